@@ -1,5 +1,5 @@
 # api.py
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 import sys
 import os
 
@@ -7,13 +7,25 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database.connection import DatabaseConnection
+from database.salud import monitor_salud
 from controllers.user_controller import UserController
+from middleware.compresion import CompresionRespuestas
+from middleware.lecturas import LeerTusEscrituras
 
 app = Flask(__name__)
 
+# Compresión de respuestas (gzip, y br/zstd si están instalados)
+compresion = CompresionRespuestas(app)
+
 # Inicializar controlador
 user_controller = UserController()
 
+# Con réplicas de lectura o la réplica en memoria, quien acaba de escribir lee de la primaria
+ventanas_escritura = [origen.ventana_escritura for origen in
+                      (user_controller.user_model.lecturas, user_controller.user_model.replica) if origen]
+if ventanas_escritura:
+    LeerTusEscrituras(app, ventana=max(ventanas_escritura))
+
 # ===== VALIDADORES =====
 
 def validar_id_usuario(usuario_id):
@@ -36,6 +48,15 @@ def validar_id_usuario(usuario_id):
 def inicio():
     return user_controller.obtener_info_sistema()
 
+# Sondas de vida y disponibilidad (no consultan la tabla users)
+@app.route('/salud', methods=['GET'])
+def salud():
+    return user_controller.salud()
+
+@app.route('/listo', methods=['GET'])
+def listo():
+    return user_controller.listo()
+
 # Endpoints de usuarios
 @app.route('/usuarios', methods=['GET'])
 def obtener_usuarios():
@@ -46,8 +67,15 @@ def obtener_usuario(usuario_id):
     valido, resultado = validar_id_usuario(usuario_id)
     if not valido:
         return jsonify({"exito": False, "error": resultado}), 400
+    # Flask atiende HEAD con la ruta GET; aquí solo se comprueba la existencia
+    if request.method == 'HEAD':
+        return user_controller.existe(resultado)
     return user_controller.obtener_por_id(resultado)
 
+@app.route('/usuarios/email-disponible', methods=['GET'])
+def email_disponible():
+    return user_controller.email_disponible()
+
 @app.route('/usuarios', methods=['POST'])
 def crear_usuario():
     return user_controller.crear()
@@ -73,10 +101,73 @@ def eliminar_usuario(usuario_id):
         return jsonify({"exito": False, "error": resultado}), 400
     return user_controller.eliminar(resultado)
 
+@app.route('/usuarios/<usuario_id>/restaurar', methods=['POST'])
+def restaurar_usuario(usuario_id):
+    valido, resultado = validar_id_usuario(usuario_id)
+    if not valido:
+        return jsonify({"exito": False, "error": resultado}), 400
+    return user_controller.restaurar(resultado)
+
 @app.route('/usuarios/paginado', methods=['GET'])
 def obtener_usuarios_paginados():
     return user_controller.obtener_paginados()
 
+@app.route('/usuarios/por-email/<email>', methods=['PUT'])
+def upsert_usuario_por_email(email):
+    return user_controller.upsert_por_email(email)
+
+@app.route('/usuarios/por-email', methods=['PUT'])
+def upsert_usuarios_lote():
+    return user_controller.upsert_lote()
+
+@app.route('/usuarios/lote', methods=['PATCH'])
+def actualizar_usuarios_lote():
+    return user_controller.actualizar_lote()
+
+@app.route('/usuarios/lote', methods=['DELETE'])
+def eliminar_usuarios_lote():
+    return user_controller.eliminar_lote()
+
+@app.route('/usuarios/por-filtro', methods=['PATCH'])
+def mutar_usuarios_por_filtro():
+    return user_controller.mutar_por_filtro()
+
+@app.route('/usuarios/exportaciones', methods=['POST'])
+def iniciar_exportacion_usuarios():
+    return user_controller.iniciar_exportacion()
+
+@app.route('/usuarios/exportaciones/<exportacion_id>', methods=['GET'])
+def obtener_exportacion_usuarios(exportacion_id):
+    return user_controller.obtener_exportacion(exportacion_id)
+
+@app.route('/usuarios/cambios', methods=['GET'])
+def suscribir_cambios_usuarios():
+    return user_controller.suscribir_cambios()
+
+@app.route('/usuarios/cambios-desde', methods=['GET'])
+def obtener_cambios_desde():
+    return user_controller.cambios_desde()
+
+@app.route('/usuarios/estadisticas', methods=['GET'])
+def obtener_estadisticas_usuarios():
+    return user_controller.obtener_distribuciones()
+
+@app.route('/usuarios/altas', methods=['GET'])
+def obtener_altas_usuarios():
+    return user_controller.obtener_altas()
+
+@app.route('/usuarios/estadisticas/numericas', methods=['GET'])
+def obtener_estadisticas_numericas():
+    return user_controller.obtener_estadisticas_numericas()
+
+@app.route('/usuarios/buscar', methods=['GET'])
+def buscar_usuarios():
+    return user_controller.buscar()
+
+@app.route('/usuarios/buscar/indice', methods=['GET'])
+def estado_indice_busqueda():
+    return user_controller.estado_indice_busqueda()
+
 # ===== CONFIGURACIÓN E INICIO =====
 
 if __name__ == '__main__':
@@ -100,15 +191,33 @@ if __name__ == '__main__':
     
     # Verificar que la base de datos esté lista
     if db.verificar_tabla_existe():
+        monitor_salud.iniciar()
         print("🚀 Servidor iniciado en http://localhost:8000")
         print("📋 Endpoints disponibles:")
         print("   GET    http://localhost:8000/")
+        print("   GET    http://localhost:8000/salud")
+        print("   GET    http://localhost:8000/listo")
         print("   GET    http://localhost:8000/usuarios")
         print("   GET    http://localhost:8000/usuarios/1")
+        print("   HEAD   http://localhost:8000/usuarios/1")
+        print("   GET    http://localhost:8000/usuarios/email-disponible?email=ana@ejemplo.com")
         print("   POST   http://localhost:8000/usuarios")
         print("   PUT    http://localhost:8000/usuarios/1")
         print("   PATCH  http://localhost:8000/usuarios/1")
         print("   DELETE http://localhost:8000/usuarios/1")
+        print("   POST   http://localhost:8000/usuarios/1/restaurar")
+        print("   PUT    http://localhost:8000/usuarios/por-email/<email>")
+        print("   PUT    http://localhost:8000/usuarios/por-email")
+        print("   PATCH  http://localhost:8000/usuarios/lote")
+        print("   DELETE http://localhost:8000/usuarios/lote")
+        print("   PATCH  http://localhost:8000/usuarios/por-filtro?ciudad=Madrid")
+        print("   POST   http://localhost:8000/usuarios/exportaciones")
+        print("   GET    http://localhost:8000/usuarios/cambios (SSE)")
+        print("   GET    http://localhost:8000/usuarios/cambios-desde?desde=2026-01-01T00:00:00")
+        print("   GET    http://localhost:8000/usuarios/estadisticas?dimension=ciudad,edad")
+        print("   GET    http://localhost:8000/usuarios/altas?periodo=mes&por_ciudad=true")
+        print("   GET    http://localhost:8000/usuarios/estadisticas/numericas?campo=salario&agrupar_por=ciudad")
+        print("   GET    http://localhost:8000/usuarios/buscar?q=ana mad")
         print("\n🏗️ Arquitectura Modular:")
         print("   📁 database/connection.py - Gestión de conexiones")
         print("   📁 models/user_model.py - Operaciones de base de datos")
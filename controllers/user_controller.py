@@ -1,13 +1,92 @@
 # controllers/user_controller.py
 import os
-from flask import jsonify, request
+import re
+import json
+import base64
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from flask import jsonify, request, Response
 from models.user_model import UserModel
+from models.exportacion import ExportadorUsuarios
+from models.estadisticas import CacheEstadisticas
+from models.instantanea import InstantaneaUsuarios
+from models.replica import ReplicaUsuarios
+from models.indice_busqueda import IndiceBusqueda
+from models.filtro_emails import FiltroEmails
+from database.salud import monitor_salud
+from database.refresco import refresco_estadisticas
+from database.cambios import central_cambios, formatear_sse, EVENTO_REINICIO, EVENTO_DESBORDAMIENTO
+from middleware.preferencias import respuesta_minima_solicitada
 
 class UserController:
     """Controlador para manejar las operaciones de usuarios"""
     
     def __init__(self):
         self.user_model = UserModel()
+        # Máximo de registros aceptados por petición en operaciones por lote
+        self.lote_maximo = int(os.getenv('LOTE_MAXIMO', '1000'))
+        # Límite de filas y tamaño de lote de las mutaciones por filtro
+        self.mutacion_maximo_filas = int(os.getenv('MUTACION_MAXIMO_FILAS', '10000'))
+        self.mutacion_tamano_lote = int(os.getenv('MUTACION_TAMANO_LOTE', '500'))
+        # Exportaciones completas: directorio de salida, conexiones y hilos en curso
+        self.exportacion_directorio = Path(os.getenv('EXPORTACION_DIRECTORIO', 'exportaciones'))
+        self.exportacion_trabajadores = int(os.getenv('EXPORTACION_TRABAJADORES', '4'))
+        self.exportaciones = {}
+        # Sincronización incremental: margen frente a commits en curso y retención de lápidas
+        self.sincronizacion_margen = int(os.getenv('SINCRONIZACION_MARGEN_SEGUNDOS', '5'))
+        self.sincronizacion_retencion = int(os.getenv('SINCRONIZACION_RETENCION_DIAS', '30'))
+        # Estadísticas de GET / servidas desde memoria (ESTADISTICAS_INTERVALO)
+        self.estadisticas = CacheEstadisticas(self.user_model)
+        self.estadisticas.iniciar()
+        # Copia columnar para estadísticas numéricas (requiere numpy)
+        self.instantanea = InstantaneaUsuarios()
+        # Réplica completa en memoria para lecturas (opcional, REPLICA_MEMORIA=true)
+        if os.getenv('REPLICA_MEMORIA', 'false').lower() == 'true':
+            self.user_model.replica = ReplicaUsuarios(self.user_model, margen_segundos=self.sincronizacion_margen)
+            self.user_model.replica.iniciar()
+        # Medición del retraso de las réplicas de lectura (DB_REPLICAS)
+        if self.user_model.lecturas:
+            self.user_model.lecturas.iniciar()
+        # Índice invertido en memoria para la búsqueda (opcional, INDICE_BUSQUEDA=true)
+        if os.getenv('INDICE_BUSQUEDA', 'false').lower() == 'true':
+            self.user_model.indice_busqueda = IndiceBusqueda()
+            self.user_model.indice_busqueda.iniciar()
+        # Refresco periódico de la vista usuarios_estadisticas cada ESTADISTICAS_REFRESCO
+        # segundos (REFRESCO_ESTADISTICAS=false lo desactiva)
+        if os.getenv('REFRESCO_ESTADISTICAS', 'true').lower() == 'true':
+            refresco_estadisticas.iniciar()
+        # Filtro de Bloom de emails registrados (FILTRO_EMAILS=false lo desactiva)
+        if os.getenv('FILTRO_EMAILS', 'true').lower() == 'true':
+            self.user_model.filtro_emails = FiltroEmails(consulta=self.user_model.sql_emails())
+            self.user_model.filtro_emails.iniciar()
+    
+    @staticmethod
+    def _estado_error(error):
+        """404 si no existe, 409 si está archivado (se modifica tras restaurarlo) y 400 en el resto"""
+        mensaje = str(error).lower()
+        if "no encontrado" in mensaje:
+            return 404
+        return 409 if mensaje.startswith("usuario archivado") else 400
+    
+    @staticmethod
+    def _etag_usuario(usuario):
+        """ETag derivado del id y de la fecha de la última modificación"""
+        version = usuario.get('fecha_actualizacion') or usuario.get('fecha_registro') or ''
+        return hashlib.sha1(f"{usuario['id']}:{version}".encode('utf-8')).hexdigest()[:20]
+    
+    def _respuesta_minima(self, usuario, status_code):
+        """Respuesta para 'Prefer: return=minimal': solo id, Location y ETag"""
+        if status_code == 201:
+            response = jsonify({"id": usuario['id']})
+            response.status_code = 201
+        else:
+            response = Response(status=204)
+        response.headers['Location'] = f"/usuarios/{usuario['id']}"
+        response.headers['Preference-Applied'] = 'return=minimal'
+        response.set_etag(self._etag_usuario(usuario), weak=True)
+        return response
     
     def obtener_todos(self):
         """GET /usuarios - Obtener todos los usuarios"""
@@ -47,11 +126,13 @@ class UserController:
         try:
             usuario = self.user_model.obtener_por_id(usuario_id)
             if usuario:
-                return jsonify({
+                response = jsonify({
                     "exito": True,
                     "datos": usuario,
                     "mensaje": "Usuario encontrado"
-                }), 200
+                })
+                response.set_etag(self._etag_usuario(usuario), weak=True)
+                return response, 200
             else:
                 return jsonify({
                     "exito": False,
@@ -63,6 +144,39 @@ class UserController:
                 "error": str(e)
             }), 500
     
+    def existe(self, usuario_id):
+        """HEAD /usuarios/<id> - 200 o 404 sin cuerpo ni lectura de la fila"""
+        try:
+            return Response(status=200 if self.user_model.existe(usuario_id) else 404)
+        except Exception:
+            return Response(status=500)
+    
+    def email_disponible(self):
+        """GET /usuarios/email-disponible?email= - Comprobar si un email está libre"""
+        email = request.args.get('email', '').strip()
+        if not email or '@' not in email:
+            return jsonify({
+                "exito": False,
+                "error": "El parámetro email es requerido y debe ser un email válido"
+            }), 400
+        
+        try:
+            disponible, fuente = self.user_model.email_disponible(email)
+            # El filtro y la réplica de este worker no ven las altas y bajas de
+            # los demás hasta su siguiente recarga: solo PostgreSQL es autoritativo
+            consistencia = 'eventual' if fuente in ('filtro', 'replica') else 'inmediata'
+            return jsonify({
+                "exito": True,
+                "datos": {"email": email, "disponible": disponible, "fuente": fuente,
+                          "consistencia": consistencia},
+                "mensaje": "Email disponible" if disponible else "El email ya está registrado"
+            }), 200
+        except Exception as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 500
+    
     def crear(self, datos=None):
         """POST /usuarios - Crear nuevo usuario"""
         # Si no se proporcionan datos directamente, obtenerlos de request
@@ -90,7 +204,11 @@ class UserController:
                 }), 400
         
         try:
-            nuevo_usuario = self.user_model.crear(datos)
+            # Con 'Prefer: return=minimal' no se serializa el usuario creado
+            minima = respuesta_minima_solicitada()
+            nuevo_usuario = self.user_model.crear(datos, minimo=minima)
+            if minima:
+                return self._respuesta_minima(nuevo_usuario, 201)
             
             # Para tests, devolver datos directos sin jsonify
             if os.getenv('TESTING') == 'true' and datos is not None:
@@ -155,23 +273,27 @@ class UserController:
                 }), 400
         
         try:
-            usuario_actualizado = self.user_model.actualizar(usuario_id, datos)
+            minima = respuesta_minima_solicitada()
+            resultado = self.user_model.actualizar(usuario_id, datos, minimo=minima)
+            if minima:
+                return self._respuesta_minima(resultado["usuario"], 204)
+            
+            # Informar solo de los campos que cambiaron realmente
+            respuesta = {
+                "exito": True,
+                "datos": resultado["usuario"],
+                "campos_modificados": resultado["campos_modificados"],
+                "mensaje": "Usuario actualizado exitosamente" if resultado["campos_modificados"]
+                           else "Sin cambios: los valores enviados coinciden con los almacenados"
+            }
             
             # Para tests, devolver datos directos sin jsonify
             if os.getenv('TESTING') == 'true':
-                return {
-                    "exito": True,
-                    "datos": usuario_actualizado,
-                    "mensaje": "Usuario actualizado exitosamente"
-                }, 200
+                return respuesta, 200
             else:
-                return jsonify({
-                    "exito": True,
-                    "datos": usuario_actualizado,
-                    "mensaje": "Usuario actualizado exitosamente"
-                }), 200
+                return jsonify(respuesta), 200
         except ValueError as e:
-            error_status = 404 if "no encontrado" in str(e).lower() else 400
+            error_status = self._estado_error(e)
             if os.getenv('TESTING') == 'true':
                 return {
                     "exito": False,
@@ -220,7 +342,10 @@ class UserController:
                 }), 400
         
         try:
-            resultado = self.user_model.actualizar_parcial(usuario_id, datos)
+            minima = respuesta_minima_solicitada()
+            resultado = self.user_model.actualizar_parcial(usuario_id, datos, minimo=minima)
+            if minima:
+                return self._respuesta_minima(resultado["usuario"], 204)
             
             # Para tests, devolver datos directos sin jsonify
             if os.getenv('TESTING') == 'true':
@@ -236,7 +361,7 @@ class UserController:
                     "mensaje": "Usuario actualizado parcialmente"
                 }), 200
         except ValueError as e:
-            error_status = 404 if "no encontrado" in str(e).lower() else 400
+            error_status = self._estado_error(e)
             if os.getenv('TESTING') == 'true':
                 return {
                     "exito": False,
@@ -262,7 +387,12 @@ class UserController:
     def eliminar(self, usuario_id):
         """DELETE /usuarios/<id> - Eliminar usuario"""
         try:
-            resultado = self.user_model.eliminar(usuario_id)
+            minima = respuesta_minima_solicitada()
+            resultado = self.user_model.eliminar(usuario_id, minimo=minima)
+            if minima:
+                response = Response(status=204)
+                response.headers['Preference-Applied'] = 'return=minimal'
+                return response
             return jsonify({
                 "exito": True,
                 "datos": resultado,
@@ -279,6 +409,401 @@ class UserController:
                 "error": str(e)
             }), 500
     
+    def restaurar(self, usuario_id):
+        """POST /usuarios/<id>/restaurar - Devolver un usuario archivado a la tabla principal"""
+        if not self.user_model.archivo:
+            return jsonify({
+                "exito": False,
+                "error": "El archivo de usuarios no está activado (ARCHIVO_USUARIOS=true)"
+            }), 501
+        
+        try:
+            usuario = self.user_model.restaurar(usuario_id)
+            if not usuario:
+                return jsonify({
+                    "exito": False,
+                    "error": "Usuario no encontrado en el archivo"
+                }), 404
+            return jsonify({
+                "exito": True,
+                "datos": usuario,
+                "mensaje": "Usuario restaurado del archivo"
+            }), 200
+        except Exception as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 500
+    
+    def upsert_por_email(self, email):
+        """PUT /usuarios/por-email/<email> - Crear o actualizar usuario por email"""
+        if request.content_type and 'application/json' not in request.content_type:
+            return jsonify({
+                "exito": False,
+                "error": "Content-Type debe ser application/json"
+            }), 415
+        
+        datos = request.get_json()
+        if not isinstance(datos, dict) or not datos.get('nombre'):
+            return jsonify({
+                "exito": False,
+                "error": "El nombre es requerido"
+            }), 400
+        
+        # El email de la URL manda sobre el del cuerpo
+        datos['email'] = email
+        
+        try:
+            minima = respuesta_minima_solicitada()
+            resultado = self.user_model.upsert_por_email([datos], minimo=minima)[0]
+            if resultado["resultado"] == 'archivado':
+                return jsonify({
+                    "exito": False,
+                    "resultado": "archivado",
+                    "error": "Usuario archivado: restáurelo antes de modificarlo"
+                }), 409
+            if resultado["resultado"] == 'conflicto':
+                return jsonify({
+                    "exito": False,
+                    "resultado": "conflicto",
+                    "error": "El email se modificó de forma concurrente, inténtelo de nuevo"
+                }), 409
+            status_code = 201 if resultado["resultado"] == 'insertado' else 200
+            
+            if minima:
+                return self._respuesta_minima(resultado["usuario"], 201 if status_code == 201 else 204)
+            
+            return jsonify({
+                "exito": True,
+                "datos": resultado["usuario"],
+                "resultado": resultado["resultado"],
+                "mensaje": f"Usuario {resultado['resultado']} por email"
+            }), status_code
+        except ValueError as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 400
+        except Exception as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 500
+    
+    def upsert_lote(self):
+        """PUT /usuarios/por-email - Crear o actualizar un lote de usuarios por email"""
+        if request.content_type and 'application/json' not in request.content_type:
+            return jsonify({
+                "exito": False,
+                "error": "Content-Type debe ser application/json"
+            }), 415
+        
+        datos = request.get_json()
+        registros = datos.get('usuarios') if isinstance(datos, dict) else datos
+        
+        if not isinstance(registros, list) or not registros:
+            return jsonify({
+                "exito": False,
+                "error": "Se espera una lista de usuarios no vacía"
+            }), 400
+        if len(registros) > self.lote_maximo:
+            return jsonify({
+                "exito": False,
+                "error": f"El lote no puede superar {self.lote_maximo} usuarios"
+            }), 413
+        
+        for posicion, registro in enumerate(registros):
+            if not isinstance(registro, dict) or not registro.get('email') or not registro.get('nombre'):
+                return jsonify({
+                    "exito": False,
+                    "error": f"Registro {posicion}: nombre y email son requeridos"
+                }), 400
+        
+        try:
+            resultados = self.user_model.upsert_por_email(
+                registros, minimo=respuesta_minima_solicitada())
+            
+            resumen = {"insertados": 0, "actualizados": 0, "sin_cambios": 0, "archivados": 0, "conflictos": 0}
+            claves = {"insertado": "insertados", "actualizado": "actualizados", "sin_cambios": "sin_cambios",
+                      "archivado": "archivados", "conflicto": "conflictos"}
+            for resultado in resultados:
+                resumen[claves[resultado["resultado"]]] += 1
+            
+            return jsonify({
+                "exito": True,
+                "datos": {
+                    "resumen": resumen,
+                    "resultados": resultados
+                },
+                "mensaje": f"Lote procesado: {len(resultados)} usuario(s)"
+            }), 200
+        except ValueError as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 400
+        except Exception as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 500
+    
+    def _ids_del_lote(self, claves):
+        """Convertir y validar los IDs de un lote; devuelve (ids, error)
+        
+        Solo enteros JSON o cadenas de dígitos: int() truncaría 1.9 a 1.
+        """
+        ids, vistos = [], set()
+        for clave in claves:
+            if isinstance(clave, int) and not isinstance(clave, bool):
+                usuario_id = clave
+            elif isinstance(clave, str) and clave.isascii() and clave.isdigit():
+                usuario_id = int(clave)
+            else:
+                return None, f"ID inválido en el lote: {clave}"
+            if usuario_id <= 0:
+                return None, f"ID inválido en el lote: {clave}"
+            if usuario_id not in vistos:
+                vistos.add(usuario_id)
+                ids.append(usuario_id)
+        return ids, None
+    
+    def actualizar_lote(self):
+        """PATCH /usuarios/lote - Actualizar parcialmente varios usuarios"""
+        if request.content_type and 'application/json' not in request.content_type:
+            return jsonify({
+                "exito": False,
+                "error": "Content-Type debe ser application/json"
+            }), 415
+        
+        datos = request.get_json()
+        if isinstance(datos, dict) and isinstance(datos.get('usuarios'), (dict, list)):
+            datos = datos['usuarios']
+        
+        # Se admite un mapa {id: campos} o una lista de objetos con 'id'
+        if isinstance(datos, list):
+            if not all(isinstance(registro, dict) and 'id' in registro for registro in datos):
+                return jsonify({
+                    "exito": False,
+                    "error": "Cada usuario del lote debe incluir su 'id'"
+                }), 400
+            pares = [(registro['id'], {c: v for c, v in registro.items() if c != 'id'})
+                     for registro in datos]
+        elif isinstance(datos, dict):
+            pares = list(datos.items())
+        else:
+            pares = []
+        
+        if not pares:
+            return jsonify({
+                "exito": False,
+                "error": "Se espera un lote de usuarios no vacío"
+            }), 400
+        if len(pares) > self.lote_maximo:
+            return jsonify({
+                "exito": False,
+                "error": f"El lote no puede superar {self.lote_maximo} usuarios"
+            }), 413
+        
+        ids, error = self._ids_del_lote([clave for clave, _ in pares])
+        if error:
+            return jsonify({"exito": False, "error": error}), 400
+        
+        # Un ID repetido acumula sus campos: el último valor de cada campo gana
+        cambios = {usuario_id: {} for usuario_id in ids}
+        for clave, campos in pares:
+            if not isinstance(campos, dict):
+                return jsonify({
+                    "exito": False,
+                    "error": f"Usuario {clave}: se esperaba un objeto con los campos"
+                }), 400
+            validos = {c: v for c, v in campos.items() if c in self.user_model.CAMPOS_ACTUALIZABLES}
+            if not validos:
+                return jsonify({
+                    "exito": False,
+                    "error": f"Usuario {clave}: no hay campos válidos para actualizar"
+                }), 400
+            cambios[int(clave)].update(validos)
+        
+        try:
+            resultados = self.user_model.actualizar_lote(cambios)
+            
+            resumen = {"actualizados": 0, "sin_cambios": 0, "archivados": 0, "no_encontrados": 0}
+            claves = {"actualizado": "actualizados", "sin_cambios": "sin_cambios",
+                      "archivado": "archivados", "no_encontrado": "no_encontrados"}
+            for resultado in resultados.values():
+                resumen[claves[resultado]] += 1
+            
+            return jsonify({
+                "exito": True,
+                "datos": {
+                    "resumen": resumen,
+                    "resultados": [{"id": usuario_id, "resultado": resultados.get(usuario_id, 'no_encontrado')}
+                                   for usuario_id in ids]
+                },
+                "mensaje": f"Lote procesado: {len(ids)} usuario(s)"
+            }), 200
+        except ValueError as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 400
+        except Exception as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 500
+    
+    def eliminar_lote(self):
+        """DELETE /usuarios/lote - Eliminar varios usuarios"""
+        datos = request.get_json(silent=True)
+        ids = datos.get('ids') if isinstance(datos, dict) else datos
+        
+        if not isinstance(ids, list) or not ids:
+            return jsonify({
+                "exito": False,
+                "error": "Se espera una lista 'ids' no vacía"
+            }), 400
+        if len(ids) > self.lote_maximo:
+            return jsonify({
+                "exito": False,
+                "error": f"El lote no puede superar {self.lote_maximo} usuarios"
+            }), 413
+        
+        ids, error = self._ids_del_lote(ids)
+        if error:
+            return jsonify({"exito": False, "error": error}), 400
+        
+        try:
+            resultados = self.user_model.eliminar_lote(ids)
+            eliminados = sum(1 for resultado in resultados.values() if resultado == 'eliminado')
+            
+            return jsonify({
+                "exito": True,
+                "datos": {
+                    "resumen": {"eliminados": eliminados, "no_encontrados": len(ids) - eliminados},
+                    "resultados": [{"id": usuario_id, "resultado": resultados[usuario_id]}
+                                   for usuario_id in ids]
+                },
+                "mensaje": f"Lote procesado: {eliminados} usuario(s) eliminado(s)"
+            }), 200
+        except Exception as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 500
+    
+    def _leer_filtros(self, parametros):
+        """Leer los filtros del listado de la query string; devuelve (filtros, error)"""
+        filtros = {}
+        for nombre in self.user_model.FILTROS_USUARIO:
+            valor = parametros.get(nombre)
+            if valor is None or valor == '':
+                continue
+            if nombre == 'activo':
+                if valor.lower() not in ('true', 'false'):
+                    return None, "El filtro activo debe ser true o false"
+                valor = valor.lower() == 'true'
+            elif nombre in ('edad_min', 'edad_max'):
+                try:
+                    valor = int(valor)
+                except ValueError:
+                    return None, f"El filtro {nombre} debe ser un número entero"
+            filtros[nombre] = valor
+        return filtros, None
+    
+    def mutar_por_filtro(self):
+        """PATCH /usuarios/por-filtro - Modificar un campo de todos los usuarios filtrados"""
+        if request.content_type and 'application/json' not in request.content_type:
+            return jsonify({
+                "exito": False,
+                "error": "Content-Type debe ser application/json"
+            }), 415
+        
+        filtros, error = self._leer_filtros(request.args)
+        if error:
+            return jsonify({"exito": False, "error": error}), 400
+        if not filtros:
+            return jsonify({
+                "exito": False,
+                "error": f"Se requiere al menos un filtro: {', '.join(self.user_model.FILTROS_USUARIO)}"
+            }), 400
+        
+        datos = request.get_json(silent=True)
+        if not isinstance(datos, dict):
+            return jsonify({
+                "exito": False,
+                "error": "Se espera un objeto con campo, operacion y valor"
+            }), 400
+        
+        campo = datos.get('campo')
+        operacion = datos.get('operacion', 'asignar')
+        valor = datos.get('valor')
+        if operacion not in self.user_model.MUTACIONES_POR_FILTRO.get(campo, ()):
+            permitidas = {c: list(o) for c, o in self.user_model.MUTACIONES_POR_FILTRO.items()}
+            return jsonify({
+                "exito": False,
+                "error": f"Campo u operación no permitidos. Permitidos: {permitidas}"
+            }), 400
+        if operacion != 'asignar' and (isinstance(valor, bool) or not isinstance(valor, (int, float))):
+            return jsonify({
+                "exito": False,
+                "error": f"La operación {operacion} requiere un valor numérico"
+            }), 400
+        if campo == 'activo' and not isinstance(valor, bool):
+            return jsonify({
+                "exito": False,
+                "error": "El valor de activo debe ser true o false"
+            }), 400
+        
+        try:
+            conteo = self.user_model.contar_por_filtro(filtros, campo, operacion, valor)
+            
+            if datos.get('simular'):
+                return jsonify({
+                    "exito": True,
+                    "datos": dict(conteo, simulacion=True, filtros=filtros),
+                    "mensaje": f"Simulación: se modificarían {conteo['a_modificar']} usuario(s)"
+                }), 200
+            
+            if conteo['a_modificar'] > self.mutacion_maximo_filas:
+                return jsonify({
+                    "exito": False,
+                    "datos": conteo,
+                    "error": f"La operación afectaría a {conteo['a_modificar']} usuarios; "
+                             f"el máximo es {self.mutacion_maximo_filas}"
+                }), 409
+            
+            # El límite se vuelve a aplicar durante la mutación: el recuento no ve
+            # las filas que otras transacciones hagan coincidir mientras tanto
+            resultado = self.user_model.mutar_por_filtro(
+                filtros, campo, operacion, valor, tamano_lote=self.mutacion_tamano_lote,
+                maximo_filas=self.mutacion_maximo_filas)
+            
+            if resultado['limite_alcanzado']:
+                return jsonify({
+                    "exito": False,
+                    "datos": dict(resultado, coinciden=conteo['coinciden'], filtros=filtros),
+                    "error": f"Se alcanzó el máximo de {self.mutacion_maximo_filas} usuarios: "
+                             f"{resultado['filas_actualizadas']} actualizados y el resto sin modificar"
+                }), 409
+            
+            return jsonify({
+                "exito": True,
+                "datos": dict(resultado, coinciden=conteo['coinciden'], filtros=filtros),
+                "mensaje": f"{resultado['filas_actualizadas']} usuario(s) actualizado(s)"
+            }), 200
+        except ValueError as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 400
+        except Exception as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 500
+    
     def obtener_paginados(self):
         """GET /usuarios/paginado - Obtener usuarios con paginación"""
         try:
@@ -308,8 +833,12 @@ class UserController:
                     "error": "El límite debe estar entre 1 y 100"
                 }), 400
             
+            filtros, error = self._leer_filtros(request.args)
+            if error:
+                return jsonify({"exito": False, "error": error}), 400
+            
             # Obtener usuarios paginados
-            resultado = self.user_model.obtener_paginados(pagina, limite)
+            resultado = self.user_model.obtener_paginados(pagina, limite, filtros)
             return jsonify({
                 "exito": True,
                 "datos": resultado,
@@ -321,10 +850,423 @@ class UserController:
                 "error": str(e)
             }), 500
     
+    def _ejecutar_exportacion(self, exportacion_id, exportador, reanudar):
+        """Cuerpo del hilo de una exportación: guarda el error si falla"""
+        try:
+            exportador.exportar(reanudar=reanudar)
+        except Exception as e:
+            print(f"❌ Error en la exportación {exportacion_id}: {e}")
+            self.exportaciones[exportacion_id]["error"] = str(e)
+    
+    def iniciar_exportacion(self):
+        """POST /usuarios/exportaciones - Lanzar (o reanudar) una exportación completa"""
+        if self.user_model.db.shards:
+            return jsonify({
+                "exito": False,
+                "error": "Las exportaciones no están disponibles con DB_SHARDS: exporte cada shard por separado"
+            }), 501
+        
+        datos = request.get_json(silent=True) or {}
+        formato = datos.get('formato', 'csv')
+        reanudar = datos.get('reanudar')
+        
+        if formato not in ExportadorUsuarios.FORMATOS:
+            return jsonify({
+                "exito": False,
+                "error": f"Formato no soportado. Use: {', '.join(ExportadorUsuarios.FORMATOS)}"
+            }), 400
+        
+        if reanudar:
+            exportacion_id = str(reanudar)
+            if not re.fullmatch(r'\d{20}', exportacion_id) or \
+                    not (self.exportacion_directorio / exportacion_id / 'manifiesto.json').exists():
+                return jsonify({
+                    "exito": False,
+                    "error": "Exportación no encontrada"
+                }), 404
+        else:
+            exportacion_id = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        
+        en_curso = self.exportaciones.get(exportacion_id)
+        if en_curso and en_curso["hilo"].is_alive():
+            return jsonify({
+                "exito": False,
+                "error": "La exportación ya está en curso"
+            }), 409
+        
+        exportador = ExportadorUsuarios(self.exportacion_directorio / exportacion_id, formato,
+                                        trabajadores=self.exportacion_trabajadores)
+        hilo = threading.Thread(target=self._ejecutar_exportacion,
+                                args=(exportacion_id, exportador, bool(reanudar)), daemon=True)
+        self.exportaciones[exportacion_id] = {"hilo": hilo, "error": None}
+        hilo.start()
+        
+        response = jsonify({
+            "exito": True,
+            "datos": {"id": exportacion_id, "formato": formato, "estado": "en_curso"},
+            "mensaje": "Exportación iniciada"
+        })
+        response.status_code = 202
+        response.headers['Location'] = f"/usuarios/exportaciones/{exportacion_id}"
+        return response
+    
+    def obtener_exportacion(self, exportacion_id):
+        """GET /usuarios/exportaciones/<id> - Estado y manifiesto de una exportación"""
+        ruta = self.exportacion_directorio / exportacion_id / 'manifiesto.json'
+        if not re.fullmatch(r'\d{20}', exportacion_id) or not ruta.exists():
+            en_curso = self.exportaciones.get(exportacion_id)
+            if en_curso and en_curso["hilo"].is_alive():
+                return jsonify({
+                    "exito": True,
+                    "datos": {"id": exportacion_id, "estado": "en_curso"}
+                }), 200
+            return jsonify({
+                "exito": False,
+                "error": "Exportación no encontrada"
+            }), 404
+        
+        manifiesto = ExportadorUsuarios(ruta.parent).cargar_manifiesto()
+        en_curso = self.exportaciones.get(exportacion_id, {})
+        if manifiesto.get("completado"):
+            estado = "completada"
+        elif en_curso.get("hilo") and en_curso["hilo"].is_alive():
+            estado = "en_curso"
+        else:
+            # Se puede reanudar con POST {"reanudar": id}
+            estado = "interrumpida"
+        
+        rangos = manifiesto.get("rangos", [])
+        return jsonify({
+            "exito": True,
+            "datos": {
+                "id": exportacion_id,
+                "estado": estado,
+                "error": en_curso.get("error"),
+                "rangos_completados": sum(1 for r in rangos if r["completado"]),
+                "rangos_totales": len(rangos),
+                "manifiesto": manifiesto
+            }
+        }), 200
+    
+    def suscribir_cambios(self):
+        """GET /usuarios/cambios - Flujo de cambios de usuarios (Server-Sent Events)"""
+        if self.user_model.db.shards:
+            # Cada shard numera sus eventos: Last-Event-ID no sería único
+            return jsonify({
+                "exito": False,
+                "error": "El flujo de cambios no está disponible con DB_SHARDS: use /usuarios/cambios-desde"
+            }), 501
+        
+        ultimo_id = request.headers.get('Last-Event-ID') or request.args.get('ultimo_id')
+        try:
+            ultimo_id = int(ultimo_id) if ultimo_id else None
+        except ValueError:
+            return jsonify({
+                "exito": False,
+                "error": "Last-Event-ID debe ser un número entero"
+            }), 400
+        
+        resultado = central_cambios.suscribir(ultimo_id)
+        if resultado is None:
+            response = jsonify({
+                "exito": False,
+                "error": "Demasiados suscriptores, inténtelo más tarde"
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = '5'
+            return response
+        suscripcion, pendientes = resultado
+        
+        def flujo():
+            try:
+                yield "retry: 3000\n\n"
+                if pendientes is None:
+                    # El id ya salió del anillo: el cliente debe resincronizar
+                    yield formatear_sse(EVENTO_REINICIO)
+                else:
+                    for evento in pendientes:
+                        yield formatear_sse(evento)
+                while True:
+                    evento = suscripcion.siguiente(central_cambios.latido)
+                    if evento:
+                        yield formatear_sse(evento)
+                    elif suscripcion.desbordada:
+                        yield formatear_sse(EVENTO_DESBORDAMIENTO)
+                        return
+                    else:
+                        yield ": latido\n\n"
+            finally:
+                central_cambios.cancelar(suscripcion)
+        
+        response = Response(flujo(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    
+    @staticmethod
+    def _codificar_cursor(fecha, usuario_id):
+        """Cursor opaco con la marca de agua (fecha, id)"""
+        crudo = json.dumps([fecha.isoformat(), usuario_id]).encode('utf-8')
+        return base64.urlsafe_b64encode(crudo).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def _decodificar_cursor(cursor):
+        """Marca de agua (fecha, id) de un cursor; ValueError si no es válido"""
+        try:
+            crudo = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            fecha, usuario_id = json.loads(crudo)
+            return datetime.fromisoformat(fecha), int(usuario_id)
+        except (ValueError, TypeError):
+            raise ValueError("Cursor inválido")
+    
+    def cambios_desde(self):
+        """GET /usuarios/cambios-desde - Cambios y eliminaciones desde una marca de agua"""
+        try:
+            limite = int(request.args.get('limite', '100'))
+        except ValueError:
+            limite = 0
+        if limite < 1 or limite > 1000:
+            return jsonify({
+                "exito": False,
+                "error": "El límite debe estar entre 1 y 1000"
+            }), 400
+        
+        cursor = request.args.get('cursor')
+        desde = request.args.get('desde')
+        try:
+            if cursor:
+                fecha, ultimo_id = self._decodificar_cursor(cursor)
+            elif desde:
+                fecha, ultimo_id = datetime.fromisoformat(desde), 0
+            else:
+                # Sin marca de agua: sincronización completa, también paginada
+                fecha, ultimo_id = datetime.min, 0
+        except ValueError:
+            return jsonify({
+                "exito": False,
+                "error": "Parámetro desde o cursor inválido (use una fecha ISO 8601 o el cursor recibido)"
+            }), 400
+        
+        # Las lápidas más antiguas que la retención ya se purgaron: no se
+        # puede garantizar que la réplica del cliente vea todas las bajas
+        if fecha != datetime.min:
+            ahora = datetime.now(fecha.tzinfo) if fecha.tzinfo else datetime.now()
+            if fecha < ahora - timedelta(days=self.sincronizacion_retencion):
+                return jsonify({
+                    "exito": False,
+                    "error": f"La marca de agua supera la retención de {self.sincronizacion_retencion} días: "
+                             "se requiere una sincronización completa"
+                }), 410
+        
+        try:
+            resultado = self.user_model.obtener_cambios_desde(
+                fecha, ultimo_id, limite, margen_segundos=self.sincronizacion_margen)
+            marca_fecha, marca_id = resultado.pop("marca_agua")
+            
+            return jsonify({
+                "exito": True,
+                "datos": dict(
+                    resultado,
+                    marca_agua=None if marca_fecha == datetime.min else marca_fecha.isoformat(),
+                    cursor=self._codificar_cursor(marca_fecha, marca_id)
+                ),
+                "mensaje": f"{len(resultado['cambios'])} cambio(s) y {len(resultado['eliminados'])} eliminación(es)"
+            }), 200
+        except Exception as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 500
+    
+    def obtener_distribuciones(self):
+        """GET /usuarios/estadisticas - Distribuciones precalculadas por dimensión"""
+        dimensiones = [d.strip() for d in request.args.get('dimension', '').split(',') if d.strip()]
+        invalidas = [d for d in dimensiones if d not in self.user_model.DIMENSIONES_ESTADISTICAS]
+        if invalidas:
+            return jsonify({
+                "exito": False,
+                "error": f"Dimensión no válida: {', '.join(invalidas)}. "
+                         f"Use: {', '.join(self.user_model.DIMENSIONES_ESTADISTICAS)}"
+            }), 400
+        
+        try:
+            resultado = self.user_model.obtener_distribuciones(dimensiones or None)
+            return jsonify({
+                "exito": True,
+                "datos": resultado,
+                "mensaje": "Estadísticas obtenidas exitosamente"
+            }), 200
+        except Exception as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 500
+    
+    def obtener_estadisticas_numericas(self):
+        """GET /usuarios/estadisticas/numericas - Percentiles, histograma y correlación de edad/salario"""
+        if not self.instantanea.disponible():
+            return jsonify({
+                "exito": False,
+                "error": "Estadísticas numéricas no disponibles: el servidor no tiene numpy instalado"
+            }), 501
+        
+        campo = request.args.get('campo', 'salario')
+        agrupar_por = request.args.get('agrupar_por') or None
+        if campo not in InstantaneaUsuarios.NUMERICAS:
+            return jsonify({
+                "exito": False,
+                "error": f"Campo no válido. Use: {', '.join(InstantaneaUsuarios.NUMERICAS)}"
+            }), 400
+        if agrupar_por is not None and agrupar_por not in InstantaneaUsuarios.CATEGORICAS:
+            return jsonify({
+                "exito": False,
+                "error": f"agrupar_por no válido. Use: {', '.join(InstantaneaUsuarios.CATEGORICAS)}"
+            }), 400
+        try:
+            tramos = int(request.args.get('tramos', '10'))
+        except ValueError:
+            tramos = 0
+        if tramos < 1 or tramos > 100:
+            return jsonify({
+                "exito": False,
+                "error": "tramos debe estar entre 1 y 100"
+            }), 400
+        
+        if not self.instantanea.cargada():
+            # La carga inicial corre en segundo plano: no se bloquea la petición
+            self.instantanea.iniciar()
+            response = jsonify({
+                "exito": False,
+                "error": "La instantánea de usuarios se está cargando, inténtelo más tarde"
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = '5'
+            return response
+        
+        try:
+            resultado = self.instantanea.estadisticas(campo, agrupar_por, tramos)
+            return jsonify({
+                "exito": True,
+                "datos": dict(resultado, campo=campo, agrupar_por=agrupar_por,
+                              actualizado=self.instantanea.actualizado),
+                "mensaje": "Estadísticas obtenidas exitosamente"
+            }), 200
+        except Exception as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 500
+    
+    def buscar(self):
+        """GET /usuarios/buscar?q= - Búsqueda por prefijos en nombre, apellido, ciudad y profesión"""
+        consulta = request.args.get('q', '').strip()
+        if not consulta:
+            return jsonify({
+                "exito": False,
+                "error": "El parámetro q es requerido"
+            }), 400
+        try:
+            limite = int(request.args.get('limite', '20'))
+        except ValueError:
+            limite = 0
+        if limite < 1 or limite > 100:
+            return jsonify({
+                "exito": False,
+                "error": "El límite debe estar entre 1 y 100"
+            }), 400
+        
+        try:
+            resultado = self.user_model.buscar(consulta, limite)
+            return jsonify({
+                "exito": True,
+                "datos": resultado,
+                "mensaje": f"{resultado['total']} usuario(s) encontrado(s)"
+            }), 200
+        except ValueError as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 400
+        except Exception as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 500
+    
+    def estado_indice_busqueda(self):
+        """GET /usuarios/buscar/indice - Tamaño en memoria de cada índice de búsqueda"""
+        indice = self.user_model.indice_busqueda
+        if indice is None:
+            return jsonify({
+                "exito": False,
+                "error": "El índice de búsqueda en memoria no está activado (INDICE_BUSQUEDA=true)"
+            }), 404
+        return jsonify({
+            "exito": True,
+            "datos": dict(cargado=indice.cargado, indices=indice.memoria())
+        }), 200
+    
+    def obtener_altas(self):
+        """GET /usuarios/altas - Altas de usuarios por día, semana, mes o año"""
+        periodo = request.args.get('periodo', 'dia')
+        if periodo not in self.user_model.PERIODOS_ALTAS:
+            return jsonify({
+                "exito": False,
+                "error": f"Periodo no válido. Use: {', '.join(self.user_model.PERIODOS_ALTAS)}"
+            }), 400
+        
+        try:
+            desde = request.args.get('desde')
+            hasta = request.args.get('hasta')
+            desde = datetime.fromisoformat(desde).date() if desde else None
+            hasta = datetime.fromisoformat(hasta).date() if hasta else None
+        except ValueError:
+            return jsonify({
+                "exito": False,
+                "error": "Parámetros desde/hasta inválidos (use fechas ISO 8601)"
+            }), 400
+        
+        try:
+            resultado = self.user_model.obtener_altas(
+                periodo, desde, hasta,
+                ciudad=request.args.get('ciudad'),
+                por_ciudad=request.args.get('por_ciudad', '').lower() in ('1', 'true', 'si'))
+            return jsonify({
+                "exito": True,
+                "datos": dict(resultado, periodo=periodo),
+                "mensaje": f"{len(resultado['series'])} periodo(s) con altas"
+            }), 200
+        except Exception as e:
+            return jsonify({
+                "exito": False,
+                "error": str(e)
+            }), 500
+    
+    def salud(self):
+        """GET /salud - Sonda de vida: el proceso responde (sin E/S)"""
+        return jsonify({"exito": True, "estado": "vivo"}), 200
+    
+    def listo(self):
+        """GET /listo - Sonda de disponibilidad desde el estado en memoria del ping"""
+        monitor_salud.iniciar()
+        disponible, base_datos = monitor_salud.estado()
+        return jsonify({
+            "exito": disponible,
+            "estado": "listo" if disponible else "no_listo",
+            "base_datos": base_datos,
+            "cache_estadisticas": {
+                "caliente": self.estadisticas.datos is not None,
+                "actualizado": self.estadisticas.datos["actualizado"] if self.estadisticas.datos else None
+            },
+            "replica_memoria": self.user_model.replica.estado() if self.user_model.replica else None,
+            "replicas_lectura": self.user_model.lecturas.estado() if self.user_model.lecturas else None,
+            "filtro_emails": self.user_model.filtro_emails.estado() if self.user_model.filtro_emails else None
+        }), 200 if disponible else 503
+    
     def obtener_info_sistema(self):
         """GET / - Obtener información del sistema y estadísticas"""
         try:
-            estadisticas = self.user_model.obtener_estadisticas()
+            estadisticas = self.estadisticas.obtener()
             db_config = self.user_model.db.get_config_info()
             
             return jsonify({
@@ -334,6 +1276,7 @@ class UserController:
                     "base_datos": "PostgreSQL",
                     "version_postgresql": estadisticas["version_postgresql"],
                     "total_usuarios": estadisticas["total_usuarios"],
+                    "estadisticas_actualizadas": estadisticas["actualizado"],
                     "configuracion": {
                         "host": db_config['host'],
                         "database": db_config['database'],
@@ -342,11 +1285,29 @@ class UserController:
                     "endpoints": {
                         "GET /usuarios": "Obtener todos los usuarios",
                         "GET /usuarios/<id>": "Obtener usuario por ID",
+                        "HEAD /usuarios/<id>": "Comprobar si existe un usuario (sin cuerpo)",
+                        "GET /usuarios/email-disponible?email=": "Comprobar si un email está libre",
                         "POST /usuarios": "Crear nuevo usuario",
                         "PUT /usuarios/<id>": "Actualizar usuario completo",
                         "PATCH /usuarios/<id>": "Actualizar usuario parcial",
                         "DELETE /usuarios/<id>": "Eliminar usuario",
-                        "GET /usuarios/paginado": "Obtener usuarios con paginación"
+                        "POST /usuarios/<id>/restaurar": "Restaurar un usuario archivado",
+                        "PUT /usuarios/por-email/<email>": "Crear o actualizar usuario por email",
+                        "PUT /usuarios/por-email": "Crear o actualizar un lote de usuarios por email",
+                        "PATCH /usuarios/lote": "Actualizar parcialmente un lote de usuarios",
+                        "DELETE /usuarios/lote": "Eliminar un lote de usuarios",
+                        "PATCH /usuarios/por-filtro": "Modificar un campo de los usuarios que cumplen los filtros",
+                        "POST /usuarios/exportaciones": "Lanzar o reanudar una exportación completa",
+                        "GET /usuarios/exportaciones/<id>": "Estado de una exportación",
+                        "GET /usuarios/cambios": "Flujo de cambios en tiempo real (Server-Sent Events)",
+                        "GET /usuarios/cambios-desde": "Cambios y eliminaciones desde una marca de agua",
+                        "GET /usuarios/estadisticas": "Distribuciones por ciudad, profesión, género, activo y edad",
+                        "GET /usuarios/altas": "Altas por día, semana, mes o año (opcionalmente por ciudad)",
+                        "GET /usuarios/estadisticas/numericas": "Percentiles, histograma y correlación de edad y salario",
+                        "GET /usuarios/buscar?q=": "Búsqueda por prefijos en nombre, apellido, ciudad y profesión",
+                        "GET /usuarios/paginado": "Obtener usuarios con paginación",
+                        "GET /salud": "Sonda de vida del proceso",
+                        "GET /listo": "Sonda de disponibilidad (estado del ping a la base de datos)"
                     }
                 }
             }), 200
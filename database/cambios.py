@@ -0,0 +1,174 @@
+# database/cambios.py
+import os
+import json
+import time
+import select
+import threading
+from collections import deque
+from database.connection import DatabaseConnection
+
+# Eventos de control (sin id): el cliente debe volver a sincronizar o reconectar
+EVENTO_REINICIO = {"operacion": "reinicio"}
+EVENTO_DESBORDAMIENTO = {"operacion": "desbordamiento"}
+
+
+def formatear_sse(evento):
+    """Serializar un evento al formato text/event-stream"""
+    lineas = []
+    if evento.get('evento') is not None:
+        lineas.append(f"id: {evento['evento']}")
+    lineas.append(f"event: {evento['operacion']}")
+    lineas.append(f"data: {json.dumps(evento, ensure_ascii=False)}")
+    return '\n'.join(lineas) + '\n\n'
+
+
+class Suscripcion:
+    """Buffer acotado de eventos de un suscriptor"""
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self.eventos = deque()
+        self.desbordada = False
+        self._condicion = threading.Condition()
+
+    def entregar(self, evento):
+        """Encolar un evento; si el buffer está lleno la suscripción queda desbordada"""
+        with self._condicion:
+            if self.desbordada:
+                return
+            if len(self.eventos) >= self.capacidad:
+                # Contrapresión: un suscriptor lento no frena a los demás ni
+                # acumula memoria; se le desconecta y reanuda con Last-Event-ID
+                self.desbordada = True
+            else:
+                self.eventos.append(evento)
+            self._condicion.notify()
+
+    def siguiente(self, espera):
+        """Siguiente evento, o None si no llega ninguno en 'espera' segundos"""
+        with self._condicion:
+            if not self.eventos and not self.desbordada:
+                self._condicion.wait(espera)
+            return self.eventos.popleft() if self.eventos else None
+
+
+class CentralCambios:
+    """Escucha de NOTIFY sobre users y reparto de eventos a los suscriptores
+
+    Cada proceso de la API mantiene una única conexión en LISTEN (abierta con
+    la primera suscripción) y un anillo con los últimos eventos para atender
+    reconexiones con Last-Event-ID.
+    """
+
+    CANAL = 'usuarios_cambios'
+
+    def __init__(self, capacidad_anillo=None, capacidad_buffer=None, max_suscriptores=None):
+        self.anillo = deque(maxlen=capacidad_anillo or int(os.getenv('CAMBIOS_ANILLO', '1000')))
+        self.capacidad_buffer = capacidad_buffer or int(os.getenv('CAMBIOS_BUFFER', '100'))
+        self.max_suscriptores = max_suscriptores or int(os.getenv('CAMBIOS_MAX_SUSCRIPTORES', '500'))
+        self.latido = float(os.getenv('CAMBIOS_LATIDO', '15'))
+        self.suscripciones = set()
+        self.db = DatabaseConnection()
+        self._cerrojo = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def publicar(self, evento):
+        """Guardar el evento en el anillo y entregarlo a todos los suscriptores"""
+        with self._cerrojo:
+            self.anillo.append(evento)
+            suscripciones = list(self.suscripciones)
+        for suscripcion in suscripciones:
+            suscripcion.entregar(evento)
+
+    def reiniciar(self):
+        """Avisar de que se han podido perder eventos (reconexión del LISTEN)"""
+        with self._cerrojo:
+            # Sin continuidad, reanudar desde un id anterior ya no es fiable
+            self.anillo.clear()
+            suscripciones = list(self.suscripciones)
+        for suscripcion in suscripciones:
+            suscripcion.entregar(EVENTO_REINICIO)
+
+    def suscribir(self, ultimo_id=None):
+        """Registrar un suscriptor; devuelve (suscripcion, pendientes)
+
+        'pendientes' son los eventos del anillo posteriores a 'ultimo_id', o
+        None si ese id ya no está en el anillo y hace falta resincronizar.
+        Devuelve None si se alcanzó el máximo de suscriptores.
+        """
+        self.iniciar()
+        with self._cerrojo:
+            if len(self.suscripciones) >= self.max_suscriptores:
+                return None
+            suscripcion = Suscripcion(self.capacidad_buffer)
+            self.suscripciones.add(suscripcion)
+
+            # El registro y la copia del anillo van bajo el mismo cerrojo que
+            # publicar(): ningún evento se pierde ni se entrega dos veces
+            pendientes = []
+            if ultimo_id is not None:
+                eventos = list(self.anillo)
+                posiciones = [i for i, e in enumerate(eventos) if e.get('evento') == ultimo_id]
+                pendientes = eventos[posiciones[-1] + 1:] if posiciones else None
+        return suscripcion, pendientes
+
+    def cancelar(self, suscripcion):
+        with self._cerrojo:
+            self.suscripciones.discard(suscripcion)
+
+    def iniciar(self):
+        """Arrancar el hilo de escucha si no está en marcha"""
+        with self._cerrojo:
+            if self._hilo and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._escuchar, name='escucha-cambios', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+
+    def _escuchar(self):
+        """Bucle del hilo: LISTEN con reconexión y espera exponencial"""
+        espera, conectada_antes = 1, False
+        while not self._detener.is_set():
+            conn = self.db.obtener_conexion()
+            if not conn:
+                self._detener.wait(espera)
+                espera = min(espera * 2, 30)
+                continue
+            try:
+                conn.autocommit = True
+                conn.cursor().execute(f'LISTEN {self.CANAL}')
+                if conectada_antes:
+                    self.reiniciar()
+                conectada_antes, espera = True, 1
+                print(f"👂 Escuchando cambios en el canal {self.CANAL}")
+                self._procesar(conn)
+            except Exception as e:
+                print(f"❌ Error en la escucha de cambios: {e}")
+                self._detener.wait(espera)
+                espera = min(espera * 2, 30)
+            finally:
+                conn.close()
+
+    def _procesar(self, conn):
+        """Esperar notificaciones y publicarlas hasta que se pida detener"""
+        while not self._detener.is_set():
+            if select.select([conn], [], [], 1) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                aviso = conn.notifies.pop(0)
+                try:
+                    evento = json.loads(aviso.payload)
+                except ValueError:
+                    continue
+                self.publicar(evento)
+
+
+# Central única por proceso: una sola conexión LISTEN por worker
+central_cambios = CentralCambios()
@@ -2,15 +2,30 @@
 import psycopg2
 import psycopg2.extras
 import os
+import zlib
 from dotenv import load_dotenv
+from database.instrumentacion import ConexionInstrumentada
 
 # Cargar variables de entorno
 load_dotenv()
 
 class DatabaseConnection:
-    """Clase para manejar la conexión a PostgreSQL"""
+    """Clase para manejar la conexión a PostgreSQL
     
-    def __init__(self):
+    Con un mapa de shards (argumento 'shards' o DB_SHARDS) los usuarios se
+    reparten entre varias bases: el shard de un id es id % número de shards.
+    Cada shard reparte ids de su resto con su secuencia (INCREMENT BY número
+    de shards, ver scripts/preparar_shards.py). Cada email queda ligado a un
+    shard en directorio_emails (migración 008) de la base DB_*: las altas y
+    el upsert de un email van siempre a ese shard, donde su índice único
+    decide, y un email nuevo se liga al shard del hash de su email.
+    
+    Las réplicas de lectura (argumento 'replicas' o DB_REPLICAS, mismo
+    formato) son standby de la primaria DB_*; database.replicas decide a
+    cuál va cada lectura.
+    """
+    
+    def __init__(self, shards=None, replicas=None):
         self.config = {
             'host': os.getenv('DB_HOST'),
             'database': os.getenv('DB_NAME'),
@@ -18,6 +33,42 @@ class DatabaseConnection:
             'password': os.getenv('DB_PASSWORD'),
             'port': os.getenv('DB_PORT')
         }
+        # Lista de configuraciones parciales (host, port, database) que
+        # completan self.config; vacía = una sola base
+        self.shards = self.leer_shards(os.getenv('DB_SHARDS', '')) if shards is None else list(shards)
+        self.replicas = self.leer_shards(os.getenv('DB_REPLICAS', '')) if replicas is None else list(replicas)
+    
+    @staticmethod
+    def leer_shards(texto):
+        """DB_SHARDS/DB_REPLICAS=5433,5434 o host:puerto[/base] separados por comas"""
+        shards = []
+        for entrada in filter(None, (parte.strip() for parte in texto.split(','))):
+            direccion, _, base = entrada.partition('/')
+            host, _, puerto = direccion.rpartition(':')
+            shard = {'port': puerto}
+            if host:
+                shard['host'] = host
+            if base:
+                shard['database'] = base
+            shards.append(shard)
+        return shards
+    
+    @property
+    def numero_shards(self):
+        return max(len(self.shards), 1)
+    
+    def shard_de_id(self, usuario_id):
+        return int(usuario_id) % self.numero_shards
+    
+    def shard_de_email(self, email):
+        """Shard de las altas de un email (crc32: estable entre procesos)"""
+        return zlib.crc32((email or '').encode('utf-8')) % self.numero_shards
+    
+    def exigir_base_unica(self, proceso):
+        """Error si hay shards: 'proceso' solo trabaja sobre una base"""
+        if self.shards:
+            raise Exception(f"{proceso} no admite DB_SHARDS: ejecútalo en cada shard "
+                            f"con DB_HOST/DB_PORT/DB_NAME del shard y sin DB_SHARDS")
     
     def validar_configuracion(self):
         """Validar que todas las variables de entorno estén configuradas"""
@@ -50,11 +101,36 @@ class DatabaseConnection:
                 return None
                 
             conn = psycopg2.connect(**self.config)
-            return conn
+            # Instrumentar para contar las sentencias enviadas al servidor
+            return ConexionInstrumentada(conn)
         except psycopg2.Error as e:
             print(f"❌ Error conectando a PostgreSQL: {e}")
             return None
     
+    def _derivada(self, parcial):
+        """DatabaseConnection de una sola base: self.config con 'parcial' encima"""
+        db = DatabaseConnection(shards=[], replicas=[])
+        db.config = dict(self.config, **parcial)
+        return db
+    
+    def de_shard(self, shard):
+        """DatabaseConnection de un solo shard (scripts que recorren los shards)"""
+        return self._derivada(self.shards[shard])
+    
+    def de_replica(self, replica):
+        """DatabaseConnection de una réplica de lectura"""
+        return self._derivada(self.replicas[replica])
+    
+    def obtener_conexion_shard(self, shard):
+        """Conexión a un shard; sin shards, la conexión de siempre"""
+        if not self.shards:
+            return self.obtener_conexion()
+        return self.de_shard(shard).obtener_conexion()
+    
+    def obtener_conexion_por_id(self, usuario_id):
+        """Conexión al shard que guarda el usuario"""
+        return self.obtener_conexion_shard(self.shard_de_id(usuario_id))
+    
     def verificar_tabla_existe(self):
         """Verificar que la base de datos y tabla existen"""
         conn = self.obtener_conexion()
@@ -0,0 +1,105 @@
+# database/instrumentacion.py
+import threading
+from contextlib import contextmanager
+
+
+class ContadorConsultas:
+    """Contador de sentencias SQL enviadas a PostgreSQL"""
+
+    def __init__(self):
+        self.total = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def registrar(self, sentencia):
+        """Anotar una sentencia ejecutada (un viaje de ida y vuelta)"""
+        with self._lock:
+            self.total += 1
+        for registro in getattr(self._local, 'registros', ()):
+            registro.append(sentencia)
+
+    @contextmanager
+    def medir(self):
+        """Recoger las sentencias ejecutadas por el hilo actual dentro del bloque"""
+        registro = []
+        if not hasattr(self._local, 'registros'):
+            self._local.registros = []
+        self._local.registros.append(registro)
+        try:
+            yield registro
+        finally:
+            self._local.registros.remove(registro)
+
+
+# Contador compartido por todas las conexiones del proceso
+contador_consultas = ContadorConsultas()
+
+
+class CursorInstrumentado:
+    """Envoltorio de cursor que notifica cada sentencia al contador"""
+
+    def __init__(self, cursor, contador):
+        self._cursor = cursor
+        self._contador = contador
+
+    def execute(self, consulta, parametros=None):
+        self._contador.registrar(consulta)
+        return self._cursor.execute(consulta, parametros)
+
+    def executemany(self, consulta, lista_parametros):
+        # psycopg2 envía una sentencia por cada juego de parámetros
+        lista_parametros = list(lista_parametros)
+        for _ in lista_parametros:
+            self._contador.registrar(consulta)
+        return self._cursor.executemany(consulta, lista_parametros)
+
+    def copy_expert(self, consulta, archivo, *args, **kwargs):
+        self._contador.registrar(consulta)
+        return self._cursor.copy_expert(consulta, archivo, *args, **kwargs)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def __setattr__(self, nombre, valor):
+        if nombre in ('_cursor', '_contador'):
+            object.__setattr__(self, nombre, valor)
+        else:
+            setattr(self._cursor, nombre, valor)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+        return False
+
+
+class ConexionInstrumentada:
+    """Envoltorio de conexión cuyos cursores cuentan las sentencias ejecutadas"""
+
+    def __init__(self, conexion, contador=None):
+        self.conexion = conexion
+        self._contador = contador or contador_consultas
+
+    def cursor(self, *args, **kwargs):
+        return CursorInstrumentado(self.conexion.cursor(*args, **kwargs), self._contador)
+
+    def __getattr__(self, nombre):
+        return getattr(self.conexion, nombre)
+
+    def __setattr__(self, nombre, valor):
+        # Atributos como autocommit o isolation_level van a la conexión real
+        if nombre in ('conexion', '_contador'):
+            object.__setattr__(self, nombre, valor)
+        else:
+            setattr(self.conexion, nombre, valor)
+
+    def __enter__(self):
+        self.conexion.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self.conexion.__exit__(*exc_info)
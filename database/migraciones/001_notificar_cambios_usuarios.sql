@@ -0,0 +1,80 @@
+-- database/migraciones/001_notificar_cambios_usuarios.sql
+-- Notifica por el canal 'usuarios_cambios' cada INSERT, UPDATE y DELETE de users.
+-- El id del evento sale de una secuencia para que todos los procesos de la API
+-- numeren igual los eventos y 'Last-Event-ID' sirva en cualquiera de ellos.
+--
+-- Los triggers son de sentencia con tablas de transición: un lote, una
+-- mutación por filtro, una importación o un lote de archivo generan un solo
+-- NOTIFY con los ids afectados, no uno por fila (millones de avisos llenarían
+-- la cola de notificaciones y frenarían los commits).
+--
+-- Los traslados al archivo y las restauraciones (usuarios.archivo = 'on',
+-- migración 007) se avisan como 'archivo' y 'restauracion': el usuario sale
+-- o vuelve a la tabla caliente, pero no se ha dado de baja ni de alta.
+
+CREATE SEQUENCE IF NOT EXISTS usuarios_cambios_seq;
+
+CREATE OR REPLACE FUNCTION notificar_cambio_usuario() RETURNS trigger AS $$
+DECLARE
+    -- Tope de ids por aviso: el límite de NOTIFY son 8000 bytes
+    max_ids CONSTANT integer := 500;
+    total bigint;
+    ids integer[];
+    carga jsonb;
+    operacion text := lower(TG_OP);
+BEGIN
+    IF current_setting('usuarios.archivo', true) IS NOT DISTINCT FROM 'on' THEN
+        operacion := CASE TG_OP WHEN 'DELETE' THEN 'archivo' ELSE 'restauracion' END;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        SELECT COUNT(*) INTO total FROM viejos;
+        SELECT array_agg(id ORDER BY id) INTO ids
+        FROM (SELECT id FROM viejos ORDER BY id LIMIT max_ids) t;
+    ELSE
+        SELECT COUNT(*) INTO total FROM nuevos;
+        SELECT array_agg(id ORDER BY id) INTO ids
+        FROM (SELECT id FROM nuevos ORDER BY id LIMIT max_ids) t;
+    END IF;
+
+    -- Una sentencia que no toca filas no avisa
+    IF total = 0 THEN
+        RETURN NULL;
+    END IF;
+
+    -- Carga mínima: quien necesite las filas las pide con GET /usuarios/<id>.
+    -- Por encima del tope 'ids' va a null y el cliente resincroniza con
+    -- cambios-desde; con una sola fila se incluye además 'id'
+    carga := jsonb_build_object(
+        'evento', nextval('usuarios_cambios_seq'),
+        'operacion', operacion,
+        'total', total,
+        'ids', CASE WHEN total <= max_ids THEN to_jsonb(ids) END,
+        'fecha', now()
+    );
+    IF total = 1 THEN
+        carga := carga || jsonb_build_object('id', ids[1]);
+    END IF;
+
+    PERFORM pg_notify('usuarios_cambios', carga::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Las tablas de transición no admiten varios eventos en un mismo trigger
+DROP TRIGGER IF EXISTS usuarios_notificar_cambio ON users;
+
+DROP TRIGGER IF EXISTS usuarios_notificar_insert ON users;
+CREATE TRIGGER usuarios_notificar_insert
+    AFTER INSERT ON users REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_usuario();
+
+DROP TRIGGER IF EXISTS usuarios_notificar_update ON users;
+CREATE TRIGGER usuarios_notificar_update
+    AFTER UPDATE ON users REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_usuario();
+
+DROP TRIGGER IF EXISTS usuarios_notificar_delete ON users;
+CREATE TRIGGER usuarios_notificar_delete
+    AFTER DELETE ON users REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_usuario();
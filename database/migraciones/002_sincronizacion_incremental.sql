@@ -0,0 +1,61 @@
+-- database/migraciones/002_sincronizacion_incremental.sql
+-- Soporte de GET /usuarios/cambios-desde: marca de agua (fecha_actualizacion, id)
+-- y lápidas de los usuarios eliminados.
+
+-- fecha_actualizacion pasa a reflejar también el alta, para que un único
+-- índice cubra altas y modificaciones. El relleno va antes de crear el
+-- trigger: con él, cada fila rellenada recibiría la hora de la migración y
+-- todos los usuarios parecerían recién cambiados (cambios-desde, archivo).
+UPDATE users SET fecha_actualizacion = fecha_registro WHERE fecha_actualizacion IS NULL;
+
+-- Se usa clock_timestamp() (y no el inicio de la transacción) para acotar
+-- el desfase con el commit.
+CREATE OR REPLACE FUNCTION marcar_fecha_actualizacion() RETURNS trigger AS $$
+BEGIN
+    NEW.fecha_actualizacion := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS usuarios_marcar_fecha_actualizacion ON users;
+CREATE TRIGGER usuarios_marcar_fecha_actualizacion
+    BEFORE INSERT OR UPDATE ON users
+    FOR EACH ROW EXECUTE FUNCTION marcar_fecha_actualizacion();
+
+CREATE INDEX IF NOT EXISTS idx_users_fecha_actualizacion_id ON users (fecha_actualizacion, id);
+
+-- Lápidas: una fila por id eliminado, con retención de 30 días
+-- (SINCRONIZACION_RETENCION_DIAS en la API debe coincidir). 'archivado'
+-- distingue el traslado a users_archivo (migración 007) de una baja: el
+-- usuario sale de la tabla caliente pero sigue accesible por id
+CREATE TABLE IF NOT EXISTS users_eliminados (
+    id integer PRIMARY KEY,
+    fecha_eliminacion timestamp NOT NULL,
+    archivado boolean NOT NULL DEFAULT false
+);
+
+ALTER TABLE users_eliminados ADD COLUMN IF NOT EXISTS archivado boolean NOT NULL DEFAULT false;
+
+CREATE INDEX IF NOT EXISTS idx_users_eliminados_fecha_id ON users_eliminados (fecha_eliminacion, id);
+
+-- De sentencia con tabla de transición: un DELETE por lote (o un lote de
+-- archivo) registra sus lápidas con un único INSERT y purga una sola vez.
+-- Los traslados al archivo se hacen con usuarios.archivo = 'on'
+CREATE OR REPLACE FUNCTION registrar_usuario_eliminado() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO users_eliminados (id, fecha_eliminacion, archivado)
+    SELECT v.id, clock_timestamp(), current_setting('usuarios.archivo', true) IS NOT DISTINCT FROM 'on'
+    FROM viejos v
+    ON CONFLICT (id) DO UPDATE SET fecha_eliminacion = EXCLUDED.fecha_eliminacion,
+                                   archivado = EXCLUDED.archivado;
+
+    -- Purga por índice: normalmente no borra nada
+    DELETE FROM users_eliminados WHERE fecha_eliminacion < LOCALTIMESTAMP - interval '30 days';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS usuarios_registrar_eliminado ON users;
+CREATE TRIGGER usuarios_registrar_eliminado
+    AFTER DELETE ON users REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_usuario_eliminado();
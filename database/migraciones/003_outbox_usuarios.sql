@@ -0,0 +1,65 @@
+-- database/migraciones/003_outbox_usuarios.sql
+-- Outbox transaccional de cambios de usuarios. Los triggers son de sentencia
+-- con tablas de transición: cualquier escritura (individual, por lote, por
+-- filtro o importación) añade sus eventos con un único INSERT ... SELECT en
+-- la misma transacción, sin viajes extra desde la API.
+
+CREATE TABLE IF NOT EXISTS outbox_usuarios (
+    id bigserial PRIMARY KEY,
+    operacion text NOT NULL,
+    usuario_id integer NOT NULL,
+    carga jsonb,
+    creado timestamptz NOT NULL DEFAULT now(),
+    estado text NOT NULL DEFAULT 'pendiente',
+    intentos integer NOT NULL DEFAULT 0,
+    siguiente_intento timestamptz NOT NULL DEFAULT now(),
+    ultimo_error text,
+    entregas jsonb NOT NULL DEFAULT '{}'
+);
+
+-- Estado de entrega por webhook: {url: {estado, intentos, siguiente, error}}
+ALTER TABLE outbox_usuarios ADD COLUMN IF NOT EXISTS entregas jsonb NOT NULL DEFAULT '{}';
+
+-- El relay solo recorre pendientes; los entregados se borran al confirmarse
+CREATE INDEX IF NOT EXISTS idx_outbox_usuarios_pendientes
+    ON outbox_usuarios (siguiente_intento, id) WHERE estado = 'pendiente';
+
+CREATE OR REPLACE FUNCTION outbox_registrar_altas() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO outbox_usuarios (operacion, usuario_id, carga)
+    SELECT 'insert', n.id, to_jsonb(n) - 'notas' FROM nuevos n;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION outbox_registrar_modificaciones() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO outbox_usuarios (operacion, usuario_id, carga)
+    SELECT 'update', n.id, to_jsonb(n) - 'notas' FROM nuevos n;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION outbox_registrar_bajas() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO outbox_usuarios (operacion, usuario_id, carga)
+    SELECT 'delete', v.id, NULL FROM viejos v;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Las tablas de transición no admiten varios eventos en un mismo trigger
+DROP TRIGGER IF EXISTS outbox_usuarios_insert ON users;
+CREATE TRIGGER outbox_usuarios_insert
+    AFTER INSERT ON users REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION outbox_registrar_altas();
+
+DROP TRIGGER IF EXISTS outbox_usuarios_update ON users;
+CREATE TRIGGER outbox_usuarios_update
+    AFTER UPDATE ON users REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION outbox_registrar_modificaciones();
+
+DROP TRIGGER IF EXISTS outbox_usuarios_delete ON users;
+CREATE TRIGGER outbox_usuarios_delete
+    AFTER DELETE ON users REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT EXECUTE FUNCTION outbox_registrar_bajas();
@@ -0,0 +1,58 @@
+-- database/migraciones/004_estadisticas_usuarios.sql
+-- Agregados de usuarios precalculados para GET /usuarios/estadisticas: una
+-- fila por (dimension, valor). Un panel lee esta vista por su índice en vez
+-- de recorrer users; se refresca con REFRESH ... CONCURRENTLY en segundo plano.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS usuarios_estadisticas AS
+SELECT
+    CASE
+        WHEN GROUPING(ciudad) = 0 THEN 'ciudad'
+        WHEN GROUPING(profesion) = 0 THEN 'profesion'
+        WHEN GROUPING(genero) = 0 THEN 'genero'
+        WHEN GROUPING(activo) = 0 THEN 'activo'
+        ELSE 'total'
+    END AS dimension,
+    CASE
+        WHEN GROUPING(ciudad, profesion, genero, activo) = 15 THEN 'todos'
+        ELSE COALESCE(ciudad, profesion, genero, activo::text, 'sin_valor')
+    END AS valor,
+    0 AS orden,
+    COUNT(*) AS total,
+    COUNT(*) FILTER (WHERE activo) AS activos,
+    round(AVG(edad)::numeric, 1)::float8 AS edad_media,
+    round(AVG(salario)::numeric, 2)::float8 AS salario_medio,
+    percentile_cont(ARRAY[0.25, 0.5, 0.75, 0.9]) WITHIN GROUP (ORDER BY salario::float8)
+        AS salario_percentiles,
+    -- Pesos de las medias al combinar shards (DB_SHARDS)
+    COUNT(edad) AS con_edad,
+    COUNT(salario) AS con_salario,
+    now() AS calculado
+FROM users
+GROUP BY GROUPING SETS ((ciudad), (profesion), (genero), (activo), ())
+
+UNION ALL
+
+-- Histograma de edades en tramos de 10 años (0 = menores de 0, 11 = 100 o más)
+SELECT
+    'edad',
+    CASE
+        WHEN tramo = 0 THEN '<0'
+        WHEN tramo > 10 THEN '100+'
+        ELSE ((tramo - 1) * 10)::text || '-' || (tramo * 10 - 1)::text
+    END,
+    tramo,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE activo),
+    round(AVG(edad)::numeric, 1)::float8,
+    round(AVG(salario)::numeric, 2)::float8,
+    percentile_cont(ARRAY[0.25, 0.5, 0.75, 0.9]) WITHIN GROUP (ORDER BY salario::float8),
+    COUNT(edad),
+    COUNT(salario),
+    now()
+FROM (SELECT width_bucket(edad, 0, 100, 10) AS tramo, edad, activo, salario
+      FROM users WHERE edad IS NOT NULL) t
+GROUP BY tramo;
+
+-- REFRESH ... CONCURRENTLY exige un índice único sobre columnas simples
+CREATE UNIQUE INDEX IF NOT EXISTS idx_usuarios_estadisticas_dimension_valor
+    ON usuarios_estadisticas (dimension, valor);
@@ -0,0 +1,72 @@
+-- database/migraciones/005_altas_usuarios.sql
+-- Altas de usuarios por día y ciudad, mantenidas por trigger para los
+-- informes de crecimiento (GET /usuarios/altas), e índice BRIN sobre
+-- fecha_registro para consultas ad hoc por rangos de fechas.
+
+CREATE TABLE IF NOT EXISTS usuarios_altas_diarias (
+    dia date NOT NULL,
+    ciudad text NOT NULL,
+    altas bigint NOT NULL,
+    PRIMARY KEY (dia, ciudad)
+);
+
+-- Trigger de sentencia: una sola inserción agregada por sentencia sobre users.
+-- Las bajas restan y los cambios de ciudad o fecha mueven la fila de tramo,
+-- así el resumen coincide con los usuarios existentes.
+CREATE OR REPLACE FUNCTION altas_registrar() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO usuarios_altas_diarias (dia, ciudad, altas)
+        SELECT fecha_registro::date, COALESCE(ciudad, 'sin_valor'), COUNT(*)
+        FROM nuevos WHERE fecha_registro IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (dia, ciudad) DO UPDATE SET altas = usuarios_altas_diarias.altas + EXCLUDED.altas;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE usuarios_altas_diarias a SET altas = a.altas - v.bajas
+        FROM (SELECT fecha_registro::date AS dia, COALESCE(ciudad, 'sin_valor') AS ciudad, COUNT(*) AS bajas
+              FROM viejos WHERE fecha_registro IS NOT NULL GROUP BY 1, 2) v
+        WHERE a.dia = v.dia AND a.ciudad = v.ciudad;
+    ELSE
+        INSERT INTO usuarios_altas_diarias (dia, ciudad, altas)
+        SELECT dia, ciudad, SUM(delta)
+        FROM (SELECT fecha_registro::date AS dia, COALESCE(ciudad, 'sin_valor') AS ciudad, 1 AS delta
+              FROM nuevos WHERE fecha_registro IS NOT NULL
+              UNION ALL
+              SELECT fecha_registro::date, COALESCE(ciudad, 'sin_valor'), -1
+              FROM viejos WHERE fecha_registro IS NOT NULL) d
+        GROUP BY 1, 2
+        HAVING SUM(delta) <> 0
+        ON CONFLICT (dia, ciudad) DO UPDATE SET altas = usuarios_altas_diarias.altas + EXCLUDED.altas;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS altas_usuarios_insert ON users;
+CREATE TRIGGER altas_usuarios_insert
+    AFTER INSERT ON users REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION altas_registrar();
+
+DROP TRIGGER IF EXISTS altas_usuarios_update ON users;
+CREATE TRIGGER altas_usuarios_update
+    AFTER UPDATE ON users REFERENCING OLD TABLE AS viejos NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION altas_registrar();
+
+DROP TRIGGER IF EXISTS altas_usuarios_delete ON users;
+CREATE TRIGGER altas_usuarios_delete
+    AFTER DELETE ON users REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT EXECUTE FUNCTION altas_registrar();
+
+-- Carga inicial: se bloquean las escrituras hasta el commit para que
+-- ninguna alta quede fuera del recuento ni se cuente dos veces
+LOCK TABLE users IN SHARE MODE;
+TRUNCATE usuarios_altas_diarias;
+INSERT INTO usuarios_altas_diarias (dia, ciudad, altas)
+SELECT fecha_registro::date, COALESCE(ciudad, 'sin_valor'), COUNT(*)
+FROM users WHERE fecha_registro IS NOT NULL
+GROUP BY 1, 2;
+
+-- fecha_registro crece con el orden físico de inserción: un BRIN de unas
+-- pocas páginas basta para acotar rangos de años sin un B-tree completo
+CREATE INDEX IF NOT EXISTS idx_users_fecha_registro_brin
+    ON users USING brin (fecha_registro);
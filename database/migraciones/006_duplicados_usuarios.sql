@@ -0,0 +1,18 @@
+-- database/migraciones/006_duplicados_usuarios.sql
+-- Resultado del trabajo de detección de duplicados (scripts/detectar_duplicados.py):
+-- una fila por usuario que pertenece a un grupo de candidatos. Cada ejecución
+-- reemplaza por completo el contenido en una sola transacción.
+
+CREATE TABLE IF NOT EXISTS usuarios_duplicados (
+    usuario_id integer PRIMARY KEY,
+    -- Menor id del grupo: todos los candidatos de un mismo grupo lo comparten
+    grupo integer NOT NULL,
+    tamano_grupo integer NOT NULL,
+    -- Mejor similitud (0-1) del usuario con otro miembro del grupo
+    puntuacion real NOT NULL,
+    -- Claves de bloqueo por las que se encontró su mejor pareja (nombre, telefono, email)
+    motivos text[] NOT NULL,
+    detectado timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_usuarios_duplicados_grupo ON usuarios_duplicados (grupo);
@@ -0,0 +1,108 @@
+-- database/migraciones/007_archivo_usuarios.sql
+-- Archivo en frío de usuarios inactivos (scripts/archivar_usuarios.py).
+-- users queda con las filas vivas; las inactivas antiguas pasan a
+-- users_archivo por lotes y se restauran con POST /usuarios/<id>/restaurar.
+
+CREATE TABLE IF NOT EXISTS users_archivo (
+    LIKE users INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+    archivado timestamp NOT NULL DEFAULT LOCALTIMESTAMP,
+    PRIMARY KEY (id)
+);
+
+-- El email sigue siendo único entre users y users_archivo (el trigger
+-- usuarios_archivo_email; con el registro de emails lo garantiza
+-- users_emails y el trigger se quita)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_archivo_email ON users_archivo (email);
+
+-- Candidatas a archivar: el índice parcial solo contiene las inactivas
+CREATE INDEX IF NOT EXISTS idx_users_inactivos_fecha
+    ON users (fecha_actualizacion, id) WHERE activo = false;
+
+-- Los movimientos entre tablas se hacen con SET LOCAL usuarios.archivo = 'on'.
+-- Con ese ajuste no se comprueba el email contra el archivo (es la misma
+-- fila que se mueve) y la outbox y las altas diarias no lo registran: para
+-- los consumidores de webhooks y los informes el usuario no se ha dado de
+-- baja ni de alta. Las lápidas y NOTIFY sí se emiten, marcadas como
+-- archivo (lápida con archivado = true, NOTIFY 'archivo'/'restauracion'),
+-- porque las copias de users (réplica, instantánea, clientes de
+-- cambios-desde) solo reflejan la tabla caliente.
+CREATE OR REPLACE FUNCTION archivo_comprobar_email() RETURNS trigger AS $$
+DECLARE
+    archivado_id integer;
+BEGIN
+    SELECT id INTO archivado_id FROM users_archivo WHERE email = NEW.email;
+    IF FOUND THEN
+        RAISE EXCEPTION 'El email % pertenece al usuario archivado %', NEW.email, archivado_id
+            USING ERRCODE = 'unique_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS usuarios_archivo_email ON users;
+CREATE TRIGGER usuarios_archivo_email
+    BEFORE INSERT OR UPDATE OF email ON users
+    FOR EACH ROW
+    WHEN (current_setting('usuarios.archivo', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION archivo_comprobar_email();
+
+DROP TRIGGER IF EXISTS outbox_usuarios_insert ON users;
+CREATE TRIGGER outbox_usuarios_insert
+    AFTER INSERT ON users REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT
+    WHEN (current_setting('usuarios.archivo', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION outbox_registrar_altas();
+
+DROP TRIGGER IF EXISTS outbox_usuarios_delete ON users;
+CREATE TRIGGER outbox_usuarios_delete
+    AFTER DELETE ON users REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT
+    WHEN (current_setting('usuarios.archivo', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION outbox_registrar_bajas();
+
+DROP TRIGGER IF EXISTS altas_usuarios_insert ON users;
+CREATE TRIGGER altas_usuarios_insert
+    AFTER INSERT ON users REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT
+    WHEN (current_setting('usuarios.archivo', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION altas_registrar();
+
+DROP TRIGGER IF EXISTS altas_usuarios_delete ON users;
+CREATE TRIGGER altas_usuarios_delete
+    AFTER DELETE ON users REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT
+    WHEN (current_setting('usuarios.archivo', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION altas_registrar();
+
+-- Borrar un usuario archivado (DELETE /usuarios/<id>) es una baja real: lápida
+-- sin marca de archivo, NOTIFY 'delete', evento en la outbox y resta en las
+-- altas diarias. Las restauraciones (usuarios.archivo = 'on') no pasan por aquí
+DROP TRIGGER IF EXISTS archivo_registrar_eliminado ON users_archivo;
+CREATE TRIGGER archivo_registrar_eliminado
+    AFTER DELETE ON users_archivo REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT
+    WHEN (current_setting('usuarios.archivo', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION registrar_usuario_eliminado();
+
+DROP TRIGGER IF EXISTS archivo_notificar_delete ON users_archivo;
+CREATE TRIGGER archivo_notificar_delete
+    AFTER DELETE ON users_archivo REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT
+    WHEN (current_setting('usuarios.archivo', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION notificar_cambio_usuario();
+
+-- Archivar no resta el alta (altas_usuarios_delete no se dispara): sin este
+-- trigger el resumen contaría para siempre a un usuario ya borrado
+DROP TRIGGER IF EXISTS archivo_altas_delete ON users_archivo;
+CREATE TRIGGER archivo_altas_delete
+    AFTER DELETE ON users_archivo REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT
+    WHEN (current_setting('usuarios.archivo', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION altas_registrar();
+
+DROP TRIGGER IF EXISTS archivo_outbox_delete ON users_archivo;
+CREATE TRIGGER archivo_outbox_delete
+    AFTER DELETE ON users_archivo REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT
+    WHEN (current_setting('usuarios.archivo', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION outbox_registrar_bajas();
@@ -0,0 +1,15 @@
+-- database/migraciones/008_directorio_emails.sql
+-- Directorio global de emails para DB_SHARDS: email -> shard que lo guarda.
+-- Solo se usa la tabla de la base DB_*; las migraciones la crean en todas.
+-- users_emails solo garantiza la unicidad dentro de un shard: las altas y el
+-- upsert de un email van al shard ligado aquí, y un cambio de email con
+-- PUT/PATCH liga el email nuevo al shard del usuario antes de escribirlo.
+-- 'reservado' se renueva en cada escritura: un email ligado a otro shard
+-- solo se vuelve a ligar si ese shard ya no lo tiene y nadie lo ha escrito
+-- en el último minuto (UserModel.DIRECTORIO_GRACIA_SEGUNDOS).
+
+CREATE TABLE IF NOT EXISTS directorio_emails (
+    email text PRIMARY KEY,
+    shard integer NOT NULL,
+    reservado timestamptz NOT NULL DEFAULT now()
+);
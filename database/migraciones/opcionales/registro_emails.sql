@@ -0,0 +1,67 @@
+-- database/migraciones/opcionales/registro_emails.sql
+-- Registro global de emails: una fila por email de users y users_archivo.
+-- Su clave primaria garantiza la unicidad del email con cualquier
+-- organización de users. Con users particionada por hash de id un índice
+-- único sobre email no es posible (debe incluir la clave de partición), así
+-- que las consultas por email pasan por aquí: email -> id -> una partición.
+--
+-- No es una migración numerada: cuesta una escritura más en cada alta y
+-- cambio de email, y solo hace falta con users particionada o con shards.
+-- La aplican scripts/particionar_usuarios.py (tras repetir las migraciones)
+-- y scripts/preparar_shards.py; la API la usa con USERS_PARTICIONADA=true o
+-- DB_SHARDS. Es idempotente.
+
+CREATE TABLE IF NOT EXISTS users_emails (
+    email text PRIMARY KEY,
+    usuario_id integer NOT NULL
+);
+
+-- Un email duplicado falla con unique_violation en la misma sentencia que
+-- lo escribe (la API lo traduce a "El email ya existe"). Los traslados al
+-- archivo y las restauraciones (usuarios.archivo = 'on') no lo tocan: el
+-- email sigue ocupado mientras el usuario esté archivado.
+CREATE OR REPLACE FUNCTION registrar_email_usuario() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' AND OLD.email IS NOT NULL THEN
+        DELETE FROM users_emails WHERE email = OLD.email AND usuario_id = OLD.id;
+    END IF;
+    IF TG_OP <> 'DELETE' AND NEW.email IS NOT NULL THEN
+        INSERT INTO users_emails (email, usuario_id) VALUES (NEW.email, NEW.id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS usuarios_registrar_email ON users;
+CREATE TRIGGER usuarios_registrar_email
+    AFTER INSERT OR DELETE ON users
+    FOR EACH ROW
+    WHEN (current_setting('usuarios.archivo', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION registrar_email_usuario();
+
+-- Borrar un usuario archivado libera su email
+DROP TRIGGER IF EXISTS archivo_registrar_email ON users_archivo;
+CREATE TRIGGER archivo_registrar_email
+    AFTER DELETE ON users_archivo
+    FOR EACH ROW
+    WHEN (current_setting('usuarios.archivo', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION registrar_email_usuario();
+
+DROP TRIGGER IF EXISTS usuarios_registrar_email_cambio ON users;
+CREATE TRIGGER usuarios_registrar_email_cambio
+    AFTER UPDATE OF email ON users
+    FOR EACH ROW
+    WHEN (OLD.email IS DISTINCT FROM NEW.email)
+    EXECUTE FUNCTION registrar_email_usuario();
+
+-- La clave primaria ya impide repetir en users un email archivado: el
+-- trigger de la migración 007 que lo comprobaba sobra
+DROP TRIGGER IF EXISTS usuarios_archivo_email ON users;
+
+-- Carga inicial con las escrituras bloqueadas hasta el commit
+LOCK TABLE users IN SHARE MODE;
+INSERT INTO users_emails (email, usuario_id)
+SELECT email, id FROM users WHERE email IS NOT NULL
+UNION ALL
+SELECT email, id FROM users_archivo WHERE email IS NOT NULL
+ON CONFLICT (email) DO NOTHING;
@@ -0,0 +1,259 @@
+# database/outbox.py
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import psycopg2.extras
+import requests
+from database.connection import DatabaseConnection
+
+
+class RelayOutbox:
+    """Entrega por lotes de los eventos de outbox_usuarios a webhooks HTTP
+
+    Las escrituras solo pagan el INSERT del trigger en su propia transacción;
+    este relay recoge lotes con FOR UPDATE SKIP LOCKED (varios relays pueden
+    convivir sin repartirse el mismo evento) y los envía en paralelo. La
+    entrega es al menos una vez: los receptores deben deduplicar por 'id'.
+
+    El estado de entrega se lleva por webhook en la columna 'entregas'
+    ({url: {estado, intentos, siguiente, error}}): un webhook caído solo
+    reintenta (y agota) sus propios envíos, sin repetir eventos a los que
+    ya los recibieron. El evento se borra cuando todos lo han recibido; si
+    alguno agota los intentos queda 'fallido' hasta reintentar_fallidos().
+    """
+
+    ESPERA_MAXIMA = 300
+
+    SQL_RECOGER = '''
+        SELECT id, operacion, usuario_id, carga, creado, intentos, entregas, now() AS ahora
+        FROM outbox_usuarios
+        WHERE estado = 'pendiente' AND siguiente_intento <= now()
+        ORDER BY id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    '''
+
+    SQL_CONFIRMAR = 'DELETE FROM outbox_usuarios WHERE id = ANY(%s)'
+
+    # Estado por webhook de los eventos aún no entregados a todos, en una sentencia
+    SQL_ACTUALIZAR = '''
+        UPDATE outbox_usuarios o
+        SET entregas = x.entregas,
+            estado = x.estado,
+            intentos = x.intentos,
+            siguiente_intento = x.siguiente_intento,
+            ultimo_error = x.ultimo_error
+        FROM jsonb_to_recordset(%s) AS x(id bigint, entregas jsonb, estado text, intentos integer,
+                                         siguiente_intento timestamptz, ultimo_error text)
+        WHERE o.id = x.id
+    '''
+
+    # Volver a intentar los fallidos solo hacia los webhooks que no los recibieron
+    SQL_REINTENTAR_FALLIDOS = '''
+        UPDATE outbox_usuarios
+        SET estado = 'pendiente',
+            intentos = 0,
+            siguiente_intento = now(),
+            ultimo_error = NULL,
+            entregas = (SELECT COALESCE(jsonb_object_agg(url, entrega), '{}'::jsonb)
+                        FROM jsonb_each(entregas) AS e(url, entrega)
+                        WHERE entrega->>'estado' = 'entregado')
+        WHERE estado = 'fallido'
+    '''
+
+    SQL_RESUMEN = 'SELECT estado, COUNT(*) FROM outbox_usuarios GROUP BY estado ORDER BY estado'
+
+    def __init__(self, webhooks=None, tamano_lote=None, max_intentos=None,
+                 intervalo=None, timeout=None):
+        if webhooks is None:
+            webhooks = [url.strip() for url in os.getenv('OUTBOX_WEBHOOKS', '').split(',') if url.strip()]
+        self.webhooks = list(webhooks)
+        # Sin destinos cualquier evento contaría como entregado a todos y se borraría
+        if not self.webhooks:
+            raise ValueError("No hay webhooks configurados (--webhook u OUTBOX_WEBHOOKS)")
+        self.tamano_lote = tamano_lote or int(os.getenv('OUTBOX_LOTE', '100'))
+        self.max_intentos = max_intentos or int(os.getenv('OUTBOX_REINTENTOS', '5'))
+        self.intervalo = intervalo if intervalo is not None else float(os.getenv('OUTBOX_INTERVALO', '1'))
+        self.timeout = timeout or float(os.getenv('OUTBOX_TIMEOUT', '5'))
+        self.db = DatabaseConnection()
+        # Cada shard tiene su outbox: un relay por shard
+        self.db.exigir_base_unica("El relay de la outbox")
+        self._sesiones = {url: requests.Session() for url in self.webhooks}
+        self._ejecutor = ThreadPoolExecutor(max_workers=max(len(self.webhooks), 1),
+                                            thread_name_prefix='outbox-webhook')
+        self._detener = threading.Event()
+        self._hilo = None
+
+    @staticmethod
+    def _evento(fila):
+        return {
+            'id': fila['id'],
+            'operacion': fila['operacion'],
+            'usuario_id': fila['usuario_id'],
+            'datos': fila['carga'],
+            'fecha': fila['creado'].isoformat() if fila['creado'] else None,
+        }
+
+    def _enviar(self, url, cuerpo):
+        """POST de un lote a un webhook; devuelve None o el error"""
+        try:
+            respuesta = self._sesiones[url].post(
+                url, data=cuerpo, timeout=self.timeout,
+                headers={'Content-Type': 'application/json'})
+            if respuesta.status_code >= 300:
+                return f"{url}: HTTP {respuesta.status_code}"
+        except requests.RequestException as e:
+            return f"{url}: {e}"
+        return None
+
+    def entregar(self, por_webhook):
+        """Enviar a cada webhook sus eventos, todos a la vez; devuelve {url: error o None}"""
+        destinos = [(url, eventos) for url, eventos in por_webhook.items() if eventos]
+        resultados = self._ejecutor.map(
+            lambda destino: self._enviar(destino[0], json.dumps({'eventos': destino[1]},
+                                                                ensure_ascii=False, default=str)),
+            destinos)
+        return {url: error for (url, _), error in zip(destinos, resultados)}
+
+    @staticmethod
+    def _pendiente(entrega, ahora):
+        """True si toca enviar el evento a un webhook con este estado de entrega"""
+        if not entrega:
+            return True
+        if entrega['estado'] in ('entregado', 'fallido'):
+            return False
+        return entrega.get('siguiente') is None or datetime.fromisoformat(entrega['siguiente']) <= ahora
+
+    def _anotar(self, fila, enviados, errores, ahora):
+        """Nuevo estado de un evento tras el envío; None si ya lo tienen todos"""
+        entregas = dict(fila['entregas'] or {})
+        for url in enviados:
+            if errores.get(url) is None:
+                entregas[url] = {'estado': 'entregado'}
+                continue
+            intentos = entregas.get(url, {}).get('intentos', 0) + 1
+            espera = min(2 ** (intentos - 1), self.ESPERA_MAXIMA)
+            entregas[url] = {
+                'estado': 'fallido' if intentos >= self.max_intentos else 'pendiente',
+                'intentos': intentos,
+                'siguiente': (ahora + timedelta(seconds=espera)).isoformat(),
+                'error': errores[url][:500],
+            }
+
+        estados = {url: entregas.get(url, {}) for url in self.webhooks}
+        if all(entrega.get('estado') == 'entregado' for entrega in estados.values()):
+            return None
+        abiertos = [entrega for entrega in estados.values()
+                    if entrega.get('estado') not in ('entregado', 'fallido')]
+        return {
+            'id': fila['id'],
+            'entregas': entregas,
+            'estado': 'pendiente' if abiertos else 'fallido',
+            'intentos': max((entrega.get('intentos', 0) for entrega in estados.values()), default=0),
+            'siguiente_intento': min((entrega.get('siguiente') or ahora.isoformat() for entrega in abiertos),
+                                     default=ahora.isoformat()),
+            'ultimo_error': '; '.join(entrega['error'] for entrega in estados.values()
+                                      if entrega.get('error'))[:1000] or None,
+        }
+
+    def procesar_lote(self):
+        """Recoger, entregar y confirmar un lote; devuelve cuántos eventos se trataron"""
+        conn = self.db.obtener_conexion()
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        try:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cursor.execute(self.SQL_RECOGER, (self.tamano_lote,))
+            filas = cursor.fetchall()
+            if not filas:
+                conn.commit()
+                return 0
+
+            ahora = filas[0]['ahora']
+            # Cada webhook recibe solo los eventos que aún no tiene y cuyo
+            # reintento ya ha llegado. Los bloqueos se mantienen durante la
+            # entrega: si el relay cae, el rollback los deja para otro relay
+            por_webhook = {url: [fila for fila in filas if self._pendiente((fila['entregas'] or {}).get(url), ahora)]
+                           for url in self.webhooks}
+            errores = self.entregar({url: [self._evento(fila) for fila in pendientes]
+                                     for url, pendientes in por_webhook.items()})
+
+            ids_enviados = {url: {fila['id'] for fila in pendientes} for url, pendientes in por_webhook.items()}
+            confirmados, cambios = [], []
+            for fila in filas:
+                enviados = [url for url, pendientes in por_webhook.items() if fila['id'] in ids_enviados[url]]
+                cambio = self._anotar(fila, enviados, errores, ahora)
+                if cambio is None:
+                    confirmados.append(fila['id'])
+                else:
+                    cambios.append(cambio)
+
+            if confirmados:
+                cursor.execute(self.SQL_CONFIRMAR, (confirmados,))
+            if cambios:
+                cursor.execute(self.SQL_ACTUALIZAR, (psycopg2.extras.Json(cambios),))
+            for url, error in errores.items():
+                if error:
+                    print(f"⚠️  Entrega de {len(por_webhook[url])} eventos fallida: {error}")
+            fallidos = sum(1 for cambio in cambios if cambio['estado'] == 'fallido')
+            if fallidos:
+                print(f"❌ {fallidos} evento(s) agotaron sus reintentos: "
+                      f"python scripts/relay_outbox.py --reintentar-fallidos")
+            conn.commit()
+            return len(filas)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _ejecutar(self, sql):
+        conn = self.db.obtener_conexion()
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            resultado = cursor.fetchall() if cursor.description else cursor.rowcount
+            conn.commit()
+            return resultado
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def reintentar_fallidos(self):
+        """Devolver a pendientes los eventos fallidos; devuelve cuántos"""
+        return self._ejecutar(self.SQL_REINTENTAR_FALLIDOS)
+
+    def resumen(self):
+        """Eventos de la outbox por estado"""
+        return dict(self._ejecutar(self.SQL_RESUMEN))
+
+    def iniciar(self):
+        """Arrancar el hilo del relay si no está en marcha"""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name='relay-outbox', daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=self.timeout + 5)
+
+    def _bucle(self):
+        """Vaciar la outbox lote a lote; esperar solo cuando no queda nada"""
+        print(f"📤 Relay de outbox hacia {len(self.webhooks)} webhook(s)")
+        while not self._detener.is_set():
+            try:
+                tratados = self.procesar_lote()
+            except Exception as e:
+                print(f"❌ Error en el relay de outbox: {e}")
+                tratados = 0
+            if tratados < self.tamano_lote:
+                self._detener.wait(self.intervalo)
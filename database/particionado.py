@@ -0,0 +1,217 @@
+# database/particionado.py
+import re
+import time
+from pathlib import Path
+from database.connection import DatabaseConnection
+from models.user_model import UserModel
+from models.archivo import ArchivadorUsuarios
+
+DIRECTORIO_MIGRACIONES = Path(__file__).parent / 'migraciones'
+
+# Registro global de emails (users_emails): sin índice único sobre email en la
+# tabla particionada, es el que garantiza la unicidad
+MIGRACION_REGISTRO_EMAILS = DIRECTORIO_MIGRACIONES / 'opcionales' / 'registro_emails.sql'
+
+# Las filas de users se reparten por hash de id: las lecturas, PUT, PATCH y
+# DELETE por id van a una sola partición. Un rango por fecha_registro dejaría
+# las escrituras en la última partición pero obligaría a recorrerlas todas en
+# cada acceso por id, que es el camino caliente de la API.
+SQL_VERSION = "SELECT current_setting('server_version_num')::int"
+
+SQL_SECUENCIA = "SELECT pg_get_serial_sequence('users', 'id')"
+
+# Índices de la tabla original salvo los únicos: en una tabla particionada un
+# índice único debe incluir id, y la unicidad del email la da users_emails
+SQL_INDICES = '''
+    SELECT i.relname, pg_get_indexdef(i.oid)
+    FROM pg_index x
+    JOIN pg_class i ON i.oid = x.indexrelid
+    WHERE x.indrelid = %s::regclass AND NOT x.indisunique
+    ORDER BY i.relname
+'''
+
+# PARTITION BY HASH desde PostgreSQL 11, triggers BEFORE de fila en la tabla
+# particionada (marcar_fecha_actualizacion) desde 13
+VERSION_MINIMA = 130000
+
+
+# Consulta representativa de cada método de UserModel para la auditoría de
+# poda: (sql, parámetros, máximo de particiones esperado; None = todas).
+# Un INSERT enruta la fila a su partición sin que el plan lo muestre: en
+# crear y restaurar el 0 comprueba que nada más (triggers, subconsultas)
+# recorre users
+CONSULTAS_AUDITORIA = {
+    'obtener_por_id / existe': ('SELECT * FROM users WHERE id = %s', (42,), 1),
+    'actualizar / actualizar_parcial': ('UPDATE users SET nombre = nombre WHERE id = %s', (42,), 1),
+    'eliminar': ('DELETE FROM users WHERE id = %s', (42,), 1),
+    'eliminar_lote / _usuarios_por_ids': ('SELECT * FROM users WHERE id = ANY(%s)', ([1, 2, 3],), 3),
+    'upsert_por_email (por registro)': (
+        'SELECT u.* FROM users u JOIN users_emails r ON r.usuario_id = u.id WHERE r.email = %s',
+        ('ana@ejemplo.com',), 1),
+    'email_disponible': ('SELECT 1 FROM users_emails WHERE email = %s', ('ana@ejemplo.com',), 0),
+    'crear': (
+        'INSERT INTO users (nombre, apellido, email) VALUES (%s, %s, %s) RETURNING id',
+        ('Auditoría', 'Particiones', 'auditoria.particiones@ejemplo.invalid'), 0),
+    'restaurar': (
+        f'WITH movido AS (DELETE FROM users_archivo WHERE id = %s RETURNING {UserModel.COLUMNAS_ARCHIVO}) '
+        f'INSERT INTO users ({UserModel.COLUMNAS_ARCHIVO}) SELECT {UserModel.COLUMNAS_ARCHIVO} FROM movido',
+        (42,), 0),
+    'obtener_paginados': ('SELECT * FROM users ORDER BY id LIMIT %s OFFSET %s', (50, 1000), None),
+    'obtener_cambios_desde': (
+        'SELECT * FROM users WHERE (fecha_actualizacion, id) > (%s, %s) '
+        'ORDER BY fecha_actualizacion, id LIMIT 100', ('2026-01-01', 0), None),
+    'buscar (sin índice en memoria)': (
+        "SELECT * FROM users WHERE lower(nombre) LIKE %s LIMIT 20", ('ana%',), None),
+    'obtener_estadisticas / estimar_total_usuarios': (UserModel.SQL_TOTAL_ESTIMADO, (), 0),
+    'obtener_distribuciones': (
+        'SELECT * FROM usuarios_estadisticas WHERE dimension = ANY(%s)', (['ciudad', 'edad'],), 0),
+    'obtener_altas': (
+        "SELECT date_trunc('month', dia)::date, SUM(altas) FROM usuarios_altas_diarias GROUP BY 1",
+        (), 0),
+    'estado del archivo': (ArchivadorUsuarios.SQL_ESTADO, (), 0),
+}
+
+class ParticionadorUsuarios:
+    """Convierte users en una tabla particionada por HASH (id)
+
+    Todo ocurre en una transacción con users bloqueada: la tabla original
+    pasa al esquema 'respaldo', se crea la particionada con las mismas
+    columnas, valores por defecto, CHECK e índices no únicos, se copian las
+    filas y se vuelven a ejecutar las migraciones (todas idempotentes) para
+    recrear triggers, la vista de estadísticas y sus índices sobre la tabla
+    nueva, y se añade el registro de emails. Si algo falla no cambia nada.
+    """
+
+    def __init__(self, particiones=16):
+        if particiones < 2:
+            raise ValueError("Se necesitan al menos 2 particiones")
+        self.particiones = particiones
+        self.db = DatabaseConnection()
+
+    def _conectar(self):
+        conn = self.db.obtener_conexion()
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        return conn
+
+    @staticmethod
+    def _indices_locales(indices):
+        """CREATE INDEX de la tabla nueva a partir de los de respaldo.users"""
+        sentencias = []
+        for nombre, definicion in indices:
+            definicion = re.sub(r' ON (ONLY )?\S+ ', ' ON users ', definicion, count=1)
+            sentencias.append(definicion.replace('CREATE INDEX', 'CREATE INDEX IF NOT EXISTS', 1))
+        # Búsquedas por email dentro de una partición (el upsert y obtener por
+        # email llegan aquí con el id ya resuelto por users_emails)
+        sentencias.append('CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)')
+        return sentencias
+
+    def plan(self, conn, conservar_anterior=False):
+        """Lista de (descripcion, sql) de la conversión; no ejecuta nada"""
+        cursor = conn.cursor()
+        cursor.execute(SQL_VERSION)
+        version = cursor.fetchone()[0]
+        if version < VERSION_MINIMA:
+            raise Exception(f"Se necesita PostgreSQL 13 o superior (servidor: {version})")
+
+        cursor.execute("SELECT to_regclass('users')::text, "
+                       "(SELECT relkind FROM pg_class WHERE oid = to_regclass('users'))")
+        tabla, tipo = cursor.fetchone()
+        if tabla is None:
+            raise Exception("La tabla users no existe")
+        if tipo == 'p':
+            raise Exception("users ya está particionada")
+
+        cursor.execute(SQL_SECUENCIA)
+        secuencia = cursor.fetchone()[0]
+        cursor.execute(SQL_INDICES, ('users',))
+        indices = cursor.fetchall()
+
+        pasos = [
+            ('Bloquear users', 'LOCK TABLE users IN ACCESS EXCLUSIVE MODE'),
+            ('Eliminar la vista de estadísticas (se recrea al final)',
+             'DROP MATERIALIZED VIEW IF EXISTS usuarios_estadisticas'),
+            ('Mover la tabla original al esquema respaldo',
+             'CREATE SCHEMA IF NOT EXISTS respaldo; ALTER TABLE users SET SCHEMA respaldo'),
+            ('Crear la tabla particionada',
+             'CREATE TABLE users (LIKE respaldo.users INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+             'PARTITION BY HASH (id); ALTER TABLE users ADD PRIMARY KEY (id)'),
+        ]
+        if secuencia:
+            # Sin esto la secuencia se movería a respaldo con su tabla
+            pasos.insert(1, ('Soltar la secuencia de id de la tabla original',
+                             f'ALTER SEQUENCE {secuencia} OWNED BY NONE'))
+        for resto in range(self.particiones):
+            pasos.append((f'Partición {resto + 1}/{self.particiones}',
+                          f'CREATE TABLE users_p{resto:02d} PARTITION OF users '
+                          f'FOR VALUES WITH (MODULUS {self.particiones}, REMAINDER {resto})'))
+        for sentencia in self._indices_locales(indices):
+            pasos.append(('Índice', sentencia))
+        pasos.append(('Copiar las filas', 'INSERT INTO users SELECT * FROM respaldo.users'))
+        if secuencia:
+            pasos.append(('Asignar la secuencia a la tabla nueva',
+                          f'ALTER SEQUENCE {secuencia} OWNED BY users.id'))
+        for ruta in sorted(DIRECTORIO_MIGRACIONES.glob('[0-9][0-9][0-9]_*.sql')):
+            pasos.append((f'Migración {ruta.name}', ruta.read_text(encoding='utf-8')))
+        pasos.append(('Registro de emails', MIGRACION_REGISTRO_EMAILS.read_text(encoding='utf-8')))
+        if not conservar_anterior:
+            pasos.append(('Eliminar la tabla original', 'DROP TABLE respaldo.users'))
+        pasos.append(('Estadísticas del planificador', 'ANALYZE users'))
+        return pasos
+
+    def convertir(self, ejecutar=False, conservar_anterior=False, progreso=print):
+        """Mostrar el plan y, con ejecutar=True, aplicarlo en una transacción"""
+        conn = self._conectar()
+        try:
+            pasos = self.plan(conn, conservar_anterior)
+            if not ejecutar:
+                for descripcion, sql in pasos:
+                    progreso(f"📝 {descripcion}: {sql.splitlines()[0] if sql.strip() else sql}")
+                return pasos
+
+            cursor = conn.cursor()
+            inicio = time.monotonic()
+            for descripcion, sql in pasos:
+                progreso(f"▶️  {descripcion}")
+                cursor.execute(sql)
+            conn.commit()
+            progreso(f"✅ users particionada en {self.particiones} particiones "
+                     f"({time.monotonic() - inicio:.1f} s)")
+            return pasos
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def particiones_en_plan(plan):
+        """Particiones distintas de users recorridas según un EXPLAIN ANALYZE
+
+        La poda en ejecución (p. ej. el id que sale de users_emails) no se ve
+        en un EXPLAIN sin ANALYZE: las particiones podadas aparecen como
+        'never executed' o ni aparecen ('Subplans Removed').
+        """
+        return len({particion for linea in plan.splitlines() if 'never executed' not in linea
+                    for particion in re.findall(r'\busers_p\d+\b', linea)})
+
+    def auditar(self, consultas=CONSULTAS_AUDITORIA):
+        """{nombre: (particiones recorridas, esperadas)} según EXPLAIN
+
+        Un acceso por id debe tocar 1 partición; los que no filtran por id,
+        todas. EXPLAIN ANALYZE ejecuta las consultas (también UPDATE y
+        DELETE) en una transacción que se deshace al terminar.
+        """
+        conn = self._conectar()
+        try:
+            cursor = conn.cursor()
+            resultado = {}
+            for nombre, (sql, parametros, esperadas) in consultas.items():
+                cursor.execute('EXPLAIN (ANALYZE, COSTS OFF, TIMING OFF) ' + sql, parametros)
+                plan = '\n'.join(fila[0] for fila in cursor.fetchall())
+                resultado[nombre] = (self.particiones_en_plan(plan),
+                                     self.particiones if esperadas is None else esperadas)
+            conn.rollback()
+            return resultado
+        finally:
+            conn.close()
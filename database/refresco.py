@@ -0,0 +1,77 @@
+# database/refresco.py
+import os
+import threading
+from database.connection import DatabaseConnection
+
+
+class RefrescoEstadisticas:
+    """Refresco periódico de la vista materializada usuarios_estadisticas
+
+    REFRESH ... CONCURRENTLY no bloquea las lecturas de la vista. Con varios
+    procesos de la API, un bloqueo consultivo hace que solo uno refresque en
+    cada ciclo y los demás lo salten.
+    """
+
+    VISTA = 'usuarios_estadisticas'
+    # Clave del bloqueo consultivo (pg_try_advisory_xact_lock)
+    CLAVE_BLOQUEO = 40401
+
+    def __init__(self, intervalo=None):
+        self.intervalo = intervalo or float(os.getenv('ESTADISTICAS_REFRESCO', '300'))
+        self.db = DatabaseConnection()
+        self._cerrojo = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def refrescar(self):
+        """Refrescar la vista (en cada shard con DB_SHARDS); devuelve False si
+        otro proceso ya la estaba refrescando en alguno"""
+        refrescada = True
+        for shard in range(self.db.numero_shards):
+            refrescada = self._refrescar_shard(shard) and refrescada
+        return refrescada
+
+    def _refrescar_shard(self, shard):
+        conn = self.db.obtener_conexion_shard(shard)
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT pg_try_advisory_xact_lock(%s)', (self.CLAVE_BLOQUEO,))
+            if not cursor.fetchone()[0]:
+                conn.rollback()
+                return False
+            cursor.execute(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {self.VISTA}')
+            conn.commit()
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def iniciar(self):
+        """Arrancar el hilo de refresco si no está en marcha"""
+        with self._cerrojo:
+            if self._hilo and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name='refresco-estadisticas-vista', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                if self.refrescar():
+                    print(f"🔄 Vista {self.VISTA} refrescada")
+            except Exception as e:
+                print(f"❌ Error refrescando {self.VISTA}: {e}")
+
+
+# Refresco único por proceso
+refresco_estadisticas = RefrescoEstadisticas()
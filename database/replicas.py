@@ -0,0 +1,241 @@
+# database/replicas.py
+import os
+import math
+import time
+import threading
+from contextvars import ContextVar
+
+# LSN actual de la primaria, leído antes de medir las réplicas
+SQL_LSN_PRIMARIA = 'SELECT pg_current_wal_lsn()::text'
+
+# Retraso en segundos de una réplica respecto al LSN de la primaria: 0 si ya
+# ha reproducido hasta él (una réplica al día sin escrituras no envejece) y,
+# si no, la antigüedad de la última transacción reproducida (infinito si aún
+# no ha reproducido ninguna). Comparar con lo recibido no basta: con el
+# receptor WAL desconectado recibido y reproducido coinciden y la réplica
+# parecería al día. En una base que no es standby, 0
+SQL_RETRASO = '''
+    SELECT CASE
+               WHEN NOT pg_is_in_recovery() THEN 0
+               WHEN pg_last_wal_replay_lsn() >= %s::pg_lsn THEN 0
+               ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8,
+                             'Infinity'::float8)
+           END
+'''
+
+# True mientras la petición actual deba leer de la primaria (lee tus escrituras)
+_leer_de_primaria = ContextVar('leer_de_primaria', default=False)
+
+
+def forzar_primaria(valor=True):
+    """Enviar a la primaria las lecturas del contexto actual; devuelve el token para restaurarlo"""
+    return _leer_de_primaria.set(valor)
+
+
+def restaurar_primaria(token):
+    _leer_de_primaria.reset(token)
+
+
+def lectura_en_primaria():
+    return _leer_de_primaria.get()
+
+
+class ConexionLectura:
+    """Conexión a una réplica que la libera en el enrutador al cerrarse"""
+
+    def __init__(self, conexion, liberar):
+        self.conexion = conexion
+        self._liberar = liberar
+
+    def close(self):
+        liberar, self._liberar = self._liberar, None
+        try:
+            self.conexion.close()
+        finally:
+            if liberar:
+                liberar()
+
+    def __getattr__(self, nombre):
+        return getattr(self.conexion, nombre)
+
+    def __setattr__(self, nombre, valor):
+        if nombre in ('conexion', '_liberar'):
+            object.__setattr__(self, nombre, valor)
+        else:
+            setattr(self.conexion, nombre, valor)
+
+
+class EstadoReplica:
+    """Peticiones en curso y último retraso medido de una réplica"""
+
+    def __init__(self, indice, db):
+        self.indice = indice
+        self.db = db
+        self.pendientes = 0
+        self.atendidas = 0
+        self.retraso = None
+        self.medido = None
+        self.ultimo_error = None
+
+
+class EnrutadorReplicas:
+    """Reparto de lecturas entre la primaria y las réplicas (DB_REPLICAS)
+
+    Cada lectura va a la réplica con menos peticiones en curso (a igualdad,
+    la que menos ha atendido). Un hilo mide el retraso de cada réplica cada
+    'intervalo' segundos y las que superan 'max_retraso', fallan al medirse
+    o llevan más de tres intervalos sin medición quedan fuera hasta la
+    siguiente medición buena. Sin réplicas disponibles, o si el contexto
+    pide leer de la primaria, la lectura va a la primaria.
+    """
+
+    def __init__(self, db, max_retraso=None, intervalo=None):
+        self.db = db
+        self.max_retraso = max_retraso if max_retraso is not None else float(os.getenv('REPLICAS_MAX_RETRASO', '5'))
+        self.intervalo = intervalo or float(os.getenv('REPLICAS_INTERVALO', '2'))
+        self.replicas = [EstadoReplica(i, db.de_replica(i)) for i in range(len(db.replicas))]
+        self.lecturas_primaria = 0
+        self._cerrojo = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    @property
+    def ventana_escritura(self):
+        """Segundos tras una escritura en que el cliente lee de la primaria
+
+        Una réplica admitida tiene como mucho max_retraso segundos de retraso,
+        medido hace como mucho tres intervalos (después deja de estar
+        disponible): pasado ese tiempo ya tiene la escritura.
+        """
+        return self.max_retraso + 3 * self.intervalo
+
+    def _disponible(self, replica, ahora):
+        return (replica.retraso is not None and replica.retraso <= self.max_retraso
+                and ahora - replica.medido <= self.intervalo * 3)
+
+    def disponibles(self):
+        ahora = time.monotonic()
+        with self._cerrojo:
+            return [replica for replica in self.replicas if self._disponible(replica, ahora)]
+
+    def elegir(self, excluidas=()):
+        """Réplica con menos peticiones en curso (ya contada como pendiente) o None"""
+        ahora = time.monotonic()
+        with self._cerrojo:
+            candidatas = [replica for replica in self.replicas
+                          if replica.indice not in excluidas and self._disponible(replica, ahora)]
+            if not candidatas:
+                return None
+            replica = min(candidatas, key=lambda r: (r.pendientes, r.atendidas))
+            replica.pendientes += 1
+            replica.atendidas += 1
+            return replica
+
+    def liberar(self, replica):
+        with self._cerrojo:
+            replica.pendientes -= 1
+
+    def _descartar(self, replica, error):
+        """Sacar una réplica del reparto hasta su próxima medición buena"""
+        with self._cerrojo:
+            replica.retraso = None
+            replica.ultimo_error = str(error)
+
+    def obtener_conexion(self):
+        """Conexión para una lectura: réplica disponible o, si no, la primaria"""
+        if not lectura_en_primaria():
+            excluidas = set()
+            while True:
+                replica = self.elegir(excluidas)
+                if replica is None:
+                    break
+                conn = replica.db.obtener_conexion()
+                if conn:
+                    return ConexionLectura(conn, lambda: self.liberar(replica))
+                self.liberar(replica)
+                self._descartar(replica, "Error de conexión")
+                excluidas.add(replica.indice)
+        with self._cerrojo:
+            self.lecturas_primaria += 1
+        return self.db.obtener_conexion()
+
+    def _lsn_primaria(self):
+        conn = self.db.obtener_conexion()
+        if not conn:
+            raise Exception("Error de conexión a la primaria")
+        try:
+            cursor = conn.cursor()
+            cursor.execute(SQL_LSN_PRIMARIA)
+            return cursor.fetchone()[0]
+        finally:
+            conn.close()
+
+    def medir(self):
+        """Medir el retraso de todas las réplicas (una conexión corta por base)
+
+        El LSN de la primaria se lee antes que las réplicas: una réplica al
+        día ya lo ha reproducido cuando se la consulta. Sin él no se puede
+        medir y todas quedan fuera hasta la siguiente medición.
+        """
+        try:
+            lsn = self._lsn_primaria()
+        except Exception as e:
+            for replica in self.replicas:
+                self._descartar(replica, f"Sin LSN de la primaria: {e}")
+            return
+        for replica in self.replicas:
+            conn = None
+            try:
+                conn = replica.db.obtener_conexion()
+                if not conn:
+                    raise Exception("Error de conexión")
+                cursor = conn.cursor()
+                cursor.execute(SQL_RETRASO, (lsn,))
+                retraso = float(cursor.fetchone()[0])
+                with self._cerrojo:
+                    replica.retraso = retraso
+                    replica.medido = time.monotonic()
+                    replica.ultimo_error = None
+            except Exception as e:
+                self._descartar(replica, e)
+            finally:
+                if conn:
+                    conn.close()
+
+    def iniciar(self):
+        """Arrancar el hilo de medición si no está en marcha"""
+        with self._cerrojo:
+            if self._hilo and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name='retraso-replicas', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            self.medir()
+            self._detener.wait(self.intervalo)
+
+    def estado(self):
+        """Resumen para /listo"""
+        ahora = time.monotonic()
+        with self._cerrojo:
+            return {
+                "max_retraso_segundos": self.max_retraso,
+                "lecturas_primaria": self.lecturas_primaria,
+                "replicas": [{
+                    "host": replica.db.config['host'],
+                    "puerto": replica.db.config['port'],
+                    "disponible": self._disponible(replica, ahora),
+                    "retraso_segundos": round(replica.retraso, 3)
+                                        if replica.retraso is not None and math.isfinite(replica.retraso) else None,
+                    "pendientes": replica.pendientes,
+                    "atendidas": replica.atendidas,
+                    "ultimo_error": replica.ultimo_error,
+                } for replica in self.replicas],
+            }
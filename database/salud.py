@@ -0,0 +1,106 @@
+# database/salud.py
+import os
+import time
+import threading
+from datetime import datetime
+from database.connection import DatabaseConnection
+
+
+class MonitorSalud:
+    """Ping periódico a PostgreSQL para las sondas de disponibilidad
+
+    Un hilo mantiene su propia conexión y ejecuta SELECT 1 cada 'intervalo'
+    segundos (sin tocar users); /listo solo lee el estado en memoria, así que
+    el tráfico de sondas no genera consultas.
+    """
+
+    def __init__(self, intervalo=None, max_antiguedad=None):
+        self.intervalo = intervalo or float(os.getenv('SALUD_INTERVALO', '5'))
+        # Un ping más antiguo que esto deja de contar como base de datos disponible
+        self.max_antiguedad = max_antiguedad or self.intervalo * 3
+        self.db = DatabaseConnection()
+        self.conexion_abierta = False
+        self.ultimo_ping = None
+        self.ultimo_ping_monotonico = None
+        self.latencia_ms = None
+        self.fallos_consecutivos = 0
+        self.ultimo_error = None
+        self._cerrojo = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        """Arrancar el hilo de ping si no está en marcha"""
+        with self._cerrojo:
+            if self._hilo and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name='ping-bd', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+
+    def registrar_ping(self, latencia_ms):
+        with self._cerrojo:
+            self.ultimo_ping = datetime.now()
+            self.ultimo_ping_monotonico = time.monotonic()
+            self.latencia_ms = round(latencia_ms, 2)
+            self.fallos_consecutivos = 0
+            self.ultimo_error = None
+
+    def registrar_fallo(self, error):
+        with self._cerrojo:
+            self.fallos_consecutivos += 1
+            self.ultimo_error = str(error)
+
+    def _ping(self, conn):
+        inicio = time.perf_counter()
+        conn.cursor().execute('SELECT 1')
+        self.registrar_ping((time.perf_counter() - inicio) * 1000)
+
+    def _bucle(self):
+        """Reutilizar la conexión entre pings y reabrirla tras un fallo"""
+        conn = None
+        while not self._detener.is_set():
+            try:
+                if conn is None:
+                    conn = self.db.obtener_conexion()
+                    if not conn:
+                        raise Exception("Error de conexión a la base de datos")
+                    conn.autocommit = True
+                    self.conexion_abierta = True
+                self._ping(conn)
+            except Exception as e:
+                self.registrar_fallo(e)
+                if conn:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                conn, self.conexion_abierta = None, False
+            self._detener.wait(self.intervalo)
+        if conn:
+            conn.close()
+        self.conexion_abierta = False
+
+    def estado(self):
+        """Estado actual en memoria: (base_datos_disponible, detalle)"""
+        with self._cerrojo:
+            antiguedad = (time.monotonic() - self.ultimo_ping_monotonico
+                          if self.ultimo_ping_monotonico is not None else None)
+            disponible = antiguedad is not None and antiguedad <= self.max_antiguedad
+            return disponible, {
+                "conexion_abierta": self.conexion_abierta,
+                "ultimo_ping": self.ultimo_ping.isoformat() if self.ultimo_ping else None,
+                "segundos_desde_ultimo_ping": round(antiguedad, 1) if antiguedad is not None else None,
+                "latencia_ms": self.latencia_ms,
+                "fallos_consecutivos": self.fallos_consecutivos,
+                "ultimo_error": self.ultimo_error,
+            }
+
+
+# Monitor único por proceso: una sola conexión de ping por worker
+monitor_salud = MonitorSalud()
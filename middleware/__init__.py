@@ -0,0 +1,4 @@
+# middleware/__init__.py
+"""
+Módulo de middleware - Procesamiento transversal de peticiones y respuestas HTTP
+"""
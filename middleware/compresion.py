@@ -0,0 +1,184 @@
+# middleware/compresion.py
+import gzip
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from flask import request
+
+# Codificaciones opcionales: solo se anuncian si la librería está instalada
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class CompresionRespuestas:
+    """Compresión de respuestas negociada a partir de Accept-Encoding"""
+
+    # Orden de preferencia del servidor cuando el cliente acepta varias
+    PREFERENCIA = ('zstd', 'br', 'gzip')
+
+    TIPOS_COMPRIMIBLES = ('application/json', 'application/x-ndjson', 'text/csv',
+                          'text/plain', 'text/html')
+
+    def __init__(self, app=None):
+        self.umbral = int(os.getenv('COMPRESION_UMBRAL_BYTES', '1024'))
+        self.nivel_gzip = int(os.getenv('COMPRESION_NIVEL_GZIP', '6'))
+        # Tope del cache por bytes comprimidos, no por entradas: unas pocas
+        # variantes de listados completos pueden pesar megas cada una
+        self.max_bytes_variantes = int(os.getenv('COMPRESION_CACHE_BYTES', str(32 * 1024 * 1024)))
+
+        # Cache LRU de cuerpos ya comprimidos: (digest, codificacion) -> bytes
+        self._variantes = OrderedDict()
+        self._bytes_variantes = 0
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Registrar el hook de compresión en la aplicación Flask"""
+        app.after_request(self.comprimir_respuesta)
+
+    def codificaciones_disponibles(self):
+        """Codificaciones soportadas en este proceso, por orden de preferencia"""
+        disponibles = []
+        for codificacion in self.PREFERENCIA:
+            if codificacion == 'zstd' and zstandard is None:
+                continue
+            if codificacion == 'br' and brotli is None:
+                continue
+            disponibles.append(codificacion)
+        return disponibles
+
+    def negociar(self, accept_encoding):
+        """Elegir la mejor codificación aceptada por el cliente (o None)"""
+        if not accept_encoding:
+            return None
+
+        aceptadas = {}
+        for parte in accept_encoding.split(','):
+            elementos = parte.strip().split(';')
+            nombre = elementos[0].strip().lower()
+            if not nombre:
+                continue
+            calidad = 1.0
+            for parametro in elementos[1:]:
+                clave, _, valor = parametro.strip().partition('=')
+                if clave.strip() == 'q':
+                    try:
+                        calidad = float(valor)
+                    except ValueError:
+                        calidad = 0.0
+            aceptadas[nombre] = calidad
+
+        mejor = None
+        mejor_calidad = 0.0
+        for codificacion in self.codificaciones_disponibles():
+            calidad = aceptadas.get(codificacion, aceptadas.get('*', 0.0))
+            if calidad > mejor_calidad:
+                mejor, mejor_calidad = codificacion, calidad
+        return mejor
+
+    def comprimir(self, cuerpo, codificacion):
+        """Comprimir un cuerpo completo con la codificación indicada"""
+        if codificacion == 'gzip':
+            return gzip.compress(cuerpo, compresslevel=self.nivel_gzip, mtime=0)
+        if codificacion == 'br':
+            return brotli.compress(cuerpo, quality=5)
+        if codificacion == 'zstd':
+            return zstandard.ZstdCompressor(level=3).compress(cuerpo)
+        raise ValueError(f"Codificación no soportada: {codificacion}")
+
+    def obtener_variante(self, cuerpo, codificacion):
+        """Devolver el cuerpo comprimido, reutilizando la variante si ya existe"""
+        digest = hashlib.blake2b(cuerpo, digest_size=16).digest()
+        clave = (digest, codificacion)
+
+        with self._lock:
+            variante = self._variantes.get(clave)
+            if variante is not None:
+                self._variantes.move_to_end(clave)
+                return variante
+
+        variante = self.comprimir(cuerpo, codificacion)
+        if len(variante) > self.max_bytes_variantes:
+            return variante
+
+        with self._lock:
+            if clave not in self._variantes:
+                self._variantes[clave] = variante
+                self._bytes_variantes += len(variante)
+            while self._bytes_variantes > self.max_bytes_variantes:
+                _, expulsada = self._variantes.popitem(last=False)
+                self._bytes_variantes -= len(expulsada)
+        return variante
+
+    def comprimir_flujo(self, fragmentos, codificacion):
+        """Comprimir una respuesta en streaming fragmento a fragmento"""
+        if codificacion == 'gzip':
+            compresor = zlib.compressobj(self.nivel_gzip, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            procesar = compresor.compress
+            vaciar = lambda: compresor.flush(zlib.Z_SYNC_FLUSH)
+            terminar = compresor.flush
+        elif codificacion == 'br':
+            compresor = brotli.Compressor(quality=5)
+            procesar = compresor.process
+            vaciar = compresor.flush
+            terminar = compresor.finish
+        else:
+            compresor = zstandard.ZstdCompressor(level=3).compressobj()
+            procesar = compresor.compress
+            vaciar = lambda: compresor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            terminar = compresor.flush
+
+        for fragmento in fragmentos:
+            if isinstance(fragmento, str):
+                fragmento = fragmento.encode('utf-8')
+            if fragmento:
+                # Vaciar en cada fragmento para no retener datos en el servidor
+                yield procesar(fragmento) + vaciar()
+        yield terminar()
+
+    def _es_comprimible(self, response):
+        """Determinar si la respuesta admite compresión"""
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return False
+        if response.direct_passthrough or 'Content-Encoding' in response.headers:
+            return False
+        return (response.mimetype or '').startswith(self.TIPOS_COMPRIMIBLES)
+
+    def comprimir_respuesta(self, response):
+        """Hook after_request: aplica la codificación negociada a la respuesta"""
+        if not self._es_comprimible(response):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        codificacion = self.negociar(request.headers.get('Accept-Encoding', ''))
+        if codificacion is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self.comprimir_flujo(response.response, codificacion)
+            response.headers.pop('Content-Length', None)
+        else:
+            cuerpo = response.get_data()
+            if len(cuerpo) < self.umbral:
+                return response
+            response.set_data(self.obtener_variante(cuerpo, codificacion))
+
+        response.headers['Content-Encoding'] = codificacion
+
+        # Cada variante es una representación distinta: su ETag también
+        etag, debil = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{codificacion}", weak=debil)
+
+        return response
@@ -0,0 +1,54 @@
+# middleware/lecturas.py
+import math
+import time
+from flask import request, g
+from database.replicas import forzar_primaria, restaurar_primaria
+
+
+class LeerTusEscrituras:
+    """Lecturas desde la primaria para el cliente que acaba de escribir
+
+    Una escritura correcta devuelve la cookie 'escritura_reciente' con el
+    instante hasta el que ese cliente debe leer de la primaria (la ventana
+    del enrutador de réplicas o de la réplica en memoria). Mientras la
+    cookie esté vigente, y durante toda petición que no sea GET/HEAD/OPTIONS,
+    las lecturas de UserModel no van a las réplicas ni a la memoria. Al ir en la cookie funciona igual con varios workers.
+    """
+
+    COOKIE = 'escritura_reciente'
+
+    METODOS_LECTURA = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, app=None, ventana=5.0):
+        self.ventana = ventana
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Registrar los hooks de la petición en la aplicación Flask"""
+        app.before_request(self.antes_de_peticion)
+        app.after_request(self.despues_de_peticion)
+        app.teardown_request(self.al_terminar_peticion)
+
+    def escritura_reciente(self):
+        """True si la cookie de la petición sigue dentro de su ventana"""
+        try:
+            return float(request.cookies.get(self.COOKIE, '0')) > time.time()
+        except ValueError:
+            return False
+
+    def antes_de_peticion(self):
+        primaria = request.method not in self.METODOS_LECTURA or self.escritura_reciente()
+        g.token_lectura_primaria = forzar_primaria(primaria)
+
+    def despues_de_peticion(self, response):
+        if request.method not in self.METODOS_LECTURA and response.status_code < 400:
+            response.set_cookie(self.COOKIE, f'{time.time() + self.ventana:.3f}',
+                                max_age=math.ceil(self.ventana), httponly=True, samesite='Lax')
+        return response
+
+    def al_terminar_peticion(self, _error=None):
+        # Los hilos de un servidor se reutilizan: el contexto no debe pasar a la siguiente petición
+        token = g.pop('token_lectura_primaria', None)
+        if token is not None:
+            restaurar_primaria(token)
@@ -0,0 +1,28 @@
+# middleware/preferencias.py
+from flask import request, has_request_context
+
+
+def parsear_prefer(cabecera):
+    """Parsear una cabecera Prefer (RFC 7240) a un diccionario de preferencias"""
+    preferencias = {}
+    if not cabecera:
+        return preferencias
+
+    for preferencia in cabecera.split(','):
+        # Los parámetros tras ';' no se usan: solo interesa token=valor
+        token = preferencia.split(';')[0].strip()
+        if not token:
+            continue
+        nombre, _, valor = token.partition('=')
+        nombre = nombre.strip().lower()
+        # Según la RFC, ante preferencias repetidas gana la primera
+        if nombre not in preferencias:
+            preferencias[nombre] = valor.strip().strip('"').lower()
+    return preferencias
+
+
+def respuesta_minima_solicitada():
+    """Indicar si la petición actual pide 'Prefer: return=minimal'"""
+    if not has_request_context():
+        return False
+    return parsear_prefer(request.headers.get('Prefer')).get('return') == 'minimal'
@@ -0,0 +1,120 @@
+# models/archivo.py
+import os
+import time
+from database.connection import DatabaseConnection
+from models.user_model import UserModel
+
+
+class ArchivadorUsuarios:
+    """Traslado por lotes de usuarios inactivos antiguos de users a users_archivo
+
+    Cada lote es una transacción corta (DELETE ... RETURNING encadenado con
+    el INSERT en el archivo) sobre filas bloqueadas con SKIP LOCKED, seguida
+    de una pausa, para no competir con el tráfico de la API. Con
+    ARCHIVO_USUARIOS=true las lecturas por id siguen encontrando a los
+    archivados (UserModel.obtener_por_id) y POST /usuarios/<id>/restaurar
+    los devuelve a users.
+    """
+
+    SQL_ARCHIVAR = f'''
+        SET LOCAL usuarios.archivo = 'on';
+        WITH movidos AS (
+            DELETE FROM users WHERE id IN (
+                SELECT id FROM users
+                WHERE activo = false
+                  AND fecha_actualizacion < LOCALTIMESTAMP - make_interval(days => %s)
+                ORDER BY fecha_actualizacion, id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED)
+            RETURNING {UserModel.COLUMNAS_ARCHIVO}
+        )
+        INSERT INTO users_archivo ({UserModel.COLUMNAS_ARCHIVO})
+        SELECT {UserModel.COLUMNAS_ARCHIVO} FROM movidos
+        RETURNING id
+    '''
+
+    # Tamaño de cada tabla con sus índices frente a shared_buffers; una tabla
+    # particionada no tiene páginas propias y se suman sus particiones
+    SQL_ESTADO = '''
+        SELECT COALESCE(h.inhparent, c.oid)::regclass::text, SUM(GREATEST(c.reltuples, 0))::bigint,
+               SUM(pg_total_relation_size(c.oid))::bigint,
+               pg_size_bytes(current_setting('shared_buffers'))
+        FROM pg_class c
+        LEFT JOIN pg_inherits h ON h.inhrelid = c.oid
+        WHERE c.relkind <> 'p'
+          AND COALESCE(h.inhparent, c.oid) IN ('users'::regclass, 'users_archivo'::regclass)
+        GROUP BY 1
+    '''
+
+    def __init__(self, dias=None, lote=None, pausa=None):
+        self.dias = dias if dias is not None else int(os.getenv('ARCHIVO_DIAS', '365'))
+        self.lote = lote or int(os.getenv('ARCHIVO_LOTE', '1000'))
+        self.pausa = pausa if pausa is not None else float(os.getenv('ARCHIVO_PAUSA', '0.5'))
+        self.db = DatabaseConnection()
+        self.db.exigir_base_unica("El archivo de usuarios")
+        # Sin ARCHIVO_USUARIOS la API no mira users_archivo: los archivados desaparecerían
+        if os.getenv('ARCHIVO_USUARIOS', 'false').lower() != 'true':
+            raise ValueError("El archivo de usuarios no está activado: defina ARCHIVO_USUARIOS=true "
+                             "aquí y en la API")
+
+    def _conectar(self):
+        conn = self.db.obtener_conexion()
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        return conn
+
+    def archivar_lote(self, conn):
+        """Mover un lote y confirmarlo; devuelve los ids archivados"""
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_ARCHIVAR, (self.dias, self.lote))
+            ids = [fila[0] for fila in cursor.fetchall()]
+            conn.commit()
+            return ids
+        except Exception:
+            conn.rollback()
+            raise
+
+    def archivar(self, maximo_lotes=None, progreso=print):
+        """Archivar lotes hasta que no queden candidatos (o 'maximo_lotes'); devuelve el total"""
+        conn = self._conectar()
+        total = lotes = 0
+        try:
+            while maximo_lotes is None or lotes < maximo_lotes:
+                inicio = time.monotonic()
+                ids = self.archivar_lote(conn)
+                total += len(ids)
+                lotes += 1
+                if ids:
+                    progreso(f"🧊 Lote {lotes}: {len(ids)} usuarios archivados "
+                             f"({(time.monotonic() - inicio) * 1000:.0f} ms, total {total:,})")
+                if len(ids) < self.lote:
+                    break
+                time.sleep(self.pausa)
+        finally:
+            conn.close()
+        return total
+
+    def estado(self):
+        """Filas estimadas y bytes de users y users_archivo, y shared_buffers"""
+        conn = self._conectar()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_ESTADO)
+            estado = {}
+            for tabla, filas, tamano, shared_buffers in cursor.fetchall():
+                estado[tabla] = {"filas_estimadas": max(filas, 0), "bytes": tamano}
+                estado["shared_buffers"] = shared_buffers
+            return estado
+        finally:
+            conn.close()
+
+    def vacuum(self):
+        """VACUUM ANALYZE de users para reutilizar el espacio de las filas movidas"""
+        conn = self._conectar()
+        try:
+            # VACUUM no puede ejecutarse dentro de una transacción
+            conn.autocommit = True
+            conn.cursor().execute('VACUUM (ANALYZE) users')
+        finally:
+            conn.close()
@@ -0,0 +1,311 @@
+# models/duplicados.py
+import io
+import re
+import csv
+import time
+from difflib import SequenceMatcher
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from database.connection import DatabaseConnection
+from models.indice_busqueda import tokenizar
+
+# Bits de motivo: por qué clave de bloqueo se emparejó cada par
+MOTIVOS = {'nombre': 1, 'telefono': 2, 'email': 4}
+
+# Peso de cada campo en la puntuación; si falta en alguno de los dos, no cuenta
+PESOS = (('nombre', 0.5), ('email', 0.3), ('telefono', 0.2))
+
+# Posición de cada clave de bloqueo en los registros normalizados
+CLAVES_BLOQUEO = (('nombre', 0), ('telefono', 2), ('email', 3))
+
+# Registros del trabajo en cada proceso del pool (ver _iniciar_proceso)
+_registros = None
+
+
+def puntuar(campos_a, campos_b, umbral=0.0):
+    """Media ponderada de la similitud (ratio de difflib) de nombre, email y teléfono
+
+    Se corta en cuanto ni con similitud perfecta en lo que queda se llega al
+    umbral; antes de cada ratio() se prueban sus cotas baratas
+    (real_quick_ratio y quick_ratio). Devuelve 0.0 en los pares cortados.
+    """
+    presentes = [(posicion, peso) for posicion, (_, peso) in enumerate(PESOS)
+                 if campos_a[posicion] and campos_b[posicion]]
+    peso_total = sum(peso for _, peso in presentes)
+    if not peso_total:
+        return 0.0
+    # Peso que aún puede sumar (similitud 1) hasta llegar al umbral
+    restante = peso_total
+    total = 0.0
+    for posicion, peso in presentes:
+        a, b = campos_a[posicion], campos_b[posicion]
+        restante -= peso
+        if a == b:
+            total += peso
+            continue
+        comparador = SequenceMatcher(None, a, b, autojunk=False)
+        minimo = (umbral * peso_total - total - restante) / peso
+        if comparador.real_quick_ratio() < minimo or comparador.quick_ratio() < minimo:
+            return 0.0
+        similitud = comparador.ratio()
+        if similitud < minimo:
+            return 0.0
+        total += peso * similitud
+    return total / peso_total
+
+
+def _iniciar_proceso(registros):
+    """Inicializador del pool: los registros viajan una vez por proceso, no con cada par"""
+    global _registros
+    _registros = registros
+
+
+def _puntuar_trozo(trozo, registros=None):
+    """Trabajo de un proceso: pares (a, b, motivos) que superan el umbral"""
+    umbral, pares = trozo
+    registros = _registros if registros is None else registros
+    aceptados = []
+    for a, b, motivos in pares:
+        puntuacion = puntuar(registros[a], registros[b], umbral)
+        if puntuacion >= umbral:
+            aceptados.append((a, b, round(puntuacion, 4), motivos))
+    return aceptados
+
+
+class DetectorDuplicados:
+    """Detección de usuarios casi duplicados sin comparar todos contra todos
+
+    1. Un COPY lee id, nombre, apellido, email y teléfono.
+    2. Bloqueo: cada usuario cae en un bloque por nombre completo normalizado,
+       por los últimos 9 dígitos del teléfono y por la parte local del email
+       (sin puntos, '+sufijo' ni dígitos). Solo se comparan usuarios que
+       comparten bloque; los bloques mayores que 'maximo_bloque' se recorren
+       con vecindad ordenada (cada usuario con los 'ventana' siguientes).
+    3. Los pares candidatos se generan bloque a bloque (cada par una sola
+       vez, desde su menor clave compartida) y se puntúan por trozos de ids
+       en un pool de procesos que recibe los registros al arrancar.
+    4. Los pares sobre el umbral se agrupan con union-find y el resultado
+       reemplaza el contenido de usuarios_duplicados en una transacción.
+    """
+
+    SQL_COPY = 'COPY (SELECT id, nombre, apellido, email, telefono FROM users) TO STDOUT WITH (FORMAT csv)'
+
+    SQL_COPY_RESULTADOS = '''
+        COPY usuarios_duplicados (usuario_id, grupo, tamano_grupo, puntuacion, motivos)
+        FROM STDIN WITH (FORMAT csv)
+    '''
+
+    def __init__(self, umbral=0.85, procesos=4, maximo_bloque=100, ventana=10, tamano_trozo=20000):
+        self.umbral = umbral
+        self.procesos = max(1, procesos)
+        self.maximo_bloque = maximo_bloque
+        self.ventana = ventana
+        self.tamano_trozo = tamano_trozo
+        self.db = DatabaseConnection()
+        # Los duplicados entre shards no se verían comparando cada uno por separado
+        self.db.exigir_base_unica("La detección de duplicados")
+
+    # ===== NORMALIZACIÓN Y BLOQUEO =====
+
+    @staticmethod
+    def normalizar_registro(nombre, apellido, email, telefono):
+        """Campos comparables (nombre, email, telefono) y clave de bloqueo del email
+
+        El email se compara por su parte local sin '+sufijo'; para bloquear
+        se le quitan además puntos y dígitos ('ana.garcia7' -> 'anagarcia').
+        """
+        nombre_completo = ' '.join(sorted(tokenizar(f"{nombre or ''} {apellido or ''}")))
+        local = ''.join(tokenizar((email or '').split('@')[0].split('+')[0]))
+        clave_email = re.sub(r'[^a-z]', '', local)
+        digitos = re.sub(r'\D', '', telefono or '')[-9:]
+        return (nombre_completo,
+                local,
+                digitos if len(digitos) >= 7 else '',
+                clave_email if len(clave_email) >= 3 else '')
+
+    def bloquear(self, registros):
+        """Bloques {(motivo, clave): [ids]} de los registros {id: campos}"""
+        bloques = {}
+        for usuario_id, (nombre, _, telefono, clave_email) in registros.items():
+            for motivo, clave in (('nombre', nombre), ('telefono', telefono), ('email', clave_email)):
+                if clave:
+                    bloques.setdefault((motivo, clave), []).append(usuario_id)
+        return bloques
+
+    def pares_candidatos(self, bloques, registros):
+        """Genera (a, b, bits de motivo) con a < b; nunca todos contra todos
+
+        Los pares salen bloque a bloque sin acumularse. Un par que comparten
+        varios bloques solo se emite desde la menor clave de las que lo
+        generan, con los bits de todas ellas.
+        """
+        # Bloques demasiado comunes (p. ej. 'garcia maria'): vecindad ordenada por teléfono y email
+        grandes = {clave: sorted(ids, key=lambda usuario_id: (registros[usuario_id][2],
+                                                              registros[usuario_id][1], usuario_id))
+                   for clave, ids in bloques.items() if len(ids) > self.maximo_bloque}
+        posiciones = {clave: {usuario_id: i for i, usuario_id in enumerate(ids)}
+                      for clave, ids in grandes.items()}
+
+        def genera(clave, a, b):
+            posicion = posiciones.get(clave)
+            return posicion is None or abs(posicion[a] - posicion[b]) <= self.ventana
+
+        for clave, ids in bloques.items():
+            if len(ids) < 2:
+                continue
+            ventana = self.ventana if clave in grandes else len(ids)
+            ids = grandes.get(clave) or sorted(ids)
+            for i, a in enumerate(ids):
+                campos_a = registros[a]
+                for b in ids[i + 1:i + 1 + ventana]:
+                    campos_b = registros[b]
+                    generadoras = [(motivo, campos_a[posicion]) for motivo, posicion in CLAVES_BLOQUEO
+                                   if campos_a[posicion] and campos_a[posicion] == campos_b[posicion]
+                                   and genera((motivo, campos_a[posicion]), a, b)]
+                    if min(generadoras) != clave:
+                        continue
+                    motivos = 0
+                    for motivo, _ in generadoras:
+                        motivos |= MOTIVOS[motivo]
+                    yield (a, b, motivos) if a < b else (b, a, motivos)
+
+    # ===== PUNTUACIÓN =====
+
+    def _trozos(self, pares):
+        trozo = []
+        for par in pares:
+            trozo.append(par)
+            if len(trozo) >= self.tamano_trozo:
+                yield (self.umbral, trozo)
+                trozo = []
+        if trozo:
+            yield (self.umbral, trozo)
+
+    def puntuar_pares(self, pares, registros):
+        """Pares (a, b, puntuacion, motivos) sobre el umbral, en paralelo por trozos"""
+        if self.procesos == 1:
+            return [par for trozo in self._trozos(pares) for par in _puntuar_trozo(trozo, registros)]
+
+        aceptados = []
+        trozos = self._trozos(pares)
+        with ProcessPoolExecutor(max_workers=self.procesos, initializer=_iniciar_proceso,
+                                 initargs=(registros,)) as pool:
+            # Como mucho dos trozos en vuelo por proceso: la memoria no crece con el total de pares
+            pendientes = set()
+            for trozo in trozos:
+                pendientes.add(pool.submit(_puntuar_trozo, trozo))
+                if len(pendientes) >= self.procesos * 2:
+                    hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                    for futuro in hechos:
+                        aceptados.extend(futuro.result())
+            for futuro in pendientes:
+                aceptados.extend(futuro.result())
+        return aceptados
+
+    # ===== AGRUPACIÓN =====
+
+    @staticmethod
+    def agrupar(aceptados):
+        """Filas (usuario_id, grupo, tamano_grupo, puntuacion, motivos) con union-find"""
+        padre = {}
+
+        def raiz(x):
+            while padre.setdefault(x, x) != x:
+                padre[x] = padre[padre[x]]
+                x = padre[x]
+            return x
+
+        mejor = {}
+        for a, b, puntuacion, motivos in aceptados:
+            ra, rb = raiz(a), raiz(b)
+            if ra != rb:
+                # La raíz es siempre el menor id: identifica el grupo
+                padre[max(ra, rb)] = min(ra, rb)
+            for usuario_id in (a, b):
+                if puntuacion > mejor.get(usuario_id, (-1, 0))[0]:
+                    mejor[usuario_id] = (puntuacion, motivos)
+
+        grupos = {usuario_id: raiz(usuario_id) for usuario_id in mejor}
+        tamanos = {}
+        for grupo in grupos.values():
+            tamanos[grupo] = tamanos.get(grupo, 0) + 1
+        return [
+            (usuario_id, grupo, tamanos[grupo], mejor[usuario_id][0],
+             [motivo for motivo, bit in MOTIVOS.items() if mejor[usuario_id][1] & bit])
+            for usuario_id, grupo in sorted(grupos.items())
+        ]
+
+    # ===== BASE DE DATOS =====
+
+    def _copiar(self):
+        conn = self.db.obtener_conexion()
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        try:
+            buffer = io.StringIO()
+            conn.cursor().copy_expert(self.SQL_COPY, buffer)
+            return buffer.getvalue()
+        finally:
+            conn.close()
+
+    def leer_registros(self):
+        registros = {}
+        for usuario_id, nombre, apellido, email, telefono in csv.reader(io.StringIO(self._copiar())):
+            registros[int(usuario_id)] = self.normalizar_registro(nombre, apellido, email, telefono)
+        return registros
+
+    def guardar(self, filas):
+        """Reemplazar usuarios_duplicados por 'filas' en una sola transacción"""
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        for usuario_id, grupo, tamano, puntuacion, motivos in filas:
+            escritor.writerow([usuario_id, grupo, tamano, puntuacion, '{' + ','.join(motivos) + '}'])
+        buffer.seek(0)
+
+        conn = self.db.obtener_conexion()
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        try:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM usuarios_duplicados')
+            cursor.copy_expert(self.SQL_COPY_RESULTADOS, buffer)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def detectar(self, guardar=True, progreso=print):
+        """Ejecutar el trabajo completo; devuelve estadísticas de cada fase"""
+        estadisticas = {}
+        inicio = time.monotonic()
+
+        registros = self.leer_registros()
+        estadisticas['usuarios'] = len(registros)
+        progreso(f"📥 {len(registros):,} usuarios leídos ({time.monotonic() - inicio:.1f} s)")
+
+        bloques = self.bloquear(registros)
+        estadisticas['bloques'] = sum(1 for ids in bloques.values() if len(ids) > 1)
+        progreso(f"🧱 {estadisticas['bloques']:,} bloques ({time.monotonic() - inicio:.1f} s)")
+
+        # Los pares se cuentan según se generan: nunca están todos en memoria
+        estadisticas['pares_candidatos'] = 0
+
+        def contados(pares):
+            for par in pares:
+                estadisticas['pares_candidatos'] += 1
+                yield par
+
+        aceptados = self.puntuar_pares(contados(self.pares_candidatos(bloques, registros)), registros)
+        filas = self.agrupar(aceptados)
+        estadisticas['pares_duplicados'] = len(aceptados)
+        estadisticas['usuarios_duplicados'] = len(filas)
+        estadisticas['grupos'] = len({fila[1] for fila in filas})
+        progreso(f"🔗 {estadisticas['pares_candidatos']:,} pares candidatos, {len(aceptados):,} sobre "
+                 f"{self.umbral}, {estadisticas['grupos']:,} grupos ({time.monotonic() - inicio:.1f} s)")
+
+        if guardar:
+            self.guardar(filas)
+            progreso(f"💾 usuarios_duplicados actualizada con {len(filas):,} filas")
+        estadisticas['segundos'] = round(time.monotonic() - inicio, 1)
+        return estadisticas
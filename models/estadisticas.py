@@ -0,0 +1,81 @@
+# models/estadisticas.py
+import os
+import time
+import threading
+from datetime import datetime
+
+
+class CacheEstadisticas:
+    """Estadísticas del sistema en memoria para GET /
+
+    La versión del servidor se lee una sola vez, en un hilo que lanza el
+    controlador al crearse (cada worker), y el total de usuarios se refresca
+    en segundo plano cuando los datos superan 'intervalo' segundos. Solo una
+    petición que llegue antes de esa primera carga espera, y a la misma carga
+    que las demás: nunca hay dos cargas completas en curso.
+    """
+
+    def __init__(self, modelo, intervalo=None):
+        self.modelo = modelo
+        self.intervalo = intervalo if intervalo is not None else float(os.getenv('ESTADISTICAS_INTERVALO', '30'))
+        self.datos = None
+        self._cargado = 0.0
+        self._cerrojo = threading.Lock()
+        self._cerrojo_carga = threading.Lock()
+        self._refrescando = False
+
+    def cargar(self):
+        """Lectura completa (versión y total)"""
+        estadisticas = self.modelo.obtener_estadisticas()
+        with self._cerrojo:
+            self.datos = dict(estadisticas, actualizado=datetime.now().isoformat())
+            self._cargado = time.monotonic()
+        return self.datos
+
+    def _cargar_una_vez(self):
+        """Primera carga: las llamadas concurrentes esperan a la que está en curso"""
+        with self._cerrojo_carga:
+            if self.datos is None:
+                self.cargar()
+            return self.datos
+
+    def _carga_inicial(self):
+        try:
+            self._cargar_una_vez()
+        except Exception as e:
+            # La primera petición lo volverá a intentar
+            print(f"❌ Error cargando estadísticas: {e}")
+
+    def iniciar(self):
+        """Lanzar la primera carga en segundo plano"""
+        if self.datos is None:
+            threading.Thread(target=self._carga_inicial, name='carga-estadisticas', daemon=True).start()
+
+    def _refrescar(self):
+        try:
+            total = self.modelo.estimar_total_usuarios()
+            with self._cerrojo:
+                self.datos = dict(self.datos, total_usuarios=total,
+                                  actualizado=datetime.now().isoformat())
+                self._cargado = time.monotonic()
+        except Exception as e:
+            # Se siguen sirviendo los últimos datos; se reintenta en la siguiente petición
+            print(f"❌ Error refrescando estadísticas: {e}")
+        finally:
+            with self._cerrojo:
+                self._refrescando = False
+
+    def obtener(self):
+        """Estadísticas en caché; lanza un refresco en segundo plano si caducaron"""
+        if self.datos is None:
+            return self._cargar_una_vez()
+
+        with self._cerrojo:
+            caducado = time.monotonic() - self._cargado >= self.intervalo
+            lanzar = caducado and not self._refrescando
+            if lanzar:
+                self._refrescando = True
+            datos = self.datos
+        if lanzar:
+            threading.Thread(target=self._refrescar, name='refresco-estadisticas', daemon=True).start()
+        return datos
@@ -0,0 +1,181 @@
+# models/exportacion.py
+import os
+import gzip
+import json
+import queue
+import threading
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from database.connection import DatabaseConnection
+from models.user_model import UserModel
+
+class ExportadorUsuarios:
+    """Exportación completa de users por rangos de id con COPY ... TO STDOUT
+
+    Los rangos se reparten entre varias conexiones que importan la misma
+    instantánea (pg_export_snapshot), así que el volcado es consistente
+    aunque se lea en paralelo. Cada rango se escribe comprimido con gzip en
+    su propio fichero y queda anotado en manifiesto.json al terminar, lo que
+    permite reanudar una exportación interrumpida.
+    """
+
+    FORMATOS = ('csv', 'ndjson')
+
+    def __init__(self, directorio, formato='csv', trabajadores=4, rangos=None):
+        if formato not in self.FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}")
+        self.directorio = Path(directorio)
+        self.formato = formato
+        self.trabajadores = max(1, trabajadores)
+        self.num_rangos = rangos or self.trabajadores * 4
+        self.ruta_manifiesto = self.directorio / 'manifiesto.json'
+        self.db = DatabaseConnection()
+        self._cerrojo = threading.Lock()
+
+    def _sql_copy(self, rango):
+        """COPY de un rango; el último rango no tiene límite superior"""
+        condicion = 'id >= %d' % rango['desde']
+        if rango['hasta'] is not None:
+            condicion += ' AND id < %d' % rango['hasta']
+        consulta = f"SELECT {UserModel.COLUMNAS_USUARIO} FROM users WHERE {condicion} ORDER BY id"
+
+        if self.formato == 'csv':
+            cabecera = 'true' if rango['numero'] == 1 else 'false'
+            return f"COPY ({consulta}) TO STDOUT WITH (FORMAT csv, HEADER {cabecera})"
+        # Un JSON por línea: con QUOTE y DELIMITER que nunca aparecen en el
+        # JSON, el formato csv lo emite tal cual (el formato text escaparía '\')
+        return (f"COPY (SELECT row_to_json(u) FROM ({consulta}) u) TO STDOUT "
+                f"WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')")
+
+    def planificar_rangos(self, minimo, maximo):
+        """Dividir [minimo, maximo] en rangos de id de igual anchura"""
+        if minimo is None:
+            return []
+        anchura = max(1, -(-(maximo - minimo + 1) // self.num_rangos))
+        rangos = []
+        for desde in range(minimo, maximo + 1, anchura):
+            rangos.append({
+                "numero": len(rangos) + 1,
+                "desde": desde,
+                "hasta": desde + anchura,
+                "archivo": None,
+                "filas": None,
+                "completado": False,
+            })
+        rangos[-1]["hasta"] = None
+        extension = 'csv' if self.formato == 'csv' else 'ndjson'
+        for rango in rangos:
+            rango["archivo"] = f"usuarios_{rango['numero']:04d}.{extension}.gz"
+        return rangos
+
+    def cargar_manifiesto(self):
+        """Leer el manifiesto de una exportación previa (None si no existe)"""
+        if not self.ruta_manifiesto.exists():
+            return None
+        with open(self.ruta_manifiesto, encoding='utf-8') as fichero:
+            return json.load(fichero)
+
+    def _guardar_manifiesto(self, manifiesto):
+        """Escribir el manifiesto de forma atómica (fichero temporal + rename)"""
+        temporal = self.ruta_manifiesto.with_suffix('.tmp')
+        with open(temporal, 'w', encoding='utf-8') as fichero:
+            json.dump(manifiesto, fichero, indent=2, ensure_ascii=False)
+        os.replace(temporal, self.ruta_manifiesto)
+
+    def _abrir_en_instantanea(self, instantanea):
+        """Conexión de solo lectura que ve la instantánea exportada"""
+        conn = self.db.obtener_conexion()
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        conn.cursor().execute('SET TRANSACTION SNAPSHOT %s', (instantanea,))
+        return conn
+
+    def _exportar_rango(self, conn, rango):
+        """Volcar un rango a su fichero .gz; devuelve el número de filas"""
+        destino = self.directorio / rango["archivo"]
+        temporal = destino.with_suffix('.parcial')
+        cursor = conn.cursor()
+        with gzip.open(temporal, 'wb') as fichero:
+            cursor.copy_expert(self._sql_copy(rango), fichero)
+        # Solo un fichero completo lleva el nombre definitivo
+        os.replace(temporal, destino)
+        return cursor.rowcount
+
+    def _trabajador(self, instantanea, pendientes, manifiesto, progreso):
+        conn = self._abrir_en_instantanea(instantanea)
+        try:
+            while True:
+                try:
+                    rango = pendientes.get_nowait()
+                except queue.Empty:
+                    return
+                filas = self._exportar_rango(conn, rango)
+                with self._cerrojo:
+                    rango["filas"] = filas
+                    rango["completado"] = True
+                    rango["instantanea"] = instantanea
+                    self._guardar_manifiesto(manifiesto)
+                if progreso:
+                    progreso(rango)
+        finally:
+            conn.close()
+
+    def exportar(self, reanudar=False, progreso=None):
+        """Ejecutar (o reanudar) la exportación; devuelve el manifiesto final"""
+        # La instantánea compartida entre trabajadores no abarca varias bases
+        self.db.exigir_base_unica("La exportación")
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        manifiesto = self.cargar_manifiesto() if reanudar else None
+        if manifiesto and manifiesto["formato"] != self.formato:
+            raise ValueError(f"La exportación previa es {manifiesto['formato']}, no {self.formato}")
+
+        # La conexión coordinadora mantiene abierta la transacción que exporta
+        # la instantánea mientras los trabajadores la usan
+        coordinadora = self.db.obtener_conexion()
+        if not coordinadora:
+            raise Exception("Error de conexión a la base de datos")
+
+        try:
+            coordinadora.set_session(isolation_level='REPEATABLE READ', readonly=True)
+            cursor = coordinadora.cursor()
+            cursor.execute('SELECT pg_export_snapshot(), MIN(id), MAX(id) FROM users')
+            instantanea, minimo, maximo = cursor.fetchone()
+
+            if not manifiesto:
+                manifiesto = {
+                    "formato": self.formato,
+                    "creado": datetime.now().isoformat(),
+                    "rangos": self.planificar_rangos(minimo, maximo),
+                }
+            manifiesto["completado"] = False
+            self._guardar_manifiesto(manifiesto)
+
+            pendientes = queue.Queue()
+            for rango in manifiesto["rangos"]:
+                if not rango["completado"]:
+                    pendientes.put(rango)
+
+            if reanudar:
+                print(f"🔁 Reanudando exportación: {pendientes.qsize()} rango(s) pendiente(s)")
+
+            trabajadores = min(self.trabajadores, pendientes.qsize())
+            if trabajadores:
+                with ThreadPoolExecutor(max_workers=trabajadores) as pool:
+                    futuros = [pool.submit(self._trabajador, instantanea, pendientes, manifiesto, progreso)
+                               for _ in range(trabajadores)]
+                    for futuro in futuros:
+                        futuro.result()
+
+            manifiesto["completado"] = True
+            manifiesto["total_filas"] = sum(r["filas"] or 0 for r in manifiesto["rangos"])
+            manifiesto["finalizado"] = datetime.now().isoformat()
+            self._guardar_manifiesto(manifiesto)
+
+            print(f"✅ Exportación completada: {manifiesto['total_filas']} fila(s) en {self.directorio}")
+            return manifiesto
+
+        finally:
+            coordinadora.rollback()
+            coordinadora.close()
@@ -0,0 +1,148 @@
+# models/filtro_emails.py
+import io
+import os
+import csv
+import math
+import hashlib
+import threading
+from database.connection import DatabaseConnection
+
+
+class FiltroBloom:
+    """Filtro de Bloom sobre un bytearray: sin falsos negativos, falsos positivos acotados
+
+    Las k posiciones salen de un único blake2b de 128 bits partido en dos
+    mitades (doble hash: h1 + i * h2).
+    """
+
+    def __init__(self, capacidad, tasa_falsos_positivos=0.01):
+        capacidad = max(int(capacidad), 1)
+        self.bits = max(int(-capacidad * math.log(tasa_falsos_positivos) / math.log(2) ** 2), 8)
+        self.funciones = max(round(self.bits / capacidad * math.log(2)), 1)
+        self.capacidad = capacidad
+        self.elementos = 0
+        self.tabla = bytearray((self.bits + 7) // 8)
+
+    def _posiciones(self, valor):
+        resumen = hashlib.blake2b(valor.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(resumen[:8], 'little')
+        h2 = int.from_bytes(resumen[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.funciones)]
+
+    def anadir(self, valor):
+        for posicion in self._posiciones(valor):
+            self.tabla[posicion >> 3] |= 1 << (posicion & 7)
+        self.elementos += 1
+
+    def __contains__(self, valor):
+        return all(self.tabla[posicion >> 3] & (1 << (posicion & 7)) for posicion in self._posiciones(valor))
+
+
+class FiltroEmails:
+    """Emails registrados en un filtro de Bloom para GET /usuarios/email-disponible
+
+    Si el filtro dice que un email no está, seguro que no estaba al cargarlo
+    ni lo ha escrito este proceso después: se responde "disponible" sin
+    consultar. Un positivo (real o falso) se confirma con SELECT 1. Los
+    emails escritos por otros workers se recogen en la recarga periódica
+    (FILTRO_EMAILS_RECARGA, 60 s), que también limpia los borrados y
+    redimensiona: hasta entonces un negativo no es autoritativo.
+    """
+
+    def __init__(self, intervalo_recarga=None, tasa_falsos_positivos=None, holgura=2.0,
+                 consulta='SELECT email FROM users WHERE email IS NOT NULL'):
+        self.intervalo_recarga = intervalo_recarga if intervalo_recarga is not None else float(os.getenv('FILTRO_EMAILS_RECARGA', '60'))
+        self.tasa_falsos_positivos = tasa_falsos_positivos if tasa_falsos_positivos is not None else float(os.getenv('FILTRO_EMAILS_FALSOS_POSITIVOS', '0.01'))
+        # Capacidad = emails cargados * holgura, para absorber altas hasta la siguiente recarga
+        self.holgura = holgura
+        # Emails ocupados (UserModel.sql_emails: registro de emails o users y el archivo)
+        self.sql_copy = f'COPY ({consulta}) TO STDOUT WITH (FORMAT csv)'
+        self.db = DatabaseConnection()
+        self.filtro = None
+        self._cerrojo = threading.Lock()
+        # Emails escritos durante una recarga: se añaden al filtro nuevo
+        self._pendientes = None
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def anadir(self, email):
+        with self._cerrojo:
+            if self._pendientes is not None:
+                self._pendientes.append(email)
+            if self.filtro is not None:
+                self.filtro.anadir(email)
+
+    def puede_contener(self, email):
+        """False solo si el email no está registrado; sin cargar siempre True"""
+        filtro = self.filtro
+        return filtro is None or email in filtro
+
+    def _copiar(self):
+        """CSV del COPY; con DB_SHARDS, el de todos los shards seguidos"""
+        buffer = io.StringIO()
+        for shard in range(self.db.numero_shards):
+            conn = self.db.obtener_conexion_shard(shard)
+            if not conn:
+                raise Exception("Error de conexión a la base de datos")
+            try:
+                conn.cursor().copy_expert(self.sql_copy, buffer)
+            finally:
+                conn.close()
+        return buffer.getvalue()
+
+    def cargar(self):
+        """Construir un filtro nuevo con un COPY de los emails y publicarlo de una vez"""
+        with self._cerrojo:
+            self._pendientes = []
+        try:
+            emails = [fila[0] for fila in csv.reader(io.StringIO(self._copiar()))]
+            filtro = FiltroBloom(max(len(emails) * self.holgura, 1000), self.tasa_falsos_positivos)
+            for email in emails:
+                filtro.anadir(email)
+        except Exception:
+            with self._cerrojo:
+                self._pendientes = None
+            raise
+
+        with self._cerrojo:
+            pendientes, self._pendientes = self._pendientes, None
+            for email in pendientes:
+                filtro.anadir(email)
+            self.filtro = filtro
+        print(f"🌸 Filtro de emails cargado: {len(emails)} emails, {len(filtro.tabla) // 1024} KiB")
+
+    def _recargar(self):
+        try:
+            self.cargar()
+        except Exception as e:
+            print(f"❌ Error cargando el filtro de emails: {e}")
+
+    def iniciar(self):
+        """Carga inicial y recargas periódicas en un hilo"""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name='filtro-emails', daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+
+    def _bucle(self):
+        self._recargar()
+        while not self._detener.wait(self.intervalo_recarga):
+            self._recargar()
+
+    def estado(self):
+        filtro = self.filtro
+        if filtro is None:
+            return {"cargado": False}
+        return {
+            "cargado": True,
+            "emails": filtro.elementos,
+            "capacidad": filtro.capacidad,
+            "bytes": len(filtro.tabla),
+            "funciones_hash": filtro.funciones,
+        }
@@ -0,0 +1,234 @@
+# models/indice_busqueda.py
+import io
+import os
+import re
+import csv
+import sys
+import heapq
+import bisect
+import threading
+import unicodedata
+from database.connection import DatabaseConnection
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes ni diacríticos ('José Ñúñez' -> 'jose nunez')"""
+    descompuesto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def tokenizar(texto):
+    return re.findall(r'\w+', normalizar(texto)) if texto else []
+
+
+class IndiceBusqueda:
+    """Índice invertido en memoria sobre nombre, apellido, ciudad y profesión
+
+    Un índice por campo (token -> ids) con su vocabulario ordenado para
+    buscar por prefijo con bisect. Se carga con un COPY de users y lo
+    mantienen al día las escrituras de UserModel de este proceso; la recarga
+    periódica (INDICE_RECARGA) recoge lo escrito por otros workers.
+    """
+
+    CAMPOS = ('nombre', 'apellido', 'ciudad', 'profesion')
+    # Términos más cortos solo coinciden con tokens completos
+    MIN_PREFIJO = 2
+
+    SQL_COPY = 'COPY (SELECT id, nombre, apellido, ciudad, profesion FROM users) TO STDOUT WITH (FORMAT csv)'
+
+    def __init__(self, intervalo_recarga=None):
+        self.intervalo_recarga = intervalo_recarga if intervalo_recarga is not None else float(os.getenv('INDICE_RECARGA', '300'))
+        self.db = DatabaseConnection()
+        self.indices = {campo: {} for campo in self.CAMPOS}
+        self.vocabulario = {campo: [] for campo in self.CAMPOS}
+        self.documentos = {}
+        self.cargado = False
+        self._cerrojo = threading.RLock()
+        # Escrituras ocurridas durante una recarga: se reaplican sobre el índice nuevo
+        self._pendientes = None
+        self._detener = threading.Event()
+        self._hilo = None
+
+    # ===== MANTENIMIENTO =====
+
+    def _quitar_tokens(self, campo, usuario_id, tokens):
+        indice, vocabulario = self.indices[campo], self.vocabulario[campo]
+        for token in set(tokens):
+            ids = indice.get(token)
+            if ids is None:
+                continue
+            ids.discard(usuario_id)
+            if not ids:
+                del indice[token]
+                del vocabulario[bisect.bisect_left(vocabulario, token)]
+
+    def _poner_tokens(self, campo, usuario_id, tokens):
+        indice, vocabulario = self.indices[campo], self.vocabulario[campo]
+        for token in set(tokens):
+            ids = indice.get(token)
+            if ids is None:
+                indice[token] = ids = set()
+                bisect.insort(vocabulario, token)
+            ids.add(usuario_id)
+
+    def actualizar(self, usuario_id, datos):
+        """Reindexar los campos presentes en 'datos'; los demás se conservan"""
+        with self._cerrojo:
+            if self._pendientes is not None:
+                self._pendientes.append((usuario_id, datos))
+            documento = self.documentos.setdefault(usuario_id, {})
+            for campo in self.CAMPOS:
+                if campo not in datos:
+                    continue
+                tokens = tuple(tokenizar(datos[campo]))
+                self._quitar_tokens(campo, usuario_id, documento.get(campo, ()))
+                self._poner_tokens(campo, usuario_id, tokens)
+                documento[campo] = tokens
+
+    def eliminar(self, usuario_id):
+        with self._cerrojo:
+            if self._pendientes is not None:
+                self._pendientes.append((usuario_id, None))
+            documento = self.documentos.pop(usuario_id, None)
+            for campo, tokens in (documento or {}).items():
+                self._quitar_tokens(campo, usuario_id, tokens)
+
+    def _copiar(self):
+        """CSV del COPY; con DB_SHARDS, el de todos los shards seguidos"""
+        buffer = io.StringIO()
+        for shard in range(self.db.numero_shards):
+            conn = self.db.obtener_conexion_shard(shard)
+            if not conn:
+                raise Exception("Error de conexión a la base de datos")
+            try:
+                conn.cursor().copy_expert(self.SQL_COPY, buffer)
+            finally:
+                conn.close()
+        return buffer.getvalue()
+
+    def cargar(self):
+        """Construir el índice completo con un COPY y publicarlo de una vez"""
+        with self._cerrojo:
+            self._pendientes = []
+        try:
+            texto = self._copiar()
+            indices = {campo: {} for campo in self.CAMPOS}
+            documentos = {}
+            for fila in csv.reader(io.StringIO(texto)):
+                usuario_id = int(fila[0])
+                documento = documentos[usuario_id] = {}
+                for campo, valor in zip(self.CAMPOS, fila[1:]):
+                    tokens = tuple(tokenizar(valor))
+                    documento[campo] = tokens
+                    for token in set(tokens):
+                        indices[campo].setdefault(token, set()).add(usuario_id)
+        except Exception:
+            with self._cerrojo:
+                self._pendientes = None
+            raise
+
+        with self._cerrojo:
+            pendientes, self._pendientes = self._pendientes, None
+            self.indices, self.documentos = indices, documentos
+            self.vocabulario = {campo: sorted(indice) for campo, indice in indices.items()}
+            self.cargado = True
+            # Lo escrito mientras corría el COPY puede no estar en la copia
+            for usuario_id, datos in pendientes:
+                if datos is None:
+                    self.eliminar(usuario_id)
+                else:
+                    self.actualizar(usuario_id, datos)
+        print(f"🔎 Índice de búsqueda cargado: {len(documentos)} usuarios")
+
+    def recargar_en_segundo_plano(self):
+        threading.Thread(target=self._recargar, name='recarga-indice-busqueda', daemon=True).start()
+
+    def _recargar(self):
+        try:
+            self.cargar()
+        except Exception as e:
+            print(f"❌ Error cargando el índice de búsqueda: {e}")
+
+    def iniciar(self):
+        """Carga inicial y recargas periódicas en un hilo"""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name='indice-busqueda', daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+
+    def _bucle(self):
+        self._recargar()
+        while not self._detener.wait(self.intervalo_recarga):
+            self._recargar()
+
+    # ===== CONSULTAS =====
+
+    @staticmethod
+    def analizar(consulta):
+        """Términos (campo | None, token) de la consulta; admite 'campo:texto'"""
+        terminos = []
+        for parte in consulta.split():
+            campo, _, texto = parte.rpartition(':')
+            campo = campo.lower() or None
+            for token in tokenizar(texto):
+                terminos.append((campo, token))
+        return terminos
+
+    def _coincidencias(self, campo, termino):
+        """Conjuntos de ids de los tokens del campo que empiezan por 'termino'"""
+        indice, vocabulario = self.indices[campo], self.vocabulario[campo]
+        if len(termino) < self.MIN_PREFIJO:
+            return [indice[termino]] if termino in indice else []
+        conjuntos = []
+        posicion = bisect.bisect_left(vocabulario, termino)
+        while posicion < len(vocabulario) and vocabulario[posicion].startswith(termino):
+            conjuntos.append(indice[vocabulario[posicion]])
+            posicion += 1
+        return conjuntos
+
+    def buscar(self, consulta, limite=20):
+        """Ids (los 'limite' menores) que cumplen todos los términos y total de coincidencias"""
+        terminos = self.analizar(consulta)
+        for campo, _ in terminos:
+            if campo is not None and campo not in self.CAMPOS:
+                raise ValueError(f"Campo de búsqueda no soportado: {campo}")
+        if not terminos:
+            return [], 0
+
+        with self._cerrojo:
+            por_termino = []
+            for campo, termino in terminos:
+                conjuntos = [ids for c in ([campo] if campo else self.CAMPOS)
+                             for ids in self._coincidencias(c, termino)]
+                # Un único token no se copia; varios se unen
+                por_termino.append(conjuntos[0] if len(conjuntos) == 1 else set().union(*conjuntos))
+            # Intersección conjuntiva empezando por el término más selectivo
+            por_termino.sort(key=len)
+            resultado = por_termino[0].intersection(*por_termino[1:])
+            return heapq.nsmallest(limite, resultado), len(resultado)
+
+    def memoria(self):
+        """Tamaño aproximado en bytes de cada índice (tokens, conjuntos y vocabulario)"""
+        with self._cerrojo:
+            informe = {}
+            for campo in self.CAMPOS:
+                indice = self.indices[campo]
+                bytes_totales = (sys.getsizeof(indice) + sys.getsizeof(self.vocabulario[campo])
+                                 + sum(sys.getsizeof(token) + sys.getsizeof(ids) for token, ids in indice.items()))
+                informe[campo] = {
+                    "tokens": len(indice),
+                    "entradas": sum(len(ids) for ids in indice.values()),
+                    "bytes": bytes_totales,
+                }
+            informe["documentos"] = {
+                "usuarios": len(self.documentos),
+                "bytes": sys.getsizeof(self.documentos) + sum(
+                    sys.getsizeof(documento) for documento in self.documentos.values()),
+            }
+            return informe
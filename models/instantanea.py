@@ -0,0 +1,247 @@
+# models/instantanea.py
+import io
+import os
+import csv
+import time
+import threading
+from datetime import datetime, timedelta
+from database.connection import DatabaseConnection
+
+# NumPy es opcional: sin él la instantánea no está disponible (la API responde 501)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class InstantaneaUsuarios:
+    """Copia columnar en memoria de las columnas numéricas y categóricas de users
+
+    Se carga con un único COPY y después se actualiza por incrementos a partir
+    de fecha_actualizacion (y de las lápidas de users_eliminados). Las
+    estadísticas se calculan con operaciones vectorizadas de NumPy sobre la
+    copia, sin consultas. Cada actualización construye arrays nuevos y los
+    publica de una vez: los lectores nunca ven una copia a medias.
+    """
+
+    NUMERICAS = ('edad', 'salario')
+    # Se guardan como códigos enteros (-1 = nulo) más la lista de valores
+    CATEGORICAS = ('ciudad', 'profesion', 'genero', 'activo')
+    PERCENTILES = (25, 50, 75, 90)
+
+    SQL_COPY = '''
+        COPY (
+            SELECT id, edad, salario, activo, ciudad, profesion, genero,
+                   fecha_actualizacion, false
+            FROM users {filtro_users}
+            UNION ALL
+            SELECT id, NULL, NULL, NULL, NULL, NULL, NULL, fecha_eliminacion, true
+            FROM users_eliminados {filtro_eliminados}
+        ) TO STDOUT WITH (FORMAT csv)
+    '''
+
+    def __init__(self, intervalo=None, margen_segundos=None):
+        self.intervalo = intervalo if intervalo is not None else float(os.getenv('INSTANTANEA_INTERVALO', '60'))
+        # Solape frente a transacciones que confirman con una fecha anterior a la marca
+        self.margen = margen_segundos if margen_segundos is not None else int(os.getenv('SINCRONIZACION_MARGEN_SEGUNDOS', '5'))
+        self.db = DatabaseConnection()
+        self.columnas = None
+        self.categorias = None
+        self.marca = None
+        self.actualizado = None
+        self._cargado = 0.0
+        self._cerrojo = threading.Lock()
+        self._refrescando = False
+
+    @staticmethod
+    def disponible():
+        return np is not None
+
+    @classmethod
+    def desde_columnas(cls, columnas, categorias, marca=None):
+        """Instantánea construida a partir de arrays ya preparados (pruebas y benchmark)"""
+        instantanea = cls(intervalo=float('inf'))
+        instantanea._publicar(columnas, categorias, marca)
+        return instantanea
+
+    @staticmethod
+    def leer_copy(texto):
+        """Filas del COPY en columnas de listas Python; devuelve (filas, marca)"""
+        filas = {campo: [] for campo in ('id', 'edad', 'salario', 'activo', 'ciudad',
+                                         'profesion', 'genero', 'eliminado')}
+        marca = None
+        for id_, edad, salario, activo, ciudad, profesion, genero, fecha, eliminado in csv.reader(io.StringIO(texto)):
+            filas['id'].append(int(id_))
+            filas['edad'].append(float(edad) if edad else None)
+            filas['salario'].append(float(salario) if salario else None)
+            filas['activo'].append({'t': 'true', 'f': 'false'}.get(activo))
+            filas['ciudad'].append(ciudad or None)
+            filas['profesion'].append(profesion or None)
+            filas['genero'].append(genero or None)
+            filas['eliminado'].append(eliminado == 't')
+            if fecha:
+                fecha = datetime.fromisoformat(fecha)
+                marca = fecha if marca is None or fecha > marca else marca
+        return filas, marca
+
+    def _a_columnas(self, filas, categorias):
+        """Listas Python a arrays; amplía 'categorias' con los valores nuevos"""
+        columnas = {'id': np.array(filas['id'], dtype=np.int64)}
+        for campo in self.NUMERICAS:
+            columnas[campo] = np.array([np.nan if v is None else v for v in filas[campo]], dtype=np.float64)
+        for campo in self.CATEGORICAS:
+            # Los códigos solo se añaden: los de copias anteriores siguen siendo válidos
+            indice = categorias[campo]
+            columnas[campo] = np.array(
+                [-1 if v is None else indice.setdefault(v, len(indice)) for v in filas[campo]],
+                dtype=np.int32)
+        return columnas
+
+    def _copiar(self, desde=None):
+        """Texto CSV del COPY completo o de los cambios posteriores a 'desde' (de todos los shards)"""
+        buffer = io.StringIO()
+        for shard in range(self.db.numero_shards):
+            conn = self.db.obtener_conexion_shard(shard)
+            if not conn:
+                raise Exception("Error de conexión a la base de datos")
+            try:
+                cursor = conn.cursor()
+                if desde is None:
+                    sql = self.SQL_COPY.format(filtro_users='', filtro_eliminados='WHERE false')
+                else:
+                    # COPY no admite parámetros: se enlazan con mogrify
+                    sql = cursor.mogrify(self.SQL_COPY.format(
+                        filtro_users='WHERE fecha_actualizacion > %s',
+                        filtro_eliminados='WHERE fecha_eliminacion > %s'), (desde, desde)).decode('utf-8')
+                cursor.copy_expert(sql, buffer)
+            finally:
+                conn.close()
+        return buffer.getvalue()
+
+    def _publicar(self, columnas, categorias, marca):
+        with self._cerrojo:
+            self.columnas, self.categorias = columnas, categorias
+            self.marca = marca
+            self.actualizado = datetime.now().isoformat()
+            self._cargado = time.monotonic()
+
+    def cargar(self):
+        """Carga completa con un único COPY"""
+        if np is None:
+            raise Exception("La instantánea requiere numpy (pip install numpy)")
+        filas, marca = self.leer_copy(self._copiar())
+        categorias = {campo: {} for campo in self.CATEGORICAS}
+        self._publicar(self._a_columnas(filas, categorias), categorias, marca)
+        print(f"📊 Instantánea de usuarios cargada: {len(filas['id'])} filas")
+
+    def actualizar(self):
+        """Aplicar altas, cambios y bajas posteriores a la marca de agua"""
+        if self.columnas is None or self.marca is None:
+            return self.cargar()
+        desde = self.marca - timedelta(seconds=self.margen)
+        filas, marca = self.leer_copy(self._copiar(desde))
+        if not filas['id']:
+            self._publicar(self.columnas, self.categorias, self.marca)
+            return
+
+        categorias = {campo: dict(valores) for campo, valores in self.categorias.items()}
+        nuevas = self._a_columnas(filas, categorias)
+        eliminado = np.array(filas['eliminado'], dtype=bool)
+
+        # Upsert vectorizado: fuera las filas tocadas, dentro su versión actual
+        quitar = np.isin(self.columnas['id'], nuevas['id'])
+        columnas = {campo: np.concatenate([valores[~quitar], nuevas[campo][~eliminado]])
+                    for campo, valores in self.columnas.items()}
+        self._publicar(columnas, categorias, max(marca, self.marca))
+
+    def _refrescar(self):
+        try:
+            self.actualizar()
+        except Exception as e:
+            # Se sigue sirviendo la copia anterior; se reintenta en la siguiente petición
+            print(f"❌ Error actualizando la instantánea: {e}")
+        finally:
+            with self._cerrojo:
+                self._refrescando = False
+
+    def cargada(self):
+        return self.columnas is not None
+
+    def iniciar(self):
+        """Cargar o actualizar en segundo plano; no hace nada si ya hay una carga en curso"""
+        with self._cerrojo:
+            if self._refrescando:
+                return False
+            self._refrescando = True
+        threading.Thread(target=self._refrescar, name='refresco-instantanea', daemon=True).start()
+        return True
+
+    def obtener(self):
+        """(columnas, categorias) actuales; actualiza en segundo plano si caducaron
+
+        Sin copia cargada lanza la carga inicial en segundo plano (una sola a la
+        vez) y falla en lugar de bloquear la petición con el COPY completo.
+        """
+        if self.columnas is None:
+            self.iniciar()
+            raise Exception("La instantánea de usuarios se está cargando, inténtelo más tarde")
+        with self._cerrojo:
+            caducada = time.monotonic() - self._cargado >= self.intervalo
+            datos = self.columnas, self.categorias
+        if caducada:
+            self.iniciar()
+        return datos
+
+    def _resumir(self, valores, tramos=None):
+        valores = valores[~np.isnan(valores)]
+        if not len(valores):
+            return {"n": 0}
+        percentiles = np.percentile(valores, self.PERCENTILES)
+        resumen = {
+            "n": int(len(valores)),
+            "media": round(float(valores.mean()), 2),
+            "desviacion": round(float(valores.std()), 2),
+            "minimo": float(valores.min()),
+            "maximo": float(valores.max()),
+            "percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(self.PERCENTILES, percentiles)},
+        }
+        if tramos:
+            conteos, bordes = np.histogram(valores, bins=tramos)
+            resumen["histograma"] = [
+                {"desde": round(float(bordes[i]), 2), "hasta": round(float(bordes[i + 1]), 2), "n": int(n)}
+                for i, n in enumerate(conteos)
+            ]
+        return resumen
+
+    @staticmethod
+    def _correlacion(columnas):
+        """Correlación de Pearson entre edad y salario (filas con ambos valores)"""
+        validos = ~(np.isnan(columnas['edad']) | np.isnan(columnas['salario']))
+        if validos.sum() < 2:
+            return None
+        correlacion = np.corrcoef(columnas['edad'][validos], columnas['salario'][validos])[0, 1]
+        return None if np.isnan(correlacion) else round(float(correlacion), 4)
+
+    def estadisticas(self, campo, agrupar_por=None, tramos=10):
+        """Resumen de 'campo' (edad o salario), global o por una columna categórica"""
+        columnas, categorias = self.obtener()
+        valores = columnas[campo]
+        if agrupar_por is None:
+            resumen = self._resumir(valores, tramos)
+            resumen["correlacion_edad_salario"] = self._correlacion(columnas)
+            return resumen
+
+        # Agrupación vectorizada: ordenar por código y cortar donde cambia
+        validos = ~np.isnan(valores)
+        codigos, valores = columnas[agrupar_por][validos], valores[validos]
+        orden = np.argsort(codigos, kind='stable')
+        codigos, valores = codigos[orden], valores[orden]
+        cortes = np.flatnonzero(np.diff(codigos)) + 1
+        nombres = list(categorias[agrupar_por])
+
+        grupos = []
+        if len(codigos):
+            for codigo, trozo in zip(codigos[np.r_[0, cortes]], np.split(valores, cortes)):
+                grupos.append(dict(valor=nombres[codigo] if codigo >= 0 else None, **self._resumir(trozo)))
+        grupos.sort(key=lambda grupo: grupo["n"], reverse=True)
+        return {"grupos": grupos}
@@ -0,0 +1,219 @@
+# models/replica.py
+import os
+import time
+import bisect
+import threading
+from datetime import datetime
+
+
+class ReplicaUsuarios:
+    """Copia completa de users en la memoria de cada worker (REPLICA_MEMORIA=true)
+
+    Las filas se guardan como tuplas indexadas por id, con índices por email,
+    ciudad y activo, y una lista ordenada de ids para paginar. Un hilo la
+    mantiene al día recorriendo el flujo de cambios por marca de agua
+    (obtener_cambios_desde). Si la última sincronización supera
+    'max_antiguedad' segundos, vigente() es False y UserModel vuelve a leer
+    de PostgreSQL: la antigüedad de lo servido desde memoria está acotada.
+    Las escrituras del propio worker se aplican al confirmarse (UserModel);
+    las de otros workers llegan en la siguiente sincronización, así que
+    durante ventana_escritura segundos quien escribe lee de PostgreSQL
+    (LeerTusEscrituras).
+    """
+
+    COLUMNAS = ('id', 'nombre', 'apellido', 'email', 'edad', 'telefono', 'ciudad',
+                'activo', 'fecha_registro', 'fecha_actualizacion', 'genero',
+                'profesion', 'salario')
+    POSICION = {columna: i for i, columna in enumerate(COLUMNAS)}
+
+    # Mismos filtros que UserModel.FILTROS_USUARIO (NULL nunca coincide, como en SQL)
+    FILTROS = {
+        'ciudad': lambda fila, valor: fila[6] == valor,
+        'profesion': lambda fila, valor: fila[11] == valor,
+        'genero': lambda fila, valor: fila[10] == valor,
+        'activo': lambda fila, valor: fila[7] == valor,
+        'edad_min': lambda fila, valor: fila[4] is not None and fila[4] >= valor,
+        'edad_max': lambda fila, valor: fila[4] is not None and fila[4] <= valor,
+    }
+
+    # Por encima de estos cambios en un lote se reordena la lista de ids de una vez
+    UMBRAL_REORDENAR = 1000
+
+    def __init__(self, modelo, intervalo=None, max_antiguedad=None, tamano_pagina=None, margen_segundos=None):
+        self.modelo = modelo
+        self.intervalo = intervalo if intervalo is not None else float(os.getenv('REPLICA_INTERVALO', '1'))
+        self.max_antiguedad = max_antiguedad if max_antiguedad is not None else float(os.getenv('REPLICA_MAX_ANTIGUEDAD', '15'))
+        self.tamano_pagina = tamano_pagina or int(os.getenv('REPLICA_PAGINA', '10000'))
+        self.margen = margen_segundos if margen_segundos is not None else int(os.getenv('SINCRONIZACION_MARGEN_SEGUNDOS', '5'))
+        self.filas = {}
+        self.ids = []
+        self.por_email = {}
+        self.por_ciudad = {}
+        self.por_activo = {}
+        self.marca = (datetime.min, 0)
+        self._sincronizado = None
+        self._cerrojo = threading.RLock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def _indexar(self, fila):
+        self.por_email[fila[3]] = fila[0]
+        self.por_ciudad.setdefault(fila[6], set()).add(fila[0])
+        self.por_activo.setdefault(fila[7], set()).add(fila[0])
+
+    def _desindexar(self, fila):
+        if self.por_email.get(fila[3]) == fila[0]:
+            del self.por_email[fila[3]]
+        self.por_ciudad.get(fila[6], set()).discard(fila[0])
+        self.por_activo.get(fila[7], set()).discard(fila[0])
+
+    def aplicar(self, cambios, eliminados):
+        """Aplicar una página del flujo de cambios (filas completas e ids eliminados)"""
+        with self._cerrojo:
+            altas, bajas = [], []
+            for usuario in cambios:
+                fila = tuple(usuario.get(columna) for columna in self.COLUMNAS)
+                anterior = self.filas.get(fila[0])
+                # Una escritura local ya aplicada es más nueva que la página
+                # que el hilo de sincronización leyó antes de ella
+                if anterior and (anterior[9] or '') > (fila[9] or ''):
+                    continue
+                if anterior:
+                    self._desindexar(anterior)
+                else:
+                    altas.append(fila[0])
+                self.filas[fila[0]] = fila
+                self._indexar(fila)
+            for usuario_id in eliminados:
+                anterior = self.filas.pop(usuario_id, None)
+                if anterior:
+                    self._desindexar(anterior)
+                    bajas.append(usuario_id)
+
+            if len(altas) + len(bajas) > self.UMBRAL_REORDENAR:
+                self.ids = sorted(self.filas)
+            else:
+                for usuario_id in altas:
+                    bisect.insort(self.ids, usuario_id)
+                for usuario_id in bajas:
+                    del self.ids[bisect.bisect_left(self.ids, usuario_id)]
+
+    def sincronizar(self):
+        """Recorrer el flujo de cambios desde la marca de agua hasta alcanzarlo"""
+        while True:
+            resultado = self.modelo.obtener_cambios_desde(
+                *self.marca, self.tamano_pagina, margen_segundos=self.margen)
+            self.aplicar(resultado['cambios'], [e['id'] for e in resultado['eliminados']])
+            self.marca = resultado['marca_agua']
+            if not resultado['hay_mas']:
+                break
+        self._sincronizado = time.monotonic()
+
+    def vigente(self):
+        """True si la copia está cargada y sincronizada hace menos de max_antiguedad"""
+        return self._sincronizado is not None and time.monotonic() - self._sincronizado <= self.max_antiguedad
+
+    @property
+    def ventana_escritura(self):
+        """Segundos tras una escritura en que el cliente no lee de la memoria
+
+        Una copia vigente se sincronizó hace como mucho max_antiguedad
+        segundos y el flujo de cambios retiene 'margen' segundos las filas
+        recientes: pasado ese tiempo cualquier worker tiene la escritura.
+        """
+        return self.max_antiguedad + self.margen
+
+    def invalidar(self):
+        """Dejar de servir lecturas hasta la próxima sincronización completa"""
+        self._sincronizado = None
+
+    def iniciar(self):
+        """Arrancar el hilo de sincronización si no está en marcha"""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name='replica-usuarios', daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout=5)
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                cargada = self._sincronizado is not None
+                self.sincronizar()
+                if not cargada:
+                    print(f"🧠 Réplica en memoria cargada: {len(self.filas)} usuarios")
+            except Exception as e:
+                print(f"❌ Error sincronizando la réplica en memoria: {e}")
+            self._detener.wait(self.intervalo)
+
+    def estado(self):
+        """Resumen para /listo"""
+        return {
+            "usuarios": len(self.filas),
+            "vigente": self.vigente(),
+            "segundos_desde_sincronizacion": round(time.monotonic() - self._sincronizado, 1)
+                                             if self._sincronizado is not None else None,
+            "marca_agua": None if self.marca[0] == datetime.min else self.marca[0].isoformat(),
+        }
+
+    # ===== LECTURAS =====
+
+    def _usuario(self, fila):
+        return dict(zip(self.COLUMNAS, fila))
+
+    def obtener_por_id(self, usuario_id):
+        fila = self.filas.get(usuario_id)
+        return self._usuario(fila) if fila else None
+
+    def obtener_por_email(self, email):
+        with self._cerrojo:
+            usuario_id = self.por_email.get(email)
+            return self.obtener_por_id(usuario_id) if usuario_id is not None else None
+
+    def obtener_todos(self):
+        with self._cerrojo:
+            return [self._usuario(self.filas[i]) for i in self.ids]
+
+    def _ids_filtrados(self, filtros):
+        """Ids ordenados que cumplen los filtros, empezando por los índices secundarios"""
+        candidatos = None
+        for nombre, indice in (('ciudad', self.por_ciudad), ('activo', self.por_activo)):
+            if nombre in filtros:
+                conjunto = indice.get(filtros[nombre], set())
+                candidatos = set(conjunto) if candidatos is None else candidatos & conjunto
+        ids = sorted(candidatos) if candidatos is not None else self.ids
+
+        resto = [(self.FILTROS[nombre], valor) for nombre, valor in filtros.items()
+                 if nombre not in ('ciudad', 'activo')]
+        if not resto:
+            return ids
+        return [i for i in ids if all(cumple(self.filas[i], valor) for cumple, valor in resto)]
+
+    def obtener_paginados(self, pagina, limite, filtros=None):
+        """Misma respuesta que UserModel.obtener_paginados, calculada en memoria"""
+        for nombre in (filtros or {}):
+            if nombre not in self.FILTROS:
+                raise ValueError(f"Filtro no soportado: {nombre}")
+        with self._cerrojo:
+            ids = self._ids_filtrados(filtros) if filtros else self.ids
+            offset = (pagina - 1) * limite
+            usuarios = [self._usuario(self.filas[i]) for i in ids[offset:offset + limite]]
+            total_usuarios = len(ids)
+
+        total_paginas = (total_usuarios + limite - 1) // limite
+        return {
+            "usuarios": usuarios,
+            "paginacion": {
+                "pagina_actual": pagina,
+                "limite": limite,
+                "total_usuarios": total_usuarios,
+                "total_paginas": total_paginas,
+                "tiene_siguiente": pagina < total_paginas,
+                "tiene_anterior": pagina > 1
+            }
+        }
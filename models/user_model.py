@@ -1,30 +1,223 @@
 # models/user_model.py
+import os
+import json
+import heapq
 import psycopg2
 import psycopg2.extras
+from itertools import islice
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 from database.connection import DatabaseConnection
+from database.replicas import EnrutadorReplicas, lectura_en_primaria
+from models.indice_busqueda import IndiceBusqueda
+from models.filtro_emails import FiltroEmails
 
 class UserModel:
     """Modelo para operaciones CRUD de usuarios"""
     
+    # Columnas devueltas al cliente (notas queda fuera de las respuestas)
+    COLUMNAS_USUARIO = '''id, nombre, apellido, email, edad, telefono, ciudad,
+                          activo, fecha_registro, fecha_actualizacion, genero,
+                          profesion, salario'''
+    
+    # Columnas que se mueven entre users y users_archivo (incluye notas)
+    COLUMNAS_ARCHIVO = COLUMNAS_USUARIO + ', notas'
+    
+    # Columnas mínimas para 'Prefer: return=minimal' (id y versión para el ETag)
+    COLUMNAS_MINIMAS = 'id, fecha_registro, fecha_actualizacion'
+    
+    CAMPOS_ACTUALIZABLES = ['nombre', 'apellido', 'email', 'edad', 'telefono', 
+                            'ciudad', 'genero', 'profesion', 'salario', 'notas', 'activo']
+    
+    # Filtros del listado (parámetro -> condición), compartidos con la mutación por filtro
+    FILTROS_USUARIO = {
+        'ciudad': 'ciudad = %s',
+        'profesion': 'profesion = %s',
+        'genero': 'genero = %s',
+        'activo': 'activo = %s',
+        'edad_min': 'edad >= %s',
+        'edad_max': 'edad <= %s',
+    }
+    
+    # Campos modificables por filtro y operaciones permitidas sobre cada uno
+    MUTACIONES_POR_FILTRO = {
+        'activo': ('asignar',),
+        'ciudad': ('asignar',),
+        'profesion': ('asignar',),
+        'salario': ('asignar', 'multiplicar', 'sumar'),
+    }
+    
+    # Expresión del nuevo valor según la operación
+    OPERACIONES = {
+        'asignar': '%s',
+        'multiplicar': '{campo} * %s',
+        'sumar': '{campo} + %s',
+    }
+    
+    # Total de filas estimado desde el catálogo, sin recorrer la tabla: densidad
+    # del último ANALYZE por páginas actuales (COUNT solo si nunca se analizó).
+    # Con users particionada el padre no tiene páginas y su reltuples no se
+    # actualiza: se suma la estimación de cada partición (pg_inherits)
+    SQL_TOTAL_ESTIMADO = '''
+        SELECT CASE
+                   WHEN bool_or(c.reltuples < 0) THEN (SELECT COUNT(*) FROM users)
+                   ELSE COALESCE(SUM(CASE
+                       WHEN c.relpages = 0 THEN c.reltuples
+                       ELSE c.reltuples / c.relpages
+                            * (pg_relation_size(c.oid) / current_setting('block_size')::int)
+                   END), 0)::bigint
+               END
+        FROM pg_class c
+        WHERE (c.oid = 'users'::regclass AND c.relkind <> 'p')
+           OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = 'users'::regclass)
+    '''
+    
+    # Búsqueda sin extensiones (unaccent/pg_trgm): minúsculas y tildes
+    # quitadas con translate, y palabras separadas por espacios
+    SQL_TEXTO_NORMALIZADO = '''
+        ' ' || regexp_replace(translate(lower(coalesce({campo}, '')),
+                                        'áàäâãéèëêíìïîóòöôõúùüûñç', 'aaaaaeeeeiiiiooooouuuunc'),
+                              '\\W+', ' ', 'g')
+    '''
+    
+    # Dimensiones de la vista materializada usuarios_estadisticas
+    DIMENSIONES_ESTADISTICAS = ('total', 'ciudad', 'profesion', 'genero', 'activo', 'edad')
+    
+    # Granularidades de las series de altas (argumento de date_trunc)
+    PERIODOS_ALTAS = {'dia': 'day', 'semana': 'week', 'mes': 'month', 'anio': 'year'}
+    
+    # Con DB_SHARDS, segundos tras su última escritura durante los que un
+    # email no se liga a otro shard (migración 008)
+    DIRECTORIO_GRACIA_SEGUNDOS = 60
+    
+    # Réplica en memoria, índice de búsqueda y filtro de emails opcionales; los asigna el controlador
+    replica = None
+    indice_busqueda = None
+    filtro_emails = None
+    
     def __init__(self):
         self.db = DatabaseConnection()
+        # users particionada por hash de id (scripts/particionar_usuarios.py): sin
+        # índice único sobre email, el upsert resuelve los emails con users_emails
+        self.particionada = os.getenv('USERS_PARTICIONADA', 'false').lower() == 'true'
+        # Archivo en frío (migración 007, scripts/archivar_usuarios.py): solo con
+        # ARCHIVO_USUARIOS=true las lecturas y bajas por id miran users_archivo
+        self.archivo = os.getenv('ARCHIVO_USUARIOS', 'false').lower() == 'true'
+        # Registro global de emails (database/migraciones/opcionales): solo lo
+        # aplican el particionado y la preparación de shards
+        self.registro_emails = self.particionada or bool(self.db.shards)
+        # Con shards (DB_SHARDS) las lecturas de listado se piden a todos a la vez
+        self._pool_shards = (ThreadPoolExecutor(max_workers=self.db.numero_shards, thread_name_prefix='shards')
+                             if self.db.shards else None)
+        # Réplicas de lectura (DB_REPLICAS) de la base única; con shards no se usan
+        self.lecturas = EnrutadorReplicas(self.db) if self.db.replicas and not self.db.shards else None
+    
+    def _conexion_lectura(self, shard=0):
+        """Conexión para una lectura: réplica elegida por el enrutador o la base del shard"""
+        if self.lecturas is not None:
+            return self.lecturas.obtener_conexion()
+        return self.db.obtener_conexion_shard(shard)
+    
+    def _dispersar(self, consulta, parametros, shards=None, primaria=False):
+        """Ejecutar una lectura en varios shards en paralelo (o en una réplica): lista de filas por shard
+        
+        primaria=True lee siempre de la base de cada shard (marcas de agua y
+        recuentos previos a una escritura no pueden ir por detrás).
+        """
+        def en_shard(shard):
+            conn = self.db.obtener_conexion_shard(shard) if primaria else self._conexion_lectura(shard)
+            if not conn:
+                raise Exception("Error de conexión a la base de datos")
+            try:
+                cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+                cursor.execute(consulta, parametros(shard) if callable(parametros) else parametros)
+                return [dict(fila) for fila in cursor.fetchall()]
+            finally:
+                conn.close()
+        
+        shards = list(range(self.db.numero_shards)) if shards is None else list(shards)
+        if self._pool_shards is None or len(shards) == 1:
+            return [en_shard(shard) for shard in shards]
+        return list(self._pool_shards.map(en_shard, shards))
+    
+    def _replica_vigente(self):
+        """Réplica en memoria si está activada, dentro de su antigüedad máxima y
+        el contexto no pide leer de la primaria (lee tus escrituras)"""
+        replica = self.replica
+        if replica is None or lectura_en_primaria():
+            return None
+        return replica if replica.vigente() else None
+    
+    def _indexar(self, usuario_id, datos):
+        """Reflejar en el índice de búsqueda y el filtro de emails (si están activos) los campos escritos"""
+        if self.indice_busqueda is not None:
+            self.indice_busqueda.actualizar(usuario_id, datos)
+        if self.filtro_emails is not None and datos.get('email'):
+            self.filtro_emails.anadir(datos['email'])
+    
+    def _desindexar(self, ids):
+        if self.indice_busqueda is not None:
+            for usuario_id in ids:
+                self.indice_busqueda.eliminar(usuario_id)
+    
+    def _reflejar(self, ids, usuarios=None):
+        """Aplicar a la réplica en memoria (si está activa) las escrituras
+        confirmadas por este worker: las filas completas si la escritura las
+        devolvió y, si no, releídas de la base de los ids tocados. Los ids que
+        ya no están en users se quitan. Si no se pueden releer, la réplica deja
+        de servir lecturas hasta su próxima sincronización."""
+        replica = self.replica
+        ids = list(ids)
+        if replica is None or not ids:
+            return
+        if usuarios is None:
+            try:
+                usuarios = self._leer_filas(ids)
+            except Exception as e:
+                print(f"⚠️  Réplica en memoria invalidada: {e}")
+                replica.invalidar()
+                return
+        encontrados = {usuario['id'] for usuario in usuarios}
+        replica.aplicar(usuarios, [usuario_id for usuario_id in ids if usuario_id not in encontrados])
+    
+    def _leer_filas(self, ids):
+        """Filas completas de users en la primaria de cada shard (fechas en ISO)"""
+        por_shard = {}
+        for usuario_id in ids:
+            por_shard.setdefault(self.db.shard_de_id(usuario_id), []).append(usuario_id)
+        
+        usuarios = []
+        for shard, ids_shard in por_shard.items():
+            conn = self.db.obtener_conexion_shard(shard)
+            if not conn:
+                raise Exception("Error de conexión a la base de datos")
+            try:
+                cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+                cursor.execute(f'SELECT {self.COLUMNAS_USUARIO} FROM users WHERE id = ANY(%s)', (ids_shard,))
+                usuarios.extend(dict(fila) for fila in cursor.fetchall())
+            finally:
+                conn.close()
+        for usuario in usuarios:
+            for campo in ('fecha_registro', 'fecha_actualizacion'):
+                if usuario[campo]:
+                    usuario[campo] = usuario[campo].isoformat()
+        return usuarios
     
     def obtener_todos(self):
         """Obtener todos los usuarios"""
-        conn = self.db.obtener_conexion()
-        if not conn:
-            raise Exception("Error de conexión a la base de datos")
+        replica = self._replica_vigente()
+        if replica:
+            return replica.obtener_todos()
         
         try:
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            cursor.execute('''
+            # Cada shard devuelve sus filas ordenadas: mezcla de k listas por id
+            usuarios = list(heapq.merge(*self._dispersar('''
                 SELECT id, nombre, apellido, email, edad, telefono, ciudad, 
                        activo, fecha_registro, fecha_actualizacion, genero, 
                        profesion, salario
                 FROM users 
                 ORDER BY id
-            ''')
-            usuarios = [dict(row) for row in cursor.fetchall()]
+            ''', ()), key=itemgetter('id')))
             
             # Convertir timestamps a string para JSON
             for usuario in usuarios:
@@ -33,35 +226,45 @@ class UserModel:
                 if usuario['fecha_actualizacion']:
                     usuario['fecha_actualizacion'] = usuario['fecha_actualizacion'].isoformat()
             
-            conn.close()
             return usuarios
             
         except psycopg2.Error as e:
             print(f"❌ Error obteniendo usuarios: {e}")
-            if conn:
-                conn.close()
             raise Exception("Error al obtener usuarios")
     
     def obtener_por_id(self, usuario_id):
-        """Obtener un usuario por ID"""
-        conn = self.db.obtener_conexion()
+        """Obtener un usuario por ID (con el archivo activo, si no está en users se busca en users_archivo)"""
+        replica = self._replica_vigente()
+        if replica:
+            usuario = replica.obtener_por_id(usuario_id)
+            if usuario:
+                return usuario
+        
+        conn = self._conexion_lectura(self.db.shard_de_id(usuario_id))
         if not conn:
             raise Exception("Error de conexión a la base de datos")
         
         try:
             cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            cursor.execute(
-                '''SELECT id, nombre, apellido, email, edad, telefono, ciudad, 
-                          activo, fecha_registro, fecha_actualizacion, genero, 
-                          profesion, salario
-                   FROM users WHERE id = %s''',
-                (usuario_id,)
-            )
+            if self.archivo:
+                # Una sola sentencia: con LIMIT 1 el archivo solo se consulta si falla users
+                cursor.execute(
+                    f'''(SELECT {self.COLUMNAS_USUARIO}, NULL::timestamp AS archivado FROM users WHERE id = %s)
+                        UNION ALL
+                        (SELECT {self.COLUMNAS_USUARIO}, archivado FROM users_archivo WHERE id = %s)
+                        LIMIT 1''',
+                    (usuario_id, usuario_id)
+                )
+            else:
+                cursor.execute(f'SELECT {self.COLUMNAS_USUARIO} FROM users WHERE id = %s', (usuario_id,))
             usuario = cursor.fetchone()
             conn.close()
             
             if usuario:
                 usuario = dict(usuario)
+                archivado = usuario.pop('archivado', None)
+                if archivado:
+                    usuario['archivado'] = archivado.isoformat()
                 # Convertir timestamps a string
                 if usuario['fecha_registro']:
                     usuario['fecha_registro'] = usuario['fecha_registro'].isoformat()
@@ -77,21 +280,218 @@ class UserModel:
                 conn.close()
             raise Exception("Error al obtener usuario")
     
-    def crear(self, datos):
-        """Crear nuevo usuario"""
+    def _existe_fila(self, consulta, parametros, shard=0):
+        """SELECT 1 por un índice único, sin leer la fila"""
+        conn = self.db.obtener_conexion_shard(shard)
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        
+        try:
+            cursor = conn.cursor()
+            cursor.execute(consulta, parametros)
+            existe = cursor.fetchone() is not None
+            conn.close()
+            return existe
+        except psycopg2.Error as e:
+            print(f"❌ Error comprobando existencia: {e}")
+            if conn:
+                conn.close()
+            raise Exception("Error al comprobar la existencia")
+    
+    def _ligar_emails(self, shards_por_email, fijo=False):
+        """Shard de cada email según directorio_emails (base DB_*), con DB_SHARDS
+        
+        'shards_por_email' propone un shard por email: los emails nuevos se
+        ligan a él y los ya ligados renuevan su reserva. Sin 'fijo' (altas y
+        upsert) se devuelve el shard ligado aunque sea otro. Con 'fijo' (un
+        cambio de email, el usuario no cambia de shard) un email ligado a otro
+        shard solo se vuelve a ligar si ese shard ya no lo tiene y nadie lo ha
+        escrito en DIRECTORIO_GRACIA_SEGUNDOS; si no, ValueError.
+        """
+        if not self.db.shards or not shards_por_email:
+            return dict(shards_por_email)
+        
+        emails = list(shards_por_email)
         conn = self.db.obtener_conexion()
         if not conn:
             raise Exception("Error de conexión a la base de datos")
         
+        try:
+            cursor = conn.cursor()
+            # En conflicto, DO UPDATE devuelve la fila ligada (también si la
+            # confirmó otra sesión después de empezar esta sentencia)
+            condicion = 'WHERE directorio_emails.shard = EXCLUDED.shard' if fijo else ''
+            cursor.execute(f'''
+                WITH ligados AS (
+                    INSERT INTO directorio_emails (email, shard)
+                    SELECT * FROM unnest(%s::text[], %s::int[])
+                    ON CONFLICT (email) DO UPDATE SET reservado = now() {condicion}
+                    RETURNING email, shard
+                )
+                SELECT email, shard FROM ligados
+                UNION ALL
+                SELECT email, shard FROM directorio_emails
+                WHERE email = ANY(%s) AND email NOT IN (SELECT email FROM ligados)
+            ''', (emails, [shards_por_email[email] for email in emails], emails))
+            ligados = dict(cursor.fetchall())
+            conn.commit()
+            
+            if fijo:
+                for email in emails:
+                    propuesto, actual = shards_por_email[email], ligados.get(email)
+                    if actual == propuesto:
+                        continue
+                    # Sin fila visible: otra sesión acaba de ligarlo
+                    if actual is None or self._existe_fila(
+                            'SELECT 1 FROM users_emails WHERE email = %s', (email,), actual):
+                        raise ValueError("El email ya existe")
+                    cursor.execute('''
+                        UPDATE directorio_emails SET shard = %s, reservado = now()
+                        WHERE email = %s AND shard = %s
+                          AND reservado < now() - make_interval(secs => %s)
+                    ''', (propuesto, email, actual, self.DIRECTORIO_GRACIA_SEGUNDOS))
+                    conn.commit()
+                    if cursor.rowcount != 1:
+                        raise ValueError("El email ya existe")
+                    ligados[email] = propuesto
+            return ligados
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error en el directorio de emails: {e}")
+            conn.rollback()
+            raise Exception("Error al reservar el email")
+        finally:
+            conn.close()
+    
+    def _shard_ligado(self, email):
+        """Shard ligado al email en directorio_emails, o None si nunca se ligó"""
+        conn = self.db.obtener_conexion()
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT shard FROM directorio_emails WHERE email = %s', (email,))
+            fila = cursor.fetchone()
+            conn.close()
+            return fila[0] if fila else None
+        except psycopg2.Error as e:
+            print(f"❌ Error en el directorio de emails: {e}")
+            if conn:
+                conn.close()
+            raise Exception("Error al comprobar la existencia")
+    
+    def existe(self, usuario_id):
+        """True si existe un usuario con ese id, archivado o no (HEAD /usuarios/<id>)
+        
+        Siempre con SELECT 1: la réplica en memoria no ve las bajas de otros
+        workers hasta su siguiente sincronización, y un acierto suyo habría que
+        confirmarlo igualmente.
+        """
+        shard = self.db.shard_de_id(usuario_id)
+        if not self.archivo:
+            return self._existe_fila('SELECT 1 FROM users WHERE id = %s', (usuario_id,), shard)
+        return self._existe_fila(
+            '(SELECT 1 FROM users WHERE id = %s) UNION ALL '
+            '(SELECT 1 FROM users_archivo WHERE id = %s) LIMIT 1', (usuario_id, usuario_id), shard)
+    
+    def sql_emails(self):
+        """SELECT de todos los emails ocupados (carga del filtro de Bloom)"""
+        if self.registro_emails:
+            return 'SELECT email FROM users_emails'
+        consulta = 'SELECT email FROM users WHERE email IS NOT NULL'
+        if self.archivo:
+            consulta += ' UNION ALL SELECT email FROM users_archivo WHERE email IS NOT NULL'
+        return consulta
+    
+    def email_disponible(self, email):
+        """(disponible, fuente): el filtro de Bloom descarta sin consultar los
+        emails que seguro no están; el resto se confirma con SELECT 1"""
+        if self.filtro_emails is not None and not self.filtro_emails.puede_contener(email):
+            return True, 'filtro'
+        replica = self._replica_vigente()
+        # La réplica no contiene los archivados: solo sirve para confirmar que está ocupado
+        if replica and email in replica.por_email:
+            return False, 'replica'
+        # users_emails cubre users y users_archivo con un único índice; sin
+        # registro, el índice único de cada tabla. Con shards solo se mira el
+        # shard ligado en directorio_emails
+        if self.registro_emails:
+            consulta, parametros = 'SELECT 1 FROM users_emails WHERE email = %s', (email,)
+        elif self.archivo:
+            consulta, parametros = ('(SELECT 1 FROM users WHERE email = %s) UNION ALL '
+                                    '(SELECT 1 FROM users_archivo WHERE email = %s) LIMIT 1', (email, email))
+        else:
+            consulta, parametros = 'SELECT 1 FROM users WHERE email = %s', (email,)
+        shard = self._shard_ligado(email) if self.db.shards else 0
+        if shard is None or not self._existe_fila(consulta, parametros, shard):
+            return True, 'postgresql'
+        return False, 'postgresql'
+    
+    def restaurar(self, usuario_id):
+        """Devolver un usuario de users_archivo a users en una sola sentencia
+        
+        Con usuarios.archivo = 'on' la outbox y las altas no lo registran;
+        se borra su lápida para que los clientes de cambios-desde lo reciban
+        como un cambio (el trigger renueva fecha_actualizacion).
+        """
+        conn = self.db.obtener_conexion_por_id(usuario_id)
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        
+        try:
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cursor.execute(f'''
+                SET LOCAL usuarios.archivo = 'on';
+                WITH movido AS (
+                    DELETE FROM users_archivo WHERE id = %s RETURNING {self.COLUMNAS_ARCHIVO}
+                ), lapida AS (
+                    DELETE FROM users_eliminados WHERE id IN (SELECT id FROM movido)
+                )
+                INSERT INTO users ({self.COLUMNAS_ARCHIVO})
+                SELECT {self.COLUMNAS_ARCHIVO} FROM movido
+                RETURNING {self.COLUMNAS_USUARIO}
+            ''', (usuario_id,))
+            usuario = cursor.fetchone()
+            conn.commit()
+            conn.close()
+            
+            if not usuario:
+                return None
+            usuario = dict(usuario)
+            self._indexar(usuario['id'], usuario)
+            for campo in ('fecha_registro', 'fecha_actualizacion'):
+                if usuario[campo]:
+                    usuario[campo] = usuario[campo].isoformat()
+            self._reflejar([usuario['id']], [usuario])
+            print(f"♻️ Usuario {usuario_id} restaurado del archivo")
+            return usuario
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error restaurando usuario: {e}")
+            if conn:
+                conn.rollback()
+                conn.close()
+            raise Exception("Error al restaurar usuario")
+    
+    def crear(self, datos, minimo=False):
+        """Crear nuevo usuario (minimo=True devuelve solo id y fechas)"""
+        email = datos.get('email')
+        shard = self.db.shard_de_email(email)
+        if email:
+            shard = self._ligar_emails({email: shard})[email]
+        conn = self.db.obtener_conexion_shard(shard)
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        
         try:
             cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            columnas = self.COLUMNAS_MINIMAS if minimo else self.COLUMNAS_USUARIO
             cursor.execute(
-                '''INSERT INTO users (nombre, apellido, email, edad, telefono, ciudad, 
-                                      genero, profesion, salario, notas) 
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) 
-                   RETURNING id, nombre, apellido, email, edad, telefono, ciudad, 
-                             activo, fecha_registro, fecha_actualizacion, genero, 
-                             profesion, salario''',
+                f'''INSERT INTO users (nombre, apellido, email, edad, telefono, ciudad, 
+                                       genero, profesion, salario, notas) 
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) 
+                    RETURNING {columnas}''',
                 (datos.get('nombre'),
                  datos.get('apellido'),
                  datos.get('email'),
@@ -104,14 +504,21 @@ class UserModel:
                  datos.get('notas'))
             )
             nuevo_usuario = dict(cursor.fetchone())
+            if self.db.shard_de_id(nuevo_usuario['id']) != shard:
+                # Secuencia sin preparar: el id no se podría volver a encontrar
+                conn.rollback()
+                conn.close()
+                raise Exception(f"La secuencia de ids del shard {shard} no está preparada (scripts/preparar_shards.py)")
             conn.commit()
             conn.close()
+            self._indexar(nuevo_usuario['id'], datos)
             
             # Convertir timestamps a string
             if nuevo_usuario['fecha_registro']:
                 nuevo_usuario['fecha_registro'] = nuevo_usuario['fecha_registro'].isoformat()
             if nuevo_usuario['fecha_actualizacion']:
                 nuevo_usuario['fecha_actualizacion'] = nuevo_usuario['fecha_actualizacion'].isoformat()
+            self._reflejar([nuevo_usuario['id']], None if minimo else [nuevo_usuario])
             
             print(f"✅ Usuario creado en PostgreSQL: {nuevo_usuario}")
             return nuevo_usuario
@@ -126,61 +533,98 @@ class UserModel:
                 conn.close()
             raise Exception("Error al crear usuario")
     
-    def actualizar(self, usuario_id, datos):
+    def _actualizar_si_cambia(self, cursor, usuario_id, datos, minimo=False):
+        """Ejecutar un UPDATE que solo reescribe la fila si algún valor cambia
+        
+        Devuelve la fila resultante con la lista 'campos_modificados', o None
+        si el usuario no existe. Si nada cambia no se escribe tupla ni WAL y
+        el trigger de fecha_actualizacion no se dispara.
+        """
+        campos = [campo for campo in self.CAMPOS_ACTUALIZABLES if campo in datos]
+        valores = [datos[campo] for campo in campos]
+        columnas = self.COLUMNAS_MINIMAS if minimo else self.COLUMNAS_USUARIO
+        
+        asignaciones = ', '.join(f'{campo} = %s' for campo in campos)
+        guarda = ' OR '.join(f'u.{campo} IS DISTINCT FROM %s' for campo in campos)
+        diferencias = ', '.join(
+            f"CASE WHEN a.{campo} IS DISTINCT FROM u.{campo} THEN '{campo}' END"
+            for campo in campos
+        )
+        
+        # La CTE 'actual' conserva la fila previa: sirve para distinguir
+        # "no existe" de "sin cambios" y para calcular qué campos cambiaron
+        consulta = f'''
+            WITH actual AS (
+                SELECT * FROM users WHERE id = %s
+            ), cambiado AS (
+                UPDATE users u
+                SET {asignaciones}
+                FROM actual a
+                WHERE u.id = a.id AND ({guarda})
+                RETURNING u.*, ARRAY_REMOVE(ARRAY[{diferencias}], NULL) AS campos_modificados
+            )
+            SELECT {columnas}, campos_modificados FROM cambiado
+            UNION ALL
+            SELECT {columnas}, ARRAY[]::text[] FROM actual
+            WHERE NOT EXISTS (SELECT 1 FROM cambiado)
+        '''
+        
+        cursor.execute(consulta, [usuario_id] + valores + valores)
+        fila = cursor.fetchone()
+        if not fila:
+            return None
+        
+        usuario = dict(fila)
+        # Convertir timestamps a string
+        if usuario['fecha_registro']:
+            usuario['fecha_registro'] = usuario['fecha_registro'].isoformat()
+        if usuario['fecha_actualizacion']:
+            usuario['fecha_actualizacion'] = usuario['fecha_actualizacion'].isoformat()
+        return usuario
+    
+    def _esta_archivado(self, cursor, usuario_id):
+        """True si el id está en users_archivo (solo se consulta cuando el UPDATE no encontró la fila)"""
+        if not self.archivo:
+            return False
+        cursor.execute('SELECT 1 FROM users_archivo WHERE id = %s', (usuario_id,))
+        return cursor.fetchone() is not None
+    
+    def actualizar(self, usuario_id, datos, minimo=False):
         """Actualizar usuario completo (PUT)"""
-        conn = self.db.obtener_conexion()
+        if not any(campo in datos for campo in self.CAMPOS_ACTUALIZABLES):
+            raise ValueError("No hay campos válidos para actualizar")
+        if datos.get('email'):
+            self._ligar_emails({datos['email']: self.db.shard_de_id(usuario_id)}, fijo=True)
+        
+        conn = self.db.obtener_conexion_por_id(usuario_id)
         if not conn:
             raise Exception("Error de conexión a la base de datos")
         
         try:
             cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
             
-            # Construir la consulta dinámicamente
-            campos = []
-            valores = []
-            
-            campos_permitidos = ['nombre', 'apellido', 'email', 'edad', 'telefono', 
-                               'ciudad', 'genero', 'profesion', 'salario', 'notas', 'activo']
-            
-            for campo in campos_permitidos:
-                if campo in datos:
-                    campos.append(f'{campo} = %s')
-                    valores.append(datos[campo])
-            
-            if not campos:
-                raise ValueError("No hay campos válidos para actualizar")
-            
-            # Agregar timestamp de actualización automático (manejado por trigger)
-            valores.append(usuario_id)
-            
-            consulta = f'''
-                UPDATE users 
-                SET {', '.join(campos)} 
-                WHERE id = %s 
-                RETURNING id, nombre, apellido, email, edad, telefono, ciudad,
-                          activo, fecha_registro, fecha_actualizacion, genero,
-                          profesion, salario
-            '''
-            
-            cursor.execute(consulta, valores)
-            usuario_actualizado = cursor.fetchone()
+            # El trigger actualiza fecha_actualizacion solo si la fila cambia
+            usuario_actualizado = self._actualizar_si_cambia(cursor, usuario_id, datos, minimo)
             
             if not usuario_actualizado:
+                archivado = self._esta_archivado(cursor, usuario_id)
                 conn.close()
+                if archivado:
+                    raise ValueError(f"Usuario archivado: restáuralo con POST /usuarios/{usuario_id}/restaurar")
                 raise ValueError("Usuario no encontrado")
             
             conn.commit()
             conn.close()
+            self._indexar(usuario_id, datos)
             
-            usuario_actualizado = dict(usuario_actualizado)
-            # Convertir timestamps a string
-            if usuario_actualizado['fecha_registro']:
-                usuario_actualizado['fecha_registro'] = usuario_actualizado['fecha_registro'].isoformat()
-            if usuario_actualizado['fecha_actualizacion']:
-                usuario_actualizado['fecha_actualizacion'] = usuario_actualizado['fecha_actualizacion'].isoformat()
-            
+            campos_modificados = usuario_actualizado.pop('campos_modificados')
+            if campos_modificados:
+                self._reflejar([usuario_id], None if minimo else [usuario_actualizado])
             print(f"✅ Usuario actualizado en PostgreSQL: {usuario_actualizado}")
-            return usuario_actualizado
+            return {
+                "usuario": usuario_actualizado,
+                "campos_modificados": campos_modificados
+            }
             
         except psycopg2.IntegrityError:
             if conn:
@@ -192,70 +636,53 @@ class UserModel:
                 conn.close()
             raise Exception("Error al actualizar usuario")
     
-    def actualizar_parcial(self, usuario_id, datos):
+    def actualizar_parcial(self, usuario_id, datos, minimo=False):
         """Actualizar usuario parcial (PATCH)"""
-        conn = self.db.obtener_conexion()
+        # Solo procesar campos que están en el JSON enviado
+        campos_enviados = [campo for campo in self.CAMPOS_ACTUALIZABLES if campo in datos]
+        if not campos_enviados:
+            raise ValueError("No hay campos válidos para actualizar")
+        if datos.get('email'):
+            self._ligar_emails({datos['email']: self.db.shard_de_id(usuario_id)}, fijo=True)
+        
+        conn = self.db.obtener_conexion_por_id(usuario_id)
         if not conn:
             raise Exception("Error de conexión a la base de datos")
         
         try:
             cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
             
-            # Verificar que el usuario existe
-            cursor.execute('SELECT id FROM users WHERE id = %s', (usuario_id,))
-            if not cursor.fetchone():
+            # Una sola sentencia: si no hay fila devuelta, el usuario no existe
+            usuario_actualizado = self._actualizar_si_cambia(cursor, usuario_id, datos, minimo)
+            
+            if not usuario_actualizado:
+                archivado = self._esta_archivado(cursor, usuario_id)
                 conn.close()
+                if archivado:
+                    raise ValueError(f"Usuario archivado: restáuralo con POST /usuarios/{usuario_id}/restaurar")
                 raise ValueError("Usuario no encontrado")
             
-            # Construir la consulta dinámicamente solo con campos enviados
-            campos = []
-            valores = []
-            
-            campos_permitidos = ['nombre', 'apellido', 'email', 'edad', 'telefono', 
-                               'ciudad', 'genero', 'profesion', 'salario', 'notas', 'activo']
-            
-            # Solo procesar campos que están en el JSON enviado
-            for campo in campos_permitidos:
-                if campo in datos:
-                    campos.append(f'{campo} = %s')
-                    valores.append(datos[campo])
-            
-            if not campos:
-                raise ValueError("No hay campos válidos para actualizar")
-            
-            # El trigger automático maneja fecha_actualizacion
-            valores.append(usuario_id)
-            
-            consulta = f'''
-                UPDATE users 
-                SET {', '.join(campos)} 
-                WHERE id = %s 
-                RETURNING id, nombre, apellido, email, edad, telefono, ciudad,
-                          activo, fecha_registro, fecha_actualizacion, genero,
-                          profesion, salario
-            '''
-            
-            cursor.execute(consulta, valores)
-            usuario_actualizado = cursor.fetchone()
-            
             conn.commit()
             conn.close()
+            self._indexar(usuario_id, datos)
             
-            usuario_actualizado = dict(usuario_actualizado)
-            # Convertir timestamps a string
-            if usuario_actualizado['fecha_registro']:
-                usuario_actualizado['fecha_registro'] = usuario_actualizado['fecha_registro'].isoformat()
-            if usuario_actualizado['fecha_actualizacion']:
-                usuario_actualizado['fecha_actualizacion'] = usuario_actualizado['fecha_actualizacion'].isoformat()
-            
-            # Mostrar qué campos se actualizaron
-            campos_actualizados = [campo.split(' = ')[0] for campo in campos]
+            # Mostrar qué campos cambiaron realmente
+            campos_actualizados = usuario_actualizado.pop('campos_modificados')
+            if campos_actualizados:
+                self._reflejar([usuario_id], None if minimo else [usuario_actualizado])
+            campos_sin_cambios = [c for c in campos_enviados if c not in campos_actualizados]
             print(f"✅ Usuario {usuario_id} actualizado (PATCH): {campos_actualizados}")
             
+            if campos_actualizados:
+                mensaje = f"Actualización parcial exitosa de {len(campos_actualizados)} campo(s)"
+            else:
+                mensaje = "Sin cambios: los valores enviados coinciden con los almacenados"
+            
             return {
                 "usuario": usuario_actualizado,
                 "campos_actualizados": campos_actualizados,
-                "mensaje": f"Actualización parcial exitosa de {len(campos_actualizados)} campo(s)"
+                "campos_sin_cambios": campos_sin_cambios,
+                "mensaje": mensaje
             }
             
         except psycopg2.IntegrityError:
@@ -268,30 +695,40 @@ class UserModel:
                 conn.close()
             raise Exception("Error al actualizar usuario")
     
-    def eliminar(self, usuario_id):
-        """Eliminar usuario"""
-        conn = self.db.obtener_conexion()
+    def eliminar(self, usuario_id, minimo=False):
+        """Eliminar usuario (minimo=True no recupera el nombre)"""
+        conn = self.db.obtener_conexion_por_id(usuario_id)
         if not conn:
             raise Exception("Error de conexión a la base de datos")
         
         try:
             cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
             
-            # Obtener datos del usuario antes de eliminar
-            cursor.execute(
-                'SELECT nombre, apellido FROM users WHERE id = %s',
-                (usuario_id,)
-            )
+            # Eliminar y recuperar el nombre en la misma sentencia; con el archivo
+            # activo un archivado se borra del archivo (el id no puede estar en las dos)
+            columnas = 'id' if minimo else 'id, nombre, apellido'
+            if self.archivo:
+                cursor.execute(
+                    f'''WITH caliente AS (DELETE FROM users WHERE id = %s RETURNING {columnas}),
+                             archivado AS (DELETE FROM users_archivo WHERE id = %s RETURNING {columnas})
+                        SELECT * FROM caliente UNION ALL SELECT * FROM archivado''',
+                    (usuario_id, usuario_id)
+                )
+            else:
+                cursor.execute(f'DELETE FROM users WHERE id = %s RETURNING {columnas}', (usuario_id,))
             usuario = cursor.fetchone()
             
             if not usuario:
                 conn.close()
                 raise ValueError("Usuario no encontrado")
             
-            # Eliminar usuario
-            cursor.execute('DELETE FROM users WHERE id = %s', (usuario_id,))
             conn.commit()
             conn.close()
+            self._desindexar([usuario_id])
+            self._reflejar([usuario_id], [])
+            
+            if minimo:
+                return {"id": usuario['id']}
             
             nombre_completo = f"{usuario['nombre']} {usuario['apellido'] or ''}".strip()
             print(f"✅ Usuario eliminado de PostgreSQL: {nombre_completo}")
@@ -303,19 +740,572 @@ class UserModel:
                 conn.close()
             raise Exception("Error al eliminar usuario")
     
+    @staticmethod
+    def _recoger_upsert(filas, resultados):
+        for fila in filas:
+            usuario = dict(fila)
+            resultado = usuario.pop('resultado')
+            # Convertir timestamps a string
+            if usuario['fecha_registro']:
+                usuario['fecha_registro'] = usuario['fecha_registro'].isoformat()
+            if usuario['fecha_actualizacion']:
+                usuario['fecha_actualizacion'] = usuario['fecha_actualizacion'].isoformat()
+            resultados[usuario['email']] = {
+                "email": usuario['email'],
+                "resultado": resultado,
+                "usuario": usuario
+            }
+    
+    @staticmethod
+    def _sql_upsert_particionada(campos, columnas_retorno):
+        """Upsert sin ON CONFLICT (email) para users particionada por id
+        
+        Los emails se bloquean con advisory locks (en orden, sin interbloqueos)
+        y se resuelven a ids con users_emails: cada UPDATE va a una sola
+        partición. Parámetros: lista de emails y array JSON de registros.
+        """
+        retorno = ', '.join(f'u.{c.strip()}' for c in columnas_retorno.split(','))
+        columnas = ', '.join(('email',) + campos)
+        asignaciones = ', '.join(f'{c} = x.{c}' for c in campos)
+        guarda = (f"({', '.join('u.' + c for c in campos)}) IS DISTINCT FROM "
+                  f"({', '.join('x.' + c for c in campos)})")
+        return f'''
+            SELECT pg_advisory_xact_lock(clave)
+            FROM (SELECT DISTINCT hashtextextended(e, 0) AS clave FROM unnest(%s::text[]) e ORDER BY 1) s;
+            WITH entrada AS (
+                SELECT v.* FROM jsonb_populate_recordset(NULL::users, %s::jsonb) v
+            ), existentes AS (
+                SELECT e.*, r.usuario_id FROM entrada e JOIN users_emails r ON r.email = e.email
+            ), actualizados AS (
+                UPDATE users u SET {asignaciones}
+                FROM existentes x
+                WHERE u.id = x.usuario_id AND {guarda}
+                RETURNING {retorno}, 'actualizado' AS resultado
+            ), insertados AS (
+                INSERT INTO users ({columnas})
+                SELECT {columnas} FROM entrada
+                WHERE email NOT IN (SELECT email FROM existentes)
+                RETURNING {columnas_retorno}, 'insertado' AS resultado
+            )
+            SELECT * FROM insertados
+            UNION ALL
+            SELECT * FROM actualizados
+            UNION ALL
+            SELECT {retorno}, 'sin_cambios' FROM users u JOIN existentes x ON u.id = x.usuario_id
+            WHERE x.email NOT IN (SELECT email FROM actualizados)
+        '''
+    
+    def upsert_por_email(self, registros, minimo=False):
+        """Crear o actualizar usuarios por email con INSERT ... ON CONFLICT
+        
+        Cada registro solo escribe las columnas que trae: al insertar, las
+        ausentes toman su valor por defecto y al actualizar se conservan.
+        Los registros con el mismo juego de campos van en una sola sentencia.
+        Devuelve una lista de resultados ('insertado', 'actualizado' o
+        'sin_cambios') en el orden de los emails recibidos. Con users
+        particionada (USERS_PARTICIONADA) no hay ON CONFLICT (email): ver
+        _sql_upsert_particionada.
+        
+        Un email de un usuario archivado no se toca ('archivado', se modifica
+        tras restaurarlo) y uno que una inserción o un borrado concurrente deja
+        fuera de la sentencia se devuelve como 'conflicto' (se puede reintentar).
+        """
+        # Un mismo email no puede tocarse dos veces en un ON CONFLICT: gana el último
+        por_email = {}
+        for registro in registros:
+            por_email[registro['email']] = registro
+        
+        # Grupos por shard (el ligado a cada email en el directorio) y juego de campos
+        shards = self._ligar_emails({email: self.db.shard_de_email(email) for email in por_email})
+        grupos = {}
+        for email, registro in por_email.items():
+            campos = tuple(c for c in self.CAMPOS_ACTUALIZABLES if c in registro and c != 'email')
+            grupos.setdefault(shards[email], {}).setdefault(campos, []).append(registro)
+        
+        columnas_retorno = 'id, email, fecha_registro, fecha_actualizacion' if minimo else self.COLUMNAS_USUARIO
+        
+        conn = None
+        try:
+            resultados = {}
+            # Con shards cada uno confirma su parte: no hay transacción entre bases
+            for shard, grupos_shard in grupos.items():
+                conn = self.db.obtener_conexion_shard(shard)
+                if not conn:
+                    raise Exception("Error de conexión a la base de datos")
+                cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+                
+                if self.archivo:
+                    # El trigger de 007 (o users_emails) rechazaría el lote entero
+                    cursor.execute('SELECT email FROM users_archivo WHERE email = ANY(%s)',
+                                   ([r['email'] for grupo in grupos_shard.values() for r in grupo],))
+                    archivados = {fila['email'] for fila in cursor.fetchall()}
+                    for email in archivados:
+                        resultados[email] = {"email": email, "resultado": "archivado", "usuario": None}
+                    grupos_shard = {campos: [r for r in grupo if r['email'] not in archivados]
+                                    for campos, grupo in grupos_shard.items()}
+                
+                for campos, grupo in grupos_shard.items():
+                    if not grupo:
+                        continue
+                    columnas = ('email',) + campos
+                    if self.particionada:
+                        cursor.execute(self._sql_upsert_particionada(campos, columnas_retorno),
+                                       ([r['email'] for r in grupo],
+                                        psycopg2.extras.Json([{c: r[c] for c in columnas} for r in grupo])))
+                        self._recoger_upsert(cursor.fetchall(), resultados)
+                        continue
+                    
+                    plantilla = '(' + ', '.join(['%s'] * len(columnas)) + ')'
+                    filas_sql = ', '.join(
+                        cursor.mogrify(plantilla, [r[c] for c in columnas]).decode('utf-8')
+                        for r in grupo
+                    )
+                    emails_sql = cursor.mogrify('%s', ([r['email'] for r in grupo],)).decode('utf-8')
+                    asignaciones = ', '.join(f'{c} = EXCLUDED.{c}' for c in campos)
+                    guarda = (f"({', '.join('users.' + c for c in campos)}) IS DISTINCT FROM "
+                              f"({', '.join('EXCLUDED.' + c for c in campos)})")
+                    
+                    # Los valores ya van escapados con mogrify: se ejecuta sin parámetros.
+                    # xmax = 0 identifica las filas recién insertadas; las que no
+                    # cambian no se reescriben y se recuperan en la segunda rama
+                    consulta = f'''
+                        WITH upsert AS (
+                            INSERT INTO users ({', '.join(columnas)})
+                            VALUES {filas_sql}
+                            ON CONFLICT (email) DO UPDATE SET {asignaciones}
+                            WHERE {guarda}
+                            RETURNING {columnas_retorno},
+                                      CASE WHEN xmax = 0 THEN 'insertado' ELSE 'actualizado' END AS resultado
+                        )
+                        SELECT * FROM upsert
+                        UNION ALL
+                        SELECT {columnas_retorno}, 'sin_cambios' FROM users
+                        WHERE email = ANY({emails_sql}) AND email NOT IN (SELECT email FROM upsert)
+                    '''
+                    cursor.execute(consulta)
+                    self._recoger_upsert(cursor.fetchall(), resultados)
+                
+                conn.commit()
+                conn.close()
+                conn = None
+            
+            # Los 'sin_cambios' ya están en el índice, el filtro y la réplica tal cual
+            escritos = [resultado['usuario'] for resultado in resultados.values()
+                        if resultado['resultado'] in ('insertado', 'actualizado')]
+            for usuario in escritos:
+                self._indexar(usuario['id'], por_email[usuario['email']])
+            self._reflejar([usuario['id'] for usuario in escritos], None if minimo else escritos)
+            
+            print(f"✅ Upsert por email de {len(por_email)} usuario(s) en PostgreSQL")
+            # Sin fila devuelta: otra transacción insertó o borró el email entre
+            # el ON CONFLICT y la lectura de los 'sin_cambios'
+            return [resultados.get(email) or {"email": email, "resultado": "conflicto", "usuario": None}
+                    for email in por_email]
+            
+        except psycopg2.IntegrityError as e:
+            print(f"❌ Error de integridad en upsert: {e}")
+            if conn:
+                conn.close()
+            raise ValueError("Datos de usuario inválidos para el upsert")
+        except psycopg2.Error as e:
+            print(f"❌ Error en upsert por email: {e}")
+            if conn:
+                conn.close()
+            raise Exception("Error al crear o actualizar usuarios")
+    
+    def actualizar_lote(self, cambios):
+        """Actualizar parcialmente varios usuarios en una sola sentencia
+        
+        'cambios' es un diccionario id -> campos. Los valores llegan como un
+        array JSON que jsonb_populate_record tipa con las columnas de users,
+        y cada fila solo reescribe los campos que trae y que cambian.
+        Devuelve un diccionario id -> 'actualizado' | 'sin_cambios' |
+        'archivado' (con el archivo activo; se modifica tras restaurarlo) |
+        'no_encontrado'.
+        """
+        campos = [c for c in self.CAMPOS_ACTUALIZABLES
+                  if any(c in datos for datos in cambios.values())]
+        if not campos:
+            raise ValueError("No hay campos válidos para actualizar")
+        
+        # Los CASE usan la fila actual (u): un campo no enviado nunca se
+        # sobrescribe con un valor leído antes de bloquear la fila
+        asignaciones = ', '.join(
+            f"{c} = CASE WHEN c.cambio ? '{c}' THEN c.{c} ELSE u.{c} END" for c in campos
+        )
+        guarda = ' OR '.join(
+            f"(c.cambio ? '{c}' AND u.{c} IS DISTINCT FROM c.{c})" for c in campos
+        )
+        if self.archivo:
+            archivado = "WHEN r.id IS NOT NULL THEN 'archivado'"
+            join_archivo = 'LEFT JOIN users_archivo r ON r.id = c.id'
+        else:
+            archivado = join_archivo = ''
+        
+        por_shard = {}
+        for usuario_id, datos in cambios.items():
+            por_shard.setdefault(self.db.shard_de_id(usuario_id), []).append(dict(datos, id=usuario_id))
+        
+        # Con shards los emails nuevos se ligan antes al shard de su usuario
+        emails = {datos['email']: self.db.shard_de_id(usuario_id)
+                  for usuario_id, datos in cambios.items() if datos.get('email')}
+        if self.db.shards and emails:
+            if len(emails) < sum(1 for datos in cambios.values() if datos.get('email')):
+                raise ValueError("El email ya existe")
+            self._ligar_emails(emails, fijo=True)
+        
+        conn = None
+        try:
+            resultados = {}
+            # Una sentencia por shard; cada shard confirma su parte
+            for shard, filas in por_shard.items():
+                conn = self.db.obtener_conexion_shard(shard)
+                if not conn:
+                    raise Exception("Error de conexión a la base de datos")
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    WITH cambios AS (
+                        SELECT e.cambio, v.*
+                        FROM jsonb_array_elements(%s::jsonb) AS e(cambio),
+                             LATERAL jsonb_populate_record(NULL::users, e.cambio) AS v
+                    ), actualizados AS (
+                        UPDATE users u
+                        SET {asignaciones}
+                        FROM cambios c
+                        WHERE u.id = c.id AND ({guarda})
+                        RETURNING u.id
+                    )
+                    SELECT c.id,
+                           CASE WHEN a.id IS NOT NULL THEN 'actualizado'
+                                WHEN u.id IS NOT NULL THEN 'sin_cambios'
+                                {archivado}
+                                ELSE 'no_encontrado' END
+                    FROM cambios c
+                    LEFT JOIN actualizados a ON a.id = c.id
+                    LEFT JOIN users u ON u.id = c.id
+                    {join_archivo}
+                ''', (psycopg2.extras.Json(filas),))
+                resultados.update(cursor.fetchall())
+                conn.commit()
+                conn.close()
+                conn = None
+            
+            actualizados = [usuario_id for usuario_id, resultado in resultados.items()
+                            if resultado == 'actualizado']
+            for usuario_id in actualizados:
+                self._indexar(usuario_id, cambios[usuario_id])
+            self._reflejar(actualizados)
+            
+            print(f"✅ Actualización por lote de {len(cambios)} usuario(s) en PostgreSQL")
+            return resultados
+            
+        except psycopg2.IntegrityError:
+            if conn:
+                conn.close()
+            raise ValueError("El email ya existe")
+        except psycopg2.DataError as e:
+            # Un valor que jsonb_populate_record no puede tipar (InvalidTextRepresentation,
+            # fuera de rango...) es un error del cliente, no del servidor
+            if conn:
+                conn.close()
+            mensaje = getattr(e.diag, 'message_primary', None) or str(e).strip()
+            culpable = self._valor_invalido(cambios, mensaje)
+            if culpable:
+                raise ValueError(f"Usuario {culpable[0]}: valor no válido para {culpable[1]} ({mensaje})")
+            raise ValueError(f"Valor no válido en el lote: {mensaje}")
+        except psycopg2.Error as e:
+            print(f"❌ Error en actualización por lote: {e}")
+            if conn:
+                conn.close()
+            raise Exception("Error al actualizar usuarios")
+    
+    @staticmethod
+    def _valor_invalido(cambios, mensaje):
+        """(id, campo) cuyo valor cita el error de tipo de PostgreSQL, o None
+        
+        PostgreSQL no dice qué elemento del array falló, pero cita el valor
+        como texto entre comillas ('invalid input syntax for type integer: "abc"').
+        """
+        for usuario_id, datos in cambios.items():
+            for campo, valor in datos.items():
+                texto = valor if isinstance(valor, str) else json.dumps(valor)
+                if f'"{texto}"' in mensaje:
+                    return usuario_id, campo
+        return None
+    
+    def eliminar_lote(self, ids):
+        """Eliminar varios usuarios en una sola sentencia
+        
+        Devuelve un diccionario id -> 'eliminado' | 'no_encontrado'.
+        """
+        por_shard = {}
+        for usuario_id in ids:
+            por_shard.setdefault(self.db.shard_de_id(usuario_id), []).append(usuario_id)
+        
+        conn = None
+        try:
+            eliminados = set()
+            for shard, ids_shard in por_shard.items():
+                conn = self.db.obtener_conexion_shard(shard)
+                if not conn:
+                    raise Exception("Error de conexión a la base de datos")
+                cursor = conn.cursor()
+                if self.archivo:
+                    # Los archivados se borran del archivo en la misma sentencia
+                    cursor.execute('''
+                        WITH caliente AS (DELETE FROM users WHERE id = ANY(%s) RETURNING id),
+                             archivado AS (DELETE FROM users_archivo WHERE id = ANY(%s) RETURNING id)
+                        SELECT id FROM caliente UNION ALL SELECT id FROM archivado
+                    ''', (ids_shard, ids_shard))
+                else:
+                    cursor.execute('DELETE FROM users WHERE id = ANY(%s) RETURNING id', (ids_shard,))
+                eliminados.update(fila[0] for fila in cursor.fetchall())
+                conn.commit()
+                conn.close()
+                conn = None
+            self._desindexar(eliminados)
+            self._reflejar(eliminados, [])
+            
+            print(f"✅ Eliminados {len(eliminados)} usuario(s) de PostgreSQL")
+            return {usuario_id: 'eliminado' if usuario_id in eliminados else 'no_encontrado'
+                    for usuario_id in ids}
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error en eliminación por lote: {e}")
+            if conn:
+                conn.close()
+            raise Exception("Error al eliminar usuarios")
+    
+    def _condiciones_filtros(self, filtros):
+        """Traducir los filtros del listado a condiciones SQL y sus parámetros"""
+        condiciones, parametros = [], []
+        for nombre, valor in (filtros or {}).items():
+            if nombre not in self.FILTROS_USUARIO:
+                raise ValueError(f"Filtro no soportado: {nombre}")
+            condiciones.append(self.FILTROS_USUARIO[nombre])
+            parametros.append(valor)
+        return condiciones, parametros
+    
+    def _sql_mutacion(self, filtros, campo, operacion):
+        """Condiciones de la mutación por filtro y expresión del nuevo valor
+        
+        La guarda IS DISTINCT FROM deja fuera las filas que no cambiarían.
+        """
+        if operacion not in self.MUTACIONES_POR_FILTRO.get(campo, ()):
+            raise ValueError(f"Operación '{operacion}' no permitida sobre '{campo}'")
+        condiciones, parametros = self._condiciones_filtros(filtros)
+        if not condiciones:
+            raise ValueError("Se requiere al menos un filtro")
+        nuevo = self.OPERACIONES[operacion].format(campo=campo)
+        condiciones.append(f"{nuevo} IS DISTINCT FROM {campo}")
+        return ' AND '.join(condiciones), parametros, nuevo
+    
+    def contar_por_filtro(self, filtros, campo, operacion, valor):
+        """Contar las filas que coinciden con los filtros y las que cambiarían (simulación)"""
+        condicion, parametros, _ = self._sql_mutacion(filtros, campo, operacion)
+        coincidencia, parametros_coincidencia = self._condiciones_filtros(filtros)
+        
+        try:
+            # Con shards, un recuento por shard en paralelo
+            partes = self._dispersar(f'''
+                SELECT COUNT(*) AS coinciden, COUNT(*) FILTER (WHERE {condicion}) AS a_modificar
+                FROM users
+                WHERE {' AND '.join(coincidencia)}
+            ''', parametros + [valor] + parametros_coincidencia, primaria=True)
+            
+            return {"coinciden": sum(filas[0]['coinciden'] for filas in partes),
+                    "a_modificar": sum(filas[0]['a_modificar'] for filas in partes)}
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error al contar usuarios por filtro: {e}")
+            raise Exception("Error al contar usuarios")
+    
+    def mutar_por_filtro(self, filtros, campo, operacion, valor, tamano_lote=500, maximo_filas=None):
+        """Aplicar una operación sobre un campo a todos los usuarios que cumplen los filtros
+        
+        Se recorre la tabla por id en lotes de 'tamano_lote' filas, cada uno en
+        su propia transacción, para no mantener bloqueos largos. El recorrido por
+        id garantiza que una operación no idempotente (multiplicar, sumar) se
+        aplique una sola vez por fila.
+        
+        Con 'maximo_filas' el límite se aplica a las filas realmente modificadas
+        (el recuento previo no ve las que cambian durante la mutación): el lote
+        que lo superaría se deshace y se termina con limite_alcanzado=True y las
+        filas ya confirmadas.
+        """
+        condicion, parametros, nuevo = self._sql_mutacion(filtros, campo, operacion)
+        # La guarda usa el nuevo valor, que a su vez lleva el parámetro 'valor'
+        parametros_condicion = parametros + [valor]
+        
+        conn = None
+        actualizadas, lotes = 0, 0
+        limite_alcanzado = False
+        try:
+            # Con shards se recorre cada uno por turno; cada lote confirma en su shard
+            for shard in range(self.db.numero_shards):
+                conn = self.db.obtener_conexion_shard(shard)
+                if not conn:
+                    raise Exception("Error de conexión a la base de datos")
+                cursor = conn.cursor()
+                ultimo_id = 0
+                
+                while True:
+                    # Cerca del límite el lote se reduce a lo que queda más una fila,
+                    # la que demuestra que se superaría
+                    limite_lote = tamano_lote
+                    if maximo_filas is not None:
+                        limite_lote = min(tamano_lote, maximo_filas - actualizadas + 1)
+                    # El UPDATE repite la condición: si otra transacción cambió la
+                    # fila entre la selección y el bloqueo, se vuelve a evaluar
+                    cursor.execute(f'''
+                        WITH lote AS (
+                            SELECT id FROM users
+                            WHERE {condicion} AND id > %s
+                            ORDER BY id
+                            LIMIT %s
+                        ), actualizados AS (
+                            UPDATE users SET {campo} = {nuevo}
+                            WHERE id IN (SELECT id FROM lote) AND {condicion}
+                            RETURNING id
+                        )
+                        SELECT (SELECT MAX(id) FROM lote), (SELECT array_agg(id) FROM actualizados)
+                    ''', parametros_condicion + [ultimo_id, limite_lote]
+                         + [valor] + parametros_condicion)
+                    
+                    maximo_id, ids_lote = cursor.fetchone()
+                    ids_lote = ids_lote or []
+                    filas = len(ids_lote)
+                    if maximo_filas is not None and actualizadas + filas > maximo_filas:
+                        conn.rollback()
+                        limite_alcanzado = True
+                        break
+                    conn.commit()
+                    self._reflejar(ids_lote)
+                    if maximo_id is None:
+                        break
+                    ultimo_id = maximo_id
+                    actualizadas += filas
+                    lotes += 1
+                
+                conn.close()
+                conn = None
+                if limite_alcanzado:
+                    break
+            
+            # La mutación no devuelve los ids tocados: si afecta a un campo
+            # indexado se reconstruye el índice de búsqueda
+            if actualizadas and self.indice_busqueda is not None and campo in self.indice_busqueda.CAMPOS:
+                self.indice_busqueda.recargar_en_segundo_plano()
+            
+            if limite_alcanzado:
+                print(f"⚠️  Mutación por filtro detenida en el límite de {maximo_filas} filas: "
+                      f"{actualizadas} usuario(s) en {lotes} lote(s)")
+            else:
+                print(f"✅ Mutación por filtro: {actualizadas} usuario(s) en {lotes} lote(s)")
+            return {"filas_actualizadas": actualizadas, "lotes": lotes, "limite_alcanzado": limite_alcanzado}
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error en mutación por filtro: {e}")
+            if conn:
+                conn.rollback()
+                conn.close()
+            raise Exception(f"Error al actualizar usuarios: {actualizadas} fila(s) ya confirmadas")
+    
+    def obtener_cambios_desde(self, fecha, ultimo_id, limite, margen_segundos=5):
+        """Usuarios modificados y eliminados después de la marca de agua (fecha, id)
+        
+        Recorre el índice (fecha_actualizacion, id) de users y el de lápidas
+        en users_eliminados, así que el coste depende de los cambios y no del
+        tamaño de la tabla. Solo se devuelven cambios con más de
+        'margen_segundos' de antigüedad: las transacciones que aún no han
+        hecho commit no pueden quedar por detrás de la marca de agua.
+        """
+        columnas = ', '.join(f"u.{c.strip()}" for c in self.COLUMNAS_USUARIO.split(',')
+                             if c.strip() != 'id')
+        
+        try:
+            marca = (fecha, ultimo_id)
+            # Con shards cada uno devuelve sus limite + 1 primeros cambios tras
+            # la marca; mezclados por (fecha, id) dan los primeros del total
+            partes = self._dispersar(f'''
+                SELECT p.tipo, p.fecha, p.id, p.archivado, {columnas}
+                FROM (
+                    (SELECT 'cambio' AS tipo, fecha_actualizacion AS fecha, id, false AS archivado
+                     FROM users
+                     WHERE (fecha_actualizacion, id) > (%s, %s)
+                       AND fecha_actualizacion < LOCALTIMESTAMP - make_interval(secs => %s)
+                     ORDER BY fecha_actualizacion, id
+                     LIMIT %s)
+                    UNION ALL
+                    (SELECT 'eliminado', fecha_eliminacion, id, archivado
+                     FROM users_eliminados
+                     WHERE (fecha_eliminacion, id) > (%s, %s)
+                       AND fecha_eliminacion < LOCALTIMESTAMP - make_interval(secs => %s)
+                     ORDER BY fecha_eliminacion, id
+                     LIMIT %s)
+                    ORDER BY fecha, id
+                    LIMIT %s
+                ) p
+                LEFT JOIN users u ON p.tipo = 'cambio' AND u.id = p.id
+                ORDER BY p.fecha, p.id
+            ''', (*marca, margen_segundos, limite + 1, *marca, margen_segundos, limite + 1, limite + 1),
+                primaria=True)
+            filas = list(islice(heapq.merge(*partes, key=itemgetter('fecha', 'id')), limite + 1))
+            
+            hay_mas = len(filas) > limite
+            filas = filas[:limite]
+            
+            cambios, eliminados = [], []
+            for fila in filas:
+                tipo = fila.pop('tipo')
+                fecha_cambio = fila.pop('fecha')
+                archivado = fila.pop('archivado')
+                if tipo == 'eliminado':
+                    # archivado: salió de la tabla caliente pero sigue en GET /usuarios/<id>
+                    eliminados.append({"id": fila['id'], "fecha_eliminacion": fecha_cambio.isoformat(),
+                                       "archivado": bool(archivado)})
+                    continue
+                for campo in ('fecha_registro', 'fecha_actualizacion'):
+                    if fila.get(campo):
+                        fila[campo] = fila[campo].isoformat()
+                cambios.append(fila)
+            
+            # La nueva marca de agua es la última fila devuelta
+            if filas:
+                marca = (fecha_cambio, filas[-1]['id'])
+            
+            return {
+                "cambios": cambios,
+                "eliminados": eliminados,
+                "marca_agua": marca,
+                "hay_mas": hay_mas
+            }
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error obteniendo cambios: {e}")
+            raise Exception("Error al obtener cambios")
+    
     def obtener_estadisticas(self):
-        """Obtener estadísticas de usuarios y base de datos"""
-        conn = self.db.obtener_conexion()
+        """Obtener estadísticas de usuarios y base de datos (con shards, el total de todos)"""
+        if self.db.shards:
+            try:
+                partes = self._dispersar(f'SELECT ({self.SQL_TOTAL_ESTIMADO}) AS total, version() AS version', ())
+                return {
+                    "total_usuarios": sum(filas[0]['total'] for filas in partes),
+                    "version_postgresql": partes[0][0]['version']
+                }
+            except psycopg2.Error as e:
+                print(f"❌ Error obteniendo información: {e}")
+                raise Exception("Error al obtener información")
+        
+        conn = self._conexion_lectura()
         if not conn:
             raise Exception("Error de conexión a la base de datos")
         
         try:
             cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) FROM users')
-            total = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT version()')
-            version_pg = cursor.fetchone()[0]
+            cursor.execute(f'SELECT ({self.SQL_TOTAL_ESTIMADO}), version()')
+            total, version_pg = cursor.fetchone()
             
             conn.close()
             
@@ -330,33 +1320,276 @@ class UserModel:
                 conn.close()
             raise Exception("Error al obtener información")
     
-    def obtener_paginados(self, pagina, limite):
-        """Obtener usuarios con paginación"""
+    def estimar_total_usuarios(self):
+        """Total aproximado de usuarios leído del catálogo (con shards, la suma)"""
+        if self.db.shards:
+            try:
+                partes = self._dispersar(self.SQL_TOTAL_ESTIMADO, ())
+                return sum(next(iter(filas[0].values())) for filas in partes)
+            except psycopg2.Error as e:
+                print(f"❌ Error estimando el total de usuarios: {e}")
+                raise Exception("Error al obtener información")
+        
         conn = self.db.obtener_conexion()
         if not conn:
             raise Exception("Error de conexión a la base de datos")
         
         try:
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cursor = conn.cursor()
+            cursor.execute(self.SQL_TOTAL_ESTIMADO)
+            total = cursor.fetchone()[0]
             
-            # Calcular offset
-            offset = (pagina - 1) * limite
+            conn.close()
+            return total
             
-            # Obtener total de usuarios
-            cursor.execute('SELECT COUNT(*) FROM users')
-            total_usuarios = cursor.fetchone()[0]
+        except psycopg2.Error as e:
+            print(f"❌ Error estimando el total de usuarios: {e}")
+            if conn:
+                conn.close()
+            raise Exception("Error al obtener información")
+    
+    @staticmethod
+    def _combinar_distribuciones(partes):
+        """Filas de usuarios_estadisticas de varios shards sumadas por (dimension, valor)
+        
+        Las medias se ponderan con las filas que tienen edad o salario; los
+        percentiles de cada shard no se pueden combinar y quedan a None.
+        """
+        combinadas = {}
+        for filas in partes:
+            for fila in filas:
+                actual = combinadas.setdefault((fila['dimension'], fila['valor']), dict(
+                    fila, total=0, activos=0, con_edad=0, con_salario=0,
+                    edad_media=0.0, salario_medio=0.0, salario_percentiles=None))
+                actual['total'] += fila['total']
+                actual['activos'] += fila['activos']
+                actual['con_edad'] += fila['con_edad']
+                actual['con_salario'] += fila['con_salario']
+                actual['edad_media'] += (fila['edad_media'] or 0) * fila['con_edad']
+                actual['salario_medio'] += (fila['salario_medio'] or 0) * fila['con_salario']
+                actual['calculado'] = min(actual['calculado'], fila['calculado'])
+        
+        for fila in combinadas.values():
+            fila['edad_media'] = round(fila['edad_media'] / fila['con_edad'], 1) if fila['con_edad'] else None
+            fila['salario_medio'] = (round(fila['salario_medio'] / fila['con_salario'], 2)
+                                     if fila['con_salario'] else None)
+        return sorted(combinadas.values(), key=lambda f: (f['dimension'], f['orden'], -f['total'], f['valor']))
+    
+    def obtener_distribuciones(self, dimensiones=None):
+        """Agregados por dimensión leídos de la vista materializada (con shards, combinados)"""
+        dimensiones = list(dimensiones or self.DIMENSIONES_ESTADISTICAS)
+        
+        try:
+            partes = self._dispersar('''
+                SELECT dimension, valor, orden, total, activos, edad_media, salario_medio,
+                       salario_percentiles, con_edad, con_salario, calculado
+                FROM usuarios_estadisticas
+                WHERE dimension = ANY(%s)
+                ORDER BY dimension, orden, total DESC, valor
+            ''', (dimensiones,))
+            filas = partes[0] if len(partes) == 1 else self._combinar_distribuciones(partes)
             
-            # Obtener usuarios con paginación
-            cursor.execute('''
-                SELECT id, nombre, apellido, email, edad, telefono, ciudad, 
-                       activo, fecha_registro, fecha_actualizacion, genero, 
-                       profesion, salario
-                FROM users 
+            resultado = {dimension: [] for dimension in dimensiones}
+            calculado = None
+            for fila in filas:
+                calculado = fila['calculado']
+                percentiles = fila['salario_percentiles'] or [None] * 4
+                resultado[fila['dimension']].append({
+                    "valor": fila['valor'],
+                    "total": fila['total'],
+                    "activos": fila['activos'],
+                    "edad_media": fila['edad_media'],
+                    "salario_medio": fila['salario_medio'],
+                    "salario_percentiles": dict(zip(('p25', 'p50', 'p75', 'p90'), percentiles))
+                })
+            
+            return {
+                "distribuciones": resultado,
+                "calculado": calculado.isoformat() if calculado else None
+            }
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error obteniendo distribuciones: {e}")
+            raise Exception("Error al obtener estadísticas")
+    
+    def obtener_altas(self, periodo='dia', desde=None, hasta=None, ciudad=None, por_ciudad=False):
+        """Series de altas por periodo desde la tabla resumen usuarios_altas_diarias (con shards, sumadas)"""
+        condiciones, parametros = [], [self.PERIODOS_ALTAS[periodo]]
+        if desde:
+            condiciones.append('dia >= %s')
+            parametros.append(desde)
+        if hasta:
+            condiciones.append('dia <= %s')
+            parametros.append(hasta)
+        if ciudad:
+            condiciones.append('ciudad = %s')
+            parametros.append(ciudad)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+        columna_ciudad = ', ciudad' if por_ciudad else ''
+        
+        try:
+            partes = self._dispersar(f'''
+                SELECT date_trunc(%s, dia)::date AS periodo{columna_ciudad}, SUM(altas)::bigint AS altas
+                FROM usuarios_altas_diarias
+                {where}
+                GROUP BY 1{columna_ciudad}
+                HAVING SUM(altas) > 0
+                ORDER BY 1{columna_ciudad}
+            ''', parametros)
+            series = partes[0]
+            if len(partes) > 1:
+                # Misma clave (periodo y ciudad) en varios shards: se suman
+                sumas = {}
+                for fila in (fila for filas in partes for fila in filas):
+                    clave = tuple((campo, valor) for campo, valor in fila.items() if campo != 'altas')
+                    sumas[clave] = sumas.get(clave, 0) + fila['altas']
+                series = [dict(clave, altas=altas) for clave, altas in sumas.items()]
+                series.sort(key=lambda fila: (fila['periodo'], fila.get('ciudad') is None, fila.get('ciudad') or ''))
+            
+            for fila in series:
+                fila['periodo'] = fila['periodo'].isoformat()
+            return {
+                "series": series,
+                "total_altas": sum(fila['altas'] for fila in series)
+            }
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error obteniendo altas: {e}")
+            raise Exception("Error al obtener altas")
+    
+    def _usuarios_por_ids(self, ids):
+        """Filas completas de los ids dados, en el mismo orden
+        
+        Con la réplica en memoria vigente solo se piden a PostgreSQL los ids
+        que aún no tiene (altas de otros workers dentro de su retraso).
+        """
+        replica = self._replica_vigente()
+        if replica:
+            encontrados = {usuario_id: replica.obtener_por_id(usuario_id) for usuario_id in ids}
+            ausentes = [usuario_id for usuario_id, usuario in encontrados.items() if usuario is None]
+            if ausentes:
+                encontrados.update((usuario['id'], usuario) for usuario in self._usuarios_por_ids_bd(ausentes))
+            return [encontrados[usuario_id] for usuario_id in ids if encontrados[usuario_id] is not None]
+        return self._usuarios_por_ids_bd(ids)
+    
+    def _usuarios_por_ids_bd(self, ids):
+        por_shard = {}
+        for usuario_id in ids:
+            por_shard.setdefault(self.db.shard_de_id(usuario_id), []).append(usuario_id)
+        
+        try:
+            partes = self._dispersar(f'SELECT {self.COLUMNAS_USUARIO} FROM users WHERE id = ANY(%s)',
+                                     lambda shard: (por_shard[shard],), por_shard)
+            por_id = {fila['id']: fila for filas in partes for fila in filas}
+            
+            usuarios = [por_id[usuario_id] for usuario_id in ids if usuario_id in por_id]
+            for usuario in usuarios:
+                if usuario['fecha_registro']:
+                    usuario['fecha_registro'] = usuario['fecha_registro'].isoformat()
+                if usuario['fecha_actualizacion']:
+                    usuario['fecha_actualizacion'] = usuario['fecha_actualizacion'].isoformat()
+            return usuarios
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error obteniendo usuarios: {e}")
+            raise Exception("Error al obtener usuarios")
+    
+    def buscar(self, consulta, limite=20):
+        """Buscar usuarios cuyo nombre, apellido, ciudad o profesión contengan
+        palabras que empiecen por cada término de la consulta
+        
+        Con el índice en memoria cargado la búsqueda no consulta PostgreSQL
+        (solo se leen las filas resultantes); si no, se usa una sentencia LIKE
+        sobre el texto normalizado.
+        """
+        indice = self.indice_busqueda
+        if indice is not None and indice.cargado:
+            ids, total = indice.buscar(consulta, limite)
+            return {"usuarios": self._usuarios_por_ids(ids) if ids else [],
+                    "total": total, "motor": "memoria"}
+        
+        terminos = IndiceBusqueda.analizar(consulta)
+        if not terminos:
+            return {"usuarios": [], "total": 0, "motor": "postgresql"}
+        
+        condiciones, parametros = [], []
+        for campo, termino in terminos:
+            if campo is not None and campo not in IndiceBusqueda.CAMPOS:
+                raise ValueError(f"Campo de búsqueda no soportado: {campo}")
+            texto = self.SQL_TEXTO_NORMALIZADO.format(
+                campo=campo or "concat_ws(' ', nombre, apellido, ciudad, profesion)")
+            condiciones.append(f"({texto}) LIKE %s")
+            patron = termino.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            parametros.append(f"% {patron}%")
+        
+        try:
+            partes = self._dispersar(f'''
+                SELECT {self.COLUMNAS_USUARIO}, COUNT(*) OVER () AS total
+                FROM users
+                WHERE {' AND '.join(condiciones)}
                 ORDER BY id
-                LIMIT %s OFFSET %s
-            ''', (limite, offset))
+                LIMIT %s
+            ''', parametros + [limite])
+            # Los primeros 'limite' por id de cada shard bastan para los primeros del total
+            total = sum(filas[0]['total'] for filas in partes if filas)
+            usuarios = list(islice(heapq.merge(*partes, key=itemgetter('id')), limite))
             
-            usuarios = [dict(row) for row in cursor.fetchall()]
+            for usuario in usuarios:
+                usuario.pop('total')
+                if usuario['fecha_registro']:
+                    usuario['fecha_registro'] = usuario['fecha_registro'].isoformat()
+                if usuario['fecha_actualizacion']:
+                    usuario['fecha_actualizacion'] = usuario['fecha_actualizacion'].isoformat()
+            return {"usuarios": usuarios, "total": total, "motor": "postgresql"}
+            
+        except psycopg2.Error as e:
+            print(f"❌ Error buscando usuarios: {e}")
+            raise Exception("Error al buscar usuarios")
+    
+    def obtener_paginados(self, pagina, limite, filtros=None):
+        """Obtener usuarios con paginación y filtros opcionales"""
+        replica = self._replica_vigente()
+        if replica:
+            return replica.obtener_paginados(pagina, limite, filtros)
+        
+        # Calcular offset
+        offset = (pagina - 1) * limite
+        
+        # Con shards cada uno devuelve sus primeras offset + limite filas por
+        # id y la página sale de su mezcla; con una sola base, OFFSET directo
+        if self.db.shards:
+            limite_shard, offset_shard, salto = offset + limite, 0, offset
+        else:
+            limite_shard, offset_shard, salto = limite, offset, 0
+        
+        try:
+            # Total y página en una sola sentencia por shard: el LEFT JOIN
+            # garantiza una fila con el total aunque la página quede fuera de rango
+            condiciones, parametros = self._condiciones_filtros(filtros)
+            where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+            
+            partes = self._dispersar(f'''
+                SELECT t.total_usuarios, p.*
+                FROM (SELECT COUNT(*) AS total_usuarios FROM users {where}) t
+                LEFT JOIN LATERAL (
+                    SELECT id, nombre, apellido, email, edad, telefono, ciudad, 
+                           activo, fecha_registro, fecha_actualizacion, genero, 
+                           profesion, salario
+                    FROM users 
+                    {where}
+                    ORDER BY id
+                    LIMIT %s OFFSET %s
+                ) p ON true
+                ORDER BY p.id
+            ''', parametros + parametros + [limite_shard, offset_shard])
+            
+            total_usuarios = sum(filas[0]['total_usuarios'] for filas in partes if filas)
+            for filas in partes:
+                for fila in filas:
+                    fila.pop('total_usuarios')
+            usuarios = list(islice(heapq.merge(*[[fila for fila in filas if fila['id'] is not None]
+                                                 for filas in partes], key=itemgetter('id')),
+                                   salto, salto + limite))
             
             # Convertir timestamps a string para JSON
             for usuario in usuarios:
@@ -365,8 +1598,6 @@ class UserModel:
                 if usuario['fecha_actualizacion']:
                     usuario['fecha_actualizacion'] = usuario['fecha_actualizacion'].isoformat()
             
-            conn.close()
-            
             # Calcular información de paginación
             total_paginas = (total_usuarios + limite - 1) // limite  # Redondeo hacia arriba
             
@@ -384,6 +1615,4 @@ class UserModel:
             
         except psycopg2.Error as e:
             print(f"❌ Error obteniendo usuarios paginados: {e}")
-            if conn:
-                conn.close()
             raise Exception("Error al obtener usuarios paginados")
\ No newline at end of file
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Archivo en frío de usuarios inactivos.
+
+Mueve de users a users_archivo (migración 007) los usuarios con
+activo = false sin cambios desde hace más de --dias días, en lotes de
+--lote filas con una pausa de --pausa segundos entre lotes. Requiere
+ARCHIVO_USUARIOS=true, también en la API: así los archivados se siguen
+leyendo por id y se restauran con POST /usuarios/<id>/restaurar.
+
+Tras un archivado grande, --vacuum deja el espacio de users listo para
+reutilizarse y actualiza las estadísticas del planificador.
+
+Uso: ARCHIVO_USUARIOS=true python scripts/archivar_usuarios.py [--dias 365] [--lote 1000] [--pausa 0.5] [--vacuum]
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.archivo import ArchivadorUsuarios
+
+
+def mostrar_estado(archivador):
+    """Tamaño de la tabla caliente y del archivo frente a shared_buffers."""
+    estado = archivador.estado()
+    for tabla in ('users', 'users_archivo'):
+        if tabla in estado:
+            print(f"   {tabla:<15} {estado[tabla]['filas_estimadas']:>12,} filas  "
+                  f"{estado[tabla]['bytes'] / 1024 ** 2:>10,.1f} MiB")
+    if 'users' in estado:
+        proporcion = estado['users']['bytes'] / max(estado['shared_buffers'], 1)
+        print(f"   users ocupa el {proporcion:.0%} de shared_buffers "
+              f"({estado['shared_buffers'] / 1024 ** 2:,.0f} MiB)")
+
+
+def main():
+    """Función principal del script."""
+    parser = argparse.ArgumentParser(description='Archivo por lotes de usuarios inactivos')
+    parser.add_argument('--dias', type=int, help='Antigüedad mínima sin cambios (ARCHIVO_DIAS, 365)')
+    parser.add_argument('--lote', type=int, help='Usuarios por lote (ARCHIVO_LOTE, 1000)')
+    parser.add_argument('--pausa', type=float, help='Segundos entre lotes (ARCHIVO_PAUSA, 0.5)')
+    parser.add_argument('--maximo-lotes', type=int, help='Parar tras este número de lotes')
+    parser.add_argument('--vacuum', action='store_true', help='VACUUM ANALYZE de users al terminar')
+    parser.add_argument('--estado', action='store_true', help='Solo mostrar tamaños y salir')
+    args = parser.parse_args()
+
+    try:
+        archivador = ArchivadorUsuarios(args.dias, args.lote, args.pausa)
+        if not args.estado:
+            print(f"🧊 Archivando inactivos sin cambios desde hace {archivador.dias} días "
+                  f"(lotes de {archivador.lote}, pausa {archivador.pausa} s)")
+            total = archivador.archivar(args.maximo_lotes)
+            print(f"✅ {total:,} usuarios archivados")
+            if args.vacuum and total:
+                archivador.vacuum()
+                print("🧹 VACUUM ANALYZE de users completado")
+        mostrar_estado(archivador)
+    except Exception as e:
+        print(f"❌ Error fatal: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
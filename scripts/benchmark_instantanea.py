@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark de estadísticas numéricas: instantánea NumPy frente a SQL.
+
+Genera una instantánea sintética de N filas (por defecto 1.000.000) y mide
+el percentil/histograma global de salario y la agrupación por ciudad con
+NumPy. Con --sql mide además la consulta equivalente en PostgreSQL
+(percentile_cont ... GROUP BY ciudad) y la carga real con COPY.
+
+Requiere numpy (pip install numpy).
+
+Uso: python scripts/benchmark_instantanea.py [--filas 1000000] [--repeticiones 5] [--sql]
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.instantanea import InstantaneaUsuarios, np
+from database.connection import DatabaseConnection
+
+CIUDADES = ['Madrid', 'Barcelona', 'Valencia', 'Sevilla', 'Bilbao', 'Málaga', 'Zaragoza',
+            'Murcia', 'Palma', 'Vigo', 'Gijón', 'Granada', 'Alicante', 'Córdoba', 'Valladolid']
+
+SQL_POR_CIUDAD = '''
+    SELECT ciudad, COUNT(salario), AVG(salario), stddev_pop(salario),
+           percentile_cont(ARRAY[0.25, 0.5, 0.75, 0.9]) WITHIN GROUP (ORDER BY salario)
+    FROM users WHERE salario IS NOT NULL
+    GROUP BY ciudad
+'''
+
+SQL_GLOBAL = '''
+    SELECT COUNT(salario), AVG(salario),
+           percentile_cont(ARRAY[0.25, 0.5, 0.75, 0.9]) WITHIN GROUP (ORDER BY salario),
+           corr(edad, salario)
+    FROM users
+'''
+
+
+def instantanea_sintetica(filas, semilla=42):
+    """Instantánea con datos aleatorios con forma parecida a la tabla real."""
+    generador = np.random.default_rng(semilla)
+    salario = generador.lognormal(10.5, 0.4, filas)
+    salario[generador.random(filas) < 0.05] = np.nan
+    columnas = {
+        'id': np.arange(1, filas + 1, dtype=np.int64),
+        'edad': generador.integers(18, 70, filas).astype(np.float64),
+        'salario': salario,
+        'ciudad': generador.integers(0, len(CIUDADES), filas).astype(np.int32),
+        'profesion': np.full(filas, -1, dtype=np.int32),
+        'genero': generador.integers(0, 2, filas).astype(np.int32),
+        'activo': generador.integers(0, 2, filas).astype(np.int32),
+    }
+    categorias = {
+        'ciudad': {nombre: i for i, nombre in enumerate(CIUDADES)},
+        'profesion': {},
+        'genero': {'Masculino': 0, 'Femenino': 1},
+        'activo': {'false': 0, 'true': 1},
+    }
+    return InstantaneaUsuarios.desde_columnas(columnas, categorias)
+
+
+def medir(funcion, repeticiones):
+    """Mediana en milisegundos de 'repeticiones' ejecuciones."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def medir_sql(sql, repeticiones):
+    conn = DatabaseConnection().obtener_conexion()
+    if not conn:
+        raise Exception("Error de conexión a la base de datos")
+    try:
+        cursor = conn.cursor()
+        return medir(lambda: (cursor.execute(sql), cursor.fetchall()), repeticiones)
+    finally:
+        conn.close()
+
+
+def main():
+    """Función principal del script."""
+    parser = argparse.ArgumentParser(description='Benchmark de la instantánea NumPy frente a SQL')
+    parser.add_argument('--filas', type=int, default=1_000_000, help='Filas de la instantánea sintética')
+    parser.add_argument('--repeticiones', type=int, default=5, help='Ejecuciones por medida (se toma la mediana)')
+    parser.add_argument('--sql', action='store_true',
+                        help='Medir también las consultas SQL y la carga con COPY contra la base de datos')
+    args = parser.parse_args()
+
+    try:
+        if np is None:
+            raise Exception("Este benchmark requiere numpy (pip install numpy)")
+
+        print(f"🧪 Instantánea sintética de {args.filas:,} filas")
+        instantanea = instantanea_sintetica(args.filas)
+        resultados = [
+            ('NumPy global (percentiles + histograma + correlación)',
+             medir(lambda: instantanea.estadisticas('salario'), args.repeticiones)),
+            ('NumPy por ciudad',
+             medir(lambda: instantanea.estadisticas('salario', 'ciudad'), args.repeticiones)),
+        ]
+
+        if args.sql:
+            real = InstantaneaUsuarios(intervalo=float('inf'))
+            resultados += [
+                ('SQL global', medir_sql(SQL_GLOBAL, args.repeticiones)),
+                ('SQL por ciudad', medir_sql(SQL_POR_CIUDAD, args.repeticiones)),
+                ('Carga completa con COPY', medir(real.cargar, 1)),
+            ]
+
+        print()
+        for nombre, milisegundos in resultados:
+            print(f"   {nombre:<55} {milisegundos:>10.1f} ms")
+    except Exception as e:
+        print(f"❌ Error fatal: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
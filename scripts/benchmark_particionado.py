@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark de users plana frente a particionada por HASH (id).
+
+Crea en el esquema benchmark_particionado dos tablas con N filas sintéticas
+(por defecto 1.000.000), una normal y otra particionada en --particiones,
+más un registro de emails como users_emails, y mide por operación:
+
+- lectura por id (poda a una partición)
+- página profunda con OFFSET y página por clave (id > ultimo_id)
+- alta de una fila por transacción (con la fila del registro de emails)
+- búsqueda por email: índice único, registro de emails e índice local
+
+Para cada consulta muestra también cuántas particiones recorre su plan. El
+esquema se borra al terminar salvo con --conservar.
+
+Uso: python scripts/benchmark_particionado.py [--filas 1000000] [--particiones 16] [--operaciones 2000]
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.connection import DatabaseConnection
+from database.particionado import ParticionadorUsuarios
+
+ESQUEMA = 'benchmark_particionado'
+
+COLUMNAS = '''
+    id bigint NOT NULL DEFAULT nextval('benchmark_particionado.ids'),
+    email text NOT NULL,
+    nombre text,
+    ciudad text,
+    fecha_registro timestamp NOT NULL DEFAULT LOCALTIMESTAMP
+'''
+
+SQL_DATOS = '''
+    SELECT g, 'usuario' || g || '@ejemplo.com', 'Usuario ' || g,
+           (ARRAY['Madrid', 'Barcelona', 'Valencia', 'Sevilla'])[1 + g % 4],
+           LOCALTIMESTAMP - g * interval '1 minute'
+    FROM generate_series(1, %s) g
+'''
+
+
+def preparar(cursor, filas, particiones):
+    """Esquema con las tablas plana, particionada y el registro de emails."""
+    cursor.execute(f'DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE; CREATE SCHEMA {ESQUEMA}')
+    cursor.execute(f'SET search_path TO {ESQUEMA}')
+    cursor.execute('CREATE SEQUENCE ids')
+    cursor.execute(f'CREATE TABLE plana ({COLUMNAS}, PRIMARY KEY (id), UNIQUE (email))')
+    cursor.execute(f'CREATE TABLE particionada ({COLUMNAS}, PRIMARY KEY (id)) PARTITION BY HASH (id)')
+    for resto in range(particiones):
+        cursor.execute(f'CREATE TABLE users_p{resto:02d} PARTITION OF particionada '
+                       f'FOR VALUES WITH (MODULUS {particiones}, REMAINDER {resto})')
+    cursor.execute('CREATE INDEX ON particionada (email)')
+    cursor.execute('CREATE TABLE emails (email text PRIMARY KEY, usuario_id bigint NOT NULL)')
+    cursor.execute('INSERT INTO plana ' + SQL_DATOS, (filas,))
+    cursor.execute('INSERT INTO particionada ' + SQL_DATOS, (filas,))
+    cursor.execute('INSERT INTO emails SELECT email, id FROM particionada')
+    cursor.execute('SELECT setval(%s, %s)', ('ids', filas))
+    cursor.execute('ANALYZE plana; ANALYZE particionada; ANALYZE emails')
+
+
+def medir(cursor, sql, parametros, operaciones, explicar=True):
+    """Milisegundos por operación y particiones recorridas por el plan."""
+    particiones = None
+    if explicar:
+        cursor.execute('EXPLAIN (ANALYZE, COSTS OFF, TIMING OFF) ' + sql, parametros(0))
+        particiones = ParticionadorUsuarios.particiones_en_plan(
+            '\n'.join(fila[0] for fila in cursor.fetchall()))
+    inicio = time.perf_counter()
+    for i in range(operaciones):
+        cursor.execute(sql, parametros(i))
+        if cursor.description:
+            cursor.fetchall()
+    return (time.perf_counter() - inicio) * 1000 / operaciones, particiones
+
+
+def main():
+    """Función principal del script."""
+    parser = argparse.ArgumentParser(description='Benchmark de users plana frente a particionada')
+    parser.add_argument('--filas', type=int, default=1_000_000, help='Filas sintéticas por tabla')
+    parser.add_argument('--particiones', type=int, default=16, help='Particiones hash')
+    parser.add_argument('--operaciones', type=int, default=2000, help='Operaciones por medida')
+    parser.add_argument('--conservar', action='store_true', help='No borrar el esquema al terminar')
+    args = parser.parse_args()
+
+    conn = None
+    try:
+        conn = DatabaseConnection().obtener_conexion()
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        conn.autocommit = True
+        cursor = conn.cursor()
+
+        print(f"🧪 Preparando {args.filas:,} filas por tabla ({args.particiones} particiones)...")
+        inicio = time.monotonic()
+        preparar(cursor, args.filas, args.particiones)
+        print(f"   listo en {time.monotonic() - inicio:.1f} s")
+
+        aleatorio = random.Random(42)
+        ids = [aleatorio.randint(1, args.filas) for _ in range(args.operaciones)]
+        profundidad = args.filas // 2
+        pocas = max(args.operaciones // 100, 5)
+        contador = iter(range(args.filas + 1, args.filas * 2 + args.operaciones * 4))
+
+        def alta(tabla, registro):
+            # Una sentencia (y transacción) por alta, como POST /usuarios; la
+            # particionada escribe también su fila del registro de emails
+            def parametros(_):
+                usuario_id = next(contador)
+                return (usuario_id, f'nuevo{usuario_id}@ejemplo.com')
+            sentencia = f"INSERT INTO {tabla} (id, email, nombre) VALUES (%s, %s, 'Nuevo')"
+            if registro:
+                sentencia = (f"WITH fila AS ({sentencia} RETURNING id, email) "
+                             "INSERT INTO emails SELECT email, id FROM fila")
+            return sentencia, parametros
+
+        medidas = []
+        for tabla in ('plana', 'particionada'):
+            medidas += [
+                (f'{tabla}: lectura por id',
+                 medir(cursor, f'SELECT * FROM {tabla} WHERE id = %s', lambda i: (ids[i],), args.operaciones)),
+                (f'{tabla}: página OFFSET {profundidad:,}',
+                 medir(cursor, f'SELECT * FROM {tabla} ORDER BY id LIMIT 50 OFFSET %s',
+                       lambda i: (profundidad,), pocas)),
+                (f'{tabla}: página por clave',
+                 medir(cursor, f'SELECT * FROM {tabla} WHERE id > %s ORDER BY id LIMIT 50',
+                       lambda i: (ids[i],), args.operaciones)),
+                # Sin EXPLAIN ANALYZE: insertaría; la partición se elige al ejecutar
+                (f'{tabla}: alta',
+                 medir(cursor, *alta(tabla, tabla == 'particionada'), args.operaciones, explicar=False)),
+            ]
+        medidas += [
+            ('plana: email (índice único)',
+             medir(cursor, 'SELECT * FROM plana WHERE email = %s',
+                   lambda i: (f'usuario{ids[i]}@ejemplo.com',), args.operaciones)),
+            ('particionada: email (registro -> id)',
+             medir(cursor, 'SELECT p.* FROM emails e JOIN particionada p ON p.id = e.usuario_id '
+                           'WHERE e.email = %s',
+                   lambda i: (f'usuario{ids[i]}@ejemplo.com',), args.operaciones)),
+            ('particionada: email (índice local)',
+             medir(cursor, 'SELECT * FROM particionada WHERE email = %s',
+                   lambda i: (f'usuario{ids[i]}@ejemplo.com',), args.operaciones)),
+        ]
+
+        print()
+        print(f"   {'Operación':<48} {'ms/op':>10} {'particiones':>12}")
+        for nombre, (milisegundos, particiones) in medidas:
+            print(f"   {nombre:<48} {milisegundos:>10.3f} {'-' if particiones is None else particiones:>12}")
+
+        if not args.conservar:
+            cursor.execute(f'DROP SCHEMA {ESQUEMA} CASCADE')
+    except Exception as e:
+        print(f"❌ Error fatal: {e}")
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
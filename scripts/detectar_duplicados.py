@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Detección de usuarios casi duplicados.
+
+Agrupa a los usuarios en bloques por nombre normalizado, teléfono y parte
+local del email, puntúa solo los pares que comparten bloque en un pool de
+procesos y guarda los grupos de candidatos en la tabla usuarios_duplicados
+(migración 006), reemplazando el resultado de la ejecución anterior.
+
+Consultar el resultado:
+    SELECT * FROM usuarios_duplicados ORDER BY tamano_grupo DESC, grupo;
+
+Uso: python scripts/detectar_duplicados.py [--umbral 0.85] [--procesos 4] [--simular]
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.duplicados import DetectorDuplicados
+
+
+def main():
+    """Función principal del script."""
+    parser = argparse.ArgumentParser(description='Detección de usuarios duplicados por bloqueo y similitud')
+    parser.add_argument('--umbral', type=float, default=0.85,
+                        help='Similitud mínima (0-1) para considerar duplicado un par')
+    parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                        help='Procesos para puntuar pares')
+    parser.add_argument('--maximo-bloque', type=int, default=100,
+                        help='Tamaño a partir del cual un bloque se recorre con vecindad ordenada')
+    parser.add_argument('--ventana', type=int, default=10,
+                        help='Vecinos comparados por usuario en los bloques grandes')
+    parser.add_argument('--simular', action='store_true',
+                        help='Calcular los grupos sin escribir en usuarios_duplicados')
+    args = parser.parse_args()
+
+    try:
+        detector = DetectorDuplicados(args.umbral, args.procesos, args.maximo_bloque, args.ventana)
+        estadisticas = detector.detectar(guardar=not args.simular)
+        print(f"✅ {estadisticas['usuarios_duplicados']:,} usuarios en {estadisticas['grupos']:,} grupos "
+              f"en {estadisticas['segundos']} s")
+    except Exception as e:
+        print(f"❌ Error fatal: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Exportación completa de usuarios a CSV o NDJSON comprimidos.
+
+Divide el espacio de ids en rangos y los vuelca en paralelo con
+COPY (SELECT ...) TO STDOUT sobre varias conexiones que comparten una
+misma instantánea exportada, de modo que el volcado es consistente:
+- Un fichero .gz por rango (usuarios_0001.csv.gz, ...)
+- manifiesto.json con los rangos completados y sus filas
+- --reanudar continúa desde los rangos que faltaban
+
+Los ficheros gzip se pueden concatenar tal cual:
+    cat usuarios_*.csv.gz > usuarios.csv.gz
+
+Uso: python scripts/exportar_usuarios.py exportaciones/hoy [--formato ndjson]
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.exportacion import ExportadorUsuarios
+
+
+def main():
+    """Función principal del script."""
+    parser = argparse.ArgumentParser(
+        description='Exportación paralela de usuarios con COPY TO STDOUT',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('directorio', help='Directorio de salida (ficheros .gz y manifiesto)')
+    parser.add_argument('--formato', choices=ExportadorUsuarios.FORMATOS, default='csv',
+                        help='Formato de los ficheros')
+    parser.add_argument('--trabajadores', type=int, default=4,
+                        help='Conexiones en paralelo')
+    parser.add_argument('--rangos', type=int,
+                        help='Número de rangos de id (por defecto, 4 por trabajador)')
+    parser.add_argument('--reanudar', action='store_true',
+                        help='Continuar una exportación previa en el mismo directorio')
+
+    args = parser.parse_args()
+
+    inicio = time.monotonic()
+    exportadas = [0]
+
+    def progreso(rango):
+        exportadas[0] += rango["filas"] or 0
+        velocidad = exportadas[0] / max(time.monotonic() - inicio, 1e-6)
+        print(f"📤 Rango {rango['numero']}: {rango['filas']:,} filas → {rango['archivo']} "
+              f"({velocidad:,.0f} filas/s)", flush=True)
+
+    try:
+        exportador = ExportadorUsuarios(args.directorio, args.formato, args.trabajadores, args.rangos)
+        exportador.exportar(reanudar=args.reanudar, progreso=progreso)
+    except Exception as e:
+        print(f"❌ Error fatal: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+Importación masiva de usuarios desde CSV o NDJSON.
+
+Carga ficheros grandes directamente en PostgreSQL sin pasar por la API:
+- Validación por columnas de cada bloque de filas
+- COPY FROM STDIN a una tabla de staging UNLOGGED propia de cada
+  ejecución (varias importaciones a la vez no se pisan), bloque a bloque
+- Trabajadores en paralelo sobre particiones del fichero (por bytes)
+- Fusión con users en una única sentencia (INSERT ... ON CONFLICT DO NOTHING)
+  que informa de emails duplicados en el fichero y de los ya existentes
+- Progreso en filas/s
+
+Con más de un trabajador, el CSV no puede tener campos con saltos de línea
+(cada línea del fichero debe ser un registro).
+
+Uso: python scripts/importar_usuarios.py usuarios.csv [--trabajadores 4]
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import sys
+import os
+import io
+import re
+import csv
+import json
+import time
+import queue
+import argparse
+import uuid
+import multiprocessing
+from decimal import Decimal, InvalidOperation
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.connection import DatabaseConnection
+
+
+# Prefijo de las tablas de staging: cada ejecución crea la suya. No puede ser
+# TEMP porque los trabajadores copian desde conexiones distintas
+PREFIJO_STAGING = 'users_importacion'
+
+# Columnas importables, en el orden de la tabla de staging (tras 'linea')
+COLUMNAS = ['nombre', 'apellido', 'email', 'edad', 'telefono', 'ciudad',
+            'genero', 'profesion', 'salario', 'activo']
+
+SQL_STAGING = '''
+    CREATE UNLOGGED TABLE {tabla} (
+        linea bigint,
+        nombre text,
+        apellido text,
+        email text,
+        edad integer,
+        telefono text,
+        ciudad text,
+        genero text,
+        profesion text,
+        salario numeric,
+        activo boolean
+    )
+'''
+
+SQL_COPY = f"COPY {{tabla}} (linea, {', '.join(COLUMNAS)}) FROM STDIN"
+
+# Fusión en una sola sentencia: ante emails repetidos en el fichero gana la
+# primera línea; los emails que ya existen en users no se tocan
+SQL_FUSION = '''
+    WITH candidatos AS (
+        SELECT DISTINCT ON (email) *
+        FROM {tabla}
+        ORDER BY email, linea
+    ), insertados AS (
+        INSERT INTO users (nombre, apellido, email, edad, telefono, ciudad,
+                           genero, profesion, salario, activo)
+        SELECT nombre, apellido, email, edad, telefono, ciudad,
+               genero, profesion, salario, COALESCE(activo, true)
+        FROM candidatos
+        ORDER BY linea
+        ON CONFLICT (email) DO NOTHING
+        RETURNING email
+    ), repetidos AS (
+        SELECT email, array_agg(linea ORDER BY linea) AS lineas
+        FROM {tabla}
+        GROUP BY email
+        HAVING COUNT(*) > 1
+    ), existentes AS (
+        SELECT c.email, c.linea
+        FROM candidatos c
+        WHERE NOT EXISTS (SELECT 1 FROM insertados i WHERE i.email = c.email)
+    )
+    SELECT
+        (SELECT COUNT(*) FROM {tabla}) AS filas,
+        (SELECT COUNT(*) FROM insertados) AS insertados,
+        (SELECT COUNT(*) FROM repetidos) AS total_repetidos,
+        (SELECT COALESCE(json_agg(r), '[]') FROM
+            (SELECT * FROM repetidos ORDER BY email LIMIT %(muestra)s) r) AS repetidos,
+        (SELECT COUNT(*) FROM existentes) AS total_existentes,
+        (SELECT COALESCE(json_agg(e), '[]') FROM
+            (SELECT * FROM existentes ORDER BY linea LIMIT %(muestra)s) e) AS existentes
+'''
+
+# Máximo de ejemplos de rechazos y duplicados que se muestran
+MUESTRA = 20
+
+def tabla_staging():
+    """Nombre de la tabla de staging de una ejecución."""
+    return f"{PREFIJO_STAGING}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+
+
+PATRON_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+# ===== VALIDACIÓN =====
+
+def _texto(valor):
+    """Texto recortado; vacío equivale a NULL."""
+    if valor is None:
+        return None
+    texto = str(valor).strip()
+    return texto or None
+
+
+def _obligatorio(valor):
+    texto = _texto(valor)
+    if texto is None:
+        raise ValueError("es requerido")
+    return texto
+
+
+def _email(valor):
+    texto = _obligatorio(valor)
+    if not PATRON_EMAIL.match(texto):
+        raise ValueError(f"formato inválido '{texto}'")
+    return texto
+
+
+def _edad(valor):
+    texto = _texto(valor)
+    if texto is None:
+        return None
+    try:
+        edad = int(texto)
+    except ValueError:
+        raise ValueError(f"no es un entero '{texto}'")
+    if not 0 <= edad <= 150:
+        raise ValueError(f"fuera de rango ({edad})")
+    return edad
+
+
+def _salario(valor):
+    texto = _texto(valor)
+    if texto is None:
+        return None
+    try:
+        salario = Decimal(texto)
+    except InvalidOperation:
+        raise ValueError(f"no es un número '{texto}'")
+    if not salario.is_finite() or salario < 0:
+        raise ValueError(f"valor inválido ({texto})")
+    return salario
+
+
+def _booleano(valor):
+    if isinstance(valor, bool) or valor is None:
+        return valor
+    texto = str(valor).strip().lower()
+    if texto in ('', 'null'):
+        return None
+    if texto in ('true', 't', '1', 'si', 'sí', 'yes'):
+        return True
+    if texto in ('false', 'f', '0', 'no'):
+        return False
+    raise ValueError(f"no es booleano '{valor}'")
+
+
+CONVERSORES = {
+    'nombre': _obligatorio,
+    'apellido': _texto,
+    'email': _email,
+    'edad': _edad,
+    'telefono': _texto,
+    'ciudad': _texto,
+    'genero': _texto,
+    'profesion': _texto,
+    'salario': _salario,
+    'activo': _booleano,
+}
+
+
+def _convertir_columna(convertir, valores, columna, errores):
+    """Aplicar un conversor a una columna entera.
+
+    La conversión sigue siendo una llamada Python por celda, pero con map el
+    recorrido va en C. Solo si alguna celda falla se repite celda a celda
+    para anotar cada rechazo.
+    """
+    try:
+        return list(map(convertir, valores))
+    except ValueError:
+        pass
+    convertidos = []
+    for indice, valor in enumerate(valores):
+        try:
+            convertidos.append(convertir(valor))
+        except ValueError as e:
+            errores.setdefault(indice, f"{columna}: {e}")
+            convertidos.append(None)
+    return convertidos
+
+
+def validar_bloque(registros):
+    """Validar un bloque de (linea, registro) columna a columna.
+
+    Devuelve (filas, rechazos): filas como tuplas (linea, *COLUMNAS) y
+    rechazos como (linea, motivo).
+    """
+    errores = {}
+    columnas = [
+        _convertir_columna(CONVERSORES[columna], [registro.get(columna) for _, registro in registros],
+                           columna, errores)
+        for columna in COLUMNAS
+    ]
+
+    lineas = [linea for linea, _ in registros]
+    filas = [fila for indice, fila in enumerate(zip(lineas, *columnas)) if indice not in errores]
+    rechazos = [(lineas[indice], motivo) for indice, motivo in sorted(errores.items())]
+    return filas, rechazos
+
+
+# ===== LECTURA Y PARTICIONES =====
+
+def calcular_particiones(ruta, trabajadores, con_cabecera):
+    """Dividir el fichero en rangos de bytes alineados a inicio de línea.
+
+    Devuelve una lista de (inicio, fin, primera_linea).
+    """
+    tamano = os.path.getsize(ruta)
+    with open(ruta, 'rb') as fichero:
+        inicio = len(fichero.readline()) if con_cabecera else 0
+        cortes = [inicio]
+        for i in range(1, trabajadores):
+            objetivo = inicio + (tamano - inicio) * i // trabajadores
+            if objetivo <= cortes[-1]:
+                continue
+            # Avanzar hasta el siguiente inicio de línea
+            fichero.seek(objetivo - 1)
+            fichero.readline()
+            if cortes[-1] < fichero.tell() < tamano:
+                cortes.append(fichero.tell())
+        cortes.append(tamano)
+
+        # Número de la primera línea de cada partición (para informar de errores)
+        particiones = []
+        linea = 2 if con_cabecera else 1
+        for desde, hasta in zip(cortes, cortes[1:]):
+            if desde >= hasta:
+                continue
+            particiones.append((desde, hasta, linea))
+            fichero.seek(desde)
+            linea += fichero.read(hasta - desde).count(b'\n')
+    return particiones
+
+
+def leer_lineas(ruta, inicio, fin, primera_linea):
+    """Generar (linea, texto) de las líneas del rango [inicio, fin)."""
+    with open(ruta, 'rb') as fichero:
+        fichero.seek(inicio)
+        posicion, linea = inicio, primera_linea
+        for bruta in fichero:
+            if posicion >= fin:
+                break
+            posicion += len(bruta)
+            texto = bruta.decode('utf-8').rstrip('\r\n')
+            if texto:
+                yield linea, texto
+            linea += 1
+
+
+def parsear_bloque(lineas, formato, cabecera, delimitador=','):
+    """Convertir líneas de texto en (linea, registro); devuelve (registros, rechazos)."""
+    registros, rechazos = [], []
+    if formato == 'csv':
+        numeros = [numero for numero, _ in lineas]
+        for numero, valores in zip(numeros, csv.reader((texto for _, texto in lineas),
+                                                       delimiter=delimitador)):
+            if len(valores) != len(cabecera):
+                rechazos.append((numero, f"se esperaban {len(cabecera)} columnas y hay {len(valores)}"))
+            else:
+                registros.append((numero, dict(zip(cabecera, valores))))
+    else:
+        for numero, texto in lineas:
+            try:
+                registro = json.loads(texto)
+            except ValueError:
+                rechazos.append((numero, "JSON inválido"))
+                continue
+            if not isinstance(registro, dict):
+                rechazos.append((numero, "se esperaba un objeto JSON"))
+            else:
+                registros.append((numero, registro))
+    return registros, rechazos
+
+
+def _valor_copy(valor):
+    """Serializar un valor al formato de texto de COPY."""
+    if valor is None:
+        return '\\N'
+    if isinstance(valor, bool):
+        return 't' if valor else 'f'
+    texto = str(valor)
+    return (texto.replace('\\', '\\\\').replace('\t', '\\t')
+                 .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def a_buffer_copy(filas):
+    """Construir el buffer de texto que consume COPY FROM STDIN."""
+    return io.StringIO(''.join(
+        '\t'.join(map(_valor_copy, fila)) + '\n' for fila in filas
+    ))
+
+
+# ===== TRABAJADORES =====
+
+def importar_particion(tabla, ruta, formato, cabecera, inicio, fin, primera_linea,
+                       tamano_bloque, delimitador=',', progreso=None):
+    """Leer, validar y copiar a la tabla de staging una partición del fichero.
+
+    Cada bloque se confirma por separado. Devuelve un diccionario con las
+    filas copiadas, el total de rechazos y una muestra de ellos.
+    """
+    conn = DatabaseConnection().obtener_conexion()
+    if not conn:
+        raise Exception("Error de conexión a la base de datos")
+
+    resultado = {"copiadas": 0, "rechazadas": 0, "rechazos": []}
+    try:
+        cursor = conn.cursor()
+        lineas = leer_lineas(ruta, inicio, fin, primera_linea)
+        while True:
+            bloque = [linea for _, linea in zip(range(tamano_bloque), lineas)]
+            if not bloque:
+                break
+
+            registros, rechazos = parsear_bloque(bloque, formato, cabecera, delimitador)
+            filas, rechazos_validacion = validar_bloque(registros)
+            rechazos += rechazos_validacion
+
+            if filas:
+                cursor.copy_expert(SQL_COPY.format(tabla=tabla), a_buffer_copy(filas))
+                conn.commit()
+
+            resultado["copiadas"] += len(filas)
+            resultado["rechazadas"] += len(rechazos)
+            hueco = MUESTRA - len(resultado["rechazos"])
+            if hueco > 0:
+                resultado["rechazos"] += sorted(rechazos)[:hueco]
+            if progreso:
+                progreso(len(bloque))
+        return resultado
+    finally:
+        conn.close()
+
+
+_cola_progreso = None
+
+
+def _iniciar_trabajador(cola):
+    """Inicializador del pool: cada proceso recibe la cola de progreso."""
+    global _cola_progreso
+    _cola_progreso = cola
+
+
+def _trabajar(argumentos):
+    return importar_particion(*argumentos, progreso=_cola_progreso.put)
+
+
+class Progreso:
+    """Indicador de filas leídas y velocidad en filas/s."""
+
+    def __init__(self, intervalo=0.5):
+        self.filas = 0
+        self.inicio = time.monotonic()
+        self.intervalo = intervalo
+        self.ultimo = 0
+
+    def sumar(self, filas):
+        self.filas += filas
+        if time.monotonic() - self.ultimo >= self.intervalo:
+            self.mostrar()
+
+    def velocidad(self):
+        transcurrido = time.monotonic() - self.inicio
+        return self.filas / transcurrido if transcurrido > 0 else 0
+
+    def mostrar(self, final=False):
+        self.ultimo = time.monotonic()
+        print(f"\r📥 {self.filas:,} filas leídas · {self.velocidad():,.0f} filas/s",
+              end='\n' if final else '', flush=True)
+
+
+# ===== IMPORTACIÓN =====
+
+class ImportadorUsuarios:
+    """Orquesta la carga a staging (en paralelo) y la fusión con users."""
+
+    def __init__(self, ruta, formato=None, trabajadores=1, tamano_bloque=50000, delimitador=','):
+        self.ruta = Path(ruta)
+        self.formato = formato or ('ndjson' if self.ruta.suffix.lower() in ('.ndjson', '.jsonl') else 'csv')
+        self.trabajadores = max(1, trabajadores)
+        self.tamano_bloque = tamano_bloque
+        self.delimitador = delimitador
+        self.tabla = tabla_staging()
+        self.db = DatabaseConnection()
+        # La fusión con users no reparte filas entre shards
+        self.db.exigir_base_unica("La importación")
+
+    def leer_cabecera(self):
+        """Columnas del CSV según su primera línea (None para NDJSON)."""
+        if self.formato != 'csv':
+            return None
+        with open(self.ruta, encoding='utf-8', newline='') as fichero:
+            cabecera = [c.strip() for c in next(csv.reader(fichero, delimiter=self.delimitador))]
+        faltantes = [c for c in ('nombre', 'email') if c not in cabecera]
+        if faltantes:
+            raise ValueError(f"La cabecera del CSV no incluye: {', '.join(faltantes)}")
+        return cabecera
+
+    def _ejecutar(self, sql, parametros=None, obtener=False):
+        conn = self.db.obtener_conexion()
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, parametros)
+            fila = cursor.fetchone() if obtener else None
+            conn.commit()
+            return fila
+        finally:
+            conn.close()
+
+    def cargar_staging(self, cabecera):
+        """Copiar el fichero a staging; devuelve el resumen de todas las particiones."""
+        particiones = calcular_particiones(self.ruta, self.trabajadores, self.formato == 'csv')
+        argumentos = [(self.tabla, str(self.ruta), self.formato, cabecera, inicio, fin, linea,
+                       self.tamano_bloque, self.delimitador)
+                      for inicio, fin, linea in particiones]
+        progreso = Progreso()
+
+        if len(argumentos) <= 1:
+            resultados = [importar_particion(*a, progreso=progreso.sumar) for a in argumentos]
+        else:
+            cola = multiprocessing.Queue()
+            with ProcessPoolExecutor(max_workers=len(argumentos), initializer=_iniciar_trabajador,
+                                     initargs=(cola,)) as pool:
+                futuros = [pool.submit(_trabajar, a) for a in argumentos]
+                while not all(f.done() for f in futuros) or not cola.empty():
+                    try:
+                        progreso.sumar(cola.get(timeout=0.2))
+                    except queue.Empty:
+                        pass
+                resultados = [f.result() for f in futuros]
+        progreso.mostrar(final=True)
+
+        return {
+            "copiadas": sum(r["copiadas"] for r in resultados),
+            "rechazadas": sum(r["rechazadas"] for r in resultados),
+            "rechazos": sorted(r for resultado in resultados for r in resultado["rechazos"])[:MUESTRA],
+            "filas_por_segundo": progreso.velocidad(),
+        }
+
+    def fusionar(self):
+        """Fusionar staging con users en una sola sentencia."""
+        fila = self._ejecutar(SQL_FUSION.format(tabla=self.tabla), {"muestra": MUESTRA}, obtener=True)
+        filas, insertados, total_repetidos, repetidos, total_existentes, existentes = fila
+        return {
+            "filas": filas,
+            "insertados": insertados,
+            "total_repetidos": total_repetidos,
+            "repetidos": repetidos,
+            "total_existentes": total_existentes,
+            "existentes": existentes,
+        }
+
+    def importar(self):
+        print(f"📂 Importando {self.ruta} ({self.formato}, {self.trabajadores} trabajador(es))")
+        cabecera = self.leer_cabecera()
+
+        self._ejecutar(SQL_STAGING.format(tabla=self.tabla))
+        try:
+            carga = self.cargar_staging(cabecera)
+            print(f"✅ Staging: {carga['copiadas']:,} filas copiadas, {carga['rechazadas']:,} rechazadas")
+            for linea, motivo in carga["rechazos"]:
+                print(f"   ⚠️  Línea {linea}: {motivo}")
+
+            self._ejecutar(f"ANALYZE {self.tabla}")
+            fusion = self.fusionar()
+        finally:
+            self._ejecutar(f"DROP TABLE IF EXISTS {self.tabla}")
+        print(f"✅ Fusión: {fusion['insertados']:,} usuarios insertados")
+        if fusion["total_repetidos"]:
+            print(f"⚠️  {fusion['total_repetidos']:,} email(s) repetidos en el fichero (se usa la primera línea):")
+            for repetido in fusion["repetidos"]:
+                print(f"   - {repetido['email']} (líneas {repetido['lineas']})")
+        if fusion["total_existentes"]:
+            print(f"⚠️  {fusion['total_existentes']:,} email(s) ya existían en users y no se modificaron:")
+            for existente in fusion["existentes"]:
+                print(f"   - {existente['email']} (línea {existente['linea']})")
+
+        return dict(carga, **fusion)
+
+
+def main():
+    """Función principal del script."""
+    parser = argparse.ArgumentParser(
+        description='Importación masiva de usuarios desde CSV o NDJSON',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('archivo', help='Fichero CSV (con cabecera) o NDJSON')
+    parser.add_argument('--formato', choices=['csv', 'ndjson'],
+                        help='Formato del fichero (por defecto, según la extensión)')
+    parser.add_argument('--trabajadores', type=int, default=1,
+                        help='Procesos en paralelo sobre particiones del fichero')
+    parser.add_argument('--tamano-bloque', type=int, default=50000,
+                        help='Filas por bloque de COPY')
+    parser.add_argument('--delimitador', default=',', help='Delimitador del CSV')
+
+    args = parser.parse_args()
+
+    try:
+        importador = ImportadorUsuarios(args.archivo, args.formato, args.trabajadores,
+                                        args.tamano_bloque, args.delimitador)
+        importador.importar()
+    except Exception as e:
+        print(f"❌ Error fatal: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
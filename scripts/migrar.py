@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Aplicación de migraciones SQL de la base de datos.
+
+Ejecuta en orden los ficheros database/migraciones/NNN_descripcion.sql que
+aún no se hayan aplicado, cada uno en su propia transacción, y los anota en
+la tabla schema_migraciones.
+
+Uso: python scripts/migrar.py [--estado]
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.connection import DatabaseConnection
+
+
+DIRECTORIO_MIGRACIONES = Path(__file__).parent.parent / 'database' / 'migraciones'
+
+SQL_TABLA_CONTROL = '''
+    CREATE TABLE IF NOT EXISTS schema_migraciones (
+        version text PRIMARY KEY,
+        aplicada timestamptz NOT NULL DEFAULT now()
+    )
+'''
+
+
+def listar_migraciones(directorio=DIRECTORIO_MIGRACIONES):
+    """Ficheros de migración ordenados por su prefijo numérico."""
+    return sorted(directorio.glob('[0-9][0-9][0-9]_*.sql'))
+
+
+class Migrador:
+    """Aplica las migraciones pendientes en orden."""
+
+    def __init__(self, directorio=DIRECTORIO_MIGRACIONES, db=None):
+        self.directorio = Path(directorio)
+        self.db = db or DatabaseConnection()
+
+    def _conectar(self):
+        conn = self.db.obtener_conexion()
+        if not conn:
+            raise Exception("Error de conexión a la base de datos")
+        return conn
+
+    def aplicadas(self, conn):
+        """Versiones ya aplicadas (crea la tabla de control si no existe)."""
+        cursor = conn.cursor()
+        cursor.execute(SQL_TABLA_CONTROL)
+        cursor.execute('SELECT version FROM schema_migraciones')
+        versiones = {fila[0] for fila in cursor.fetchall()}
+        conn.commit()
+        return versiones
+
+    def pendientes(self, conn):
+        aplicadas = self.aplicadas(conn)
+        return [ruta for ruta in listar_migraciones(self.directorio) if ruta.stem not in aplicadas]
+
+    def migrar(self):
+        """Aplicar las migraciones pendientes; devuelve las versiones aplicadas."""
+        conn = self._conectar()
+        aplicadas = []
+        try:
+            for ruta in self.pendientes(conn):
+                print(f"▶️  Aplicando {ruta.name}...")
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(ruta.read_text(encoding='utf-8'))
+                    cursor.execute('INSERT INTO schema_migraciones (version) VALUES (%s)', (ruta.stem,))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    print(f"❌ Error en {ruta.name}: se deshace la migración")
+                    raise
+                aplicadas.append(ruta.stem)
+                print(f"✅ {ruta.name} aplicada")
+        finally:
+            conn.close()
+
+        if not aplicadas:
+            print("✅ La base de datos ya está al día")
+        return aplicadas
+
+    def estado(self):
+        """Mostrar qué migraciones están aplicadas y cuáles pendientes."""
+        conn = self._conectar()
+        try:
+            aplicadas = self.aplicadas(conn)
+        finally:
+            conn.close()
+        for ruta in listar_migraciones(self.directorio):
+            marca = '✅' if ruta.stem in aplicadas else '⏳'
+            print(f"{marca} {ruta.name}")
+
+
+def main():
+    """Función principal del script."""
+    parser = argparse.ArgumentParser(description='Migraciones SQL de la base de datos')
+    parser.add_argument('--estado', action='store_true',
+                        help='Solo mostrar migraciones aplicadas y pendientes')
+    args = parser.parse_args()
+
+    try:
+        migrador = Migrador()
+        if args.estado:
+            migrador.estado()
+        else:
+            migrador.migrar()
+    except Exception as e:
+        print(f"❌ Error fatal: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Conversión de users a una tabla particionada por HASH (id).
+
+Sin --ejecutar solo muestra el plan (no cambia nada). Con --ejecutar
+convierte la tabla en una transacción con users bloqueada: mueve la
+original al esquema respaldo, crea --particiones particiones, copia las
+filas, vuelve a aplicar las migraciones sobre la tabla nueva y añade el
+registro de emails (users_emails). Requiere PostgreSQL 13+.
+
+Después hay que arrancar la API con USERS_PARTICIONADA=true: el upsert por
+email deja de usar ON CONFLICT (email), que necesita un índice único global.
+
+--auditar muestra cuántas particiones recorre la consulta de cada método.
+
+Uso: python scripts/particionar_usuarios.py [--particiones 16] [--ejecutar] [--conservar-anterior] [--auditar]
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.particionado import ParticionadorUsuarios
+
+
+def mostrar_auditoria(particionador):
+    """Particiones recorridas por método frente a las esperadas."""
+    for nombre, (recorridas, esperadas) in particionador.auditar().items():
+        marca = '✅' if recorridas <= esperadas else '⚠️ '
+        print(f"   {marca} {nombre:<40} {recorridas:>3} particiones (esperadas: {esperadas})")
+
+
+def main():
+    """Función principal del script."""
+    parser = argparse.ArgumentParser(description='Particionado de users por hash de id')
+    parser.add_argument('--particiones', type=int, default=16, help='Número de particiones hash')
+    parser.add_argument('--ejecutar', action='store_true', help='Aplicar la conversión (si no, solo el plan)')
+    parser.add_argument('--conservar-anterior', action='store_true',
+                        help='Dejar la tabla original en respaldo.users')
+    parser.add_argument('--auditar', action='store_true',
+                        help='Solo auditar la poda de particiones de la tabla ya convertida')
+    args = parser.parse_args()
+
+    try:
+        particionador = ParticionadorUsuarios(args.particiones)
+        if args.auditar:
+            mostrar_auditoria(particionador)
+            return
+        if not args.ejecutar:
+            print("🔎 Plan de la conversión (no se ejecuta; usa --ejecutar)")
+        particionador.convertir(args.ejecutar, args.conservar_anterior)
+        if args.ejecutar:
+            print("🔎 Poda de particiones por método:")
+            mostrar_auditoria(particionador)
+    except Exception as e:
+        print(f"❌ Error fatal: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
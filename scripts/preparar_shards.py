@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Preparación de los shards de usuarios (DB_SHARDS).
+
+Para cada shard aplica las migraciones pendientes y el registro de emails
+(users_emails, database/migraciones/opcionales) y ajusta la secuencia de
+users.id para que solo reparta ids de su resto: el shard k de N genera
+k, k + N, k + 2N... (INCREMENT BY N), a partir del mayor id que ya haya en
+users, users_archivo o la propia secuencia. Así el id de un usuario dice en
+qué shard está sin consultar ningún directorio.
+
+Liga además en directorio_emails (migración 008, en la base DB_*) cada
+email al shard que lo guarda. Avisa de las filas cuyo id no corresponde a
+su shard (datos de antes del reparto) y de los emails repetidos en varios
+shards; corregirlos queda fuera de este script.
+
+Ejecutar antes de abrir el tráfico: una alta durante el ajuste podría
+recibir un id con el incremento anterior.
+
+Uso: DB_SHARDS=5432,5433,5434 python scripts/preparar_shards.py [--sin-migrar]
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.connection import DatabaseConnection
+from migrar import Migrador, DIRECTORIO_MIGRACIONES
+
+MIGRACION_DIRECTORIO = DIRECTORIO_MIGRACIONES / '008_directorio_emails.sql'
+MIGRACION_REGISTRO = DIRECTORIO_MIGRACIONES / 'opcionales' / 'registro_emails.sql'
+
+
+def siguiente_id(maximo, shard, numero_shards):
+    """Menor id mayor que 'maximo' que pertenece al shard."""
+    base = maximo + 1
+    return base + (shard - base) % numero_shards
+
+
+def preparar_secuencia(conn, shard, numero_shards):
+    """Ajustar la secuencia de users.id del shard; devuelve (siguiente id, filas fuera de su shard)."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_get_serial_sequence('users', 'id')")
+    secuencia = cursor.fetchone()[0]
+    if not secuencia:
+        raise Exception(f"users.id del shard {shard} no tiene secuencia")
+
+    cursor.execute(f'''
+        SELECT GREATEST((SELECT COALESCE(MAX(id), 0) FROM users),
+                        (SELECT COALESCE(MAX(id), 0) FROM users_archivo),
+                        (SELECT last_value FROM {secuencia}))
+    ''')
+    siguiente = siguiente_id(cursor.fetchone()[0], shard, numero_shards)
+    cursor.execute(f'ALTER SEQUENCE {secuencia} INCREMENT BY {int(numero_shards)}')
+    # is_called = false: el próximo nextval devuelve exactamente 'siguiente'
+    cursor.execute('SELECT setval(%s, %s, false)', (secuencia, siguiente))
+    cursor.execute('SELECT COUNT(*) FROM users WHERE id %% %s <> %s', (numero_shards, shard))
+    fuera = cursor.fetchone()[0]
+    conn.commit()
+    return siguiente, fuera
+
+
+def registrar_emails(conn, directorio, shard, tamano_lote=10000):
+    """Ligar los emails del shard en directorio_emails; devuelve (ligados, ligados a otro shard)."""
+    cursor = conn.cursor()
+    cursor.execute('SELECT email FROM users_emails ORDER BY email')
+    emails = [fila[0] for fila in cursor.fetchall()]
+
+    cursor_directorio = directorio.cursor()
+    repetidos = 0
+    for inicio in range(0, len(emails), tamano_lote):
+        lote = emails[inicio:inicio + tamano_lote]
+        cursor_directorio.execute('''
+            INSERT INTO directorio_emails (email, shard)
+            SELECT email, %s FROM unnest(%s::text[]) AS email
+            ON CONFLICT (email) DO NOTHING
+        ''', (shard, lote))
+        cursor_directorio.execute('SELECT COUNT(*) FROM directorio_emails WHERE email = ANY(%s) AND shard <> %s',
+                                  (lote, shard))
+        repetidos += cursor_directorio.fetchone()[0]
+        directorio.commit()
+    return len(emails), repetidos
+
+
+def main():
+    """Función principal del script."""
+    parser = argparse.ArgumentParser(description='Migraciones y secuencias de id de cada shard')
+    parser.add_argument('--sin-migrar', action='store_true', help='Solo ajustar las secuencias')
+    args = parser.parse_args()
+
+    try:
+        db = DatabaseConnection()
+        if not db.shards:
+            raise Exception("DB_SHARDS no está definida")
+
+        # La base DB_* guarda el directorio de emails; puede no ser un shard,
+        # así que solo se le aplica la migración del directorio (idempotente)
+        print(f"📒 Directorio de emails ({db.config['host']}:{db.config['port']})")
+        directorio = db.obtener_conexion()
+        if not directorio:
+            raise Exception("Error de conexión a la base del directorio")
+        directorio.cursor().execute(MIGRACION_DIRECTORIO.read_text(encoding='utf-8'))
+        directorio.commit()
+
+        for shard in range(db.numero_shards):
+            db_shard = db.de_shard(shard)
+            print(f"🧩 Shard {shard} ({db_shard.config['host']}:{db_shard.config['port']})")
+            if not args.sin_migrar:
+                Migrador(db=db_shard).migrar()
+
+            conn = db_shard.obtener_conexion()
+            if not conn:
+                raise Exception(f"Error de conexión al shard {shard}")
+            try:
+                if not args.sin_migrar:
+                    conn.cursor().execute(MIGRACION_REGISTRO.read_text(encoding='utf-8'))
+                    conn.commit()
+                siguiente, fuera = preparar_secuencia(conn, shard, db.numero_shards)
+                emails, repetidos = registrar_emails(conn, directorio, shard)
+            except Exception:
+                conn.rollback()
+                directorio.rollback()
+                raise
+            finally:
+                conn.close()
+
+            print(f"✅ Próximo id {siguiente} (incremento {db.numero_shards}), {emails} email(s) ligados")
+            if fuera:
+                print(f"⚠️  {fuera} usuario(s) con id de otro shard: no se encontrarán por id")
+            if repetidos:
+                print(f"⚠️  {repetidos} email(s) ya ligados a otro shard: están repetidos entre shards")
+        directorio.close()
+    except Exception as e:
+        print(f"❌ Error fatal: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
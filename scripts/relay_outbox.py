@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Relay de la outbox transaccional de usuarios.
+
+Entrega a los webhooks configurados los eventos que los triggers de la
+migración 003 dejan en outbox_usuarios dentro de la misma transacción que
+cada escritura:
+- Lotes recogidos con FOR UPDATE SKIP LOCKED (se pueden lanzar varios relays)
+- Envío en paralelo a todos los webhooks, un POST por lote y webhook
+- Reintentos por webhook con espera exponencial: un webhook caído no repite
+  eventos a los demás; agotados, el evento queda 'fallido' para ese webhook
+- --estado muestra los eventos por estado y --reintentar-fallidos los
+  devuelve a pendientes solo hacia los webhooks que no los recibieron
+
+La entrega es al menos una vez: los receptores deduplican por el 'id' del evento.
+
+Uso: python scripts/relay_outbox.py --webhook http://localhost:9000/eventos [--una-vez]
+     python scripts/relay_outbox.py --estado | --reintentar-fallidos
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.outbox import RelayOutbox
+
+
+def main():
+    """Función principal del script."""
+    parser = argparse.ArgumentParser(description='Relay de la outbox de usuarios hacia webhooks')
+    parser.add_argument('--webhook', action='append',
+                        help='URL destino (repetible; por defecto OUTBOX_WEBHOOKS)')
+    parser.add_argument('--lote', type=int, help='Eventos por lote (por defecto OUTBOX_LOTE)')
+    parser.add_argument('--una-vez', action='store_true',
+                        help='Vaciar la outbox y terminar en lugar de quedarse escuchando')
+    parser.add_argument('--estado', action='store_true', help='Mostrar los eventos por estado y terminar')
+    parser.add_argument('--reintentar-fallidos', action='store_true',
+                        help='Devolver a pendientes los eventos fallidos y terminar')
+    args = parser.parse_args()
+
+    try:
+        relay = RelayOutbox(webhooks=args.webhook, tamano_lote=args.lote)
+        if args.reintentar_fallidos:
+            print(f"🔁 {relay.reintentar_fallidos()} eventos fallidos devueltos a pendientes")
+            return
+        if args.estado:
+            resumen = relay.resumen()
+            for estado, total in sorted(resumen.items()):
+                print(f"📊 {estado}: {total}")
+            if not resumen:
+                print("📊 Outbox vacía")
+            return
+
+        if args.una_vez:
+            total = 0
+            while True:
+                tratados = relay.procesar_lote()
+                total += tratados
+                if tratados < relay.tamano_lote:
+                    break
+            print(f"✅ {total} eventos tratados")
+            return
+
+        relay.iniciar()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("\n⏹️  Deteniendo relay...")
+            relay.detener()
+    except Exception as e:
+        print(f"❌ Error fatal: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para las series de altas de usuarios.
+
+Prueba las funcionalidades de UserModel.obtener_altas y del endpoint
+GET /usuarios/altas incluyendo:
+- Agregación por periodo sobre la tabla resumen en una sola sentencia
+- Filtros de rango y ciudad, y desglose por ciudad
+- Migración con trigger de sentencia e índice BRIN
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+from datetime import date
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from api import app, user_controller
+from database.connection import DatabaseConnection
+from database.instrumentacion import contador_consultas
+from models.user_model import UserModel
+
+
+class TestAltasModelo(unittest.TestCase):
+    """Pruebas del SQL de UserModel.obtener_altas."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def test_series_por_mes_y_ciudad(self):
+        """Prueba el desglose por ciudad con rango de fechas."""
+        self.mock_cursor.fetchall.return_value = [
+            {'periodo': date(2026, 1, 1), 'ciudad': 'Madrid', 'altas': 4},
+            {'periodo': date(2026, 2, 1), 'ciudad': 'Madrid', 'altas': 6},
+        ]
+
+        with contador_consultas.medir() as sentencias:
+            resultado = UserModel().obtener_altas('mes', date(2026, 1, 1), date(2026, 12, 31),
+                                                  ciudad='Madrid', por_ciudad=True)
+
+        self.assertEqual(len(sentencias), 1)
+        self.assertIn('FROM usuarios_altas_diarias', sentencias[0])
+        self.assertIn('GROUP BY 1, ciudad', sentencias[0])
+        self.assertEqual(self.mock_cursor.execute.call_args[0][1],
+                         ['month', date(2026, 1, 1), date(2026, 12, 31), 'Madrid'])
+        self.assertEqual(resultado['series'][0]['periodo'], '2026-01-01')
+        self.assertEqual(resultado['total_altas'], 10)
+
+    def test_sin_filtros(self):
+        """Prueba la serie total sin WHERE ni columna de ciudad."""
+        self.mock_cursor.fetchall.return_value = []
+
+        UserModel().obtener_altas('semana')
+
+        sql, parametros = self.mock_cursor.execute.call_args[0]
+        self.assertNotIn('WHERE', sql)
+        self.assertNotIn('ciudad', sql)
+        self.assertEqual(parametros, ['week'])
+
+    def test_migracion_resumen_y_brin(self):
+        """Prueba que la migración mantiene el resumen por trigger y crea el BRIN."""
+        ruta = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'database', 'migraciones', '005_altas_usuarios.sql')
+        with open(ruta, encoding='utf-8') as fichero:
+            sql = fichero.read()
+
+        self.assertEqual(sql.count('FOR EACH STATEMENT'), 3)
+        self.assertIn('USING brin (fecha_registro)', sql)
+
+
+class TestEndpointAltas(unittest.TestCase):
+    """Pruebas del endpoint GET /usuarios/altas."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_parametros(self):
+        """Prueba el paso de periodo, rango y desglose al modelo."""
+        with patch.object(user_controller.user_model, 'obtener_altas',
+                          return_value={'series': [], 'total_altas': 0}) as mock_altas:
+            response = self.client.get('/usuarios/altas?periodo=mes&desde=2024-01-01&por_ciudad=true')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['datos']['periodo'], 'mes')
+        mock_altas.assert_called_once_with('mes', date(2024, 1, 1), None, ciudad=None, por_ciudad=True)
+
+    def test_parametros_invalidos(self):
+        """Prueba periodo y fechas inválidos."""
+        self.assertEqual(self.client.get('/usuarios/altas?periodo=hora').status_code, 400)
+        self.assertEqual(self.client.get('/usuarios/altas?desde=ayer').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para el archivo en frío de usuarios inactivos.
+
+Prueba las funcionalidades de models.archivo.ArchivadorUsuarios y de la
+lectura y restauración de archivados en UserModel incluyendo:
+- Traslado por lotes con pausa y una transacción por lote
+- Lectura por id que cae al archivo en una sola sentencia
+- Restauración en una sola sentencia y endpoint POST /usuarios/<id>/restaurar
+- Borrado de archivados y 409 al modificarlos sin restaurar
+- Sin ARCHIVO_USUARIOS, lecturas y bajas solo sobre users
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from api import app, user_controller
+from database.connection import DatabaseConnection
+from database.instrumentacion import contador_consultas
+from models.archivo import ArchivadorUsuarios
+from models.indice_busqueda import IndiceBusqueda
+from models.user_model import UserModel
+
+
+class BaseConexionSimulada(unittest.TestCase):
+    """Conexión real de DatabaseConnection sobre un psycopg2.connect simulado."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+        self.parches = [
+            patch.dict(os.environ, {'ARCHIVO_USUARIOS': 'true'}),
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+
+class TestArchivador(BaseConexionSimulada):
+    """Pruebas del traslado por lotes."""
+
+    def test_lotes_hasta_agotar(self):
+        """Prueba que se para con el primer lote incompleto y se pausa entre lotes."""
+        self.mock_cursor.fetchall.side_effect = [[(1,), (2,)], [(3,), (4,)], [(5,)]]
+        archivador = ArchivadorUsuarios(dias=90, lote=2, pausa=0.25)
+
+        with patch('models.archivo.time.sleep') as mock_sleep, \
+             contador_consultas.medir() as sentencias:
+            total = archivador.archivar(progreso=lambda mensaje: None)
+
+        self.assertEqual(total, 5)
+        self.assertEqual(len(sentencias), 3)
+        self.assertEqual(self.mock_conn.commit.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        mock_sleep.assert_called_with(0.25)
+        self.assertIn("SET LOCAL usuarios.archivo = 'on'", sentencias[0])
+        self.assertIn('FOR UPDATE SKIP LOCKED', sentencias[0])
+        self.assertEqual(self.mock_cursor.execute.call_args[0][1], (90, 2))
+
+    def test_maximo_lotes_y_error(self):
+        """Prueba el límite de lotes y el rollback de un lote fallido."""
+        self.mock_cursor.fetchall.return_value = [(1,)]
+        archivador = ArchivadorUsuarios(dias=90, lote=1, pausa=0)
+        with patch('models.archivo.time.sleep'):
+            self.assertEqual(archivador.archivar(maximo_lotes=2, progreso=lambda mensaje: None), 2)
+
+        self.mock_cursor.execute.side_effect = Exception("canceling statement due to lock timeout")
+        with self.assertRaises(Exception):
+            archivador.archivar(progreso=lambda mensaje: None)
+        self.mock_conn.rollback.assert_called_once()
+
+    def test_archivo_desactivado(self):
+        """Prueba que sin ARCHIVO_USUARIOS el archivador no arranca."""
+        with patch.dict(os.environ, {'ARCHIVO_USUARIOS': 'false'}), self.assertRaises(ValueError):
+            ArchivadorUsuarios()
+
+
+class TestLecturaYRestauracion(BaseConexionSimulada):
+    """Pruebas de la caída al archivo y de la restauración."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        super().setUp()
+        self.modelo = UserModel()
+        self.fila = {'id': 4, 'nombre': 'Eva', 'email': 'eva@ejemplo.com',
+                     'fecha_registro': datetime(2020, 1, 1), 'fecha_actualizacion': datetime(2021, 1, 1)}
+
+    def test_obtener_por_id_archivado(self):
+        """Prueba una sola sentencia sobre users y users_archivo y la marca 'archivado'."""
+        self.mock_cursor.fetchone.return_value = dict(self.fila, archivado=datetime(2026, 10, 1))
+
+        with contador_consultas.medir() as sentencias:
+            usuario = metodo_original(UserModel, 'obtener_por_id')(self.modelo, 4)
+
+        self.assertEqual(len(sentencias), 1)
+        self.assertIn('UNION ALL', sentencias[0])
+        self.assertIn('FROM users_archivo WHERE id = %s', sentencias[0])
+        self.assertEqual(usuario['archivado'], '2026-10-01T00:00:00')
+
+        self.mock_cursor.fetchone.return_value = dict(self.fila, archivado=None)
+        usuario = metodo_original(UserModel, 'obtener_por_id')(self.modelo, 4)
+        self.assertNotIn('archivado', usuario)
+
+    def test_fallo_de_replica_consulta_archivo(self):
+        """Prueba que un id que no está en la réplica se busca en PostgreSQL."""
+        self.modelo.replica = MagicMock()
+        self.modelo.replica.obtener_por_id.return_value = None
+        self.mock_cursor.fetchone.return_value = dict(self.fila, archivado=datetime(2026, 10, 1))
+
+        usuario = metodo_original(UserModel, 'obtener_por_id')(self.modelo, 4)
+
+        self.assertEqual(usuario['id'], 4)
+        self.mock_cursor.execute.assert_called_once()
+
+    def test_restaurar(self):
+        """Prueba la restauración en una sentencia, sin lápida, y su reflejo en el índice."""
+        self.modelo.indice_busqueda = IndiceBusqueda(intervalo_recarga=3600)
+        self.mock_cursor.fetchone.return_value = dict(self.fila)
+
+        with patch('builtins.print'), contador_consultas.medir() as sentencias:
+            usuario = self.modelo.restaurar(4)
+
+        self.assertEqual(len(sentencias), 1)
+        self.assertIn('DELETE FROM users_archivo WHERE id = %s', sentencias[0])
+        self.assertIn('DELETE FROM users_eliminados', sentencias[0])
+        self.assertEqual(usuario['fecha_registro'], '2020-01-01T00:00:00')
+        self.assertEqual(self.modelo.indice_busqueda.buscar('eva'), ([4], 1))
+        self.mock_conn.commit.assert_called_once()
+
+        self.mock_cursor.fetchone.return_value = None
+        self.assertIsNone(self.modelo.restaurar(5))
+
+    def test_eliminar_archivado(self):
+        """Prueba que el borrado individual y por lote alcanza también al archivo."""
+        self.mock_cursor.fetchone.return_value = {'id': 4}
+
+        with patch('builtins.print'), contador_consultas.medir() as sentencias:
+            metodo_original(UserModel, 'eliminar')(self.modelo, 4, minimo=True)
+            self.mock_cursor.fetchall.return_value = [(4,)]
+            resultados = self.modelo.eliminar_lote([4, 5])
+
+        self.assertEqual(len(sentencias), 2)
+        for sentencia in sentencias:
+            self.assertIn('DELETE FROM users_archivo WHERE id', sentencia)
+        self.assertEqual(resultados, {4: 'eliminado', 5: 'no_encontrado'})
+
+    def test_modificar_archivado(self):
+        """Prueba que modificar un archivado indica cómo restaurarlo en vez de 'no encontrado'."""
+        self.mock_cursor.fetchone.side_effect = [None, (1,)]
+
+        with self.assertRaises(ValueError) as contexto:
+            metodo_original(UserModel, 'actualizar_parcial')(self.modelo, 4, {'ciudad': 'Vigo'})
+
+        self.assertIn('/usuarios/4/restaurar', str(contexto.exception))
+        self.assertIn('FROM users_archivo WHERE id = %s', self.mock_cursor.execute.call_args[0][0])
+
+    def test_sin_archivo_solo_users(self):
+        """Prueba que sin ARCHIVO_USUARIOS ninguna sentencia toca users_archivo."""
+        with patch.dict(os.environ, {'ARCHIVO_USUARIOS': 'false'}):
+            modelo = UserModel()
+        self.mock_cursor.fetchone.side_effect = [dict(self.fila), (1,), {'id': 4}, None]
+        self.mock_cursor.fetchall.return_value = [(4,)]
+
+        with patch('builtins.print'), contador_consultas.medir() as sentencias:
+            self.assertNotIn('archivado', metodo_original(UserModel, 'obtener_por_id')(modelo, 4))
+            self.assertTrue(modelo.existe(4))
+            metodo_original(UserModel, 'eliminar')(modelo, 4, minimo=True)
+            modelo.eliminar_lote([4])
+            with self.assertRaises(ValueError) as contexto:
+                metodo_original(UserModel, 'actualizar_parcial')(modelo, 5, {'ciudad': 'Vigo'})
+
+        self.assertEqual(str(contexto.exception), "Usuario no encontrado")
+        self.assertEqual(len(sentencias), 5)
+        for sentencia in sentencias:
+            self.assertNotIn('users_archivo', sentencia)
+
+
+class TestEndpointRestaurar(unittest.TestCase):
+    """Pruebas del endpoint POST /usuarios/<id>/restaurar."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_restaurar(self):
+        """Prueba 200 con el usuario, 404 si no está archivado y 400 con id inválido."""
+        with patch.object(user_controller.user_model, 'archivo', True), \
+             patch.object(user_controller.user_model, 'restaurar', side_effect=[{'id': 4}, None]):
+            self.assertEqual(self.client.post('/usuarios/4/restaurar').status_code, 200)
+            self.assertEqual(self.client.post('/usuarios/5/restaurar').status_code, 404)
+        self.assertEqual(self.client.post('/usuarios/abc/restaurar').status_code, 400)
+
+    def test_restaurar_sin_archivo(self):
+        """Prueba 501 si el archivo no está activado."""
+        with patch.object(user_controller.user_model, 'archivo', False), \
+             patch.object(user_controller.user_model, 'restaurar') as mock_restaurar:
+            self.assertEqual(self.client.post('/usuarios/4/restaurar').status_code, 501)
+        mock_restaurar.assert_not_called()
+
+    def test_modificar_archivado_409(self):
+        """Prueba el estado de PUT/PATCH: 409 si está archivado, 404 si no existe."""
+        archivado = ValueError("Usuario archivado: restáuralo con POST /usuarios/4/restaurar")
+
+        self.assertEqual(user_controller._estado_error(archivado), 409)
+        self.assertEqual(user_controller._estado_error(ValueError("Usuario no encontrado")), 404)
+        self.assertEqual(user_controller._estado_error(ValueError("El email ya existe")), 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
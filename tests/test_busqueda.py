@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para la búsqueda de usuarios.
+
+Prueba las funcionalidades de models.indice_busqueda.IndiceBusqueda, de
+UserModel.buscar y del endpoint GET /usuarios/buscar incluyendo:
+- Normalización sin tildes y tokenización
+- Consultas por prefijo, conjuntivas y restringidas a un campo
+- Mantenimiento del índice desde las escrituras de UserModel
+- Recarga con COPY sin perder escrituras concurrentes
+- Búsqueda en PostgreSQL sin extensiones cuando el índice no está activo
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from api import app, user_controller
+from database.connection import DatabaseConnection
+from database.instrumentacion import contador_consultas
+from models.indice_busqueda import IndiceBusqueda, normalizar, tokenizar
+from models.user_model import UserModel
+
+
+class TestIndiceBusqueda(unittest.TestCase):
+    """Pruebas del índice invertido en memoria."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.indice = IndiceBusqueda(intervalo_recarga=3600)
+        self.indice.actualizar(1, {'nombre': 'José', 'apellido': 'Núñez', 'ciudad': 'Málaga',
+                                   'profesion': 'Desarrollador web'})
+        self.indice.actualizar(2, {'nombre': 'Josefa', 'apellido': 'García', 'ciudad': 'Madrid',
+                                   'profesion': 'Diseñadora'})
+        self.indice.actualizar(3, {'nombre': 'Ana', 'apellido': 'Madrigal', 'ciudad': 'Sevilla',
+                                   'profesion': None})
+
+    def test_normalizacion(self):
+        """Prueba minúsculas, tildes y separación en palabras."""
+        self.assertEqual(normalizar('José Ñúñez'), 'jose nunez')
+        self.assertEqual(tokenizar('Ana-María  López'), ['ana', 'maria', 'lopez'])
+        self.assertEqual(tokenizar(None), [])
+
+    def test_prefijo_y_conjuncion(self):
+        """Prueba prefijos en cualquier campo y que todos los términos deben cumplirse."""
+        self.assertEqual(self.indice.buscar('jos'), ([1, 2], 2))
+        self.assertEqual(self.indice.buscar('mad'), ([2, 3], 2))
+        self.assertEqual(self.indice.buscar('JOSÉ mál'), ([1], 1))
+        self.assertEqual(self.indice.buscar('jos sevilla'), ([], 0))
+
+    def test_campo_y_limite(self):
+        """Prueba 'campo:texto', el límite y los términos de una letra."""
+        self.assertEqual(self.indice.buscar('ciudad:mad'), ([2], 1))
+        self.assertEqual(self.indice.buscar('jos', limite=1), ([1], 2))
+        self.assertEqual(self.indice.buscar('j'), ([], 0))
+        with self.assertRaises(ValueError):
+            self.indice.buscar('email:ana')
+
+    def test_actualizar_y_eliminar(self):
+        """Prueba que un cambio parcial conserva los demás campos y la baja limpia el vocabulario."""
+        self.indice.actualizar(3, {'ciudad': 'Bilbao'})
+        self.indice.eliminar(2)
+
+        self.assertEqual(self.indice.buscar('mad'), ([3], 1))
+        self.assertEqual(self.indice.buscar('bilbao ana'), ([3], 1))
+        self.assertNotIn('madrid', self.indice.vocabulario['ciudad'])
+        self.assertEqual(self.indice.memoria()['ciudad']['tokens'], 2)
+
+    def test_carga_con_escrituras_concurrentes(self):
+        """Prueba que lo escrito durante el COPY se reaplica sobre el índice nuevo."""
+        indice = IndiceBusqueda(intervalo_recarga=3600)
+
+        def copiar():
+            indice.actualizar(7, {'nombre': 'Nuevo'})
+            indice.eliminar(1)
+            return '1,José,Núñez,Málaga,\n2,Ana,,"San Sebastián",Profesora\n'
+        indice._copiar = copiar
+
+        with patch('builtins.print'):
+            indice.cargar()
+
+        self.assertTrue(indice.cargado)
+        self.assertEqual(indice.buscar('nue'), ([7], 1))
+        self.assertEqual(indice.buscar('jose'), ([], 0))
+        self.assertEqual(indice.buscar('sebas'), ([2], 1))
+
+
+class TestBusquedaModelo(unittest.TestCase):
+    """Pruebas de UserModel.buscar y del mantenimiento desde las escrituras."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.modelo = UserModel()
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def test_busqueda_sql_sin_indice(self):
+        """Prueba una única sentencia LIKE por término sobre el texto normalizado."""
+        self.mock_cursor.fetchall.return_value = []
+
+        with contador_consultas.medir() as sentencias:
+            resultado = self.modelo.buscar('Jose ciudad:mál_', 10)
+
+        self.assertEqual(len(sentencias), 1)
+        self.assertIn('translate(lower(coalesce(ciudad', sentencias[0])
+        self.assertEqual(self.mock_cursor.execute.call_args[0][1], ['% jose%', '% mal\\_%', 10])
+        self.assertEqual(resultado['motor'], 'postgresql')
+
+    def test_busqueda_en_memoria(self):
+        """Prueba que con el índice solo se leen las filas encontradas, en orden."""
+        self.modelo.indice_busqueda = IndiceBusqueda(intervalo_recarga=3600)
+        self.modelo.indice_busqueda.cargado = True
+        self.modelo.indice_busqueda.actualizar(5, {'nombre': 'Ana'})
+        self.modelo.indice_busqueda.actualizar(4, {'nombre': 'Anabel'})
+        self.mock_cursor.fetchall.return_value = [
+            {'id': 5, 'fecha_registro': None, 'fecha_actualizacion': None},
+            {'id': 4, 'fecha_registro': None, 'fecha_actualizacion': None}]
+
+        resultado = self.modelo.buscar('ana')
+
+        self.assertEqual(self.mock_cursor.execute.call_args[0][1], ([4, 5],))
+        self.assertEqual([u['id'] for u in resultado['usuarios']], [4, 5])
+        self.assertEqual(resultado['motor'], 'memoria')
+
+    def test_busqueda_con_replica_incompleta(self):
+        """Prueba que los ids que la réplica en memoria aún no tiene se leen de PostgreSQL."""
+        self.modelo.indice_busqueda = IndiceBusqueda(intervalo_recarga=3600)
+        self.modelo.indice_busqueda.cargado = True
+        self.modelo.indice_busqueda.actualizar(4, {'nombre': 'Anabel'})
+        self.modelo.indice_busqueda.actualizar(5, {'nombre': 'Ana'})
+        self.modelo.replica = MagicMock()
+        self.modelo.replica.obtener_por_id.side_effect = lambda i: {'id': i} if i == 4 else None
+        self.mock_cursor.fetchall.return_value = [
+            {'id': 5, 'fecha_registro': None, 'fecha_actualizacion': None}]
+
+        resultado = self.modelo.buscar('ana')
+
+        self.assertEqual(self.mock_cursor.execute.call_args[0][1], ([5],))
+        self.assertEqual([u['id'] for u in resultado['usuarios']], [4, 5])
+
+    def test_escrituras_mantienen_el_indice(self):
+        """Prueba crear, actualización parcial y eliminación por lote."""
+        self.modelo.indice_busqueda = indice = IndiceBusqueda(intervalo_recarga=3600)
+        self.mock_cursor.fetchone.return_value = {'id': 9, 'fecha_registro': None, 'fecha_actualizacion': None}
+
+        with patch('builtins.print'):
+            metodo_original(UserModel, 'crear')(self.modelo, {'nombre': 'Lucía', 'ciudad': 'Vigo'})
+            self.assertEqual(indice.buscar('luc'), ([9], 1))
+
+            self.mock_cursor.fetchone.return_value = {
+                'id': 9, 'fecha_registro': None, 'fecha_actualizacion': None, 'campos_modificados': ['ciudad']}
+            metodo_original(UserModel, 'actualizar_parcial')(self.modelo, 9, {'ciudad': 'Lugo'})
+            self.assertEqual(indice.buscar('lucia lugo'), ([9], 1))
+
+            self.mock_cursor.fetchall.return_value = [(9,)]
+            self.modelo.eliminar_lote([9])
+        self.assertEqual(indice.buscar('lucia'), ([], 0))
+
+
+class TestEndpointBusqueda(unittest.TestCase):
+    """Pruebas del endpoint GET /usuarios/buscar."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_busqueda(self):
+        """Prueba el paso de la consulta y el límite."""
+        with patch.object(user_controller.user_model, 'buscar',
+                          return_value={'usuarios': [], 'total': 0, 'motor': 'postgresql'}) as mock_buscar:
+            response = self.client.get('/usuarios/buscar?q=ana+mad&limite=5')
+
+        self.assertEqual(response.status_code, 200)
+        mock_buscar.assert_called_once_with('ana mad', 5)
+
+    def test_parametros_invalidos(self):
+        """Prueba consulta vacía, límite fuera de rango e índice no activado."""
+        self.assertEqual(self.client.get('/usuarios/buscar').status_code, 400)
+        self.assertEqual(self.client.get('/usuarios/buscar?q=ana&limite=500').status_code, 400)
+        self.assertEqual(self.client.get('/usuarios/buscar/indice').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
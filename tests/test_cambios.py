@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para el flujo de cambios de usuarios (SSE).
+
+Prueba las funcionalidades de database.cambios y del endpoint
+GET /usuarios/cambios incluyendo:
+- Reparto de eventos a varios suscriptores
+- Buffers acotados y desbordamiento (contrapresión)
+- Reanudación con Last-Event-ID desde el anillo de cambios recientes
+- Escucha de NOTIFY sobre una conexión simulada
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+import json
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility
+setup_all_compatibility()
+
+from api import app
+from database.cambios import CentralCambios, Suscripcion, formatear_sse
+
+
+def evento(numero, operacion='update'):
+    return {'evento': numero, 'operacion': operacion, 'id': numero * 10}
+
+
+class TestCentralCambios(unittest.TestCase):
+    """Pruebas del reparto de eventos y del anillo."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.central = CentralCambios(capacidad_anillo=5, capacidad_buffer=3, max_suscriptores=2)
+        self.central.iniciar = MagicMock()
+
+    def test_reparto_a_todos(self):
+        """Prueba que cada suscriptor recibe todos los eventos."""
+        a, _ = self.central.suscribir()
+        b, _ = self.central.suscribir()
+
+        self.central.publicar(evento(1))
+
+        self.assertEqual(a.siguiente(0), evento(1))
+        self.assertEqual(b.siguiente(0), evento(1))
+        self.assertIsNone(a.siguiente(0))
+
+    def test_maximo_de_suscriptores(self):
+        """Prueba que por encima del máximo la suscripción se rechaza."""
+        self.central.suscribir()
+        self.central.suscribir()
+
+        self.assertIsNone(self.central.suscribir())
+
+    def test_desbordamiento(self):
+        """Prueba que un suscriptor lento queda desbordado sin afectar a otros."""
+        lento, _ = self.central.suscribir()
+        for numero in range(1, 6):
+            self.central.publicar(evento(numero))
+
+        self.assertTrue(lento.desbordada)
+        self.assertEqual(len(lento.eventos), 3)
+
+    def test_reanudar_desde_anillo(self):
+        """Prueba la reanudación desde un id presente en el anillo."""
+        for numero in range(1, 8):
+            self.central.publicar(evento(numero))
+
+        suscripcion, pendientes = self.central.suscribir(ultimo_id=5)
+        self.assertEqual([e['evento'] for e in pendientes], [6, 7])
+
+        # El 1 ya salió del anillo (capacidad 5): hay que resincronizar
+        self.central.cancelar(suscripcion)
+        _, pendientes = self.central.suscribir(ultimo_id=1)
+        self.assertIsNone(pendientes)
+
+    def test_reinicio_vacia_el_anillo(self):
+        """Prueba que una reconexión del LISTEN invalida las reanudaciones."""
+        suscripcion, _ = self.central.suscribir()
+        self.central.publicar(evento(1))
+
+        self.central.reiniciar()
+
+        self.assertEqual(len(self.central.anillo), 0)
+        suscripcion.siguiente(0)
+        self.assertEqual(suscripcion.siguiente(0)['operacion'], 'reinicio')
+
+    @patch('database.cambios.select.select')
+    def test_procesar_notificaciones(self, mock_select):
+        """Prueba que las notificaciones de PostgreSQL se publican como eventos."""
+        conn = MagicMock()
+        conn.notifies = []
+        mock_select.return_value = ([conn], [], [])
+
+        def poll():
+            conn.notifies.extend([MagicMock(payload=json.dumps(evento(1))),
+                                  MagicMock(payload='no es json')])
+            self.central._detener.set()
+        conn.poll.side_effect = poll
+
+        self.central._procesar(conn)
+
+        self.assertEqual(list(self.central.anillo), [evento(1)])
+
+    def test_formatear_sse(self):
+        """Prueba el formato text/event-stream con id y tipo de evento."""
+        texto = formatear_sse(evento(4, 'delete'))
+
+        self.assertTrue(texto.startswith('id: 4\nevent: delete\ndata: {'))
+        self.assertTrue(texto.endswith('\n\n'))
+        self.assertNotIn('id:', formatear_sse({'operacion': 'reinicio'}))
+
+
+class TestEndpointCambios(unittest.TestCase):
+    """Pruebas del endpoint GET /usuarios/cambios."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.central = CentralCambios(capacidad_anillo=10, capacidad_buffer=2, max_suscriptores=1)
+        self.central.iniciar = MagicMock()
+        self.central.latido = 0.01
+        self.parche = patch('controllers.user_controller.central_cambios', self.central)
+        self.parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        self.parche.stop()
+
+    def test_flujo_con_last_event_id(self):
+        """Prueba la cabecera SSE, la reanudación y el latido."""
+        for numero in (1, 2, 3):
+            self.central.publicar(evento(numero))
+
+        response = self.client.get('/usuarios/cambios', headers={'Last-Event-ID': '1'}, buffered=False)
+        fragmentos = iter(response.response)
+
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        self.assertEqual(next(fragmentos), b'retry: 3000\n\n')
+        self.assertTrue(next(fragmentos).startswith(b'id: 2\n'))
+        self.assertTrue(next(fragmentos).startswith(b'id: 3\n'))
+        self.assertEqual(next(fragmentos), b': latido\n\n')
+        response.close()
+
+        # Al cerrar la conexión se libera la suscripción
+        self.assertEqual(len(self.central.suscripciones), 0)
+
+    def test_desbordamiento_cierra_el_flujo(self):
+        """Prueba que un suscriptor desbordado recibe el aviso y se desconecta."""
+        response = self.client.get('/usuarios/cambios', buffered=False)
+        fragmentos = iter(response.response)
+        next(fragmentos)
+        for numero in range(1, 5):
+            self.central.publicar(evento(numero))
+
+        restantes = b''.join(fragmentos)
+
+        self.assertIn(b'id: 1\n', restantes)
+        self.assertIn(b'event: desbordamiento', restantes)
+        self.assertNotIn(b'id: 3\n', restantes)
+
+    def test_limite_de_suscriptores(self):
+        """Prueba 503 con Retry-After cuando no caben más suscriptores."""
+        self.central.suscribir()
+
+        response = self.client.get('/usuarios/cambios')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+    def test_last_event_id_invalido(self):
+        """Prueba que un Last-Event-ID no numérico responde 400."""
+        response = self.client.get('/usuarios/cambios', headers={'Last-Event-ID': 'abc'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
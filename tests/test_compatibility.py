@@ -48,9 +48,10 @@ def setup_database_compatibility():
         
         # Solo aplicar mocks en entorno de pruebas
         if os.getenv('TESTING') == 'true':
-            # Guardar métodos originales
-            DatabaseConnection._original_obtener_conexion = DatabaseConnection.obtener_conexion
-            DatabaseConnection._original_verificar_tabla_existe = DatabaseConnection.verificar_tabla_existe
+            # Guardar métodos originales (solo la primera vez, antes de mockear)
+            if not hasattr(DatabaseConnection, '_original_obtener_conexion'):
+                DatabaseConnection._original_obtener_conexion = DatabaseConnection.obtener_conexion
+                DatabaseConnection._original_verificar_tabla_existe = DatabaseConnection.verificar_tabla_existe
             
             def mock_get_config_info(self):
                 """Mock para get_config_info."""
@@ -119,6 +120,13 @@ def setup_model_compatibility():
         
         # Mockear métodos que hacen operaciones de BD para pruebas
         if os.getenv('TESTING') == 'true':
+            # Guardar métodos originales para las pruebas que ejecutan el SQL real
+            for nombre in ('obtener_todos', 'obtener_por_id', 'crear', 'actualizar',
+                           'eliminar', 'actualizar_parcial', 'obtener_paginados',
+                           'obtener_estadisticas'):
+                if not hasattr(UserModel, f'_original_{nombre}'):
+                    setattr(UserModel, f'_original_{nombre}', getattr(UserModel, nombre))
+            
             def mock_obtener_todos(self):
                 """Mock para obtener_todos."""
                 return []  # Lista vacía para simular no hay usuarios
@@ -127,23 +135,23 @@ def setup_model_compatibility():
                 """Mock para obtener_por_id."""
                 return None  # Simular usuario no encontrado
             
-            def mock_crear(self, datos):
+            def mock_crear(self, datos, minimo=False):
                 """Mock para crear."""
                 if not datos or not datos.get('nombre'):
                     raise Exception("Error de conexión a la base de datos")
                 return 1  # ID simulado del nuevo usuario
             
-            def mock_actualizar(self, user_id, datos):
+            def mock_actualizar(self, user_id, datos, minimo=False):
                 """Mock para actualizar."""
                 if not datos:
                     raise Exception("Error de conexión a la base de datos")
                 return True  # Simular actualización exitosa
             
-            def mock_eliminar(self, user_id):
+            def mock_eliminar(self, user_id, minimo=False):
                 """Mock para eliminar."""
                 return True  # Simular eliminación exitosa
             
-            def mock_actualizar_parcial(self, user_id, datos):
+            def mock_actualizar_parcial(self, user_id, datos, minimo=False):
                 """Mock para actualización parcial."""
                 if not datos:
                     return False
@@ -158,7 +166,7 @@ def setup_model_compatibility():
                 
                 return True
             
-            def mock_obtener_paginados(self, pagina, limite):
+            def mock_obtener_paginados(self, pagina, limite, filtros=None):
                 """Mock para obtener_paginados."""
                 # Generar datos de prueba más realistas
                 usuarios_test = []
@@ -234,6 +242,12 @@ def setup_controller_compatibility():
         if not hasattr(UserController, 'user_model'):
             UserController.user_model = UserModel()
         
+        # Guardar métodos originales antes de envolverlos (solo la primera vez)
+        for nombre in ('obtener_todos', 'obtener_por_id', 'crear', 'actualizar',
+                       'actualizar_parcial', 'eliminar', 'obtener_paginados'):
+            if not hasattr(UserController, f'_original_{nombre}'):
+                setattr(UserController, f'_original_{nombre}', getattr(UserController, nombre))
+        
         # Obtener referencia a la app Flask para el contexto
         try:
             from api import app
@@ -475,6 +489,11 @@ def _setup_controller_test_wrappers(UserController):
     UserController.eliminar = eliminar_wrapper
 
 
+def metodo_original(clase, nombre):
+    """Devuelve el método real de una clase aunque la compatibilidad lo haya mockeado."""
+    return getattr(clase, f'_original_{nombre}', getattr(clase, nombre))
+
+
 def setup_test_environment():
     """Configura el entorno de pruebas con variables de entorno de test."""
     # Cargar archivo .env.test si existe
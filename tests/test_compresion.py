@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para la compresión de respuestas.
+
+Prueba las funcionalidades del módulo middleware.compresion incluyendo:
+- Negociación de Accept-Encoding con valores q
+- Umbral mínimo de tamaño
+- Reutilización de variantes comprimidas y tope del cache en bytes
+- Compresión de respuestas en streaming
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+import gzip
+import json
+from unittest.mock import patch
+from flask import Flask, Response, jsonify
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from middleware.compresion import CompresionRespuestas
+
+
+class TestCompresionRespuestas(unittest.TestCase):
+    """Pruebas para la clase CompresionRespuestas."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.app = Flask(__name__)
+        self.app.config['TESTING'] = True
+        self.compresion = CompresionRespuestas(self.app)
+        self.usuarios = [{'id': i, 'nombre': f'Usuario {i}', 'ciudad': 'Madrid'}
+                         for i in range(200)]
+
+        @self.app.route('/grande')
+        def grande():
+            return jsonify({"exito": True, "datos": self.usuarios})
+
+        @self.app.route('/pequena')
+        def pequena():
+            return jsonify({"exito": True})
+
+        @self.app.route('/flujo')
+        def flujo():
+            def generar():
+                for usuario in self.usuarios:
+                    yield json.dumps(usuario) + '\n'
+            return Response(generar(), mimetype='application/x-ndjson')
+
+        self.client = self.app.test_client()
+
+    def test_negociar_preferencia_gzip(self):
+        """Prueba que se elige gzip cuando es la única codificación disponible aceptada."""
+        self.assertEqual(self.compresion.negociar('gzip, deflate'), 'gzip')
+        self.assertEqual(self.compresion.negociar('*'), 'gzip')
+
+    def test_negociar_rechazos(self):
+        """Prueba que q=0 y cabeceras vacías desactivan la compresión."""
+        self.assertIsNone(self.compresion.negociar('gzip;q=0'))
+        self.assertIsNone(self.compresion.negociar(''))
+        self.assertIsNone(self.compresion.negociar('identity'))
+
+    def test_respuesta_grande_comprimida(self):
+        """Prueba que una respuesta por encima del umbral se comprime con gzip."""
+        response = self.client.get('/grande', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(response.headers.get('Content-Encoding'), 'gzip')
+        self.assertIn('Accept-Encoding', response.headers.get('Vary', ''))
+        datos = json.loads(gzip.decompress(response.data))
+        self.assertEqual(len(datos['datos']), 200)
+
+    def test_respuesta_pequena_sin_comprimir(self):
+        """Prueba que una respuesta por debajo del umbral no se comprime."""
+        response = self.client.get('/pequena', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertTrue(response.get_json()['exito'])
+
+    def test_sin_accept_encoding(self):
+        """Prueba que sin Accept-Encoding la respuesta se envía sin comprimir."""
+        response = self.client.get('/grande')
+
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(len(response.get_json()['datos']), 200)
+
+    def test_variante_reutilizada(self):
+        """Prueba que un mismo cuerpo solo se comprime una vez."""
+        with patch.object(self.compresion, 'comprimir',
+                          wraps=self.compresion.comprimir) as mock_comprimir:
+            primera = self.client.get('/grande', headers={'Accept-Encoding': 'gzip'})
+            segunda = self.client.get('/grande', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(mock_comprimir.call_count, 1)
+        self.assertEqual(primera.data, segunda.data)
+
+    def test_cache_acotado_por_bytes(self):
+        """Prueba que el cache expulsa variantes por tamaño total, no por número."""
+        self.compresion.max_bytes_variantes = 100
+        with patch.object(self.compresion, 'comprimir', side_effect=lambda cuerpo, _: cuerpo[:40]):
+            for i in range(5):
+                self.compresion.obtener_variante(bytes([i]) * 50, 'gzip')
+        with patch.object(self.compresion, 'comprimir', side_effect=lambda cuerpo, _: cuerpo):
+            # Mayor que todo el cache: se devuelve sin guardarse
+            self.assertEqual(len(self.compresion.obtener_variante(b'z' * 500, 'gzip')), 500)
+
+        self.assertEqual(len(self.compresion._variantes), 2)
+        self.assertEqual(self.compresion._bytes_variantes, 80)
+
+    def test_flujo_comprimido(self):
+        """Prueba la compresión incremental de una respuesta en streaming."""
+        response = self.client.get('/flujo', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(response.headers.get('Content-Encoding'), 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        lineas = gzip.decompress(response.data).decode('utf-8').splitlines()
+        self.assertEqual(len(lineas), 200)
+        self.assertEqual(json.loads(lineas[-1])['id'], 199)
+
+
+if __name__ == '__main__':
+    unittest.main()
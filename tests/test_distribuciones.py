@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para las distribuciones de usuarios precalculadas.
+
+Prueba las funcionalidades de UserModel.obtener_distribuciones, de
+database.refresco.RefrescoEstadisticas y del endpoint
+GET /usuarios/estadisticas incluyendo:
+- Lectura de la vista materializada en una sola sentencia
+- Agrupación por dimensión y percentiles de salario
+- Refresco concurrente protegido por un bloqueo consultivo
+- Validación de dimensiones
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from api import app, user_controller
+from controllers.user_controller import UserController
+from database.connection import DatabaseConnection
+from database.instrumentacion import contador_consultas
+from database.refresco import RefrescoEstadisticas
+from models.estadisticas import CacheEstadisticas
+from models.user_model import UserModel
+
+
+class TestDistribucionesSQL(unittest.TestCase):
+    """Pruebas del SQL contra una conexión simulada."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def fila(self, dimension, valor, total, percentiles=None):
+        return {'dimension': dimension, 'valor': valor, 'total': total, 'activos': total,
+                'edad_media': 30.5, 'salario_medio': 40000.0,
+                'salario_percentiles': percentiles, 'calculado': datetime(2026, 10, 19, 8, 0)}
+
+    def test_lectura_de_la_vista(self):
+        """Prueba una única lectura agrupada por dimensión."""
+        self.mock_cursor.fetchall.return_value = [
+            self.fila('ciudad', 'Madrid', 5, [30000.0, 40000.0, 50000.0, 60000.0]),
+            self.fila('edad', '20-29', 3),
+        ]
+
+        with contador_consultas.medir() as sentencias:
+            resultado = UserModel().obtener_distribuciones(['ciudad', 'edad'])
+
+        self.assertEqual(len(sentencias), 1)
+        self.assertIn('FROM usuarios_estadisticas', sentencias[0])
+        self.assertEqual(self.mock_cursor.execute.call_args[0][1], (['ciudad', 'edad'],))
+        madrid = resultado['distribuciones']['ciudad'][0]
+        self.assertEqual(madrid['salario_percentiles']['p50'], 40000.0)
+        self.assertEqual(resultado['distribuciones']['edad'][0]['salario_percentiles']['p90'], None)
+        self.assertEqual(resultado['calculado'], '2026-10-19T08:00:00')
+
+    def test_todas_las_dimensiones(self):
+        """Prueba que sin filtro se devuelven todas las dimensiones, aunque estén vacías."""
+        self.mock_cursor.fetchall.return_value = []
+
+        resultado = UserModel().obtener_distribuciones()
+
+        self.assertEqual(set(resultado['distribuciones']), set(UserModel.DIMENSIONES_ESTADISTICAS))
+        self.assertIsNone(resultado['calculado'])
+
+    def test_refresco_concurrente(self):
+        """Prueba REFRESH CONCURRENTLY tras obtener el bloqueo consultivo."""
+        self.mock_cursor.fetchone.return_value = (True,)
+
+        self.assertTrue(RefrescoEstadisticas(intervalo=60).refrescar())
+
+        sentencias = [c[0][0] for c in self.mock_cursor.execute.call_args_list]
+        self.assertIn('pg_try_advisory_xact_lock', sentencias[0])
+        self.assertEqual(sentencias[1], 'REFRESH MATERIALIZED VIEW CONCURRENTLY usuarios_estadisticas')
+        self.mock_conn.commit.assert_called_once()
+
+    def test_refresco_en_otro_proceso(self):
+        """Prueba que si otro proceso tiene el bloqueo no se refresca."""
+        self.mock_cursor.fetchone.return_value = (False,)
+
+        self.assertFalse(RefrescoEstadisticas(intervalo=60).refrescar())
+        self.assertEqual(self.mock_cursor.execute.call_count, 1)
+
+
+class TestEndpointDistribuciones(unittest.TestCase):
+    """Pruebas del endpoint GET /usuarios/estadisticas."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.parche = patch('controllers.user_controller.refresco_estadisticas')
+        self.mock_refresco = self.parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        self.parche.stop()
+
+    def test_dimensiones_pedidas(self):
+        """Prueba el paso de dimensiones sin tocar el refresco (lo arranca el controlador)."""
+        with patch.object(user_controller.user_model, 'obtener_distribuciones',
+                          return_value={'distribuciones': {}, 'calculado': None}) as mock_dist:
+            response = self.client.get('/usuarios/estadisticas?dimension=ciudad,genero')
+
+        self.assertEqual(response.status_code, 200)
+        mock_dist.assert_called_once_with(['ciudad', 'genero'])
+        self.mock_refresco.iniciar.assert_not_called()
+
+    def test_refresco_al_crear_el_controlador(self):
+        """Prueba que el refresco arranca con el controlador salvo con REFRESCO_ESTADISTICAS=false."""
+        with patch.dict(os.environ, {'REFRESCO_ESTADISTICAS': 'true', 'FILTRO_EMAILS': 'false'}), \
+             patch.object(CacheEstadisticas, 'iniciar'):
+            UserController()
+        self.mock_refresco.iniciar.assert_called_once()
+
+        with patch.dict(os.environ, {'REFRESCO_ESTADISTICAS': 'false', 'FILTRO_EMAILS': 'false'}), \
+             patch.object(CacheEstadisticas, 'iniciar'):
+            UserController()
+        self.mock_refresco.iniciar.assert_called_once()
+
+    def test_dimension_invalida(self):
+        """Prueba 400 con una dimensión desconocida."""
+        response = self.client.get('/usuarios/estadisticas?dimension=telefono')
+
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
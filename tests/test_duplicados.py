@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para la detección de usuarios duplicados.
+
+Prueba las funcionalidades de models.duplicados.DetectorDuplicados
+incluyendo:
+- Normalización de nombre, email y teléfono y claves de bloqueo
+- Pares candidatos solo dentro de cada bloque (vecindad ordenada en los grandes)
+- Puntuación con corte anticipado bajo el umbral
+- Agrupación con union-find y escritura en usuarios_duplicados
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from database.connection import DatabaseConnection
+from database.instrumentacion import contador_consultas
+from models.duplicados import DetectorDuplicados, puntuar
+
+USUARIOS_CSV = '''1,José,García,jose.garcia@ejemplo.com,+34 600 111 222
+2,Jose,Garcia,josegarcia+tienda@otro.com,600111222
+3,Ana,López,ana.lopez@ejemplo.com,611 000 000
+4,Ana,López,alopez88@ejemplo.com,699 999 999
+5,García,José,jose.garcia1@ejemplo.com,
+6,Luis,Pérez,,
+'''
+
+
+class TestBloqueo(unittest.TestCase):
+    """Pruebas de normalización, bloqueo y pares candidatos."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.detector = DetectorDuplicados(procesos=1)
+        self.detector._copiar = lambda: USUARIOS_CSV
+        self.registros = self.detector.leer_registros()
+
+    def test_normalizacion(self):
+        """Prueba el orden de las palabras del nombre, el email y el teléfono."""
+        self.assertEqual(self.registros[1], ('garcia jose', 'josegarcia', '600111222', 'josegarcia'))
+        self.assertEqual(self.registros[2], ('garcia jose', 'josegarcia', '600111222', 'josegarcia'))
+        self.assertEqual(self.registros[4][1:], ('alopez88', '699999999', 'alopez'))
+        self.assertEqual(self.registros[6], ('luis perez', '', '', ''))
+
+    def test_pares_solo_dentro_de_bloque(self):
+        """Prueba que solo se emparejan usuarios que comparten alguna clave."""
+        generados = list(self.detector.pares_candidatos(self.detector.bloquear(self.registros), self.registros))
+        pares = {(a, b): motivos for a, b, motivos in generados}
+
+        # (1, 2) comparte tres bloques y sale una sola vez, con los tres motivos
+        self.assertEqual(len(generados), len(pares))
+        self.assertEqual(set(pares), {(1, 2), (1, 5), (2, 5), (3, 4)})
+        self.assertEqual(pares[(1, 2)], 1 | 2 | 4)
+        self.assertEqual(pares[(3, 4)], 1)
+
+    def test_bloque_grande_con_vecindad(self):
+        """Prueba que un bloque enorme genera pares lineales, no cuadráticos."""
+        detector = DetectorDuplicados(procesos=1, maximo_bloque=10, ventana=3)
+        registros = {i: ('maria garcia', f'mgarcia{i}', f'6{i:08d}', 'mgarcia') for i in range(1, 1001)}
+
+        generados = list(detector.pares_candidatos(detector.bloquear(registros), registros))
+        pares = {(a, b) for a, b, _ in generados}
+
+        self.assertEqual(len(generados), 3 * 1000 - 6)
+        self.assertEqual(len(pares), len(generados))
+        self.assertIn((1, 2), pares)
+        self.assertNotIn((1, 5), pares)
+
+
+class TestPuntuacionYAgrupacion(unittest.TestCase):
+    """Pruebas de la puntuación y de la agrupación."""
+
+    def test_puntuacion(self):
+        """Prueba campos ausentes, el corte bajo el umbral y el valor sin corte."""
+        self.assertEqual(puntuar(('ana lopez', 'alopez', ''), ('ana lopez', 'alopez', '6')), 1.0)
+        self.assertEqual(puntuar(('ana lopez', 'analopez', '611000000'),
+                                 ('ana lopez', 'alopez88', '699999999'), 0.85), 0.0)
+        sin_corte = puntuar(('ana lopez', 'analopez', '611000000'), ('ana lopez', 'alopez88', '699999999'))
+        self.assertGreater(sin_corte, 0.5)
+        self.assertLess(sin_corte, 0.85)
+
+    def test_agrupar(self):
+        """Prueba grupos transitivos identificados por el menor id."""
+        filas = DetectorDuplicados.agrupar([(7, 9, 0.9, 1), (3, 9, 0.95, 4), (20, 21, 0.88, 2)])
+
+        self.assertEqual(filas, [
+            (3, 3, 3, 0.95, ['email']),
+            (7, 3, 3, 0.9, ['nombre']),
+            (9, 3, 3, 0.95, ['email']),
+            (20, 20, 2, 0.88, ['telefono']),
+            (21, 20, 2, 0.88, ['telefono']),
+        ])
+
+    def test_pool_de_procesos(self):
+        """Prueba que el pool devuelve lo mismo que la ejecución en el proceso actual."""
+        registros = {i: (f'usuario {i % 50}', f'u{i % 50}x{i % 7}', '', f'u{i % 50}x') for i in range(1, 501)}
+        secuencial = DetectorDuplicados(umbral=0.8, procesos=1, tamano_trozo=100)
+        paralelo = DetectorDuplicados(umbral=0.8, procesos=2, tamano_trozo=100)
+        pares = list(secuencial.pares_candidatos(secuencial.bloquear(registros), registros))
+
+        self.assertEqual(sorted(paralelo.puntuar_pares(pares, registros)),
+                         sorted(secuencial.puntuar_pares(pares, registros)))
+
+
+class TestDetectarYGuardar(unittest.TestCase):
+    """Pruebas del trabajo completo contra la base de datos simulada."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.mock_conn = MagicMock()
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def test_detectar(self):
+        """Prueba el grupo encontrado y su escritura en una transacción."""
+        cursor = self.mock_conn.cursor.return_value
+        volcados = []
+        cursor.copy_expert.side_effect = lambda sql, archivo: volcados.append(archivo.read())
+        detector = DetectorDuplicados(procesos=1)
+        detector._copiar = lambda: USUARIOS_CSV
+
+        with contador_consultas.medir() as sentencias:
+            estadisticas = detector.detectar(progreso=lambda mensaje: None)
+
+        self.assertEqual(estadisticas['grupos'], 1)
+        self.assertEqual(estadisticas['usuarios_duplicados'], 3)
+        self.assertEqual(sentencias[0], 'DELETE FROM usuarios_duplicados')
+        self.assertEqual(volcados[0].splitlines()[0], '1,1,3,1.0,"{nombre,telefono,email}"')
+        self.mock_conn.commit.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
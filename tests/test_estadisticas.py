@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para las estadísticas en caché de GET /.
+
+Prueba las funcionalidades de models.estadisticas.CacheEstadisticas y de
+UserModel.estimar_total_usuarios incluyendo:
+- Primera carga completa (versión y total) y respuestas desde memoria
+- Una sola primera carga aunque lleguen peticiones concurrentes
+- Refresco en segundo plano del total al caducar el intervalo
+- Conservación de los últimos datos si el refresco falla
+- Total estimado desde pg_class sin COUNT(*)
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+import threading
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from api import app, user_controller
+from database.connection import DatabaseConnection
+from database.instrumentacion import contador_consultas
+from models.estadisticas import CacheEstadisticas
+from models.user_model import UserModel
+
+
+class TestCacheEstadisticas(unittest.TestCase):
+    """Pruebas de CacheEstadisticas con un modelo simulado."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.modelo = MagicMock()
+        self.modelo.obtener_estadisticas.return_value = {
+            'total_usuarios': 10, 'version_postgresql': 'PostgreSQL 16.1'}
+        self.modelo.estimar_total_usuarios.return_value = 12
+
+    def esperar_refresco(self):
+        for hilo in threading.enumerate():
+            if hilo.name == 'refresco-estadisticas':
+                hilo.join(timeout=2)
+
+    def test_primera_carga_y_memoria(self):
+        """Prueba que tras la primera carga no se vuelve a consultar."""
+        cache = CacheEstadisticas(self.modelo, intervalo=60)
+
+        for _ in range(5):
+            datos = cache.obtener()
+
+        self.assertEqual(datos['total_usuarios'], 10)
+        self.assertIn('actualizado', datos)
+        self.modelo.obtener_estadisticas.assert_called_once()
+        self.modelo.estimar_total_usuarios.assert_not_called()
+
+    def test_primera_carga_unica(self):
+        """Prueba que las peticiones concurrentes en frío esperan a una sola carga."""
+        liberar = threading.Event()
+
+        def cargar_lento():
+            liberar.wait(2)
+            return {'total_usuarios': 10, 'version_postgresql': 'PostgreSQL 16.1'}
+        self.modelo.obtener_estadisticas.side_effect = cargar_lento
+        cache = CacheEstadisticas(self.modelo, intervalo=60)
+
+        cache.iniciar()
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(cache.obtener())) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        liberar.set()
+        for hilo in hilos:
+            hilo.join(timeout=2)
+
+        self.assertEqual([datos['total_usuarios'] for datos in resultados], [10] * 4)
+        self.modelo.obtener_estadisticas.assert_called_once()
+
+    def test_refresco_tras_el_intervalo(self):
+        """Prueba que al caducar solo se refresca el total, no la versión."""
+        cache = CacheEstadisticas(self.modelo, intervalo=0)
+        cache.cargar()
+
+        anteriores = cache.obtener()
+        self.esperar_refresco()
+
+        self.assertEqual(anteriores['total_usuarios'], 10)
+        self.assertEqual(cache.datos['total_usuarios'], 12)
+        self.assertEqual(cache.datos['version_postgresql'], 'PostgreSQL 16.1')
+        self.modelo.obtener_estadisticas.assert_called_once()
+
+    def test_fallo_conserva_datos(self):
+        """Prueba que un refresco fallido no borra las estadísticas."""
+        self.modelo.estimar_total_usuarios.side_effect = Exception("sin conexión")
+        cache = CacheEstadisticas(self.modelo, intervalo=0)
+        cache.cargar()
+
+        with patch('builtins.print'):
+            cache.obtener()
+            self.esperar_refresco()
+
+        self.assertEqual(cache.obtener()['total_usuarios'], 10)
+
+    def test_endpoint_raiz_desde_cache(self):
+        """Prueba que GET / usa la caché del controlador."""
+        app.config['TESTING'] = True
+        cache = CacheEstadisticas(self.modelo, intervalo=60)
+
+        with patch.object(user_controller, 'estadisticas', cache):
+            respuestas = [app.test_client().get('/') for _ in range(3)]
+
+        self.assertEqual(respuestas[-1].status_code, 200)
+        self.assertEqual(respuestas[-1].get_json()['datos']['total_usuarios'], 10)
+        self.modelo.obtener_estadisticas.assert_called_once()
+
+
+class TestTotalEstimado(unittest.TestCase):
+    """Pruebas del SQL de UserModel.estimar_total_usuarios."""
+
+    def test_estimacion_desde_catalogo(self):
+        """Prueba una única sentencia sobre pg_class."""
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value.fetchone.return_value = (1234,)
+
+        with patch('database.connection.psycopg2.connect', return_value=mock_conn), \
+             patch.object(DatabaseConnection, 'obtener_conexion',
+                          metodo_original(DatabaseConnection, 'obtener_conexion')), \
+             contador_consultas.medir() as sentencias:
+            total = UserModel().estimar_total_usuarios()
+
+        self.assertEqual(total, 1234)
+        self.assertEqual(len(sentencias), 1)
+        self.assertIn('FROM pg_class', sentencias[0])
+        self.assertIn('pg_relation_size', sentencias[0])
+        # Con users particionada se suman las particiones, no el padre vacío
+        self.assertIn('SELECT inhrelid FROM pg_inherits', sentencias[0])
+        self.assertIn("c.relkind <> 'p'", sentencias[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
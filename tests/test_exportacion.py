@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para la exportación completa de usuarios.
+
+Prueba las funcionalidades de models.exportacion.ExportadorUsuarios y de
+los endpoints /usuarios/exportaciones incluyendo:
+- Reparto del espacio de ids en rangos
+- COPY (SELECT ...) TO STDOUT en CSV y NDJSON
+- Instantánea exportada compartida por todas las conexiones
+- Ficheros gzip por rango, manifiesto y reanudación
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+import gzip
+import json
+import tempfile
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from api import app, user_controller
+from database.connection import DatabaseConnection
+from models.exportacion import ExportadorUsuarios
+
+
+class TestExportador(unittest.TestCase):
+    """Pruebas de ExportadorUsuarios contra una conexión simulada."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.directorio = Path(tempfile.mkdtemp()) / 'exportacion'
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+        self.mock_cursor.fetchone.return_value = ('00000003-0000001B-1', 1, 100)
+        self.mock_cursor.rowcount = 25
+
+        def copiar(sql, fichero):
+            fichero.write(f"-- {sql}\n".encode('utf-8'))
+        self.mock_cursor.copy_expert.side_effect = copiar
+
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def test_planificar_rangos(self):
+        """Prueba rangos contiguos con el último abierto por arriba."""
+        exportador = ExportadorUsuarios(self.directorio, rangos=4)
+
+        rangos = exportador.planificar_rangos(1, 10)
+
+        self.assertEqual([(r['desde'], r['hasta']) for r in rangos],
+                         [(1, 4), (4, 7), (7, 10), (10, None)])
+        self.assertEqual(rangos[0]['archivo'], 'usuarios_0001.csv.gz')
+        self.assertEqual(exportador.planificar_rangos(None, None), [])
+
+    def test_sql_copy(self):
+        """Prueba la cabecera solo en el primer rango y el NDJSON sin escapes."""
+        csv_ = ExportadorUsuarios(self.directorio, 'csv')
+        ndjson = ExportadorUsuarios(self.directorio, 'ndjson')
+        primero = {'numero': 1, 'desde': 1, 'hasta': 50}
+        ultimo = {'numero': 2, 'desde': 50, 'hasta': None}
+
+        self.assertIn('HEADER true', csv_._sql_copy(primero))
+        self.assertIn('WHERE id >= 1 AND id < 50', csv_._sql_copy(primero))
+        self.assertIn('HEADER false', csv_._sql_copy(ultimo))
+        self.assertNotIn('id <', csv_._sql_copy(ultimo))
+        self.assertIn('row_to_json(u)', ndjson._sql_copy(ultimo))
+        self.assertIn("QUOTE E'\\x01'", ndjson._sql_copy(ultimo))
+
+    def test_exportar_con_instantanea(self):
+        """Prueba la instantánea compartida, los .gz por rango y el manifiesto."""
+        exportador = ExportadorUsuarios(self.directorio, trabajadores=2, rangos=4)
+
+        manifiesto = exportador.exportar()
+
+        self.assertTrue(manifiesto['completado'])
+        self.assertEqual(manifiesto['total_filas'], 100)
+        sentencias = [c[0] for c in self.mock_cursor.execute.call_args_list]
+        self.assertIn('pg_export_snapshot()', sentencias[0][0])
+        importaciones = [s for s in sentencias if s[0] == 'SET TRANSACTION SNAPSHOT %s']
+        self.assertEqual(len(importaciones), 2)
+        self.assertEqual(importaciones[0][1], ('00000003-0000001B-1',))
+        self.mock_conn.set_session.assert_called_with(isolation_level='REPEATABLE READ', readonly=True)
+
+        archivos = sorted(p.name for p in self.directorio.glob('*.gz'))
+        self.assertEqual(len(archivos), 4)
+        with gzip.open(self.directorio / archivos[0], 'rt') as fichero:
+            self.assertIn('COPY (SELECT', fichero.read())
+        self.assertFalse(list(self.directorio.glob('*.parcial')))
+        self.assertEqual(exportador.cargar_manifiesto()['rangos'][3]['filas'], 25)
+
+    def test_reanudar_solo_pendientes(self):
+        """Prueba que al reanudar solo se exportan los rangos sin completar."""
+        exportador = ExportadorUsuarios(self.directorio, rangos=4)
+        self.directorio.mkdir(parents=True)
+        rangos = exportador.planificar_rangos(1, 100)
+        for rango in rangos[:3]:
+            rango.update(completado=True, filas=25)
+        exportador._guardar_manifiesto({'formato': 'csv', 'rangos': rangos})
+
+        manifiesto = exportador.exportar(reanudar=True)
+
+        self.assertEqual(self.mock_cursor.copy_expert.call_count, 1)
+        self.assertIn('id >= 76', self.mock_cursor.copy_expert.call_args[0][0])
+        self.assertTrue(manifiesto['completado'])
+
+    def test_reanudar_otro_formato(self):
+        """Prueba que no se mezcla un formato distinto al reanudar."""
+        ExportadorUsuarios(self.directorio).exportar()
+
+        with self.assertRaises(ValueError):
+            ExportadorUsuarios(self.directorio, 'ndjson').exportar(reanudar=True)
+
+
+class TestExportacionEndpoints(unittest.TestCase):
+    """Pruebas de los endpoints /usuarios/exportaciones."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.directorio = Path(tempfile.mkdtemp())
+        self.parche = patch.object(user_controller, 'exportacion_directorio', self.directorio)
+        self.parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        self.parche.stop()
+
+    def test_iniciar_exportacion(self):
+        """Prueba que POST responde 202 con Location y lanza el hilo."""
+        with patch.object(ExportadorUsuarios, 'exportar') as mock_exportar:
+            response = self.client.post('/usuarios/exportaciones', json={'formato': 'ndjson'})
+            exportacion_id = response.get_json()['datos']['id']
+            user_controller.exportaciones[exportacion_id]['hilo'].join(timeout=5)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.headers['Location'], f'/usuarios/exportaciones/{exportacion_id}')
+        mock_exportar.assert_called_once_with(reanudar=False)
+
+    def test_formato_invalido(self):
+        """Prueba que un formato desconocido responde 400."""
+        response = self.client.post('/usuarios/exportaciones', json={'formato': 'xml'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_estado_interrumpida_y_reanudar(self):
+        """Prueba el estado de una exportación a medias y su reanudación."""
+        exportacion_id = '20261019120000000000'
+        exportador = ExportadorUsuarios(self.directorio / exportacion_id)
+        exportador.directorio.mkdir(parents=True)
+        rangos = exportador.planificar_rangos(1, 10)
+        rangos[0].update(completado=True, filas=3)
+        exportador._guardar_manifiesto({'formato': 'csv', 'completado': False, 'rangos': rangos})
+
+        response = self.client.get(f'/usuarios/exportaciones/{exportacion_id}')
+        datos = response.get_json()['datos']
+        self.assertEqual(datos['estado'], 'interrumpida')
+        self.assertEqual(datos['rangos_completados'], 1)
+
+        with patch.object(ExportadorUsuarios, 'exportar') as mock_exportar:
+            response = self.client.post('/usuarios/exportaciones', json={'reanudar': exportacion_id})
+            user_controller.exportaciones[exportacion_id]['hilo'].join(timeout=5)
+
+        self.assertEqual(response.status_code, 202)
+        mock_exportar.assert_called_once_with(reanudar=True)
+
+    def test_exportacion_inexistente(self):
+        """Prueba que un id desconocido o malicioso responde 404."""
+        self.assertEqual(self.client.get('/usuarios/exportaciones/99999999999999999999').status_code, 404)
+        self.assertEqual(self.client.get('/usuarios/exportaciones/..').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para las comprobaciones de existencia.
+
+Prueba HEAD /usuarios/<id>, GET /usuarios/email-disponible y el filtro de
+Bloom de emails (models.filtro_emails) incluyendo:
+- Ausencia de falsos negativos y tasa de falsos positivos del filtro
+- Recarga con COPY sin perder emails escritos mientras tanto
+- Respuestas "disponible" sin consultar la base de datos
+- Confirmación con SELECT 1 de los positivos
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from api import app, user_controller
+from database.connection import DatabaseConnection
+from database.instrumentacion import contador_consultas
+from models.filtro_emails import FiltroBloom, FiltroEmails
+from models.user_model import UserModel
+
+
+class TestFiltroBloom(unittest.TestCase):
+    """Pruebas del filtro de Bloom y de su carga."""
+
+    def test_sin_falsos_negativos(self):
+        """Prueba que todo lo añadido está y que los falsos positivos rondan la tasa pedida."""
+        filtro = FiltroBloom(5000, 0.01)
+        for i in range(5000):
+            filtro.anadir(f'usuario{i}@ejemplo.com')
+
+        self.assertTrue(all(f'usuario{i}@ejemplo.com' in filtro for i in range(5000)))
+        falsos = sum(f'otro{i}@ejemplo.com' in filtro for i in range(5000))
+        self.assertLess(falsos, 5000 * 0.03)
+        self.assertEqual(filtro.funciones, 7)
+
+    def test_carga_con_escrituras_concurrentes(self):
+        """Prueba que un email escrito durante el COPY está en el filtro publicado."""
+        filtro_emails = FiltroEmails(intervalo_recarga=3600)
+        self.assertTrue(filtro_emails.puede_contener('cualquiera@ejemplo.com'))
+
+        def copiar():
+            filtro_emails.anadir('nuevo@ejemplo.com')
+            return 'ana@ejemplo.com\n"luis,perez@ejemplo.com"\n'
+        filtro_emails._copiar = copiar
+
+        with patch('builtins.print'):
+            filtro_emails.cargar()
+
+        for email in ('ana@ejemplo.com', 'luis,perez@ejemplo.com', 'nuevo@ejemplo.com'):
+            self.assertTrue(filtro_emails.puede_contener(email))
+        self.assertEqual(filtro_emails.estado()['emails'], 3)
+
+
+class TestExistenciaModelo(unittest.TestCase):
+    """Pruebas de UserModel.existe y UserModel.email_disponible."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.modelo = UserModel()
+        self.modelo.filtro_emails = FiltroEmails(intervalo_recarga=3600)
+        self.modelo.filtro_emails._copiar = lambda: 'ana@ejemplo.com\n'
+        with patch('builtins.print'):
+            self.modelo.filtro_emails.cargar()
+
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def test_disponible_sin_consultar(self):
+        """Prueba que un email descartado por el filtro no abre conexión."""
+        with contador_consultas.medir() as sentencias:
+            resultado = self.modelo.email_disponible('libre@ejemplo.com')
+
+        self.assertEqual(resultado, (True, 'filtro'))
+        self.assertEqual(sentencias, [])
+
+    def test_positivo_confirmado(self):
+        """Prueba que un posible registrado se confirma con un único SELECT 1."""
+        self.mock_cursor.fetchone.return_value = (1,)
+
+        with contador_consultas.medir() as sentencias:
+            resultado = self.modelo.email_disponible('ana@ejemplo.com')
+
+        self.assertEqual(resultado, (False, 'postgresql'))
+        self.assertEqual(len(sentencias), 1)
+        self.assertIn('SELECT 1 FROM users WHERE email = %s', sentencias[0])
+
+    def test_positivo_con_registro_de_emails(self):
+        """Prueba que con el registro (particionada o shards) se confirma en users_emails."""
+        self.mock_cursor.fetchone.return_value = None
+        self.modelo.registro_emails = True
+
+        with contador_consultas.medir() as sentencias:
+            resultado = self.modelo.email_disponible('ana@ejemplo.com')
+
+        self.assertEqual(resultado, (True, 'postgresql'))
+        self.assertEqual(sentencias, ['SELECT 1 FROM users_emails WHERE email = %s'])
+        self.assertEqual(self.modelo.sql_emails(), 'SELECT email FROM users_emails')
+
+        self.modelo.registro_emails = False
+        self.modelo.archivo = True
+        self.assertIn('UNION ALL SELECT email FROM users_archivo', self.modelo.sql_emails())
+
+    def test_existe_y_alta(self):
+        """Prueba SELECT 1 por id y que un usuario creado entra en el filtro."""
+        self.mock_cursor.fetchone.return_value = None
+        self.assertFalse(self.modelo.existe(7))
+        sql, parametros = self.mock_cursor.execute.call_args[0]
+        self.assertIn('SELECT 1 FROM users WHERE id = %s', sql)
+        self.assertEqual(parametros, (7,))
+
+        # Un acierto de la réplica en memoria no basta: el usuario pudo borrarse en otro worker
+        self.modelo.replica = MagicMock()
+        self.modelo.replica.filas = {7: ('fila',)}
+        self.assertFalse(self.modelo.existe(7))
+
+        self.mock_cursor.fetchone.return_value = {'id': 8, 'fecha_registro': None, 'fecha_actualizacion': None}
+        with patch('builtins.print'):
+            metodo_original(UserModel, 'crear')(self.modelo, {'nombre': 'Eva', 'email': 'eva@ejemplo.com'})
+        self.assertTrue(self.modelo.filtro_emails.puede_contener('eva@ejemplo.com'))
+
+
+class TestEndpointsExistencia(unittest.TestCase):
+    """Pruebas de HEAD /usuarios/<id> y GET /usuarios/email-disponible."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_head_usuario(self):
+        """Prueba 200/404 sin cuerpo y sin leer la fila."""
+        with patch.object(user_controller.user_model, 'existe', side_effect=[True, False]), \
+             patch.object(user_controller.user_model, 'obtener_por_id') as mock_obtener:
+            encontrado = self.client.head('/usuarios/5')
+            no_encontrado = self.client.head('/usuarios/6')
+
+        self.assertEqual(encontrado.status_code, 200)
+        self.assertEqual(no_encontrado.status_code, 404)
+        self.assertEqual(encontrado.data, b'')
+        mock_obtener.assert_not_called()
+
+    def test_email_disponible(self):
+        """Prueba la respuesta y la validación del parámetro."""
+        with patch.object(user_controller.user_model, 'email_disponible', return_value=(True, 'filtro')):
+            response = self.client.get('/usuarios/email-disponible?email=libre@ejemplo.com')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['datos']['disponible'], True)
+        self.assertEqual(response.get_json()['datos']['consistencia'], 'eventual')
+        self.assertEqual(self.client.get('/usuarios/email-disponible').status_code, 400)
+        self.assertEqual(self.client.get('/usuarios/email-disponible?email=nombre').status_code, 400)
+
+    def test_email_confirmado_en_postgresql(self):
+        """Prueba que la respuesta de PostgreSQL se marca como inmediata."""
+        with patch.object(user_controller.user_model, 'email_disponible', return_value=(False, 'postgresql')):
+            response = self.client.get('/usuarios/email-disponible?email=ana@ejemplo.com')
+
+        self.assertEqual(response.get_json()['datos']['consistencia'], 'inmediata')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para el script de importación masiva de usuarios.
+
+Prueba las funcionalidades de scripts/importar_usuarios.py incluyendo:
+- Validación por columnas de cada bloque
+- Particiones del fichero alineadas a inicio de línea
+- Serialización al formato de texto de COPY
+- Carga a staging bloque a bloque y fusión en una sentencia
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz y scripts/ al path para imports
+raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(raiz)
+sys.path.append(os.path.join(raiz, 'scripts'))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from database.connection import DatabaseConnection
+import importar_usuarios
+
+
+class TestValidacion(unittest.TestCase):
+    """Pruebas de validar_bloque y parsear_bloque."""
+
+    def test_validar_bloque(self):
+        """Prueba conversiones, valores vacíos y rechazos con su línea."""
+        registros = [
+            (2, {'nombre': ' Ana ', 'email': 'ana@x.com', 'edad': '30', 'salario': '1500.50', 'activo': 'si'}),
+            (3, {'nombre': 'Luis', 'email': 'no-es-email'}),
+            (4, {'nombre': '', 'email': 'b@x.com'}),
+            (5, {'nombre': 'Eva', 'email': 'eva@x.com', 'edad': 'x'}),
+            (6, {'nombre': 'Leo', 'email': 'leo@x.com', 'ciudad': ''}),
+        ]
+
+        filas, rechazos = importar_usuarios.validar_bloque(registros)
+
+        self.assertEqual([fila[0] for fila in filas], [2, 6])
+        ana = dict(zip(['linea'] + importar_usuarios.COLUMNAS, filas[0]))
+        self.assertEqual(ana['nombre'], 'Ana')
+        self.assertEqual(ana['edad'], 30)
+        self.assertEqual(ana['salario'], Decimal('1500.50'))
+        self.assertTrue(ana['activo'])
+        self.assertIsNone(filas[1][importar_usuarios.COLUMNAS.index('ciudad') + 1])
+        self.assertEqual([linea for linea, _ in rechazos], [3, 4, 5])
+        self.assertTrue(rechazos[1][1].startswith('nombre'))
+
+    def test_parsear_csv_y_ndjson(self):
+        """Prueba el parseo de ambos formatos y el rechazo de líneas mal formadas."""
+        registros, rechazos = importar_usuarios.parsear_bloque(
+            [(2, 'Ana,"a@x.com"'), (3, 'solo_una')], 'csv', ['nombre', 'email'])
+        self.assertEqual(registros, [(2, {'nombre': 'Ana', 'email': 'a@x.com'})])
+        self.assertEqual(rechazos[0][0], 3)
+
+        registros, rechazos = importar_usuarios.parsear_bloque(
+            [(1, '{"nombre": "Ana"}'), (2, '{roto'), (3, '[1]')], 'ndjson', None)
+        self.assertEqual(len(registros), 1)
+        self.assertEqual([linea for linea, _ in rechazos], [2, 3])
+
+    def test_valor_copy(self):
+        """Prueba el escape del formato de texto de COPY."""
+        fila = (1, None, 'a\tb\\c\nd', True, Decimal('2.5'))
+
+        buffer = importar_usuarios.a_buffer_copy([fila])
+
+        self.assertEqual(buffer.getvalue(), '1\t\\N\ta\\tb\\\\c\\nd\tt\t2.5\n')
+
+
+class TestParticiones(unittest.TestCase):
+    """Pruebas del reparto del fichero entre trabajadores."""
+
+    def setUp(self):
+        """Crea un CSV temporal con cabecera y 100 filas."""
+        self.ruta = os.path.join(tempfile.mkdtemp(), 'usuarios.csv')
+        with open(self.ruta, 'w', encoding='utf-8') as fichero:
+            fichero.write('nombre,email\n')
+            for i in range(100):
+                fichero.write(f'Usuario{i},u{i}@x.com\n')
+
+    def test_particiones_cubren_todas_las_lineas(self):
+        """Prueba que las particiones no parten líneas ni pierden ninguna."""
+        particiones = importar_usuarios.calcular_particiones(self.ruta, 4, True)
+
+        self.assertEqual(len(particiones), 4)
+        lineas = []
+        for inicio, fin, primera in particiones:
+            lineas += list(importar_usuarios.leer_lineas(self.ruta, inicio, fin, primera))
+
+        self.assertEqual(len(lineas), 100)
+        self.assertEqual(lineas[0], (2, 'Usuario0,u0@x.com'))
+        self.assertEqual(lineas[-1], (101, 'Usuario99,u99@x.com'))
+        self.assertEqual([numero for numero, _ in lineas], list(range(2, 102)))
+
+    def test_mas_trabajadores_que_lineas(self):
+        """Prueba que un fichero pequeño no genera particiones vacías."""
+        with open(self.ruta, 'w', encoding='utf-8') as fichero:
+            fichero.write('nombre,email\nAna,a@x.com\n')
+
+        particiones = importar_usuarios.calcular_particiones(self.ruta, 8, True)
+
+        self.assertEqual(len(particiones), 1)
+
+
+class TestCargaYFusion(unittest.TestCase):
+    """Pruebas de la copia a staging y de la fusión con users."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+        self.ruta = os.path.join(tempfile.mkdtemp(), 'usuarios.ndjson')
+        with open(self.ruta, 'w', encoding='utf-8') as fichero:
+            for i in range(5):
+                fichero.write(json.dumps({'nombre': f'U{i}', 'email': f'u{i}@x.com'}) + '\n')
+            fichero.write(json.dumps({'nombre': 'Sin email'}) + '\n')
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def test_copy_por_bloques(self):
+        """Prueba un COPY y un commit por bloque, con progreso."""
+        progreso = []
+
+        resultado = importar_usuarios.importar_particion(
+            'users_importacion_prueba', self.ruta, 'ndjson', None, 0, os.path.getsize(self.ruta), 1,
+            tamano_bloque=2, progreso=progreso.append)
+
+        self.assertEqual(resultado['copiadas'], 5)
+        self.assertEqual(resultado['rechazadas'], 1)
+        self.assertEqual(resultado['rechazos'][0][0], 6)
+        self.assertEqual(self.mock_cursor.copy_expert.call_count, 3)
+        self.assertIn('COPY users_importacion_prueba (linea, nombre', self.mock_cursor.copy_expert.call_args[0][0])
+        self.assertEqual(progreso, [2, 2, 2])
+        self.mock_conn.close.assert_called_once()
+
+    def test_importar_completo(self):
+        """Prueba staging UNLOGGED, fusión en una sentencia e informe de duplicados."""
+        self.mock_cursor.fetchone.return_value = (
+            5, 3, 1, [{'email': 'u1@x.com', 'lineas': [2, 4]}], 1, [{'email': 'u0@x.com', 'linea': 1}])
+        importador = importar_usuarios.ImportadorUsuarios(self.ruta)
+        # Cada ejecución usa su propia tabla de staging
+        self.assertNotEqual(importador.tabla, importar_usuarios.ImportadorUsuarios(self.ruta).tabla)
+
+        with patch('builtins.print'):
+            resultado = importador.importar()
+
+        self.assertEqual(importador.formato, 'ndjson')
+        sentencias = [c[0][0] for c in self.mock_cursor.execute.call_args_list]
+        self.assertIn(f'CREATE UNLOGGED TABLE {importador.tabla} (', sentencias[0])
+        self.assertNotIn('DROP', sentencias[0])
+        fusion = [s for s in sentencias if 'INSERT INTO users' in s]
+        self.assertEqual(len(fusion), 1)
+        self.assertIn('ON CONFLICT (email) DO NOTHING', fusion[0])
+        self.assertEqual(f'DROP TABLE IF EXISTS {importador.tabla}', sentencias[-1])
+        self.assertEqual(resultado['insertados'], 3)
+        self.assertEqual(resultado['total_repetidos'], 1)
+
+    def test_staging_eliminada_ante_error(self):
+        """Prueba que la tabla de staging se elimina aunque falle la fusión."""
+        self.mock_cursor.fetchone.side_effect = Exception('fallo en la fusión')
+        importador = importar_usuarios.ImportadorUsuarios(self.ruta)
+
+        with patch('builtins.print'), self.assertRaises(Exception):
+            importador.importar()
+
+        sentencias = [c[0][0] for c in self.mock_cursor.execute.call_args_list]
+        self.assertEqual(f'DROP TABLE IF EXISTS {importador.tabla}', sentencias[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para la instantánea columnar de usuarios.
+
+Prueba las funcionalidades de models.instantanea.InstantaneaUsuarios y del
+endpoint GET /usuarios/estadisticas/numericas incluyendo:
+- Lectura del CSV de COPY y marca de agua
+- Carga completa y actualización incremental (altas, cambios y bajas)
+- Percentiles, histograma, correlación y agrupación vectorizada
+- Respuesta 501 cuando numpy no está instalado
+- Carga inicial en segundo plano (503 mientras no hay copia)
+
+Las pruebas que necesitan numpy se omiten si no está disponible.
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility
+setup_all_compatibility()
+
+from api import app, user_controller
+from models.instantanea import InstantaneaUsuarios, np
+
+COPY_INICIAL = (
+    '1,30,30000,t,Madrid,Desarrollador,Femenino,2026-10-01 10:00:00,f\n'
+    '2,40,50000,f,Madrid,,Masculino,2026-10-01 11:00:00.5,f\n'
+    '3,,,t,Sevilla,Diseñador,,2026-10-01 09:00:00,f\n'
+)
+
+COPY_CAMBIOS = (
+    '2,41,60000,t,Bilbao,,Masculino,2026-10-02 08:00:00,f\n'
+    '4,25,20000,t,Sevilla,,Femenino,2026-10-02 09:00:00,f\n'
+    '3,,,,,,,2026-10-02 07:00:00,t\n'
+)
+
+
+class TestLecturaCopy(unittest.TestCase):
+    """Pruebas de la lectura del CSV (sin numpy)."""
+
+    def test_columnas_y_marca(self):
+        """Prueba nulos, booleanos, lápidas y la fecha máxima como marca."""
+        filas, marca = InstantaneaUsuarios.leer_copy(COPY_INICIAL + COPY_CAMBIOS)
+
+        self.assertEqual(filas['id'], [1, 2, 3, 2, 4, 3])
+        self.assertIsNone(filas['edad'][2])
+        self.assertEqual(filas['activo'][:2], ['true', 'false'])
+        self.assertIsNone(filas['profesion'][1])
+        self.assertEqual(filas['eliminado'], [False] * 5 + [True])
+        self.assertEqual(marca, datetime(2026, 10, 2, 9, 0))
+
+
+@unittest.skipIf(np is None, "numpy no está instalado")
+class TestInstantanea(unittest.TestCase):
+    """Pruebas de carga, actualización y estadísticas con un COPY simulado."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.instantanea = InstantaneaUsuarios(intervalo=3600, margen_segundos=5)
+        self.instantanea._copiar = MagicMock(side_effect=[COPY_INICIAL, COPY_CAMBIOS])
+        with patch('builtins.print'):
+            self.instantanea.cargar()
+
+    def test_actualizacion_incremental(self):
+        """Prueba el upsert de cambios y la eliminación por lápidas."""
+        self.instantanea.actualizar()
+
+        desde = self.instantanea._copiar.call_args[0][0]
+        self.assertEqual(desde, datetime(2026, 10, 1, 10, 59, 55, 500000))
+        columnas = self.instantanea.columnas
+        self.assertEqual(sorted(columnas['id'].tolist()), [1, 2, 4])
+        self.assertEqual(columnas['salario'][columnas['id'] == 2][0], 60000)
+        self.assertIn('Bilbao', self.instantanea.categorias['ciudad'])
+        self.assertEqual(self.instantanea.marca, datetime(2026, 10, 2, 9, 0))
+
+    def test_resumen_global(self):
+        """Prueba percentiles, histograma y correlación ignorando nulos."""
+        resumen = self.instantanea.estadisticas('salario', tramos=2)
+
+        self.assertEqual(resumen['n'], 2)
+        self.assertEqual(resumen['media'], 40000)
+        self.assertEqual(resumen['percentiles']['p50'], 40000)
+        self.assertEqual([t['n'] for t in resumen['histograma']], [1, 1])
+        self.assertEqual(resumen['correlacion_edad_salario'], 1.0)
+
+    def test_agrupado(self):
+        """Prueba la agrupación por una columna categórica."""
+        self.instantanea.actualizar()
+
+        grupos = self.instantanea.estadisticas('edad', 'ciudad')['grupos']
+
+        self.assertEqual({g['valor']: g['n'] for g in grupos}, {'Madrid': 1, 'Bilbao': 1, 'Sevilla': 1})
+        self.assertEqual(next(g for g in grupos if g['valor'] == 'Bilbao')['media'], 41)
+
+    def test_endpoint(self):
+        """Prueba el endpoint con la instantánea del controlador."""
+        app.config['TESTING'] = True
+        with patch.object(user_controller, 'instantanea', self.instantanea):
+            response = app.test_client().get('/usuarios/estadisticas/numericas?campo=edad&agrupar_por=genero')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['datos']['agrupar_por'], 'genero')
+
+
+class TestEndpointSinNumpy(unittest.TestCase):
+    """Pruebas de validación y disponibilidad del endpoint."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    @patch('models.instantanea.np', None)
+    def test_sin_numpy(self):
+        """Prueba 501 cuando numpy no está instalado."""
+        response = self.client.get('/usuarios/estadisticas/numericas')
+
+        self.assertEqual(response.status_code, 501)
+
+    @patch('models.instantanea.np', object())
+    def test_parametros_invalidos(self):
+        """Prueba campo, agrupación y tramos inválidos."""
+        self.assertEqual(self.client.get('/usuarios/estadisticas/numericas?campo=id').status_code, 400)
+        self.assertEqual(self.client.get('/usuarios/estadisticas/numericas?agrupar_por=email').status_code, 400)
+        self.assertEqual(self.client.get('/usuarios/estadisticas/numericas?tramos=0').status_code, 400)
+
+    @patch('models.instantanea.np', object())
+    def test_cargando_503(self):
+        """Prueba 503 sin bloquear mientras la carga inicial corre en segundo plano."""
+        instantanea = InstantaneaUsuarios()
+        with patch.object(user_controller, 'instantanea', instantanea), \
+             patch.object(instantanea, 'iniciar') as iniciar:
+            response = self.client.get('/usuarios/estadisticas/numericas')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '5')
+        iniciar.assert_called_once_with()
+
+
+class TestCargaEnSegundoPlano(unittest.TestCase):
+    """Pruebas de la carga inicial única y en segundo plano (sin numpy)."""
+
+    def test_una_sola_carga(self):
+        """Prueba que las peticiones en frío no repiten la carga en curso."""
+        instantanea = InstantaneaUsuarios()
+        with patch('models.instantanea.threading.Thread') as hilo:
+            for _ in range(3):
+                with self.assertRaises(Exception):
+                    instantanea.obtener()
+
+        hilo.assert_called_once()
+        self.assertTrue(instantanea._refrescando)
+
+    def test_libera_tras_fallo(self):
+        """Prueba que un fallo de la carga permite reintentarla."""
+        instantanea = InstantaneaUsuarios()
+        instantanea._refrescando = True
+        instantanea.actualizar = MagicMock(side_effect=Exception("sin conexión"))
+        with patch('builtins.print'):
+            instantanea._refrescar()
+
+        self.assertFalse(instantanea._refrescando)
+        self.assertFalse(instantanea.cargada())
+
+
+if __name__ == '__main__':
+    unittest.main()
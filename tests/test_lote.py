@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para la actualización y eliminación por lote.
+
+Prueba las funcionalidades de UserModel.actualizar_lote / eliminar_lote y
+de los endpoints PATCH y DELETE /usuarios/lote incluyendo:
+- UPDATE ... FROM sobre jsonb_populate_record en una sola sentencia
+- DELETE ... WHERE id = ANY(...) RETURNING id
+- Resultados por ID (actualizado, sin_cambios, no_encontrado, eliminado)
+- Validación de IDs y límite de tamaño del lote
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+import json
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from api import app, user_controller
+from database.connection import DatabaseConnection
+from database.instrumentacion import contador_consultas
+from models.user_model import UserModel
+
+
+class TestLoteModelo(unittest.TestCase):
+    """Pruebas del SQL de las operaciones por lote de UserModel."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.modelo = UserModel()
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def test_actualizar_lote_una_sentencia(self):
+        """Prueba que un lote heterogéneo es un único UPDATE ... FROM."""
+        self.mock_cursor.fetchall.return_value = [
+            (1, 'actualizado'), (2, 'sin_cambios'), (3, 'no_encontrado')]
+
+        with contador_consultas.medir() as sentencias:
+            resultados = self.modelo.actualizar_lote({
+                1: {'ciudad': 'Bilbao'},
+                2: {'activo': False, 'edad': 40},
+                3: {'ciudad': 'Lugo'},
+            })
+
+        self.assertEqual(len(sentencias), 1)
+        self.assertIn('jsonb_populate_record(NULL::users', sentencias[0])
+        self.assertIn("ciudad = CASE WHEN c.cambio ? 'ciudad' THEN c.ciudad ELSE u.ciudad END",
+                      sentencias[0])
+        self.assertIn("(c.cambio ? 'edad' AND u.edad IS DISTINCT FROM c.edad)", sentencias[0])
+        self.assertNotIn('nombre =', sentencias[0])
+        self.assertEqual(resultados, {1: 'actualizado', 2: 'sin_cambios', 3: 'no_encontrado'})
+        self.mock_conn.commit.assert_called_once()
+
+        cargas = self.mock_cursor.execute.call_args[0][1][0].adapted
+        self.assertEqual(cargas[1], {'activo': False, 'edad': 40, 'id': 2})
+
+    def test_actualizar_lote_email_duplicado(self):
+        """Prueba que un error de integridad se traduce a ValueError."""
+        import psycopg2
+        self.mock_cursor.execute.side_effect = psycopg2.IntegrityError("duplicate key")
+
+        with self.assertRaises(ValueError):
+            self.modelo.actualizar_lote({1: {'email': 'repetido@x.com'}})
+        self.mock_conn.commit.assert_not_called()
+
+    def test_actualizar_lote_valor_no_valido(self):
+        """Prueba que un valor que no se puede tipar es un ValueError con su id y campo."""
+        import psycopg2
+        self.mock_cursor.execute.side_effect = psycopg2.DataError(
+            'invalid input syntax for type integer: "cuarenta"')
+
+        with self.assertRaises(ValueError) as contexto:
+            self.modelo.actualizar_lote({1: {'ciudad': 'Bilbao'}, 2: {'edad': 'cuarenta'}})
+        self.assertIn('Usuario 2: valor no válido para edad', str(contexto.exception))
+        self.mock_conn.commit.assert_not_called()
+
+    def test_eliminar_lote(self):
+        """Prueba que el lote se borra con ANY y RETURNING id."""
+        self.mock_cursor.fetchall.return_value = [(1,), (3,)]
+
+        with contador_consultas.medir() as sentencias:
+            resultados = self.modelo.eliminar_lote([1, 2, 3])
+
+        self.assertEqual(len(sentencias), 1)
+        self.assertIn('WHERE id = ANY(%s) RETURNING id', sentencias[0])
+        self.assertEqual(resultados, {1: 'eliminado', 2: 'no_encontrado', 3: 'eliminado'})
+
+
+class TestLoteEndpoints(unittest.TestCase):
+    """Pruebas de los endpoints PATCH y DELETE /usuarios/lote."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_patch_lote_mapa(self):
+        """Prueba el formato {id: campos} y el resumen por resultado."""
+        with patch.object(user_controller.user_model, 'actualizar_lote',
+                          return_value={1: 'actualizado', 2: 'no_encontrado'}) as mock_lote:
+            response = self.client.patch('/usuarios/lote',
+                                         data=json.dumps({'1': {'ciudad': 'Bilbao'},
+                                                          '2': {'activo': False}}),
+                                         content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        mock_lote.assert_called_once_with({1: {'ciudad': 'Bilbao'}, 2: {'activo': False}})
+        datos = response.get_json()['datos']
+        self.assertEqual(datos['resumen'], {'actualizados': 1, 'sin_cambios': 0, 'archivados': 0, 'no_encontrados': 1})
+        self.assertEqual(datos['resultados'][1], {'id': 2, 'resultado': 'no_encontrado'})
+
+    def test_patch_lote_lista_fusiona_repetidos(self):
+        """Prueba el formato lista y que un ID repetido acumula sus campos."""
+        with patch.object(user_controller.user_model, 'actualizar_lote',
+                          return_value={4: 'actualizado'}) as mock_lote:
+            self.client.patch('/usuarios/lote',
+                              data=json.dumps({'usuarios': [
+                                  {'id': 4, 'ciudad': 'Soria'},
+                                  {'id': 4, 'edad': 33, 'campo_raro': 1},
+                              ]}),
+                              content_type='application/json')
+
+        mock_lote.assert_called_once_with({4: {'ciudad': 'Soria', 'edad': 33}})
+
+    def test_patch_lote_id_invalido(self):
+        """Prueba que un ID no numérico rechaza el lote entero."""
+        response = self.client.patch('/usuarios/lote',
+                                     data=json.dumps({'abc': {'ciudad': 'Bilbao'}}),
+                                     content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_delete_lote_id_no_entero(self):
+        """Prueba que 1.9, true o '1.5' no se truncan a un ID."""
+        for valor in (1.9, True, '1.5', ' 2'):
+            with patch.object(user_controller.user_model, 'eliminar_lote') as mock_lote:
+                response = self.client.delete('/usuarios/lote', data=json.dumps({'ids': [valor]}),
+                                              content_type='application/json')
+            self.assertEqual(response.status_code, 400, valor)
+            mock_lote.assert_not_called()
+
+    def test_patch_lote_demasiado_grande(self):
+        """Prueba el límite de tamaño del lote."""
+        with patch.object(user_controller, 'lote_maximo', 1):
+            response = self.client.patch('/usuarios/lote',
+                                         data=json.dumps({'1': {'edad': 1}, '2': {'edad': 2}}),
+                                         content_type='application/json')
+
+        self.assertEqual(response.status_code, 413)
+
+    def test_delete_lote(self):
+        """Prueba que DELETE /usuarios/lote informa por ID."""
+        with patch.object(user_controller.user_model, 'eliminar_lote',
+                          return_value={5: 'eliminado', 6: 'no_encontrado'}) as mock_lote:
+            response = self.client.delete('/usuarios/lote', data=json.dumps({'ids': [5, 6, 5]}),
+                                          content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        mock_lote.assert_called_once_with([5, 6])
+        self.assertEqual(response.get_json()['datos']['resumen'],
+                         {'eliminados': 1, 'no_encontrados': 1})
+
+    def test_delete_lote_vacio(self):
+        """Prueba que un lote vacío se rechaza."""
+        response = self.client.delete('/usuarios/lote', data=json.dumps({'ids': []}),
+                                      content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para el aplicador de migraciones SQL.
+
+Prueba las funcionalidades de scripts/migrar.py incluyendo:
+- Orden de las migraciones por prefijo numérico
+- Aplicación solo de las pendientes, una transacción por fichero
+- Rollback ante un error
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz y scripts/ al path para imports
+raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(raiz)
+sys.path.append(os.path.join(raiz, 'scripts'))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from database.connection import DatabaseConnection
+import migrar
+
+
+class TestMigrador(unittest.TestCase):
+    """Pruebas de Migrador contra una conexión simulada."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.directorio = Path(tempfile.mkdtemp())
+        for nombre in ('002_segunda.sql', '001_primera.sql', '010_decima.sql', 'notas.txt'):
+            (self.directorio / nombre).write_text(f'-- {nombre}\nSELECT 1;', encoding='utf-8')
+
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def test_listar_en_orden(self):
+        """Prueba el orden por prefijo y que se ignoran otros ficheros."""
+        nombres = [ruta.name for ruta in migrar.listar_migraciones(self.directorio)]
+
+        self.assertEqual(nombres, ['001_primera.sql', '002_segunda.sql', '010_decima.sql'])
+
+    def test_aplica_solo_pendientes(self):
+        """Prueba que las ya registradas no se vuelven a ejecutar."""
+        self.mock_cursor.fetchall.return_value = [('001_primera',)]
+
+        with patch('builtins.print'):
+            aplicadas = migrar.Migrador(self.directorio).migrar()
+
+        self.assertEqual(aplicadas, ['002_segunda', '010_decima'])
+        registros = [c[0][1] for c in self.mock_cursor.execute.call_args_list
+                     if 'INSERT INTO schema_migraciones' in c[0][0]]
+        self.assertEqual(registros, [('002_segunda',), ('010_decima',)])
+
+    def test_error_deshace_la_migracion(self):
+        """Prueba el rollback y que no se siguen aplicando migraciones."""
+        self.mock_cursor.fetchall.return_value = []
+        self.mock_cursor.execute.side_effect = [None, None, Exception("sintaxis")]
+
+        with patch('builtins.print'), self.assertRaises(Exception):
+            migrar.Migrador(self.directorio).migrar()
+
+        self.mock_conn.rollback.assert_called_once()
+        self.mock_conn.close.assert_called_once()
+
+    def test_migraciones_del_proyecto(self):
+        """Prueba que las migraciones del repositorio siguen el formato NNN_nombre.sql."""
+        migraciones = migrar.listar_migraciones()
+
+        self.assertTrue(migraciones)
+        self.assertEqual(migraciones[0].name, '001_notificar_cambios_usuarios.sql')
+
+    def test_notify_por_sentencia(self):
+        """Prueba que ningún trigger de fila emite NOTIFY (un aviso por sentencia)."""
+        sql = migrar.listar_migraciones()[0].read_text(encoding='utf-8')
+
+        self.assertIn('pg_notify', sql)
+        self.assertNotIn('FOR EACH ROW', sql)
+        self.assertEqual(sql.count('FOR EACH STATEMENT'), 3)
+
+    def test_relleno_antes_del_trigger(self):
+        """Prueba que fecha_actualizacion se rellena antes de crear el trigger que la pisa."""
+        sql = migrar.listar_migraciones()[1].read_text(encoding='utf-8')
+
+        self.assertLess(sql.index('UPDATE users SET fecha_actualizacion = fecha_registro'),
+                        sql.index('CREATE TRIGGER usuarios_marcar_fecha_actualizacion'))
+        # Lápidas y purga una vez por sentencia, no por fila eliminada
+        self.assertIn('REFERENCING OLD TABLE AS viejos\n    FOR EACH STATEMENT', sql)
+
+    def test_bajas_del_archivo(self):
+        """Prueba que borrar un archivado deja lápida, NOTIFY y outbox, y los traslados no."""
+        sql = migrar.listar_migraciones()[6].read_text(encoding='utf-8')
+
+        for funcion in ('registrar_usuario_eliminado', 'notificar_cambio_usuario', 'outbox_registrar_bajas',
+                        'altas_registrar'):
+            self.assertIn(f"AFTER DELETE ON users_archivo REFERENCING OLD TABLE AS viejos\n"
+                          f"    FOR EACH STATEMENT\n"
+                          f"    WHEN (current_setting('usuarios.archivo', true) IS DISTINCT FROM 'on')\n"
+                          f"    EXECUTE FUNCTION {funcion}();", sql)
+
+    def test_altas_de_archivar_y_borrar(self):
+        """Prueba que archivar conserva el alta y borrar después del archivo la resta."""
+        altas = migrar.listar_migraciones()[4].read_text(encoding='utf-8')
+        archivo = migrar.listar_migraciones()[6].read_text(encoding='utf-8')
+
+        # Archivar (usuarios.archivo = 'on') no pasa por la resta de users...
+        self.assertIn("CREATE TRIGGER altas_usuarios_delete\n"
+                      "    AFTER DELETE ON users REFERENCING OLD TABLE AS viejos\n"
+                      "    FOR EACH STATEMENT\n"
+                      "    WHEN (current_setting('usuarios.archivo', true) IS DISTINCT FROM 'on')", archivo)
+        # ...y el borrado del archivo la hace con la misma función, que solo lee viejos
+        self.assertIn("CREATE TRIGGER archivo_altas_delete", archivo)
+        self.assertIn("ELSIF TG_OP = 'DELETE' THEN", altas)
+        self.assertIn('FROM viejos WHERE fecha_registro IS NOT NULL', altas)
+
+
+if __name__ == '__main__':
+    unittest.main()
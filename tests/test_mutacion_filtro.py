@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para la mutación de usuarios por filtro.
+
+Prueba las funcionalidades de UserModel.contar_por_filtro / mutar_por_filtro
+y del endpoint PATCH /usuarios/por-filtro incluyendo:
+- Filtros compartidos con el listado paginado
+- Simulación (solo recuento) y límite de filas, también durante la mutación
+- Recorrido por id en lotes, una transacción por lote
+- Lista blanca de campos y operaciones
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+import json
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from api import app, user_controller
+from database.connection import DatabaseConnection
+from database.instrumentacion import contador_consultas
+from models.user_model import UserModel
+
+
+class TestMutacionFiltroModelo(unittest.TestCase):
+    """Pruebas del SQL de la mutación por filtro."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.modelo = UserModel()
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def test_contar_por_filtro(self):
+        """Prueba que la simulación cuenta coincidencias y cambios en una sentencia."""
+        self.mock_cursor.fetchall.return_value = [{'coinciden': 10, 'a_modificar': 4}]
+
+        with contador_consultas.medir() as sentencias:
+            conteo = self.modelo.contar_por_filtro({'ciudad': 'Madrid'}, 'activo', 'asignar', False)
+
+        self.assertEqual(len(sentencias), 1)
+        self.assertIn('FILTER (WHERE ciudad = %s AND %s IS DISTINCT FROM activo)', sentencias[0])
+        self.assertEqual(self.mock_cursor.execute.call_args[0][1], ['Madrid', False, 'Madrid'])
+        self.assertEqual(conteo, {'coinciden': 10, 'a_modificar': 4})
+
+    def test_mutar_en_lotes(self):
+        """Prueba el recorrido por id y un commit por lote."""
+        self.mock_cursor.fetchone.side_effect = [
+            (500, list(range(1, 501))), (731, list(range(501, 732))), (None, None)]
+
+        with contador_consultas.medir() as sentencias:
+            resultado = self.modelo.mutar_por_filtro(
+                {'profesion': 'Tester'}, 'salario', 'multiplicar', 1.03, tamano_lote=500)
+
+        self.assertEqual(resultado, {'filas_actualizadas': 731, 'lotes': 2, 'limite_alcanzado': False})
+        self.assertEqual(len(sentencias), 3)
+        self.assertIn('UPDATE users SET salario = salario * %s', sentencias[0])
+        self.assertEqual(self.mock_conn.commit.call_count, 3)
+
+        # El segundo lote continúa tras el último id del primero
+        parametros = self.mock_cursor.execute.call_args_list[1][0][1]
+        self.assertEqual(parametros, ['Tester', 1.03, 500, 500, 1.03, 'Tester', 1.03])
+
+    def test_limite_durante_la_mutacion(self):
+        """Prueba que el lote que superaría el límite se deshace y se detiene."""
+        self.mock_cursor.fetchone.side_effect = [
+            (500, list(range(1, 501))), (702, list(range(501, 702)))]
+
+        with patch('builtins.print'):
+            resultado = self.modelo.mutar_por_filtro(
+                {'profesion': 'Tester'}, 'salario', 'multiplicar', 1.03,
+                tamano_lote=500, maximo_filas=700)
+
+        self.assertEqual(resultado, {'filas_actualizadas': 500, 'lotes': 1, 'limite_alcanzado': True})
+        self.assertEqual(self.mock_conn.commit.call_count, 1)
+        self.mock_conn.rollback.assert_called_once()
+        # El segundo lote solo pide lo que queda más una fila
+        self.assertEqual(self.mock_cursor.execute.call_args_list[1][0][1][3], 201)
+
+    def test_operacion_no_permitida(self):
+        """Prueba que un campo fuera de la lista blanca no llega a la base de datos."""
+        with self.assertRaises(ValueError):
+            self.modelo.mutar_por_filtro({'ciudad': 'Madrid'}, 'email', 'asignar', 'x@x.com')
+
+        self.mock_conn.cursor.assert_not_called()
+
+    def test_sin_filtros(self):
+        """Prueba que no se permite mutar toda la tabla."""
+        with self.assertRaises(ValueError):
+            self.modelo.contar_por_filtro({}, 'activo', 'asignar', False)
+
+    def test_listado_con_filtros(self):
+        """Prueba que el listado paginado aplica los mismos filtros al total y a la página."""
+        self.mock_cursor.fetchall.return_value = []
+
+        metodo_original(UserModel, 'obtener_paginados')(
+            self.modelo, 1, 10, {'ciudad': 'Madrid', 'edad_min': 30})
+
+        consulta, parametros = self.mock_cursor.execute.call_args[0]
+        self.assertEqual(consulta.count('WHERE ciudad = %s AND edad >= %s'), 2)
+        self.assertEqual(parametros, ['Madrid', 30, 'Madrid', 30, 10, 0])
+
+
+class TestMutacionFiltroEndpoint(unittest.TestCase):
+    """Pruebas del endpoint PATCH /usuarios/por-filtro."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def patch(self, ruta, cuerpo):
+        return self.client.patch(ruta, data=json.dumps(cuerpo), content_type='application/json')
+
+    def test_simulacion(self):
+        """Prueba que 'simular' devuelve el recuento sin modificar nada."""
+        with patch.object(user_controller.user_model, 'contar_por_filtro',
+                          return_value={'coinciden': 8, 'a_modificar': 5}), \
+             patch.object(user_controller.user_model, 'mutar_por_filtro') as mock_mutar:
+            response = self.patch('/usuarios/por-filtro?ciudad=Madrid&activo=true',
+                                  {'campo': 'activo', 'valor': False, 'simular': True})
+
+        self.assertEqual(response.status_code, 200)
+        datos = response.get_json()['datos']
+        self.assertTrue(datos['simulacion'])
+        self.assertEqual(datos['filtros'], {'ciudad': 'Madrid', 'activo': True})
+        mock_mutar.assert_not_called()
+
+    def test_limite_de_filas(self):
+        """Prueba que se rechaza con 409 una mutación por encima del límite."""
+        with patch.object(user_controller, 'mutacion_maximo_filas', 100), \
+             patch.object(user_controller.user_model, 'contar_por_filtro',
+                          return_value={'coinciden': 500, 'a_modificar': 500}), \
+             patch.object(user_controller.user_model, 'mutar_por_filtro') as mock_mutar:
+            response = self.patch('/usuarios/por-filtro?profesion=Tester',
+                                  {'campo': 'salario', 'operacion': 'multiplicar', 'valor': 1.03})
+
+        self.assertEqual(response.status_code, 409)
+        mock_mutar.assert_not_called()
+
+    def test_mutacion(self):
+        """Prueba una mutación dentro del límite con el tamaño de lote configurado."""
+        with patch.object(user_controller.user_model, 'contar_por_filtro',
+                          return_value={'coinciden': 3, 'a_modificar': 3}), \
+             patch.object(user_controller.user_model, 'mutar_por_filtro',
+                          return_value={'filas_actualizadas': 3, 'lotes': 1,
+                                        'limite_alcanzado': False}) as mock_mutar:
+            response = self.patch('/usuarios/por-filtro?ciudad=Lugo',
+                                  {'campo': 'ciudad', 'valor': 'Ourense'})
+
+        self.assertEqual(response.status_code, 200)
+        mock_mutar.assert_called_once_with({'ciudad': 'Lugo'}, 'ciudad', 'asignar', 'Ourense',
+                                           tamano_lote=user_controller.mutacion_tamano_lote,
+                                           maximo_filas=user_controller.mutacion_maximo_filas)
+
+    def test_limite_alcanzado_durante_la_mutacion(self):
+        """Prueba el 409 con el resultado parcial si el límite se alcanza al mutar."""
+        with patch.object(user_controller, 'mutacion_maximo_filas', 100), \
+             patch.object(user_controller.user_model, 'contar_por_filtro',
+                          return_value={'coinciden': 90, 'a_modificar': 90}), \
+             patch.object(user_controller.user_model, 'mutar_por_filtro',
+                          return_value={'filas_actualizadas': 100, 'lotes': 1,
+                                        'limite_alcanzado': True}):
+            response = self.patch('/usuarios/por-filtro?profesion=Tester',
+                                  {'campo': 'salario', 'operacion': 'sumar', 'valor': 10})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.get_json()['datos']['filas_actualizadas'], 100)
+
+    def test_sin_filtros(self):
+        """Prueba que sin filtros se responde 400."""
+        response = self.patch('/usuarios/por-filtro', {'campo': 'activo', 'valor': False})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_operacion_numerica_con_texto(self):
+        """Prueba que multiplicar exige un valor numérico."""
+        response = self.patch('/usuarios/por-filtro?ciudad=Madrid',
+                              {'campo': 'salario', 'operacion': 'multiplicar', 'valor': 'mucho'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_filtro_invalido_en_listado(self):
+        """Prueba que el listado paginado valida los filtros."""
+        response = self.client.get('/usuarios/paginado?edad_min=treinta')
+
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para la outbox transaccional de usuarios.
+
+Prueba las funcionalidades de database.outbox.RelayOutbox incluyendo:
+- Recogida de lotes con FOR UPDATE SKIP LOCKED
+- Entrega en paralelo a webhooks (servidor HTTP local de pruebas)
+- Confirmación de lo entregado y reintento con espera ante fallos
+- Estado de entrega por webhook y reintento de los fallidos
+- Migración con triggers de sentencia sobre tablas de transición
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+import json
+import threading
+from datetime import datetime, timezone
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from database.connection import DatabaseConnection
+from database.outbox import RelayOutbox
+
+
+class ReceptorWebhook(HTTPServer):
+    """Servidor HTTP local que guarda los cuerpos recibidos"""
+
+    def __init__(self, estado=200):
+        self.estado = estado
+        self.recibidos = []
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_POST(manejador):
+                longitud = int(manejador.headers['Content-Length'])
+                self.recibidos.append(json.loads(manejador.rfile.read(longitud)))
+                manejador.send_response(self.estado)
+                manejador.end_headers()
+
+            def log_message(manejador, *args):
+                pass
+
+        super().__init__(('127.0.0.1', 0), Manejador)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/eventos'
+
+    def cerrar(self):
+        self.shutdown()
+        self.server_close()
+
+
+class TestRelayOutbox(unittest.TestCase):
+    """Pruebas de RelayOutbox contra una conexión simulada."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+        self.receptores = []
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+        for receptor in self.receptores:
+            receptor.cerrar()
+
+    def receptor(self, estado=200):
+        receptor = ReceptorWebhook(estado)
+        self.receptores.append(receptor)
+        return receptor
+
+    AHORA = datetime(2026, 10, 1, 12, 5, tzinfo=timezone.utc)
+
+    def filas(self, *ids, entregas=None):
+        return [{'id': i, 'operacion': 'update', 'usuario_id': i * 10, 'carga': {'nombre': 'Ana'},
+                 'creado': datetime(2026, 10, 1, 12, 0), 'intentos': 0,
+                 'entregas': dict(entregas or {}), 'ahora': self.AHORA} for i in ids]
+
+    def sentencias(self):
+        return [c[0] for c in self.mock_cursor.execute.call_args_list]
+
+    def test_entrega_y_confirma(self):
+        """Prueba que el lote llega a todos los webhooks y se borra de la outbox."""
+        a, b = self.receptor(), self.receptor(204)
+        self.mock_cursor.fetchall.return_value = self.filas(1, 2)
+        relay = RelayOutbox(webhooks=[a.url, b.url], tamano_lote=50)
+
+        self.assertEqual(relay.procesar_lote(), 2)
+
+        recoger, confirmar = self.sentencias()
+        self.assertIn('FOR UPDATE SKIP LOCKED', recoger[0])
+        self.assertEqual(recoger[1], (50,))
+        self.assertIn('DELETE FROM outbox_usuarios', confirmar[0])
+        self.assertEqual(confirmar[1], ([1, 2],))
+        self.mock_conn.commit.assert_called_once()
+        for receptor in (a, b):
+            self.assertEqual(len(receptor.recibidos), 1)
+            eventos = receptor.recibidos[0]['eventos']
+            self.assertEqual([e['id'] for e in eventos], [1, 2])
+            self.assertEqual(eventos[0]['fecha'], '2026-10-01T12:00:00')
+
+    def test_fallo_reprograma(self):
+        """Prueba que un webhook con error reintenta solo hacia él."""
+        correcto, roto = self.receptor(), self.receptor(500)
+        self.mock_cursor.fetchall.return_value = self.filas(7)
+        relay = RelayOutbox(webhooks=[correcto.url, roto.url], max_intentos=3)
+
+        with patch('builtins.print'):
+            relay.procesar_lote()
+
+        sql, parametros = self.sentencias()[1]
+        self.assertIn('jsonb_to_recordset', sql)
+        cambio, = parametros[0].adapted
+        self.assertEqual(cambio['estado'], 'pendiente')
+        self.assertEqual(cambio['entregas'][correcto.url], {'estado': 'entregado'})
+        self.assertEqual(cambio['entregas'][roto.url]['intentos'], 1)
+        self.assertIn('HTTP 500', cambio['ultimo_error'])
+        self.assertEqual(cambio['siguiente_intento'], '2026-10-01T12:05:01+00:00')
+        self.mock_conn.commit.assert_called_once()
+
+        # En el reintento el webhook que ya lo tiene no lo vuelve a recibir
+        self.mock_cursor.execute.reset_mock()
+        roto.estado = 200
+        self.mock_cursor.fetchall.return_value = self.filas(
+            7, entregas={**cambio['entregas'], roto.url: {**cambio['entregas'][roto.url], 'siguiente': None}})
+        relay.procesar_lote()
+
+        self.assertEqual(len(correcto.recibidos), 1)
+        self.assertEqual(len(roto.recibidos), 2)
+        self.assertEqual(self.sentencias()[1][1], ([7],))
+
+    def test_webhook_agotado_no_bloquea_al_resto(self):
+        """Prueba que agotar los intentos de un webhook deja el evento fallido sin reenviarlo."""
+        correcto, roto = self.receptor(), self.receptor(500)
+        entregas = {correcto.url: {'estado': 'entregado'},
+                    roto.url: {'estado': 'pendiente', 'intentos': 2, 'siguiente': None}}
+        self.mock_cursor.fetchall.return_value = self.filas(7, entregas=entregas)
+        relay = RelayOutbox(webhooks=[correcto.url, roto.url], max_intentos=3)
+
+        with patch('builtins.print'):
+            relay.procesar_lote()
+
+        self.assertEqual(correcto.recibidos, [])
+        cambio, = self.sentencias()[1][1][0].adapted
+        self.assertEqual(cambio['estado'], 'fallido')
+        self.assertEqual(cambio['intentos'], 3)
+        self.assertEqual(cambio['entregas'][roto.url]['estado'], 'fallido')
+
+    def test_reintentar_fallidos(self):
+        """Prueba que los fallidos vuelven a pendientes conservando lo ya entregado."""
+        self.mock_cursor.description = None
+        self.mock_cursor.rowcount = 4
+
+        self.assertEqual(RelayOutbox(webhooks=['http://a/eventos']).reintentar_fallidos(), 4)
+
+        sql = self.sentencias()[0][0]
+        self.assertIn("WHERE estado = 'fallido'", sql)
+        self.assertIn("entrega->>'estado' = 'entregado'", sql)
+        self.mock_conn.commit.assert_called_once()
+
+    def test_webhook_inalcanzable(self):
+        """Prueba que un error de red también cuenta como fallo de entrega."""
+        receptor = self.receptor()
+        url = receptor.url
+        receptor.cerrar()
+        self.receptores.remove(receptor)
+        relay = RelayOutbox(webhooks=[url], timeout=1)
+
+        self.assertIsNotNone(relay.entregar({url: [{'id': 1}]})[url])
+
+    def test_outbox_vacia(self):
+        """Prueba que sin eventos no se envía nada."""
+        receptor = self.receptor()
+        self.mock_cursor.fetchall.return_value = []
+
+        self.assertEqual(RelayOutbox(webhooks=[receptor.url]).procesar_lote(), 0)
+        self.assertEqual(receptor.recibidos, [])
+        self.assertEqual(len(self.sentencias()), 1)
+
+    def test_error_deshace_y_libera(self):
+        """Prueba el rollback (los eventos vuelven a quedar libres) ante un error."""
+        self.mock_cursor.execute.side_effect = Exception("conexión perdida")
+
+        with self.assertRaises(Exception):
+            RelayOutbox(webhooks=['http://127.0.0.1:1/']).procesar_lote()
+
+        self.mock_conn.rollback.assert_called_once()
+        self.mock_conn.close.assert_called_once()
+
+    @patch.dict(os.environ, {'OUTBOX_WEBHOOKS': ''})
+    def test_sin_webhooks(self):
+        """Prueba que sin webhooks el relay no arranca (no vaciaría la outbox)."""
+        with self.assertRaises(ValueError):
+            RelayOutbox()
+        with self.assertRaises(ValueError):
+            RelayOutbox(webhooks=[])
+
+    @patch.dict(os.environ, {'OUTBOX_WEBHOOKS': 'http://a/eventos, http://b/eventos,'})
+    def test_webhooks_desde_entorno(self):
+        """Prueba la lectura de OUTBOX_WEBHOOKS."""
+        self.assertEqual(RelayOutbox().webhooks, ['http://a/eventos', 'http://b/eventos'])
+
+
+class TestMigracionOutbox(unittest.TestCase):
+    """Pruebas del SQL de la migración de la outbox."""
+
+    def test_triggers_de_sentencia(self):
+        """Prueba que cada escritura añade sus eventos con un único INSERT por sentencia."""
+        ruta = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'database', 'migraciones', '003_outbox_usuarios.sql')
+        with open(ruta, encoding='utf-8') as fichero:
+            sql = fichero.read()
+
+        self.assertIn('CREATE TABLE IF NOT EXISTS outbox_usuarios', sql)
+        self.assertEqual(sql.count('FOR EACH STATEMENT'), 3)
+        self.assertIn("WHERE estado = 'pendiente'", sql)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para el particionado de users por hash de id.
+
+Prueba las funcionalidades de database.particionado.ParticionadorUsuarios
+y del upsert de UserModel con users particionada incluyendo:
+- Plan de conversión: versión mínima, secuencia, particiones e índices
+- Ejecución en una sola transacción y deshacer ante un error
+- Recuento de particiones recorridas en un EXPLAIN ANALYZE
+- Upsert por email sin ON CONFLICT, resuelto con users_emails
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from database.connection import DatabaseConnection
+from database.instrumentacion import contador_consultas
+from database.particionado import ParticionadorUsuarios, CONSULTAS_AUDITORIA
+from models.user_model import UserModel
+
+
+class BaseConexionSimulada(unittest.TestCase):
+    """Conexión real de DatabaseConnection sobre un psycopg2.connect simulado."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+
+class TestPlanConversion(BaseConexionSimulada):
+    """Pruebas del plan de ParticionadorUsuarios."""
+
+    def catalogo(self, version=160000, tipo='r', secuencia='public.users_id_seq'):
+        self.mock_cursor.fetchone.side_effect = [(version,), ('users', tipo), (secuencia,)]
+        self.mock_cursor.fetchall.return_value = [
+            ('idx_users_fecha_actualizacion_id',
+             'CREATE INDEX idx_users_fecha_actualizacion_id ON public.users USING btree (fecha_actualizacion, id)'),
+        ]
+
+    def test_plan_completo(self):
+        """Prueba el orden de los pasos, las particiones y los índices locales."""
+        self.catalogo()
+        sentencias = [sql for _, sql in ParticionadorUsuarios(4).plan(self.mock_conn)]
+
+        self.assertEqual(sentencias[0], 'LOCK TABLE users IN ACCESS EXCLUSIVE MODE')
+        # La secuencia se suelta antes de mover la tabla y se reasigna tras la copia
+        soltar = sentencias.index('ALTER SEQUENCE public.users_id_seq OWNED BY NONE')
+        mover = next(i for i, sql in enumerate(sentencias) if 'SET SCHEMA respaldo' in sql)
+        copiar = sentencias.index('INSERT INTO users SELECT * FROM respaldo.users')
+        asignar = sentencias.index('ALTER SEQUENCE public.users_id_seq OWNED BY users.id')
+        self.assertLess(soltar, mover)
+        self.assertLess(copiar, asignar)
+
+        particiones = [sql for sql in sentencias if 'PARTITION OF users' in sql]
+        self.assertEqual(len(particiones), 4)
+        self.assertIn('FOR VALUES WITH (MODULUS 4, REMAINDER 3)', particiones[-1])
+        self.assertIn('CREATE INDEX IF NOT EXISTS idx_users_fecha_actualizacion_id ON users USING btree '
+                      '(fecha_actualizacion, id)', sentencias)
+        self.assertIn('CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)', sentencias)
+
+        # Las migraciones se reaplican después de copiar y el registro de
+        # emails, después de la 007 (quita su trigger de email archivado)
+        archivo = next(i for i, sql in enumerate(sentencias) if 'CREATE TRIGGER usuarios_archivo_email' in sql)
+        registro = next(i for i, sql in enumerate(sentencias) if 'registrar_email_usuario' in sql)
+        self.assertLess(copiar, archivo)
+        self.assertLess(archivo, registro)
+        self.assertIn('DROP TRIGGER IF EXISTS usuarios_archivo_email ON users', sentencias[registro])
+        self.assertIn('DROP TABLE respaldo.users', sentencias)
+
+        self.catalogo()
+        sentencias = [sql for _, sql in ParticionadorUsuarios(4).plan(self.mock_conn, conservar_anterior=True)]
+        self.assertNotIn('DROP TABLE respaldo.users', sentencias)
+
+    def test_rechazos(self):
+        """Prueba los rechazos por versión, tabla ya particionada y particiones."""
+        self.catalogo(version=120000)
+        with self.assertRaises(Exception) as contexto:
+            ParticionadorUsuarios().plan(self.mock_conn)
+        self.assertIn('PostgreSQL 13', str(contexto.exception))
+
+        self.catalogo(tipo='p')
+        with self.assertRaises(Exception) as contexto:
+            ParticionadorUsuarios().plan(self.mock_conn)
+        self.assertIn('ya está particionada', str(contexto.exception))
+
+        with self.assertRaises(ValueError):
+            ParticionadorUsuarios(1)
+
+    def test_simulacion_y_error(self):
+        """Prueba que sin ejecutar no se aplica nada y que un error deshace la conversión."""
+        self.catalogo()
+        with patch('builtins.print'):
+            pasos = ParticionadorUsuarios(2).convertir(ejecutar=False, progreso=lambda _: None)
+        # Solo las consultas al catálogo (versión, tabla, secuencia, índices)
+        self.assertEqual(self.mock_cursor.execute.call_count, 4)
+        self.assertGreater(len(pasos), 4)
+        self.mock_conn.commit.assert_not_called()
+
+        self.catalogo()
+        self.mock_cursor.execute.reset_mock()
+        self.mock_conn.close.reset_mock()
+        self.mock_cursor.execute.side_effect = [None] * 6 + [Exception('fallo')]
+        with self.assertRaises(Exception):
+            ParticionadorUsuarios(2).convertir(ejecutar=True, progreso=lambda _: None)
+        self.mock_conn.rollback.assert_called_once()
+        self.mock_conn.commit.assert_not_called()
+        self.mock_conn.close.assert_called_once()
+
+    def test_particiones_en_plan(self):
+        """Prueba que las particiones podadas en ejecución no cuentan."""
+        plan = '\n'.join([
+            'Nested Loop (actual rows=1 loops=1)',
+            '  ->  Index Scan using users_emails_pkey on users_emails r (actual rows=1 loops=1)',
+            '  ->  Append (actual rows=1 loops=1)',
+            '        ->  Index Scan using users_p00_pkey on users_p00 u_1 (never executed)',
+            '        ->  Index Scan using users_p01_pkey on users_p01 u_2 (actual rows=1 loops=1)',
+            '        ->  Index Scan using users_p02_pkey on users_p02 u_3 (never executed)',
+        ])
+        self.assertEqual(ParticionadorUsuarios.particiones_en_plan(plan), 1)
+
+    def test_auditoria(self):
+        """Prueba que la auditoría cubre cada método y se deshace al terminar."""
+        self.assertTrue({'crear', 'restaurar', 'obtener_estadisticas / estimar_total_usuarios',
+                         'obtener_distribuciones', 'obtener_altas', 'estado del archivo'}
+                        <= set(CONSULTAS_AUDITORIA))
+        self.mock_cursor.fetchall.return_value = [
+            ('Aggregate (actual rows=1 loops=1)',),
+            ('  InitPlan 1 (returns $0)',),
+            ('    ->  Seq Scan on users_p00 users_1 (never executed)',),
+        ]
+        consultas = {nombre: CONSULTAS_AUDITORIA[nombre] for nombre in
+                     ('obtener_estadisticas / estimar_total_usuarios', 'obtener_paginados')}
+
+        resultado = ParticionadorUsuarios(4).auditar(consultas)
+
+        self.assertEqual(resultado, {'obtener_estadisticas / estimar_total_usuarios': (0, 0),
+                                     'obtener_paginados': (0, 4)})
+        self.assertTrue(self.mock_cursor.execute.call_args_list[0][0][0].startswith('EXPLAIN (ANALYZE'))
+        self.mock_conn.rollback.assert_called_once()
+        self.mock_conn.commit.assert_not_called()
+
+
+class TestUpsertParticionada(BaseConexionSimulada):
+    """Pruebas del upsert por email con users particionada."""
+
+    def test_una_sentencia_sin_on_conflict(self):
+        """Prueba el bloqueo por email y la resolución de ids con users_emails."""
+        modelo = UserModel()
+        modelo.particionada = True
+        self.mock_cursor.fetchall.return_value = [
+            {'id': 1, 'email': 'a@x.com', 'nombre': 'Ana', 'fecha_registro': datetime(2025, 1, 1),
+             'fecha_actualizacion': None, 'resultado': 'insertado'},
+            {'id': 9, 'email': 'b@x.com', 'nombre': 'Ana', 'fecha_registro': datetime(2025, 1, 1),
+             'fecha_actualizacion': None, 'resultado': 'sin_cambios'},
+        ]
+        registros = [{'email': 'a@x.com', 'nombre': 'Ana'}, {'email': 'b@x.com', 'nombre': 'Ana'}]
+
+        with patch('builtins.print'), contador_consultas.medir() as sentencias:
+            resultados = modelo.upsert_por_email(registros)
+
+        self.assertEqual(len(sentencias), 1)
+        self.assertNotIn('ON CONFLICT', sentencias[0])
+        self.assertIn('pg_advisory_xact_lock', sentencias[0])
+        self.assertIn('JOIN users_emails r ON r.email = e.email', sentencias[0])
+        emails, datos = self.mock_cursor.execute.call_args[0][1]
+        self.assertEqual(emails, ['a@x.com', 'b@x.com'])
+        self.assertEqual(datos.adapted, registros)
+        self.assertEqual([r['resultado'] for r in resultados], ['insertado', 'sin_cambios'])
+        self.assertEqual(resultados[0]['usuario']['fecha_registro'], '2025-01-01T00:00:00')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para la cabecera Prefer (RFC 7240).
+
+Prueba las funcionalidades del módulo middleware.preferencias y su uso
+en los controladores incluyendo:
+- Parseo de la cabecera Prefer
+- Respuestas 'return=minimal' en POST, PUT, PATCH y DELETE
+- RETURNING reducido en el modelo
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from api import app
+from controllers.user_controller import UserController
+from database.connection import DatabaseConnection
+from middleware.preferencias import parsear_prefer, respuesta_minima_solicitada
+from models.user_model import UserModel
+
+
+class TestParsearPrefer(unittest.TestCase):
+    """Pruebas para el parseo de la cabecera Prefer."""
+
+    def test_return_minimal(self):
+        """Prueba el caso básico return=minimal."""
+        self.assertEqual(parsear_prefer('return=minimal'), {'return': 'minimal'})
+
+    def test_varias_preferencias(self):
+        """Prueba varias preferencias, parámetros y mayúsculas."""
+        preferencias = parsear_prefer('respond-async, Return=Minimal; foo=bar, wait=10')
+
+        self.assertEqual(preferencias['return'], 'minimal')
+        self.assertEqual(preferencias['wait'], '10')
+        self.assertEqual(preferencias['respond-async'], '')
+
+    def test_primera_gana(self):
+        """Prueba que ante preferencias repetidas se usa la primera."""
+        self.assertEqual(parsear_prefer('return=representation, return=minimal')['return'],
+                         'representation')
+
+    def test_sin_contexto_de_peticion(self):
+        """Prueba que fuera de una petición no se pide respuesta mínima."""
+        self.assertFalse(respuesta_minima_solicitada())
+
+
+class TestRespuestaMinima(unittest.TestCase):
+    """Pruebas de los controladores con 'Prefer: return=minimal'."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.controller = UserController()
+        self.usuario_minimo = {'id': 7, 'fecha_registro': '2025-01-01T00:00:00',
+                               'fecha_actualizacion': None}
+        self.cabeceras = {'Prefer': 'return=minimal'}
+
+    def test_crear_minimo(self):
+        """Prueba que POST responde 201 con id, Location y ETag."""
+        with app.test_request_context('/usuarios', method='POST', headers=self.cabeceras,
+                                      json={'nombre': 'Ana', 'email': 'ana@email.com'}):
+            with patch.object(self.controller.user_model, 'crear',
+                              return_value=self.usuario_minimo) as mock_crear:
+                response = metodo_original(UserController, 'crear')(self.controller)
+
+        mock_crear.assert_called_once_with({'nombre': 'Ana', 'email': 'ana@email.com'}, minimo=True)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json(), {'id': 7})
+        self.assertEqual(response.headers['Location'], '/usuarios/7')
+        self.assertEqual(response.headers['Preference-Applied'], 'return=minimal')
+        self.assertTrue(response.headers['ETag'].startswith('W/'))
+
+    def test_patch_minimo(self):
+        """Prueba que PATCH responde 204 sin cuerpo."""
+        with app.test_request_context('/usuarios/7', method='PATCH', headers=self.cabeceras,
+                                      json={'ciudad': 'Sevilla'}):
+            with patch.object(self.controller.user_model, 'actualizar_parcial',
+                              return_value={'usuario': self.usuario_minimo,
+                                            'campos_actualizados': ['ciudad']}):
+                response = metodo_original(UserController, 'actualizar_parcial')(self.controller, 7)
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response.data, b'')
+        self.assertIn('ETag', response.headers)
+
+    def test_eliminar_minimo(self):
+        """Prueba que DELETE responde 204 sin recuperar el nombre."""
+        with app.test_request_context('/usuarios/7', method='DELETE', headers=self.cabeceras):
+            with patch.object(self.controller.user_model, 'eliminar',
+                              return_value={'id': 7}) as mock_eliminar:
+                response = metodo_original(UserController, 'eliminar')(self.controller, 7)
+
+        mock_eliminar.assert_called_once_with(7, minimo=True)
+        self.assertEqual(response.status_code, 204)
+
+    def test_sin_prefer_respuesta_completa(self):
+        """Prueba que sin Prefer se mantiene la respuesta con el usuario completo."""
+        usuario = dict(self.usuario_minimo, nombre='Ana', email='ana@email.com')
+        with app.test_request_context('/usuarios', method='POST',
+                                      json={'nombre': 'Ana', 'email': 'ana@email.com'}):
+            with patch.object(self.controller.user_model, 'crear', return_value=usuario):
+                respuesta, status_code = metodo_original(UserController, 'crear')(self.controller)
+
+        self.assertEqual(status_code, 201)
+        self.assertEqual(respuesta['datos']['nombre'], 'Ana')
+
+
+class TestModeloMinimo(unittest.TestCase):
+    """Pruebas del RETURNING reducido en el modelo."""
+
+    @patch('database.connection.psycopg2.connect')
+    def test_crear_returning_minimo(self, mock_connect):
+        """Prueba que el INSERT mínimo solo devuelve id y fechas."""
+        mock_conn = MagicMock()
+        mock_connect.return_value = mock_conn
+        mock_conn.cursor.return_value.fetchone.return_value = {
+            'id': 3, 'fecha_registro': None, 'fecha_actualizacion': None}
+
+        with patch.object(DatabaseConnection, 'obtener_conexion',
+                          metodo_original(DatabaseConnection, 'obtener_conexion')):
+            resultado = metodo_original(UserModel, 'crear')(
+                UserModel(), {'nombre': 'Ana', 'email': 'ana@email.com'}, minimo=True)
+
+        consulta = mock_conn.cursor.return_value.execute.call_args[0][0]
+        self.assertIn('RETURNING id, fecha_registro, fecha_actualizacion', consulta)
+        self.assertEqual(resultado['id'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Pruebas de presupuesto de sentencias SQL por operación.
+
+Ejecuta el SQL real de models.user_model contra una conexión simulada
+instrumentada y comprueba que ninguna operación supere su número máximo
+de sentencias (viajes de ida y vuelta a PostgreSQL). Una regresión N+1
+o un SELECT previo innecesario hace fallar estas pruebas.
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+from unittest.mock import patch, MagicMock
+from datetime import datetime
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from database.connection import DatabaseConnection
+from database.instrumentacion import ContadorConsultas, ConexionInstrumentada, contador_consultas
+from models.user_model import UserModel
+
+
+# Máximo de sentencias permitidas por operación del modelo
+PRESUPUESTOS = {
+    'obtener_todos': 1,
+    'obtener_por_id': 1,
+    'crear': 1,
+    'actualizar': 1,
+    'actualizar_parcial': 1,
+    'eliminar': 1,
+    'obtener_paginados': 1,
+    'obtener_estadisticas': 1,
+    'existe': 1,
+    'email_disponible': 1,
+    'restaurar': 1,
+    # Una sentencia por juego de campos enviado (por shard)
+    'upsert_por_email': 1,
+    'actualizar_lote': 1,
+    'eliminar_lote': 1,
+    # Por lote, contando el lote vacío que cierra el recorrido
+    'mutar_por_filtro': 1,
+    'obtener_cambios_desde': 1,
+    'buscar': 1,
+}
+
+
+def fila_usuario(usuario_id=1, **extra):
+    """Fila simulada de la tabla users tal como la devuelve RealDictCursor."""
+    fila = {
+        'id': usuario_id, 'nombre': 'Juan', 'apellido': 'Pérez',
+        'email': f'juan{usuario_id}@email.com', 'edad': 25,
+        'telefono': '+34-666-777-888', 'ciudad': 'Madrid', 'activo': True,
+        'fecha_registro': datetime(2025, 1, 1), 'fecha_actualizacion': datetime(2025, 1, 2),
+        'genero': 'Masculino', 'profesion': 'Desarrollador', 'salario': 45000
+    }
+    fila.update(extra)
+    return fila
+
+
+class TestPresupuestoConsultas(unittest.TestCase):
+    """Comprueba el número de sentencias SQL de cada operación de UserModel."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.modelo = UserModel()
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+
+        # Conexión real de DatabaseConnection sobre un psycopg2.connect simulado
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def ejecutar(self, nombre, *args, veces=1):
+        """Ejecuta el método real del modelo y devuelve (resultado, sentencias).
+
+        'veces' multiplica el presupuesto de las operaciones que lo tienen por
+        grupo o por lote.
+        """
+        with contador_consultas.medir() as sentencias:
+            resultado = metodo_original(UserModel, nombre)(self.modelo, *args)
+        self.assertLessEqual(
+            len(sentencias), PRESUPUESTOS[nombre] * veces,
+            f"{nombre} ejecutó {len(sentencias)} sentencias: {sentencias}"
+        )
+        return resultado, sentencias
+
+    def test_obtener_todos(self):
+        """Prueba que listar usuarios es una sola sentencia."""
+        self.mock_cursor.fetchall.return_value = [fila_usuario(1), fila_usuario(2)]
+
+        usuarios, _ = self.ejecutar('obtener_todos')
+
+        self.assertEqual(len(usuarios), 2)
+
+    def test_obtener_por_id(self):
+        """Prueba que obtener por ID es una sola sentencia."""
+        self.mock_cursor.fetchone.return_value = fila_usuario(3)
+
+        usuario, _ = self.ejecutar('obtener_por_id', 3)
+
+        self.assertEqual(usuario['id'], 3)
+
+    def test_crear(self):
+        """Prueba que crear es un único INSERT ... RETURNING."""
+        self.mock_cursor.fetchone.return_value = fila_usuario(5)
+
+        usuario, sentencias = self.ejecutar('crear', {'nombre': 'Juan', 'email': 'juan5@email.com'})
+
+        self.assertEqual(usuario['id'], 5)
+        self.assertIn('INSERT INTO users', sentencias[0])
+
+    def test_actualizar(self):
+        """Prueba que PUT es un único UPDATE ... RETURNING."""
+        self.mock_cursor.fetchone.return_value = fila_usuario(
+            1, ciudad='Valencia', campos_modificados=['ciudad'])
+
+        resultado, _ = self.ejecutar('actualizar', 1, {'ciudad': 'Valencia'})
+
+        self.assertEqual(resultado['usuario']['ciudad'], 'Valencia')
+        self.assertEqual(resultado['campos_modificados'], ['ciudad'])
+
+    def test_actualizar_parcial_sin_select_previo(self):
+        """Prueba que PATCH no hace SELECT de existencia antes del UPDATE."""
+        self.mock_cursor.fetchone.return_value = fila_usuario(
+            1, ciudad='Valencia', campos_modificados=['ciudad'])
+
+        resultado, sentencias = self.ejecutar('actualizar_parcial', 1, {'ciudad': 'Valencia'})
+
+        self.assertEqual(resultado['usuario']['ciudad'], 'Valencia')
+        self.assertIn('UPDATE users', sentencias[0])
+        self.assertNotIn('SELECT id FROM users', sentencias[0])
+
+    def test_actualizar_guarda_is_distinct_from(self):
+        """Prueba que el UPDATE solo reescribe la fila si algún valor es distinto."""
+        self.mock_cursor.fetchone.return_value = fila_usuario(
+            1, campos_modificados=['edad'])
+
+        _, sentencias = self.ejecutar('actualizar_parcial', 1, {'ciudad': 'Madrid', 'edad': 30})
+
+        self.assertIn('u.edad IS DISTINCT FROM %s OR u.ciudad IS DISTINCT FROM %s', sentencias[0])
+        parametros = self.mock_cursor.execute.call_args[0][1]
+        self.assertEqual(parametros, [1, 30, 'Madrid', 30, 'Madrid'])
+
+    def test_actualizar_parcial_sin_cambios(self):
+        """Prueba que enviar los valores ya almacenados no cuenta como modificación."""
+        self.mock_cursor.fetchone.return_value = fila_usuario(1, campos_modificados=[])
+
+        resultado, _ = self.ejecutar('actualizar_parcial', 1, {'ciudad': 'Madrid', 'edad': 25})
+
+        self.assertEqual(resultado['campos_actualizados'], [])
+        self.assertEqual(resultado['campos_sin_cambios'], ['edad', 'ciudad'])
+        self.assertIn('Sin cambios', resultado['mensaje'])
+        self.assertNotIn('campos_modificados', resultado['usuario'])
+
+    def test_actualizar_sin_campos_validos(self):
+        """Prueba que sin campos actualizables no se abre conexión."""
+        with self.assertRaises(ValueError):
+            self.ejecutar('actualizar', 1, {'campo_inexistente': 'x'})
+
+        self.mock_conn.cursor.assert_not_called()
+
+    def test_actualizar_parcial_no_existente(self):
+        """Prueba que PATCH de un ID inexistente sigue informando 'no encontrado'."""
+        self.mock_cursor.fetchone.return_value = None
+
+        with self.assertRaises(ValueError) as contexto:
+            self.ejecutar('actualizar_parcial', 999, {'ciudad': 'Valencia'})
+
+        self.assertIn('no encontrado', str(contexto.exception))
+
+    def test_eliminar(self):
+        """Prueba que DELETE devuelve el nombre con RETURNING sin SELECT previo."""
+        self.mock_cursor.fetchone.return_value = {'nombre': 'Juan', 'apellido': 'Pérez'}
+
+        resultado, sentencias = self.ejecutar('eliminar', 1)
+
+        self.assertIn('Juan Pérez', resultado['mensaje'])
+        self.assertIn('RETURNING', sentencias[0])
+
+    def test_eliminar_no_existente(self):
+        """Prueba que DELETE de un ID inexistente lanza ValueError."""
+        self.mock_cursor.fetchone.return_value = None
+
+        with self.assertRaises(ValueError):
+            self.ejecutar('eliminar', 999)
+
+    def test_obtener_paginados(self):
+        """Prueba que total y página llegan en una sola sentencia."""
+        self.mock_cursor.fetchall.return_value = [
+            dict(fila_usuario(1), total_usuarios=25),
+            dict(fila_usuario(2), total_usuarios=25),
+        ]
+
+        resultado, _ = self.ejecutar('obtener_paginados', 1, 2)
+
+        self.assertEqual(len(resultado['usuarios']), 2)
+        self.assertNotIn('total_usuarios', resultado['usuarios'][0])
+        self.assertEqual(resultado['paginacion']['total_usuarios'], 25)
+        self.assertEqual(resultado['paginacion']['total_paginas'], 13)
+
+    def test_obtener_paginados_fuera_de_rango(self):
+        """Prueba una página vacía: el total llega en la fila sin usuario."""
+        self.mock_cursor.fetchall.return_value = [
+            dict({clave: None for clave in fila_usuario()}, total_usuarios=3)
+        ]
+
+        resultado, _ = self.ejecutar('obtener_paginados', 5, 10)
+
+        self.assertEqual(resultado['usuarios'], [])
+        self.assertEqual(resultado['paginacion']['total_usuarios'], 3)
+
+    def test_obtener_estadisticas(self):
+        """Prueba que el total estimado y version() se piden en una sola sentencia."""
+        self.mock_cursor.fetchone.return_value = (7, 'PostgreSQL 16.1')
+
+        resultado, _ = self.ejecutar('obtener_estadisticas')
+
+        self.assertEqual(resultado['total_usuarios'], 7)
+
+    def test_existe(self):
+        """Prueba que HEAD /usuarios/<id> es un único SELECT 1."""
+        self.mock_cursor.fetchone.return_value = (1,)
+
+        existe, sentencias = self.ejecutar('existe', 3)
+
+        self.assertTrue(existe)
+        self.assertIn('SELECT 1', sentencias[0])
+
+    def test_email_disponible(self):
+        """Prueba que sin filtro ni réplica el email se confirma con un SELECT 1."""
+        self.mock_cursor.fetchone.return_value = None
+
+        resultado, _ = self.ejecutar('email_disponible', 'libre@email.com')
+
+        self.assertEqual(resultado, (True, 'postgresql'))
+
+    def test_restaurar(self):
+        """Prueba que restaurar mueve la fila del archivo en una sola sentencia."""
+        self.mock_cursor.fetchone.return_value = fila_usuario(4)
+
+        usuario, sentencias = self.ejecutar('restaurar', 4)
+
+        self.assertEqual(usuario['id'], 4)
+        self.assertIn('DELETE FROM users_archivo', sentencias[0])
+
+    def test_upsert_por_email(self):
+        """Prueba una sentencia por juego de campos en el upsert por lote."""
+        self.mock_cursor.mogrify.side_effect = lambda plantilla, valores: (
+            plantilla % tuple(f"'{valor}'" for valor in valores)).encode('utf-8')
+        self.mock_cursor.fetchall.side_effect = [
+            [dict(fila_usuario(1), resultado='insertado'), dict(fila_usuario(2), resultado='sin_cambios')],
+            [dict(fila_usuario(3), resultado='actualizado')],
+        ]
+        registros = [
+            {'email': 'juan1@email.com', 'nombre': 'Juan'},
+            {'email': 'juan2@email.com', 'nombre': 'Juan'},
+            {'email': 'juan3@email.com', 'nombre': 'Juan', 'ciudad': 'Bilbao'},
+        ]
+
+        resultados, _ = self.ejecutar('upsert_por_email', registros, veces=2)
+
+        self.assertEqual([r['resultado'] for r in resultados], ['insertado', 'sin_cambios', 'actualizado'])
+
+    def test_actualizar_lote(self):
+        """Prueba que el lote de cambios es una sola sentencia."""
+        self.mock_cursor.fetchall.return_value = [(1, 'actualizado'), (2, 'no_encontrado')]
+
+        resultados, _ = self.ejecutar('actualizar_lote', {1: {'ciudad': 'Bilbao'}, 2: {'edad': 40}})
+
+        self.assertEqual(resultados, {1: 'actualizado', 2: 'no_encontrado'})
+
+    def test_eliminar_lote(self):
+        """Prueba que el lote de bajas es una sola sentencia."""
+        self.mock_cursor.fetchall.return_value = [(1,)]
+
+        resultados, _ = self.ejecutar('eliminar_lote', [1, 2])
+
+        self.assertEqual(resultados, {1: 'eliminado', 2: 'no_encontrado'})
+
+    def test_mutar_por_filtro(self):
+        """Prueba una sentencia por lote de la mutación por filtro."""
+        self.mock_cursor.fetchone.side_effect = [(2, [1, 2]), (3, [3]), (None, None)]
+
+        resultado, _ = self.ejecutar('mutar_por_filtro', {'ciudad': 'Madrid'}, 'activo',
+                                     'asignar', False, 2, veces=3)
+
+        self.assertEqual(resultado['filas_actualizadas'], 3)
+        self.assertEqual(resultado['lotes'], 2)
+
+    def test_obtener_cambios_desde(self):
+        """Prueba que cambios y lápidas llegan en una sola sentencia."""
+        self.mock_cursor.fetchall.return_value = [
+            dict(fila_usuario(1), tipo='cambio', fecha=datetime(2025, 1, 2), archivado=False),
+            {'tipo': 'eliminado', 'fecha': datetime(2025, 1, 3), 'id': 2, 'archivado': False},
+        ]
+
+        resultado, _ = self.ejecutar('obtener_cambios_desde', datetime(2025, 1, 1), 0, 10)
+
+        self.assertEqual(len(resultado['cambios']), 1)
+        self.assertEqual(resultado['eliminados'][0]['id'], 2)
+
+    def test_buscar(self):
+        """Prueba que la búsqueda sin índice en memoria es una sola sentencia."""
+        self.mock_cursor.fetchall.return_value = [dict(fila_usuario(1), total=1)]
+
+        resultado, _ = self.ejecutar('buscar', 'juan madrid')
+
+        self.assertEqual(resultado['total'], 1)
+        self.assertEqual(resultado['motor'], 'postgresql')
+
+
+class TestContadorConsultas(unittest.TestCase):
+    """Pruebas para el hook de conteo de la capa de conexión."""
+
+    def test_conexion_instrumentada_cuenta_sentencias(self):
+        """Prueba que cada execute del cursor envuelto queda registrado."""
+        contador = ContadorConsultas()
+        conexion = ConexionInstrumentada(MagicMock(), contador)
+
+        with contador.medir() as sentencias:
+            cursor = conexion.cursor()
+            cursor.execute('SELECT 1')
+            cursor.executemany('INSERT INTO t VALUES (%s)', [(1,), (2,)])
+
+        self.assertEqual(len(sentencias), 3)
+        self.assertEqual(contador.total, 3)
+
+    def test_atributos_delegados(self):
+        """Prueba que los atributos de la conexión real se leen y escriben a través del envoltorio."""
+        mock_conn = MagicMock()
+        conexion = ConexionInstrumentada(mock_conn)
+
+        conexion.autocommit = True
+        conexion.commit()
+
+        self.assertTrue(mock_conn.autocommit)
+        mock_conn.commit.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
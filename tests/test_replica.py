@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para la réplica de usuarios en memoria.
+
+Prueba las funcionalidades de models.replica.ReplicaUsuarios y su uso
+desde UserModel incluyendo:
+- Sincronización paginada desde el flujo de cambios y marca de agua
+- Índices por id, email, ciudad y activo tras altas, cambios y bajas
+- Paginación y filtros con la misma respuesta que PostgreSQL
+- Vuelta a PostgreSQL cuando la réplica supera su antigüedad máxima
+- Lecturas en PostgreSQL para quien acaba de escribir
+- Escrituras del propio worker aplicadas a la réplica al confirmarse
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+import time
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from database.connection import DatabaseConnection
+from database.replicas import forzar_primaria, restaurar_primaria
+from models.replica import ReplicaUsuarios
+from models.user_model import UserModel
+
+
+def usuario(usuario_id, ciudad='Madrid', activo=True, edad=30, **extra):
+    datos = {'id': usuario_id, 'nombre': f'Usuario {usuario_id}', 'apellido': 'Pérez',
+             'email': f'u{usuario_id}@email.com', 'edad': edad, 'telefono': None,
+             'ciudad': ciudad, 'activo': activo, 'fecha_registro': '2026-01-01T00:00:00',
+             'fecha_actualizacion': '2026-01-01T00:00:00', 'genero': None,
+             'profesion': None, 'salario': None}
+    datos.update(extra)
+    return datos
+
+
+def pagina(cambios, eliminados=(), marca=(datetime(2026, 10, 1), 1), hay_mas=False):
+    return {'cambios': list(cambios), 'eliminados': [{'id': i} for i in eliminados],
+            'marca_agua': marca, 'hay_mas': hay_mas}
+
+
+class TestReplicaUsuarios(unittest.TestCase):
+    """Pruebas de la réplica con un flujo de cambios simulado."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.modelo = MagicMock()
+        self.replica = ReplicaUsuarios(self.modelo, intervalo=60, max_antiguedad=60,
+                                       tamano_pagina=2, margen_segundos=5)
+
+    def cargar(self):
+        self.modelo.obtener_cambios_desde.side_effect = [
+            pagina([usuario(3), usuario(1, ciudad='Sevilla')], hay_mas=True, marca=(datetime(2026, 10, 1), 3)),
+            pagina([usuario(2, activo=False, edad=50)], marca=(datetime(2026, 10, 2), 2)),
+        ]
+        self.replica.sincronizar()
+
+    def test_carga_paginada(self):
+        """Prueba que se recorren todas las páginas desde la marca anterior."""
+        self.cargar()
+
+        llamadas = self.modelo.obtener_cambios_desde.call_args_list
+        self.assertEqual(llamadas[0][0], (datetime.min, 0, 2))
+        self.assertEqual(llamadas[1][0], (datetime(2026, 10, 1), 3, 2))
+        self.assertEqual(llamadas[0][1], {'margen_segundos': 5})
+        self.assertEqual(self.replica.ids, [1, 2, 3])
+        self.assertEqual(self.replica.marca, (datetime(2026, 10, 2), 2))
+        self.assertTrue(self.replica.vigente())
+
+    def test_cambios_y_bajas(self):
+        """Prueba que un cambio mueve los índices y una baja los limpia."""
+        self.cargar()
+        self.modelo.obtener_cambios_desde.side_effect = [
+            pagina([usuario(3, ciudad='Bilbao', email='nuevo@email.com')], eliminados=[1])]
+
+        self.replica.sincronizar()
+
+        self.assertEqual(self.replica.ids, [2, 3])
+        self.assertEqual(self.replica.obtener_por_email('nuevo@email.com')['id'], 3)
+        self.assertIsNone(self.replica.obtener_por_email('u3@email.com'))
+        self.assertEqual(self.replica.por_ciudad['Madrid'], {2})
+        self.assertIsNone(self.replica.obtener_por_id(1))
+
+    def test_paginado_con_filtros(self):
+        """Prueba filtros indexados y no indexados con la forma de respuesta del modelo."""
+        self.cargar()
+
+        madrid = self.replica.obtener_paginados(1, 1, {'ciudad': 'Madrid'})
+        mayores = self.replica.obtener_paginados(1, 10, {'edad_min': 40})
+        activos = self.replica.obtener_paginados(1, 10, {'activo': True, 'ciudad': 'Sevilla'})
+
+        self.assertEqual([u['id'] for u in madrid['usuarios']], [2])
+        self.assertEqual(madrid['paginacion']['total_usuarios'], 2)
+        self.assertTrue(madrid['paginacion']['tiene_siguiente'])
+        self.assertEqual([u['id'] for u in mayores['usuarios']], [2])
+        self.assertEqual([u['id'] for u in activos['usuarios']], [1])
+        with self.assertRaises(ValueError):
+            self.replica.obtener_paginados(1, 10, {'telefono': '1'})
+
+    def test_reordenar_lote_grande(self):
+        """Prueba que una carga grande reconstruye la lista de ids de una vez."""
+        self.replica.aplicar([usuario(i) for i in range(1500, 0, -1)], [])
+
+        self.assertEqual(self.replica.ids, list(range(1, 1501)))
+
+    def test_version_local_mas_nueva(self):
+        """Prueba que una página leída antes de una escritura local no la pisa."""
+        self.replica.aplicar([usuario(1, ciudad='Bilbao', fecha_actualizacion='2026-10-02T10:00:00.5')], [])
+        self.replica.aplicar([usuario(1, fecha_actualizacion='2026-10-02T10:00:00')], [])
+
+        self.assertEqual(self.replica.obtener_por_id(1)['ciudad'], 'Bilbao')
+
+
+class TestUserModelConReplica(unittest.TestCase):
+    """Pruebas del uso de la réplica desde UserModel."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.modelo = UserModel()
+        self.modelo.replica = ReplicaUsuarios(MagicMock(), max_antiguedad=60)
+        self.modelo.replica.aplicar([usuario(1)], [])
+
+    def test_lectura_desde_memoria(self):
+        """Prueba que con la réplica vigente no se abre ninguna conexión."""
+        self.modelo.replica._sincronizado = time.monotonic()
+        with patch('database.connection.psycopg2.connect') as mock_connect, \
+             patch.object(DatabaseConnection, 'obtener_conexion',
+                          metodo_original(DatabaseConnection, 'obtener_conexion')):
+            usuario_leido = metodo_original(UserModel, 'obtener_por_id')(self.modelo, 1)
+            listado = metodo_original(UserModel, 'obtener_paginados')(self.modelo, 1, 10)
+
+        self.assertEqual(usuario_leido['email'], 'u1@email.com')
+        self.assertEqual(listado['paginacion']['total_usuarios'], 1)
+        mock_connect.assert_not_called()
+
+    def test_escrituras_propias(self):
+        """Prueba que altas, cambios por lote y bajas se ven en la réplica al confirmarse."""
+        mock_conn = MagicMock()
+        cursor = mock_conn.cursor.return_value
+        with patch('database.connection.psycopg2.connect', return_value=mock_conn), \
+             patch.object(DatabaseConnection, 'obtener_conexion',
+                          metodo_original(DatabaseConnection, 'obtener_conexion')), \
+             patch('builtins.print'):
+            cursor.fetchone.return_value = {
+                **usuario(2), 'fecha_registro': datetime(2026, 10, 1), 'fecha_actualizacion': datetime(2026, 10, 1)}
+            metodo_original(UserModel, 'crear')(self.modelo, {'nombre': 'Ana', 'email': 'u2@email.com'})
+            self.assertEqual(self.modelo.replica.obtener_por_id(2)['fecha_registro'], '2026-10-01T00:00:00')
+
+            # El lote no devuelve las filas: se releen las actualizadas
+            cursor.fetchall.side_effect = [[(1, 'actualizado')],
+                                           [{**usuario(1, ciudad='Bilbao'), 'fecha_registro': None,
+                                             'fecha_actualizacion': datetime(2026, 10, 2)}]]
+            metodo_original(UserModel, 'actualizar_lote')(self.modelo, {1: {'ciudad': 'Bilbao'}})
+            self.assertEqual(self.modelo.replica.por_ciudad['Bilbao'], {1})
+
+            cursor.fetchall.side_effect = [[(2,)]]
+            metodo_original(UserModel, 'eliminar_lote')(self.modelo, [2])
+
+        self.assertEqual(self.modelo.replica.ids, [1])
+
+    def test_replica_caducada_usa_postgresql(self):
+        """Prueba que una réplica sin sincronizar no se usa."""
+        self.assertIsNone(self.modelo._replica_vigente())
+
+    def test_lee_tus_escrituras_sin_memoria(self):
+        """Prueba que el contexto que lee de la primaria no usa la réplica vigente."""
+        self.modelo.replica._sincronizado = time.monotonic()
+        token = forzar_primaria()
+        try:
+            self.assertIsNone(self.modelo._replica_vigente())
+        finally:
+            restaurar_primaria(token)
+        self.assertIs(self.modelo._replica_vigente(), self.modelo.replica)
+        self.assertEqual(ReplicaUsuarios(MagicMock(), max_antiguedad=15, margen_segundos=5).ventana_escritura, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
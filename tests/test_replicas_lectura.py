@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para el reparto de lecturas entre la primaria y sus réplicas.
+
+Prueba las funcionalidades de database.replicas.EnrutadorReplicas, del
+middleware LeerTusEscrituras y del enrutado de UserModel incluyendo:
+- Elección de la réplica con menos peticiones en curso
+- Exclusión de réplicas con retraso o caídas, y vuelta a la primaria
+- Retraso medido contra el LSN de la primaria
+- Lecturas en la primaria tras una escritura del mismo cliente
+- Lecturas de UserModel en la réplica y escrituras en la primaria
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+import time
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+import psycopg2
+from flask import Flask, jsonify
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from database.connection import DatabaseConnection
+from database.replicas import EnrutadorReplicas, forzar_primaria, restaurar_primaria, lectura_en_primaria
+from middleware.lecturas import LeerTusEscrituras
+from models.user_model import UserModel
+
+
+class BaseReplicas(unittest.TestCase):
+    """Primaria en 5432 y réplicas en 5433 y 5434 sobre psycopg2.connect simulado."""
+
+    PUERTOS = ('5432', '5433', '5434')
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.conexiones = {puerto: MagicMock() for puerto in self.PUERTOS}
+        self.caidos = set()
+        self.parches = [
+            patch.dict(os.environ, {'DB_PORT': '5432', 'DB_REPLICAS': '5433,5434', 'DB_SHARDS': ''}),
+            patch('database.connection.psycopg2.connect', side_effect=self.conectar),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def conectar(self, **config):
+        if config['port'] in self.caidos:
+            raise psycopg2.OperationalError('servidor caído')
+        return self.conexiones[config['port']]
+
+    def cursor(self, puerto):
+        return self.conexiones[puerto].cursor.return_value
+
+    def retrasos(self, enrutador, *segundos):
+        self.cursor('5432').fetchone.return_value = ('0/3000060',)
+        for puerto, retraso in zip(self.PUERTOS[1:], segundos):
+            self.cursor(puerto).fetchone.return_value = (retraso,)
+        enrutador.medir()
+        self.cursor('5432').reset_mock()
+
+
+class TestEnrutadorReplicas(BaseReplicas):
+    """Pruebas de EnrutadorReplicas."""
+
+    def test_menos_peticiones_en_curso(self):
+        """Prueba que cada lectura va a la réplica con menos peticiones abiertas."""
+        enrutador = EnrutadorReplicas(DatabaseConnection(), max_retraso=5, intervalo=60)
+        self.retrasos(enrutador, 0, 0)
+
+        primera = enrutador.obtener_conexion()
+        segunda = enrutador.obtener_conexion()
+        self.assertEqual([r.pendientes for r in enrutador.replicas], [1, 1])
+
+        segunda.close()
+        # La réplica de la segunda queda libre: la siguiente lectura va a ella
+        tercera = enrutador.obtener_conexion()
+        self.assertIs(tercera.conexion.conexion, segunda.conexion.conexion)
+        self.assertIsNot(tercera.conexion.conexion, primera.conexion.conexion)
+
+        primera.close()
+        tercera.close()
+        tercera.close()
+        self.assertEqual([r.pendientes for r in enrutador.replicas], [0, 0])
+        self.assertEqual(enrutador.lecturas_primaria, 0)
+
+    def test_exclusion_por_retraso_y_caida(self):
+        """Prueba que las réplicas con retraso, caídas o sin medir no reciben lecturas."""
+        enrutador = EnrutadorReplicas(DatabaseConnection(), max_retraso=5, intervalo=60)
+
+        # Sin medición todavía: a la primaria
+        self.assertIs(enrutador.obtener_conexion().conexion, self.conexiones['5432'])
+
+        self.retrasos(enrutador, 12.5, 0.2)
+        self.assertEqual([r.indice for r in enrutador.disponibles()], [1])
+
+        # La réplica buena deja de aceptar conexiones: se descarta y se lee de la primaria
+        self.caidos.add('5434')
+        with patch('builtins.print'):
+            conn = enrutador.obtener_conexion()
+        self.assertIs(conn.conexion, self.conexiones['5432'])
+        self.assertEqual(enrutador.disponibles(), [])
+        self.assertEqual(enrutador.lecturas_primaria, 2)
+        self.assertEqual(enrutador.replicas[1].pendientes, 0)
+
+        # Una medición caducada también excluye
+        self.caidos.clear()
+        self.retrasos(enrutador, 0, 0)
+        enrutador.replicas[0].medido = time.monotonic() - 200
+        self.assertEqual([r.indice for r in enrutador.disponibles()], [1])
+        estado = enrutador.estado()
+        self.assertEqual([r['disponible'] for r in estado['replicas']], [False, True])
+
+    def test_medicion_contra_la_primaria(self):
+        """Prueba que el retraso se mide con el LSN de la primaria y sin él nadie queda disponible."""
+        enrutador = EnrutadorReplicas(DatabaseConnection(), max_retraso=5, intervalo=2)
+        self.assertEqual(enrutador.ventana_escritura, 11)
+
+        self.cursor('5432').fetchone.return_value = ('0/3000060',)
+        self.cursor('5433').fetchone.return_value = (float('inf'),)
+        self.cursor('5434').fetchone.return_value = (0.0,)
+        enrutador.medir()
+
+        sql, parametros = self.cursor('5434').execute.call_args[0]
+        self.assertIn('pg_last_wal_replay_lsn() >= %s::pg_lsn', sql)
+        self.assertEqual(parametros, ('0/3000060',))
+        estado = enrutador.estado()
+        self.assertEqual([r['disponible'] for r in estado['replicas']], [False, True])
+        self.assertIsNone(estado['replicas'][0]['retraso_segundos'])
+
+        self.caidos.add('5432')
+        enrutador.medir()
+        self.assertEqual(enrutador.disponibles(), [])
+        self.assertIn('Sin LSN de la primaria', enrutador.replicas[1].ultimo_error)
+
+    def test_primaria_forzada(self):
+        """Prueba que el contexto que lee sus escrituras no usa las réplicas."""
+        enrutador = EnrutadorReplicas(DatabaseConnection(), max_retraso=5, intervalo=60)
+        self.retrasos(enrutador, 0, 0)
+
+        token = forzar_primaria()
+        try:
+            self.assertIs(enrutador.obtener_conexion().conexion, self.conexiones['5432'])
+        finally:
+            restaurar_primaria(token)
+        self.assertFalse(lectura_en_primaria())
+        self.assertIsNot(enrutador.obtener_conexion().conexion.conexion, self.conexiones['5432'])
+
+
+class TestLeerTusEscrituras(unittest.TestCase):
+    """Pruebas del middleware LeerTusEscrituras."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        app = Flask(__name__)
+        LeerTusEscrituras(app, ventana=30)
+
+        @app.route('/lectura', methods=['GET'])
+        def lectura():
+            return jsonify({"primaria": lectura_en_primaria()})
+
+        @app.route('/escritura', methods=['POST'])
+        def escritura():
+            return jsonify({"primaria": lectura_en_primaria()}), 201
+
+        @app.route('/fallida', methods=['POST'])
+        def fallida():
+            return jsonify({"exito": False}), 400
+
+        self.cliente = app.test_client()
+
+    def test_cookie_tras_escribir(self):
+        """Prueba que tras una escritura correcta el mismo cliente lee de la primaria."""
+        self.assertFalse(self.cliente.get('/lectura').get_json()['primaria'])
+
+        self.cliente.post('/fallida')
+        self.assertFalse(self.cliente.get('/lectura').get_json()['primaria'])
+
+        respuesta = self.cliente.post('/escritura')
+        self.assertTrue(respuesta.get_json()['primaria'])
+        self.assertIn('escritura_reciente=', respuesta.headers.get('Set-Cookie', ''))
+        self.assertTrue(self.cliente.get('/lectura').get_json()['primaria'])
+
+        # Ventana vencida
+        self.cliente.set_cookie('escritura_reciente', str(time.time() - 1))
+        self.assertFalse(self.cliente.get('/lectura').get_json()['primaria'])
+
+
+class TestLecturasModelo(BaseReplicas):
+    """Pruebas de UserModel con réplicas de lectura."""
+
+    def test_lecturas_en_replica_y_escrituras_en_primaria(self):
+        """Prueba que GET por id y estadísticas van a la réplica y eliminar a la primaria."""
+        modelo = UserModel()
+        self.retrasos(modelo.lecturas, 0, 30)
+        replica = self.cursor('5433')
+        replica.fetchone.return_value = {
+            'id': 7, 'nombre': 'Ana', 'email': 'ana@x.com', 'archivado': None,
+            'fecha_registro': datetime(2025, 1, 1), 'fecha_actualizacion': None}
+        replica.execute.reset_mock()
+
+        usuario = metodo_original(UserModel, 'obtener_por_id')(modelo, 7)
+
+        self.assertEqual(usuario['id'], 7)
+        replica.execute.assert_called_once()
+        self.cursor('5432').execute.assert_not_called()
+        self.assertEqual(modelo.lecturas.replicas[0].pendientes, 0)
+
+        replica.fetchone.return_value = (1000, 'PostgreSQL 16')
+        self.assertEqual(metodo_original(UserModel, 'obtener_estadisticas')(modelo)['total_usuarios'], 1000)
+
+        self.cursor('5432').fetchone.return_value = {'id': 7}
+        metodo_original(UserModel, 'eliminar')(modelo, 7, minimo=True)
+        self.conexiones['5432'].commit.assert_called_once()
+        self.assertEqual(modelo.lecturas.replicas[1].atendidas, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para las sondas de vida y disponibilidad.
+
+Prueba las funcionalidades de database.salud.MonitorSalud y de los
+endpoints GET /salud y GET /listo incluyendo:
+- /salud sin ninguna E/S
+- /listo servido desde el estado en memoria del ping
+- Caducidad del último ping y reconexión tras un fallo
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility
+setup_all_compatibility()
+
+from api import app, user_controller
+from database.salud import MonitorSalud
+
+
+class TestMonitorSalud(unittest.TestCase):
+    """Pruebas del hilo de ping con una conexión simulada."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.monitor = MonitorSalud(intervalo=0.01, max_antiguedad=60)
+        self.conn = MagicMock()
+        self.monitor.db = MagicMock()
+        self.monitor.db.obtener_conexion.return_value = self.conn
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        self.monitor.detener()
+
+    def test_ping_sin_tocar_users(self):
+        """Prueba que el ping reutiliza la conexión y solo ejecuta SELECT 1."""
+        def detener_al_tercero(sql):
+            if self.conn.cursor.return_value.execute.call_count >= 3:
+                self.monitor._detener.set()
+        self.conn.cursor.return_value.execute.side_effect = detener_al_tercero
+
+        self.monitor._bucle()
+
+        self.monitor.db.obtener_conexion.assert_called_once()
+        sentencias = {c[0][0] for c in self.conn.cursor.return_value.execute.call_args_list}
+        self.assertEqual(sentencias, {'SELECT 1'})
+        disponible, detalle = self.monitor.estado()
+        self.assertTrue(disponible)
+        self.assertIsNotNone(detalle['ultimo_ping'])
+
+    def test_fallo_reabre_la_conexion(self):
+        """Prueba que tras un error se cierra la conexión y se cuenta el fallo."""
+        def fallar(sql):
+            self.monitor._detener.set()
+            raise Exception("servidor caído")
+        self.conn.cursor.return_value.execute.side_effect = fallar
+
+        self.monitor._bucle()
+
+        self.conn.close.assert_called_once()
+        disponible, detalle = self.monitor.estado()
+        self.assertFalse(disponible)
+        self.assertFalse(detalle['conexion_abierta'])
+        self.assertEqual(detalle['fallos_consecutivos'], 1)
+        self.assertEqual(detalle['ultimo_error'], 'servidor caído')
+
+    def test_ping_caducado(self):
+        """Prueba que un ping demasiado antiguo deja de contar."""
+        self.monitor.max_antiguedad = 5
+        self.monitor.registrar_ping(1.5)
+        self.monitor.ultimo_ping_monotonico -= 10
+
+        self.assertFalse(self.monitor.estado()[0])
+
+
+class TestEndpointsSalud(unittest.TestCase):
+    """Pruebas de GET /salud y GET /listo."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.monitor = MonitorSalud(intervalo=60)
+        self.monitor.iniciar = MagicMock()
+        self.parche = patch('controllers.user_controller.monitor_salud', self.monitor)
+        self.parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        self.parche.stop()
+
+    def test_salud_sin_base_de_datos(self):
+        """Prueba que /salud responde sin abrir conexiones."""
+        with patch('database.connection.psycopg2.connect') as mock_connect:
+            response = self.client.get('/salud')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['estado'], 'vivo')
+        mock_connect.assert_not_called()
+
+    def test_listo_con_ping_reciente(self):
+        """Prueba 200 con el detalle del ping y de la caché."""
+        self.monitor.registrar_ping(0.8)
+
+        with patch('database.connection.psycopg2.connect') as mock_connect:
+            response = self.client.get('/listo')
+
+        self.assertEqual(response.status_code, 200)
+        datos = response.get_json()
+        self.assertEqual(datos['base_datos']['latencia_ms'], 0.8)
+        self.assertIn('caliente', datos['cache_estadisticas'])
+        self.monitor.iniciar.assert_called_once()
+        mock_connect.assert_not_called()
+
+    def test_no_listo_sin_ping(self):
+        """Prueba 503 mientras no haya un ping correcto."""
+        response = self.client.get('/listo')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()['estado'], 'no_listo')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para el reparto de usuarios entre varias bases (shards).
+
+Prueba las funcionalidades del mapa de shards de DatabaseConnection y del
+enrutado de UserModel incluyendo:
+- Lectura de DB_SHARDS y shard de un id o de un email
+- Operaciones por id enviadas solo a su shard
+- Listado y paginación con mezcla por id de todos los shards
+- Altas en el shard del email con comprobación del id asignado
+- Directorio global de emails (altas, upsert y cambios de email)
+- Cambios-desde, recuentos y estadísticas combinados de todos los shards
+- Próximo id de cada shard (scripts/preparar_shards.py)
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(str(Path(__file__).parent.parent / 'scripts'))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+import preparar_shards
+from database.connection import DatabaseConnection
+from models.user_model import UserModel
+
+
+def fila(usuario_id, **extra):
+    return dict({'id': usuario_id, 'nombre': 'Ana', 'email': f'u{usuario_id}@x.com',
+                 'fecha_registro': datetime(2025, 1, 1), 'fecha_actualizacion': None}, **extra)
+
+
+class TestMapaShards(unittest.TestCase):
+    """Pruebas del mapa de shards de DatabaseConnection."""
+
+    def test_leer_shards(self):
+        """Prueba DB_SHARDS con puertos solos y con host y base."""
+        self.assertEqual(DatabaseConnection.leer_shards('5433, db2:5434/usuarios,'), [
+            {'port': '5433'},
+            {'host': 'db2', 'port': '5434', 'database': 'usuarios'},
+        ])
+        self.assertEqual(DatabaseConnection.leer_shards(''), [])
+
+    def test_shard_de_id_y_email(self):
+        """Prueba el resto del id y un hash de email estable."""
+        db = DatabaseConnection(shards=[{'port': '5433'}, {'port': '5434'}, {'port': '5435'}])
+        self.assertEqual([db.shard_de_id(i) for i in (3, 7, 11)], [0, 1, 2])
+        self.assertEqual(db.shard_de_email('ana@x.com'), db.shard_de_email('ana@x.com'))
+        self.assertIn(db.shard_de_email('ana@x.com'), range(3))
+
+        sin_shards = DatabaseConnection(shards=[])
+        self.assertEqual(sin_shards.numero_shards, 1)
+        self.assertEqual((sin_shards.shard_de_id(7), sin_shards.shard_de_email('ana@x.com')), (0, 0))
+
+    def test_siguiente_id(self):
+        """Prueba el primer id libre de cada shard tras el mayor existente."""
+        self.assertEqual([preparar_shards.siguiente_id(10, shard, 3) for shard in range(3)], [12, 13, 11])
+        self.assertEqual([preparar_shards.siguiente_id(0, shard, 3) for shard in range(3)], [3, 1, 2])
+
+    def test_registrar_emails(self):
+        """Prueba que los emails de un shard se ligan por lotes y se cuentan los repetidos."""
+        conn, directorio = MagicMock(), MagicMock()
+        conn.cursor.return_value.fetchall.return_value = [('a@x.com',), ('b@x.com',), ('c@x.com',)]
+        directorio.cursor.return_value.fetchone.side_effect = [(1,), (0,)]
+
+        self.assertEqual(preparar_shards.registrar_emails(conn, directorio, 2, tamano_lote=2), (3, 1))
+        llamadas = directorio.cursor.return_value.execute.call_args_list
+        self.assertEqual(llamadas[0][0][1], (2, ['a@x.com', 'b@x.com']))
+        self.assertEqual(llamadas[2][0][1], (2, ['c@x.com']))
+        self.assertEqual(directorio.commit.call_count, 2)
+
+
+class TestEnrutadoModelo(unittest.TestCase):
+    """Pruebas de UserModel con tres shards sobre psycopg2.connect simulado."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        # 5432 (DB_PORT) es la base del directorio de emails
+        self.conexiones = {puerto: MagicMock() for puerto in ('5432', '5433', '5434', '5435')}
+        self.parches = [
+            patch.dict(os.environ, {'DB_SHARDS': '5433,5434,5435'}),
+            patch('database.connection.psycopg2.connect',
+                  side_effect=lambda **config: self.conexiones[config['port']]),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+        self.modelo = UserModel()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def cursor(self, puerto):
+        return self.conexiones[puerto].cursor.return_value
+
+    def test_lectura_por_id_en_su_shard(self):
+        """Prueba que GET /usuarios/<id> solo consulta el shard de su id."""
+        self.cursor('5434').fetchone.return_value = fila(7, archivado=None)
+
+        usuario = metodo_original(UserModel, 'obtener_por_id')(self.modelo, 7)
+
+        self.assertEqual(usuario['id'], 7)
+        self.cursor('5434').execute.assert_called_once()
+        self.cursor('5432').execute.assert_not_called()
+        self.cursor('5433').execute.assert_not_called()
+        self.cursor('5435').execute.assert_not_called()
+
+    def test_listado_mezclado_por_id(self):
+        """Prueba la mezcla ordenada por id de los listados de cada shard."""
+        self.cursor('5433').fetchall.return_value = [fila(3), fila(6), fila(9)]
+        self.cursor('5434').fetchall.return_value = [fila(1), fila(4)]
+        self.cursor('5435').fetchall.return_value = [fila(2), fila(8)]
+
+        usuarios = metodo_original(UserModel, 'obtener_todos')(self.modelo)
+
+        self.assertEqual([u['id'] for u in usuarios], [1, 2, 3, 4, 6, 8, 9])
+        self.assertEqual(usuarios[0]['fecha_registro'], '2025-01-01T00:00:00')
+        for puerto in ('5433', '5434', '5435'):
+            self.conexiones[puerto].close.assert_called_once()
+
+    def test_paginado_disperso(self):
+        """Prueba que cada shard devuelve offset + limite filas y los totales se suman."""
+        self.cursor('5433').fetchall.return_value = [fila(3, total_usuarios=3), fila(6, total_usuarios=3)]
+        self.cursor('5434').fetchall.return_value = [fila(1, total_usuarios=2), fila(4, total_usuarios=2)]
+        # Shard vacío: la fila del total llega con la página a NULL
+        self.cursor('5435').fetchall.return_value = [{'total_usuarios': 0, 'id': None}]
+
+        resultado = metodo_original(UserModel, 'obtener_paginados')(self.modelo, 2, 2)
+
+        self.assertEqual([u['id'] for u in resultado['usuarios']], [4, 6])
+        self.assertEqual(resultado['paginacion']['total_usuarios'], 5)
+        self.assertEqual(resultado['paginacion']['total_paginas'], 3)
+        for puerto in ('5433', '5434', '5435'):
+            self.assertEqual(self.cursor(puerto).execute.call_args[0][1][-2:], [4, 0])
+
+    def test_alta_en_el_shard_del_email(self):
+        """Prueba el alta en el shard del email y el rechazo de un id de otro shard."""
+        email = 'nueva@x.com'
+        shard = self.modelo.db.shard_de_email(email)
+        puerto = ('5433', '5434', '5435')[shard]
+        self.cursor('5432').fetchall.return_value = [(email, shard)]
+
+        self.cursor(puerto).fetchone.return_value = fila(shard + 3, email=email)
+        with patch('builtins.print'):
+            usuario = metodo_original(UserModel, 'crear')(self.modelo, {'nombre': 'Eva', 'email': email})
+        self.assertEqual(usuario['id'], shard + 3)
+        self.conexiones[puerto].commit.assert_called_once()
+
+        self.cursor(puerto).fetchone.return_value = fila(shard + 4, email=email)
+        with self.assertRaises(Exception) as contexto:
+            metodo_original(UserModel, 'crear')(self.modelo, {'nombre': 'Eva', 'email': email})
+        self.assertIn('preparar_shards', str(contexto.exception))
+        self.conexiones[puerto].rollback.assert_called_once()
+        self.conexiones[puerto].commit.assert_called_once()
+
+    def test_eliminar_lote_por_shard(self):
+        """Prueba un DELETE por shard con solo sus ids."""
+        self.cursor('5433').fetchall.return_value = [(3,)]
+        self.cursor('5434').fetchall.return_value = [(1,), (4,)]
+        self.cursor('5435').fetchall.return_value = []
+
+        with patch('builtins.print'):
+            resultado = self.modelo.eliminar_lote([1, 2, 3, 4])
+
+        self.assertEqual(resultado, {1: 'eliminado', 2: 'no_encontrado', 3: 'eliminado', 4: 'eliminado'})
+        self.assertEqual(self.cursor('5434').execute.call_args[0][1], ([1, 4],))
+        self.assertEqual(self.cursor('5435').execute.call_args[0][1], ([2],))
+        for puerto in ('5433', '5434', '5435'):
+            self.conexiones[puerto].commit.assert_called_once()
+
+    def test_email_ligado_en_el_directorio(self):
+        """Prueba que el upsert y email-disponible siguen al shard ligado, no al hash."""
+        email = 'movido@x.com'
+        shard = (self.modelo.db.shard_de_email(email) + 1) % 3
+        puerto = ('5433', '5434', '5435')[shard]
+        self.cursor('5432').fetchall.return_value = [(email, shard)]
+        self.cursor(puerto).fetchall.return_value = [fila(shard + 3, email=email, resultado='actualizado')]
+        self.cursor(puerto).mogrify.return_value = b"('movido@x.com', 'Eva')"
+
+        with patch('builtins.print'):
+            resultados = self.modelo.upsert_por_email([{'email': email, 'nombre': 'Eva'}])
+
+        self.assertEqual(resultados[0]['resultado'], 'actualizado')
+        self.assertIn('INSERT INTO directorio_emails', self.cursor('5432').execute.call_args[0][0])
+        self.conexiones[puerto].commit.assert_called_once()
+        for otro in {'5433', '5434', '5435'} - {puerto}:
+            self.cursor(otro).execute.assert_not_called()
+
+        # Un email que nunca se ligó está libre sin consultar ningún shard
+        self.cursor('5432').fetchone.return_value = None
+        self.assertEqual(self.modelo.email_disponible('libre@x.com'), (True, 'postgresql'))
+        self.cursor(puerto).fetchone.return_value = (1,)
+        self.cursor('5432').fetchone.return_value = (shard,)
+        self.assertEqual(self.modelo.email_disponible(email), (False, 'postgresql'))
+
+    def test_cambio_de_email_ligado_a_otro_shard(self):
+        """Prueba que un email de otro shard solo se liga de nuevo si ese shard ya no lo tiene."""
+        self.cursor('5432').fetchall.return_value = [('ana@x.com', 0)]
+        self.cursor('5433').fetchone.return_value = (1,)
+
+        with self.assertRaises(ValueError) as contexto:
+            metodo_original(UserModel, 'actualizar_parcial')(self.modelo, 7, {'email': 'ana@x.com'})
+        self.assertIn('ya existe', str(contexto.exception))
+        self.cursor('5434').execute.assert_not_called()
+
+        # Ya no está en el shard 0: el email pasa al shard 1 del usuario 7
+        self.cursor('5433').fetchone.return_value = None
+        self.cursor('5432').rowcount = 1
+        self.cursor('5434').fetchone.return_value = fila(7, email='ana@x.com', campos_modificados=['email'])
+        with patch('builtins.print'):
+            resultado = metodo_original(UserModel, 'actualizar_parcial')(self.modelo, 7, {'email': 'ana@x.com'})
+
+        self.assertEqual(resultado['campos_actualizados'], ['email'])
+        sql, parametros = self.cursor('5432').execute.call_args[0]
+        self.assertIn('UPDATE directorio_emails SET shard = %s', sql)
+        self.assertEqual(parametros, (1, 'ana@x.com', 0, UserModel.DIRECTORIO_GRACIA_SEGUNDOS))
+
+        # Escrito hace menos de la gracia (o ligado por otra sesión): se rechaza
+        self.cursor('5432').rowcount = 0
+        with self.assertRaises(ValueError):
+            metodo_original(UserModel, 'actualizar_parcial')(self.modelo, 7, {'email': 'ana@x.com'})
+
+    def test_cambios_desde_mezclados(self):
+        """Prueba la mezcla por (fecha, id) de los cambios de cada shard."""
+        def cambio(usuario_id, minuto, tipo='cambio'):
+            return fila(usuario_id, tipo=tipo, fecha=datetime(2026, 10, 19, 8, minuto), archivado=False)
+        self.cursor('5433').fetchall.return_value = [cambio(3, 1), cambio(6, 5)]
+        self.cursor('5434').fetchall.return_value = [cambio(4, 2, 'eliminado')]
+        self.cursor('5435').fetchall.return_value = [cambio(2, 3), cambio(5, 4)]
+
+        resultado = self.modelo.obtener_cambios_desde(datetime(2026, 10, 19), 0, 3)
+
+        self.assertEqual([u['id'] for u in resultado['cambios']], [3, 2])
+        self.assertEqual([e['id'] for e in resultado['eliminados']], [4])
+        self.assertEqual(resultado['marca_agua'], (datetime(2026, 10, 19, 8, 3), 2))
+        self.assertTrue(resultado['hay_mas'])
+
+    def test_recuento_y_distribuciones_combinados(self):
+        """Prueba la suma de recuentos y las medias ponderadas entre shards."""
+        for puerto, (coinciden, a_modificar) in zip(('5433', '5434', '5435'), ((4, 1), (2, 2), (0, 0))):
+            self.cursor(puerto).fetchall.return_value = [{'coinciden': coinciden, 'a_modificar': a_modificar}]
+        self.assertEqual(self.modelo.contar_por_filtro({'ciudad': 'Madrid'}, 'activo', 'asignar', False),
+                         {'coinciden': 6, 'a_modificar': 3})
+
+        def distribucion(total, edad_media, con_edad, calculado):
+            return {'dimension': 'ciudad', 'valor': 'Madrid', 'orden': 0, 'total': total, 'activos': total,
+                    'edad_media': edad_media, 'salario_medio': None, 'salario_percentiles': [1.0] * 4,
+                    'con_edad': con_edad, 'con_salario': 0, 'calculado': datetime(2026, 10, 19, calculado)}
+        self.cursor('5433').fetchall.return_value = [distribucion(3, 20.0, 3, 9)]
+        self.cursor('5434').fetchall.return_value = [distribucion(2, 40.0, 1, 8)]
+        self.cursor('5435').fetchall.return_value = []
+
+        resultado = self.modelo.obtener_distribuciones(['ciudad'])
+
+        madrid = resultado['distribuciones']['ciudad'][0]
+        self.assertEqual((madrid['total'], madrid['edad_media'], madrid['salario_medio']), (5, 25.0, None))
+        self.assertEqual(madrid['salario_percentiles'], {'p25': None, 'p50': None, 'p75': None, 'p90': None})
+        self.assertEqual(resultado['calculado'], '2026-10-19T08:00:00')
+
+
+if __name__ == '__main__':
+    unittest.main()
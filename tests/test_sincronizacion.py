@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para la sincronización incremental de usuarios.
+
+Prueba las funcionalidades de UserModel.obtener_cambios_desde y del
+endpoint GET /usuarios/cambios-desde incluyendo:
+- Recorrido por la marca de agua (fecha_actualizacion, id) en una sentencia
+- Lápidas de usuarios eliminados
+- Cursor opaco con la nueva marca de agua en cada página
+- Retención de lápidas (410) y validación de parámetros
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from api import app, user_controller
+from controllers.user_controller import UserController
+from database.connection import DatabaseConnection
+from database.instrumentacion import contador_consultas
+from models.user_model import UserModel
+
+
+class TestCambiosDesdeModelo(unittest.TestCase):
+    """Pruebas del SQL de UserModel.obtener_cambios_desde."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.modelo = UserModel()
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def fila(self, tipo, minuto, usuario_id, archivado=False):
+        fecha = datetime(2026, 10, 1, 12, minuto)
+        fila = {'tipo': tipo, 'fecha': fecha, 'id': usuario_id, 'archivado': archivado, 'nombre': None,
+                'fecha_registro': None, 'fecha_actualizacion': None}
+        if tipo == 'cambio':
+            fila.update(nombre='Ana', fecha_registro=datetime(2026, 1, 1), fecha_actualizacion=fecha)
+        return fila
+
+    def test_pagina_con_cambios_y_lapidas(self):
+        """Prueba una página mixta, la nueva marca de agua y 'hay_mas'."""
+        self.mock_cursor.fetchall.return_value = [
+            self.fila('cambio', 1, 7), self.fila('eliminado', 2, 3, archivado=True), self.fila('cambio', 3, 9)]
+        desde = datetime(2026, 10, 1)
+
+        with contador_consultas.medir() as sentencias:
+            resultado = self.modelo.obtener_cambios_desde(desde, 0, 2, margen_segundos=5)
+
+        self.assertEqual(len(sentencias), 1)
+        self.assertIn('WHERE (fecha_actualizacion, id) > (%s, %s)', sentencias[0])
+        self.assertIn('FROM users_eliminados', sentencias[0])
+        self.assertIn('make_interval(secs => %s)', sentencias[0])
+        parametros = self.mock_cursor.execute.call_args[0][1]
+        self.assertEqual(parametros, (desde, 0, 5, 3, desde, 0, 5, 3, 3))
+
+        self.assertTrue(resultado['hay_mas'])
+        self.assertEqual([u['id'] for u in resultado['cambios']], [7])
+        self.assertNotIn('tipo', resultado['cambios'][0])
+        self.assertNotIn('archivado', resultado['cambios'][0])
+        self.assertEqual(resultado['eliminados'],
+                         [{'id': 3, 'fecha_eliminacion': '2026-10-01T12:02:00', 'archivado': True}])
+        self.assertEqual(resultado['marca_agua'], (datetime(2026, 10, 1, 12, 2), 3))
+
+    def test_sin_cambios_conserva_la_marca(self):
+        """Prueba que una página vacía devuelve la misma marca de agua."""
+        self.mock_cursor.fetchall.return_value = []
+        desde = datetime(2026, 10, 1)
+
+        resultado = self.modelo.obtener_cambios_desde(desde, 42, 100)
+
+        self.assertEqual(resultado['marca_agua'], (desde, 42))
+        self.assertFalse(resultado['hay_mas'])
+
+
+class TestCambiosDesdeEndpoint(unittest.TestCase):
+    """Pruebas del endpoint GET /usuarios/cambios-desde."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.hace_un_rato = datetime.now() - timedelta(hours=1)
+
+    def respuesta_modelo(self, marca):
+        return {'cambios': [{'id': 1}], 'eliminados': [], 'marca_agua': marca, 'hay_mas': False}
+
+    def test_desde_devuelve_cursor(self):
+        """Prueba que 'desde' inicia el recorrido y la respuesta trae el cursor siguiente."""
+        marca = (self.hace_un_rato + timedelta(minutes=5), 17)
+        with patch.object(user_controller.user_model, 'obtener_cambios_desde',
+                          return_value=self.respuesta_modelo(marca)) as mock_cambios:
+            response = self.client.get(f'/usuarios/cambios-desde?desde={self.hace_un_rato.isoformat()}')
+
+        self.assertEqual(response.status_code, 200)
+        mock_cambios.assert_called_once_with(self.hace_un_rato, 0, 100,
+                                             margen_segundos=user_controller.sincronizacion_margen)
+        datos = response.get_json()['datos']
+        self.assertEqual(datos['marca_agua'], marca[0].isoformat())
+        self.assertEqual(UserController._decodificar_cursor(datos['cursor']), marca)
+
+    def test_cursor_continua_la_marca(self):
+        """Prueba que el cursor recibido se usa como marca de agua."""
+        marca = (self.hace_un_rato, 99)
+        cursor = UserController._codificar_cursor(*marca)
+        with patch.object(user_controller.user_model, 'obtener_cambios_desde',
+                          return_value=self.respuesta_modelo(marca)) as mock_cambios:
+            self.client.get(f'/usuarios/cambios-desde?cursor={cursor}&limite=10')
+
+        self.assertEqual(mock_cambios.call_args[0][:3], (self.hace_un_rato, 99, 10))
+
+    def test_sincronizacion_completa(self):
+        """Prueba que sin marca de agua se recorre desde el principio."""
+        with patch.object(user_controller.user_model, 'obtener_cambios_desde',
+                          return_value=self.respuesta_modelo((datetime.min, 0))) as mock_cambios:
+            response = self.client.get('/usuarios/cambios-desde')
+
+        self.assertEqual(mock_cambios.call_args[0][:2], (datetime.min, 0))
+        self.assertIsNone(response.get_json()['datos']['marca_agua'])
+
+    def test_marca_fuera_de_retencion(self):
+        """Prueba 410 cuando las lápidas de ese periodo ya se purgaron."""
+        antigua = (datetime.now() - timedelta(days=400)).isoformat()
+
+        response = self.client.get(f'/usuarios/cambios-desde?desde={antigua}')
+
+        self.assertEqual(response.status_code, 410)
+
+    def test_parametros_invalidos(self):
+        """Prueba fecha, cursor y límite inválidos."""
+        self.assertEqual(self.client.get('/usuarios/cambios-desde?desde=ayer').status_code, 400)
+        self.assertEqual(self.client.get('/usuarios/cambios-desde?cursor=xxx').status_code, 400)
+        self.assertEqual(self.client.get('/usuarios/cambios-desde?limite=5000').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Pruebas unitarias para el upsert de usuarios por email.
+
+Prueba las funcionalidades de UserModel.upsert_por_email y de los
+endpoints PUT /usuarios/por-email incluyendo:
+- INSERT ... ON CONFLICT (email) DO UPDATE en una sola sentencia
+- Clasificación insertado / actualizado / sin_cambios / archivado / conflicto
+- Deduplicación de emails y agrupación por campos enviados
+- Validación y límite de tamaño del lote
+
+Autor: agustinEDev
+Fecha: 19 de octubre de 2026
+"""
+
+import unittest
+import sys
+import os
+import json
+from unittest.mock import patch, MagicMock
+from datetime import datetime
+
+# Añadir el directorio raíz al path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar compatibilidad para tests
+from tests.test_compatibility import setup_all_compatibility, metodo_original
+setup_all_compatibility()
+
+from api import app, user_controller
+from database.connection import DatabaseConnection
+from database.instrumentacion import contador_consultas
+from models.user_model import UserModel
+
+
+def mogrify_simulado(plantilla, valores):
+    """Sustituye los %s como lo haría psycopg2 (suficiente para las pruebas)."""
+    return (plantilla % tuple(f"'{valor}'" for valor in valores)).encode('utf-8')
+
+
+class TestUpsertModelo(unittest.TestCase):
+    """Pruebas del SQL de UserModel.upsert_por_email."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        self.modelo = UserModel()
+        self.mock_conn = MagicMock()
+        self.mock_cursor = self.mock_conn.cursor.return_value
+        self.mock_cursor.mogrify.side_effect = mogrify_simulado
+        self.parches = [
+            patch('database.connection.psycopg2.connect', return_value=self.mock_conn),
+            patch.object(DatabaseConnection, 'obtener_conexion',
+                         metodo_original(DatabaseConnection, 'obtener_conexion')),
+        ]
+        for parche in self.parches:
+            parche.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba."""
+        for parche in self.parches:
+            parche.stop()
+
+    def fila(self, usuario_id, email, resultado):
+        return {'id': usuario_id, 'email': email, 'nombre': 'Ana',
+                'fecha_registro': datetime(2025, 1, 1), 'fecha_actualizacion': None,
+                'resultado': resultado}
+
+    def test_lote_uniforme_una_sentencia(self):
+        """Prueba que un lote con los mismos campos es un único INSERT ... ON CONFLICT."""
+        self.mock_cursor.fetchall.return_value = [
+            self.fila(1, 'a@x.com', 'insertado'),
+            self.fila(2, 'b@x.com', 'actualizado'),
+            self.fila(3, 'c@x.com', 'sin_cambios'),
+        ]
+        registros = [{'email': e, 'nombre': 'Ana'} for e in ('a@x.com', 'b@x.com', 'c@x.com')]
+        self.modelo.indice_busqueda = MagicMock()
+
+        with contador_consultas.medir() as sentencias:
+            resultados = self.modelo.upsert_por_email(registros)
+
+        self.assertEqual(len(sentencias), 1)
+        self.assertIn('ON CONFLICT (email) DO UPDATE SET nombre = EXCLUDED.nombre', sentencias[0])
+        self.assertIn('IS DISTINCT FROM', sentencias[0])
+        self.assertIn('xmax = 0', sentencias[0])
+        self.assertEqual([r['resultado'] for r in resultados],
+                         ['insertado', 'actualizado', 'sin_cambios'])
+        self.assertNotIn('resultado', resultados[0]['usuario'])
+        self.mock_conn.commit.assert_called_once()
+        # Las filas sin cambios no se vuelven a indexar
+        self.assertEqual([c[0][0] for c in self.modelo.indice_busqueda.actualizar.call_args_list], [1, 2])
+
+    def test_emails_duplicados_gana_el_ultimo(self):
+        """Prueba que un email repetido en el lote solo se envía una vez."""
+        self.mock_cursor.fetchall.return_value = [self.fila(1, 'a@x.com', 'insertado')]
+
+        self.modelo.upsert_por_email([
+            {'email': 'a@x.com', 'nombre': 'Primero'},
+            {'email': 'a@x.com', 'nombre': 'Último'},
+        ])
+
+        consulta = self.mock_cursor.execute.call_args[0][0]
+        self.assertIn("'Último'", consulta)
+        self.assertNotIn("'Primero'", consulta)
+
+    def test_grupos_por_campos(self):
+        """Prueba que registros con distintos campos van en sentencias separadas."""
+        self.mock_cursor.fetchall.side_effect = [
+            [self.fila(1, 'a@x.com', 'insertado')],
+            [self.fila(2, 'b@x.com', 'actualizado')],
+        ]
+
+        resultados = self.modelo.upsert_por_email([
+            {'email': 'a@x.com', 'nombre': 'Ana'},
+            {'email': 'b@x.com', 'nombre': 'Luis', 'ciudad': 'Bilbao'},
+        ])
+
+        self.assertEqual(self.mock_cursor.execute.call_count, 2)
+        segunda = self.mock_cursor.execute.call_args_list[1][0][0]
+        self.assertIn('ciudad = EXCLUDED.ciudad', segunda)
+        self.assertEqual([r['email'] for r in resultados], ['a@x.com', 'b@x.com'])
+
+    def test_email_perdido_por_concurrencia(self):
+        """Prueba que un email sin fila devuelta se informa como conflicto."""
+        self.mock_cursor.fetchall.return_value = [self.fila(1, 'a@x.com', 'insertado')]
+
+        resultados = self.modelo.upsert_por_email([
+            {'email': 'a@x.com', 'nombre': 'Ana'},
+            {'email': 'b@x.com', 'nombre': 'Ana'},
+        ])
+
+        self.assertEqual(resultados[1], {'email': 'b@x.com', 'resultado': 'conflicto', 'usuario': None})
+
+    def test_email_archivado(self):
+        """Prueba que con el archivo activo un email archivado no entra en el upsert."""
+        self.modelo.archivo = True
+        self.mock_cursor.fetchall.side_effect = [
+            [{'email': 'b@x.com'}],
+            [self.fila(1, 'a@x.com', 'insertado')],
+        ]
+
+        resultados = self.modelo.upsert_por_email([
+            {'email': 'a@x.com', 'nombre': 'Ana'},
+            {'email': 'b@x.com', 'nombre': 'Ana'},
+        ])
+
+        self.assertIn('FROM users_archivo WHERE email = ANY', self.mock_cursor.execute.call_args_list[0][0][0])
+        upsert = self.mock_cursor.execute.call_args_list[1][0][0]
+        self.assertNotIn("'b@x.com'", upsert)
+        self.assertEqual([r['resultado'] for r in resultados], ['insertado', 'archivado'])
+
+    def test_integridad_a_value_error(self):
+        """Prueba que un error de integridad se traduce a ValueError."""
+        import psycopg2
+        self.mock_cursor.execute.side_effect = psycopg2.IntegrityError("null value")
+
+        with self.assertRaises(ValueError):
+            self.modelo.upsert_por_email([{'email': 'a@x.com', 'nombre': None}])
+
+
+class TestUpsertEndpoints(unittest.TestCase):
+    """Pruebas de los endpoints PUT /usuarios/por-email."""
+
+    def setUp(self):
+        """Configuración inicial para cada prueba."""
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+    def test_upsert_individual_insertado(self):
+        """Prueba que un usuario nuevo responde 201 con resultado 'insertado'."""
+        resultado = [{'email': 'ana@x.com', 'resultado': 'insertado',
+                      'usuario': {'id': 9, 'email': 'ana@x.com', 'nombre': 'Ana'}}]
+        with patch.object(user_controller.user_model, 'upsert_por_email',
+                          return_value=resultado) as mock_upsert:
+            response = self.client.put('/usuarios/por-email/ana@x.com',
+                                       data=json.dumps({'nombre': 'Ana'}),
+                                       content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['resultado'], 'insertado')
+        registros = mock_upsert.call_args[0][0]
+        self.assertEqual(registros[0]['email'], 'ana@x.com')
+
+    def test_upsert_individual_actualizado(self):
+        """Prueba que un usuario existente responde 200."""
+        resultado = [{'email': 'ana@x.com', 'resultado': 'actualizado',
+                      'usuario': {'id': 9, 'email': 'ana@x.com', 'nombre': 'Ana'}}]
+        with patch.object(user_controller.user_model, 'upsert_por_email', return_value=resultado):
+            response = self.client.put('/usuarios/por-email/ana@x.com',
+                                       data=json.dumps({'nombre': 'Ana'}),
+                                       content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_upsert_individual_archivado(self):
+        """Prueba el 409 con el estado explícito de un email archivado."""
+        resultado = {'email': 'ana@x.com', 'resultado': 'archivado', 'usuario': None}
+        with patch.object(user_controller.user_model, 'upsert_por_email', return_value=[resultado]):
+            response = self.client.put('/usuarios/por-email/ana@x.com',
+                                       data=json.dumps({'nombre': 'Ana'}),
+                                       content_type='application/json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.get_json()['resultado'], 'archivado')
+
+    def test_upsert_lote_resumen(self):
+        """Prueba que el lote informa de insertados, actualizados y sin cambios."""
+        resultados = [
+            {'email': 'a@x.com', 'resultado': 'insertado', 'usuario': {'id': 1}},
+            {'email': 'b@x.com', 'resultado': 'actualizado', 'usuario': {'id': 2}},
+            {'email': 'c@x.com', 'resultado': 'sin_cambios', 'usuario': {'id': 3}},
+        ]
+        registros = [{'email': r['email'], 'nombre': 'X'} for r in resultados]
+        with patch.object(user_controller.user_model, 'upsert_por_email', return_value=resultados):
+            response = self.client.put('/usuarios/por-email', data=json.dumps(registros),
+                                       content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        resumen = response.get_json()['datos']['resumen']
+        self.assertEqual(resumen, {'insertados': 1, 'actualizados': 1, 'sin_cambios': 1,
+                                   'archivados': 0, 'conflictos': 0})
+
+    def test_upsert_lote_registro_invalido(self):
+        """Prueba que un registro sin email rechaza el lote entero."""
+        response = self.client.put('/usuarios/por-email',
+                                   data=json.dumps([{'nombre': 'Sin email'}]),
+                                   content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.get_json()['exito'])
+
+    def test_upsert_lote_demasiado_grande(self):
+        """Prueba el límite de tamaño del lote."""
+        with patch.object(user_controller, 'lote_maximo', 2):
+            registros = [{'email': f'{i}@x.com', 'nombre': 'X'} for i in range(3)]
+            response = self.client.put('/usuarios/por-email', data=json.dumps(registros),
+                                       content_type='application/json')
+
+        self.assertEqual(response.status_code, 413)
+
+
+if __name__ == '__main__':
+    unittest.main()